@@ -1,9 +1,27 @@
 from django.contrib import admin
-from .models import Promocion
+from .models import MetricaPromocion, Promocion, UsoPromocion
 
 @admin.register(Promocion)
 class PromocionAdmin(admin.ModelAdmin):
-    list_display = ['titulo', 'tipo_descuento', 'valor_descuento', 'fecha_inicio', 'fecha_fin', 'activa']
-    list_filter = ['tipo_descuento', 'activa', 'fecha_inicio']
+    list_display = ['titulo', 'tipo_descuento', 'valor_descuento', 'modo_acumulacion', 'usos', 'max_usos', 'fecha_inicio', 'fecha_fin', 'activa']
+    list_filter = ['tipo_descuento', 'modo_acumulacion', 'activa', 'fecha_inicio']
     search_fields = ['titulo', 'codigo']
     filter_horizontal = ['servicios']
+    readonly_fields = ['usos']
+
+
+@admin.register(UsoPromocion)
+class UsoPromocionAdmin(admin.ModelAdmin):
+    list_display = ['promocion', 'cliente', 'usos']
+    search_fields = ['promocion__titulo', 'cliente__usuario__username']
+    raw_id_fields = ['promocion', 'cliente']
+
+
+@admin.register(MetricaPromocion)
+class MetricaPromocionAdmin(admin.ModelAdmin):
+    list_display = ['promocion', 'turnos', 'turnos_completados', 'turnos_cancelados', 'descuento_otorgado', 'ingresos', 'fecha_actualizacion']
+    search_fields = ['promocion__titulo']
+    readonly_fields = [campo.name for campo in MetricaPromocion._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -6,7 +6,11 @@ from .api_views import (
     PromocionListCreateAPIView,
     PromocionDetailAPIView,
     PromocionValidarEliminacionAPIView,
-    PromocionVigentesAPIView
+    PromocionVigentesAPIView,
+    SimularPromocionAPIView,
+    PromocionImportarAPIView,
+    PromocionExportarAPIView,
+    PromocionMetricasAPIView
 )
 
 app_name = 'promociones_api'
@@ -19,6 +23,13 @@ urlpatterns = [
     # Promociones vigentes (público)
     path('vigentes/', PromocionVigentesAPIView.as_view(), name='promocion-vigentes'),
     
+    # Simulación de impacto sobre turnos completados (admin)
+    path('simular/', SimularPromocionAPIView.as_view(), name='promocion-simular'),
+    
+    # Importación y exportación masiva (admin)
+    path('importar/', PromocionImportarAPIView.as_view(), name='promocion-importar'),
+    path('exportar/', PromocionExportarAPIView.as_view(), name='promocion-exportar'),
+    
     # CU-19: Modificar Promoción (PUT)
     # CU-20: Eliminar Promoción (DELETE)
     # Detalle de promoción (GET)
@@ -26,4 +37,7 @@ urlpatterns = [
     
     # Validar si puede eliminarse una promoción
     path('<int:id>/validar-eliminacion/', PromocionValidarEliminacionAPIView.as_view(), name='promocion-validar-eliminacion'),
+    
+    # Métricas de efectividad (admin)
+    path('<int:id>/metricas/', PromocionMetricasAPIView.as_view(), name='promocion-metricas'),
 ]
@@ -6,6 +6,8 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -13,9 +15,20 @@ from .models import Promocion
 from .serializers import (
     PromocionSerializer,
     PromocionListSerializer,
-    PromocionCreateUpdateSerializer
+    PromocionCreateUpdateSerializer,
+    CotizarPreciosRequestSerializer,
+    CotizacionSerializer,
+    SimularPromocionSerializer,
+    SimulacionSerializer,
+    ImportarPromocionesSerializer,
+    MetricaPromocionSerializer
 )
 from .services import PromocionService
+from .indice_services import PromocionIndiceService
+from .precio_services import PrecioService
+from .simulacion_services import SimulacionService
+from .importacion_services import ImportacionService
+from .metrica_services import MetricaService
 from apps.usuarios.permissions import IsAdministrador
 
 
@@ -46,12 +59,7 @@ class PromocionListCreateAPIView(APIView):
         # Filtro por vigencia actual
         vigente = request.query_params.get('vigente')
         if vigente is not None and vigente.lower() in ['true', '1', 'yes']:
-            now = timezone.now()
-            promociones = promociones.filter(
-                activa=True,
-                fecha_inicio__lte=now,
-                fecha_fin__gte=now
-            )
+            promociones = promociones.filter(id__in=PromocionIndiceService.vigentes_ids())
         
         serializer = PromocionListSerializer(promociones, many=True)
         return Response({
@@ -229,12 +237,144 @@ class PromocionValidarEliminacionAPIView(APIView):
         })
 
 
+
+class PromocionMetricasAPIView(APIView):
+    """
+    API de efectividad de una promoción
+    
+    GET /api/promociones/:id/metricas/
+    - Canjes, tasa de cancelación, descuento otorgado, ingresos y uplift de
+      la demanda frente a las semanas previas al inicio
+    - Lee los contadores precalculados, sin recorrer los turnos
+    """
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    
+    def get(self, request, id):
+        """Retorna las métricas de la promoción"""
+        promocion = get_object_or_404(Promocion, id=id)
+        
+        return Response({
+            'success': True,
+            'data': MetricaPromocionSerializer(MetricaService.resumen(promocion)).data
+        })
+
+class SimularPromocionAPIView(APIView):
+    """
+    API para estimar el impacto de una promoción antes de crearla
+    
+    POST /api/promociones/simular/
+    - Body: tipo_descuento, valor_descuento, categoria?, servicios?, modo_acumulacion?, desde, hasta
+    - Recalcula el precio de los turnos completados del período como si la
+      promoción hubiera estado vigente
+    - Retorna descuento total, variación de ingresos y detalle por servicio
+    """
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    
+    def post(self, request):
+        """Simula la promoción candidata"""
+        serializer = SimularPromocionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Parámetros inválidos',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        datos = serializer.validated_data
+        resultado, errores = SimulacionService.simular(datos, datos['desde'], datos['hasta'])
+        if errores:
+            return Response({
+                'success': False,
+                'message': 'Error al simular la promoción',
+                'errors': errores
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': SimulacionSerializer(resultado).data
+        })
+
+
+class PromocionImportarAPIView(APIView):
+    """
+    API para importar promociones en forma masiva
+    
+    POST /api/promociones/importar/
+    - Body (multipart): archivo (CSV o JSON), formato?, solo_validar?
+    - Valida todo el archivo con las reglas de CU-18 (incluye solapamientos
+      entre filas y con la base)
+    - Crea las filas válidas y reporta los errores de cada fila inválida
+    """
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    
+    def post(self, request):
+        """Importa las promociones del archivo"""
+        serializer = ImportarPromocionesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Parámetros inválidos',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        archivo = serializer.validated_data['archivo']
+        formato = ImportacionService.formato_de(archivo.name, serializer.validated_data.get('formato'))
+        filas, error = ImportacionService.leer(archivo.read(), formato)
+        if filas is None:
+            return Response({
+                'success': False,
+                'message': error
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        solo_validar = serializer.validated_data['solo_validar']
+        resultado, errores = ImportacionService.importar(filas, guardar=not solo_validar)
+        if solo_validar:
+            mensaje, codigo = f"{resultado['validas']} de {resultado['total']} promociones son válidas", status.HTTP_200_OK
+        elif resultado['creadas']:
+            mensaje, codigo = f"{resultado['creadas']} promociones importadas exitosamente", status.HTTP_201_CREATED
+        else:
+            mensaje, codigo = 'No se importó ninguna promoción', status.HTTP_400_BAD_REQUEST
+        
+        return Response({
+            'success': not errores,
+            'message': mensaje,
+            'data': resultado,
+            'errors': errores
+        }, status=codigo)
+
+
+class PromocionExportarAPIView(APIView):
+    """
+    API para exportar todas las promociones
+    
+    GET /api/promociones/exportar/?formato=csv|json
+    - La respuesta se genera por bloques (streaming)
+    - El archivo puede volver a importarse con /api/promociones/importar/
+    """
+    permission_classes = [IsAuthenticated, IsAdministrador]
+    
+    def get(self, request):
+        """Descarga las promociones"""
+        formato = request.query_params.get('formato', 'csv').lower()
+        if formato not in ImportacionService.FORMATOS:
+            return Response({
+                'success': False,
+                'message': f"Formato no soportado: {formato}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        tipo = 'application/json' if formato == 'json' else 'text/csv'
+        response = StreamingHttpResponse(ImportacionService.exportar(formato), content_type=f'{tipo}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="promociones.{formato}"'
+        return response
+
+
 class PromocionVigentesAPIView(APIView):
     """
     API para obtener promociones vigentes
     
     GET /api/promociones/vigentes/
     - Lista promociones activas y vigentes en el momento actual
+    - La respuesta se cachea hasta el próximo inicio o fin de vigencia
     - No requiere autenticación (puede ser consultado por clientes)
     """
     permission_classes = []  # Público
@@ -242,15 +382,49 @@ class PromocionVigentesAPIView(APIView):
     def get(self, request):
         """Lista promociones vigentes actualmente"""
         now = timezone.now()
-        promociones = Promocion.objects.filter(
-            activa=True,
-            fecha_inicio__lte=now,
-            fecha_fin__gte=now
-        )
+        clave = f'promociones:vigentes:{PromocionIndiceService.clave_vigencia(now)}'
+        data = cache.get(clave)
+        if data is None:
+            data = list(PromocionListSerializer(PromocionIndiceService.vigentes(now), many=True).data)
+            cache.set(clave, data, PromocionIndiceService.segundos_hasta_cambio(now))
         
-        serializer = PromocionListSerializer(promociones, many=True)
         return Response({
             'success': True,
-            'count': promociones.count(),
-            'data': serializer.data
+            'count': len(data),
+            'data': data
+        })
+
+
+class CotizarPreciosAPIView(APIView):
+    """
+    API para cotizar muchos servicios en un solo request
+    
+    POST /api/precios/cotizar/
+    - Body: {"items": [{"servicio_id": 1, "codigo": "VERANO"}, {"servicio_id": 2}]}
+    - Devuelve precio base, mejor promoción, descuento y precio final de cada uno
+    - No requiere autenticación (lo usa el catálogo de servicios)
+    """
+    permission_classes = []  # Público
+    
+    def post(self, request):
+        """Cotiza los servicios pedidos"""
+        serializer = CotizarPreciosRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'message': 'Parámetros inválidos',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cotizaciones, errores = PrecioService.cotizar(serializer.validated_data['items'])
+        if errores:
+            return Response({
+                'success': False,
+                'message': errores[0]
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'count': len(cotizaciones),
+            'data': CotizacionSerializer(cotizaciones, many=True).data
         })
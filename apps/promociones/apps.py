@@ -5,3 +5,6 @@ class PromocionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.promociones'
     verbose_name = 'Promociones'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,183 @@
+"""
+Motor de combinación de promociones.
+Busca, para un precio base, la combinación legal de promociones con menor
+precio final: una promoción exclusiva sola, o hasta MAX_ACUMULADAS
+promociones acumulables aplicadas en cadena según su orden de aplicación.
+Devuelve el desglose paso a paso que se guarda en el turno.
+"""
+import logging
+
+from .precio_services import PrecioService
+
+logger = logging.getLogger(__name__)
+
+
+class CombinacionService:
+    """
+    Servicio de búsqueda de la mejor combinación de promociones.
+
+    Las acumulables se aplican en orden (orden_aplicacion, porcentajes antes
+    que montos fijos): cada porcentaje se calcula sobre el precio ya
+    descontado. Antes de buscar se descartan las opciones dominadas: dentro
+    de un mismo escalón de aplicación solo pueden servir las MAX_ACUMULADAS
+    de mayor valor, y entre las exclusivas solo la de mayor descuento. La
+    búsqueda poda las ramas que, aun aplicando todo lo restante, no mejoran
+    la mejor combinación encontrada.
+    """
+
+    MAX_ACUMULADAS = 3
+
+    @staticmethod
+    def clave_aplicacion(promocion):
+        """Orden en que se aplican las acumulables"""
+        return (promocion.orden_aplicacion, 0 if promocion.tipo_descuento == 'porcentaje' else 1, promocion.id)
+
+    @staticmethod
+    def descuento_centavos(precio, promocion):
+        """Descuento de una promoción sobre un precio en centavos (mitad hacia arriba)"""
+        valor = PrecioService.a_centavos(promocion.valor_descuento)
+        if promocion.tipo_descuento == 'porcentaje':
+            escala = PrecioService.ESCALA_PORCENTAJE
+            valor = (precio * valor + escala // 2) // escala
+        return min(valor, precio)
+
+    @staticmethod
+    def _aplicar_cadena(precio, promociones):
+        """Precio final de aplicar en cadena promociones ya ordenadas"""
+        for promocion in promociones:
+            precio -= CombinacionService.descuento_centavos(precio, promocion)
+        return precio
+
+    @staticmethod
+    def _sin_dominadas(acumulables, obligatoria=None):
+        """
+        Deja en cada escalón (orden, tipo) las MAX_ACUMULADAS de mayor valor.
+        Dentro de un escalón las promociones son intercambiables, así que una
+        de menor valor nunca mejora una combinación que pueda usar otra mayor.
+        """
+        escalones = {}
+        for promocion in acumulables:
+            escalones.setdefault(CombinacionService.clave_aplicacion(promocion)[:2], []).append(promocion)
+
+        utiles = []
+        for promociones in escalones.values():
+            promociones.sort(key=lambda p: (-p.valor_descuento, p.id))
+            elegidas = promociones[:CombinacionService.MAX_ACUMULADAS]
+            if obligatoria is not None and obligatoria in promociones and obligatoria not in elegidas:
+                elegidas.append(obligatoria)
+            utiles.extend(elegidas)
+        utiles.sort(key=CombinacionService.clave_aplicacion)
+        return utiles
+
+    @staticmethod
+    def _mejor_acumulable(base, acumulables, obligatoria=None):
+        """
+        Mejor subconjunto de hasta MAX_ACUMULADAS acumulables (búsqueda con poda).
+
+        Returns:
+            tuple: (precio_final, promociones en orden de aplicación)
+        """
+        candidatas = CombinacionService._sin_dominadas(acumulables, obligatoria)
+        if obligatoria is None:
+            mejor = [base, []]
+        else:
+            mejor = [CombinacionService._aplicar_cadena(base, [obligatoria]), [obligatoria]]
+
+        def buscar(indice, precio, elegidas, usa_obligatoria):
+            if usa_obligatoria and precio < mejor[0]:
+                mejor[0], mejor[1] = precio, list(elegidas)
+            if indice == len(candidatas) or len(elegidas) == CombinacionService.MAX_ACUMULADAS:
+                return
+            # Cota: aplicar todo lo que queda es lo más barato alcanzable desde esta rama
+            if CombinacionService._aplicar_cadena(precio, candidatas[indice:]) >= mejor[0]:
+                return
+            promocion = candidatas[indice]
+            elegidas.append(promocion)
+            buscar(
+                indice + 1,
+                precio - CombinacionService.descuento_centavos(precio, promocion),
+                elegidas,
+                usa_obligatoria or promocion is obligatoria
+            )
+            elegidas.pop()
+            if promocion is not obligatoria:
+                buscar(indice + 1, precio, elegidas, usa_obligatoria)
+
+        buscar(0, base, [], obligatoria is None)
+        return mejor[0], mejor[1]
+
+    @staticmethod
+    def mejor_combinacion(precio_base, promociones, obligatoria=None):
+        """
+        Mejor combinación legal de promociones para un precio.
+
+        Args:
+            precio_base (Decimal): Precio del servicio
+            promociones (list): Promociones vigentes que aplican al servicio
+            obligatoria (Promocion, optional): Promoción que debe incluirse
+                (código ingresado o promoción elegida por el cliente)
+
+        Returns:
+            dict: promociones (en orden de aplicación), principal (la de mayor
+                  descuento), precio_base, descuento, precio_final y desglose
+        """
+        base = PrecioService.a_centavos(precio_base)
+        acumulables = [p for p in promociones if p.es_acumulable()]
+        exclusivas = [p for p in promociones if not p.es_acumulable()]
+
+        if obligatoria is not None and not obligatoria.es_acumulable():
+            elegidas = [obligatoria]
+        else:
+            if obligatoria is not None:
+                # La obligatoria reemplaza a su copia del índice: la búsqueda la distingue por identidad
+                acumulables = [p for p in acumulables if p.pk != obligatoria.pk] + [obligatoria]
+            final, elegidas = CombinacionService._mejor_acumulable(base, acumulables, obligatoria)
+            if obligatoria is None and exclusivas:
+                # Entre exclusivas solo compite la de mayor descuento
+                exclusiva = max(exclusivas, key=lambda p: (CombinacionService.descuento_centavos(base, p), -p.id))
+                # A igual precio gana la opción con menos promociones
+                if base - CombinacionService.descuento_centavos(base, exclusiva) <= final:
+                    elegidas = [exclusiva]
+
+        return CombinacionService.desglosar(base, elegidas)
+
+    @staticmethod
+    def desglosar(base, promociones):
+        """
+        Aplica las promociones en cadena y arma el desglose explicable.
+
+        Args:
+            base (int): Precio base en centavos
+            promociones (list): Promociones en orden de aplicación
+
+        Returns:
+            dict: Ver mejor_combinacion
+        """
+        desglose = []
+        precio = base
+        principal, mayor = None, 0
+        for promocion in promociones:
+            descuento = CombinacionService.descuento_centavos(precio, promocion)
+            if descuento == 0:
+                continue
+            desglose.append({
+                'promocion_id': promocion.id,
+                'titulo': promocion.titulo,
+                'tipo_descuento': promocion.tipo_descuento,
+                'valor_descuento': str(promocion.valor_descuento),
+                'precio_antes': str(PrecioService.desde_centavos(precio)),
+                'descuento': str(PrecioService.desde_centavos(descuento)),
+                'precio_despues': str(PrecioService.desde_centavos(precio - descuento)),
+            })
+            if descuento > mayor:
+                principal, mayor = promocion, descuento
+            precio -= descuento
+
+        return {
+            'promociones': [p for p in promociones if any(paso['promocion_id'] == p.id for paso in desglose)],
+            'principal': principal,
+            'precio_base': PrecioService.desde_centavos(base),
+            'descuento': PrecioService.desde_centavos(base - precio),
+            'precio_final': PrecioService.desde_centavos(precio),
+            'desglose': desglose,
+        }
@@ -0,0 +1,199 @@
+"""
+Cupos de canje de promociones.
+Los límites se hacen cumplir con UPDATE condicionales (usos = usos + 1
+WHERE usos < límite) en la misma transacción que guarda el turno: la base
+serializa los canjes concurrentes y nunca se cuenta un uso de más. Cancelar
+el turno devuelve el cupo en la transacción que lo cancela.
+
+Los contadores cambian con cada canje, así que el cupo restante se lee
+siempre de la base: el índice en memoria solo aporta las candidatas.
+"""
+from collections import Counter
+from functools import reduce
+import logging
+import operator
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .models import Promocion, UsoPromocion
+
+logger = logging.getLogger(__name__)
+
+
+class CupoAgotado(Exception):
+    """Una promoción del turno no tiene cupo; revierte los canjes ya contados"""
+
+
+class CupoService:
+    """Servicio de control de cupos de uso de promociones"""
+
+    @staticmethod
+    def agotadas(promociones, cliente_id=None):
+        """
+        IDs de las promociones sin cupo, leídos de la base en una consulta.
+
+        Solo se consulta si alguna promoción tiene límite total o, con
+        cliente, límite por cliente; los contadores de las copias en memoria
+        no se usan porque quedan viejos con cada canje.
+
+        Args:
+            promociones (iterable): Promociones candidatas
+            cliente_id (int, optional): Cliente que solicita el turno
+
+        Returns:
+            set[int]: IDs de las promociones agotadas
+        """
+        limitadas = {
+            p.pk for p in promociones
+            if p.max_usos is not None or (cliente_id is not None and p.max_usos_por_cliente is not None)
+        }
+        if not limitadas:
+            return set()
+
+        sin_cupo = Q(usos__gte=F('max_usos'))
+        if cliente_id is not None:
+            sin_cupo |= Q(
+                usos_por_cliente__cliente_id=cliente_id,
+                usos_por_cliente__usos__gte=F('max_usos_por_cliente')
+            )
+        return set(Promocion.objects.filter(sin_cupo, pk__in=limitadas).values_list('pk', flat=True).distinct())
+
+    @staticmethod
+    def disponibles(promociones, cliente_id=None):
+        """
+        Descarta las promociones sin cupo para el cliente (ver agotadas).
+
+        Args:
+            promociones (list): Promociones candidatas
+            cliente_id (int, optional): Cliente que solicita el turno
+
+        Returns:
+            list: Promociones con cupo, en el mismo orden
+        """
+        agotadas = CupoService.agotadas(promociones, cliente_id)
+        return [p for p in promociones if p.pk not in agotadas]
+
+    @staticmethod
+    def consumir(promociones, cliente_id):
+        """
+        Cuenta un canje de cada promoción aplicada a un turno.
+
+        Todas las promociones suman su uso total en un solo UPDATE
+        condicional; las que limitan el uso por cliente incrementan además
+        su fila en UsoPromocion, todas juntas en un INSERT ... ON CONFLICT
+        DO UPDATE condicional. Si alguna no tiene cupo no se cuenta ningún
+        canje.
+
+        Debe llamarse dentro de la transacción que guarda el turno; no abre un
+        savepoint propio (sería una consulta más por turno), así que si
+        devuelve False esa transacción queda marcada para revertirse.
+
+        Args:
+            promociones (list): Promociones aplicadas al turno
+            cliente_id (int): Cliente del turno
+
+        Returns:
+            tuple: (exitoso: bool, mensaje_error: str)
+        """
+        ids = [p.pk for p in promociones]
+        if not ids:
+            return True, ''
+
+        try:
+            with transaction.atomic(savepoint=False):
+                canjeadas = Promocion.objects.filter(pk__in=ids).filter(
+                    Q(max_usos__isnull=True) | Q(usos__lt=F('max_usos'))
+                ).update(usos=F('usos') + 1)
+                if canjeadas < len(ids):
+                    agotada = Promocion.objects.filter(pk__in=ids, usos__gte=F('max_usos')).first()
+                    if agotada is None:
+                        raise CupoAgotado('La promoción aplicada ya no está disponible')
+                    raise CupoAgotado(f'La promoción "{agotada.titulo}" alcanzó su límite de usos')
+
+                por_cliente = [p for p in promociones if p.max_usos_por_cliente is not None]
+                if por_cliente and CupoService._consumir_por_cliente(
+                    [p.pk for p in por_cliente], cliente_id
+                ) < len(por_cliente):
+                    agotada = Promocion.objects.filter(
+                        pk__in=[p.pk for p in por_cliente],
+                        usos_por_cliente__cliente_id=cliente_id,
+                        usos_por_cliente__usos__gte=F('max_usos_por_cliente')
+                    ).first() or por_cliente[0]
+                    raise CupoAgotado(
+                        f'Ya utilizó la promoción "{agotada.titulo}" la cantidad máxima de veces permitida'
+                    )
+        except CupoAgotado as e:
+            logger.info(f"Canje rechazado para el cliente {cliente_id}: {e}")
+            return False, str(e)
+
+        return True, ''
+
+    @staticmethod
+    def _consumir_por_cliente(ids, cliente_id):
+        """
+        Incrementa en una sentencia los contadores del cliente sin superar
+        max_usos_por_cliente; el primer canje inserta la fila con usos = 1.
+        El ON CONFLICT resuelve también dos primeros canjes simultáneos.
+
+        Returns:
+            int: Contadores incrementados (menos que len(ids) si alguno estaba agotado)
+        """
+        uso = connection.ops.quote_name(UsoPromocion._meta.db_table)
+        promocion = connection.ops.quote_name(Promocion._meta.db_table)
+        marcadores = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {uso} (promocion_id, cliente_id, usos) '
+                f'SELECT id, %s, 1 FROM {promocion} WHERE id IN ({marcadores}) AND max_usos_por_cliente > 0 '
+                f'ON CONFLICT (promocion_id, cliente_id) DO UPDATE SET usos = {uso}.usos + 1 '
+                f'WHERE {uso}.usos < (SELECT max_usos_por_cliente FROM {promocion} WHERE id = excluded.promocion_id)',
+                [cliente_id, *ids]
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def promociones_del_turno(promocion_id, desglose):
+        """IDs de las promociones que canjeó un turno: las del desglose y la principal"""
+        ids = {paso.get('promocion_id') for paso in desglose or []}
+        ids.add(promocion_id)
+        ids.discard(None)
+        return ids
+
+    @staticmethod
+    def liberar(turnos):
+        """
+        Devuelve el cupo de turnos cancelados: resta sus canjes del uso total
+        y del uso por cliente con UPDATE condicionales (nunca por debajo de
+        cero). Debe llamarse en la transacción que cancela los turnos.
+
+        Args:
+            turnos (list[tuple]): (cliente_id, promocion_id, desglose_promociones)
+                de cada turno cancelado, con los valores previos a la cancelación
+
+        Returns:
+            int: Canjes devueltos
+        """
+        por_promocion = Counter()
+        por_cliente = Counter()
+        for cliente_id, promocion_id, desglose in turnos:
+            for id_promocion in CupoService.promociones_del_turno(promocion_id, desglose):
+                por_promocion[id_promocion] += 1
+                por_cliente[(id_promocion, cliente_id)] += 1
+        if not por_promocion:
+            return 0
+
+        # Un UPDATE por cantidad distinta de canjes (casi siempre uno solo)
+        for cantidad in set(por_promocion.values()):
+            ids = [pk for pk, usos in por_promocion.items() if usos == cantidad]
+            Promocion.objects.filter(pk__in=ids, usos__gt=0).update(usos=Greatest(F('usos') - cantidad, 0))
+        for cantidad in set(por_cliente.values()):
+            pares = reduce(operator.or_, (
+                Q(promocion_id=promocion_id, cliente_id=cliente_id)
+                for (promocion_id, cliente_id), usos in por_cliente.items() if usos == cantidad
+            ))
+            UsoPromocion.objects.filter(pares, usos__gt=0).update(usos=Greatest(F('usos') - cantidad, 0))
+
+        logger.info(f"Cupos devueltos por cancelación: {dict(por_promocion)}")
+        return sum(por_promocion.values())
@@ -21,6 +21,11 @@ class PromocionForm(forms.ModelForm):
             'style': 'color: #333 !important; background-color: #fff !important;'
         })
         
+        # Las reglas de acumulación son opcionales: si el formulario no las envía
+        # se conservan los valores por defecto (o los de la promoción editada)
+        self.fields['modo_acumulacion'].required = False
+        self.fields['orden_aplicacion'].required = False
+        
         # Formatear fechas para datetime-local cuando se está editando
         if self.instance and self.instance.pk:
             if self.instance.fecha_inicio:
@@ -35,7 +40,8 @@ class PromocionForm(forms.ModelForm):
     class Meta:
         model = Promocion
         fields = ['titulo', 'descripcion', 'tipo_descuento', 'valor_descuento', 
-                  'categoria', 'servicios', 'fecha_inicio', 'fecha_fin', 'activa', 'codigo']
+                  'categoria', 'servicios', 'fecha_inicio', 'fecha_fin', 'activa', 'codigo',
+                  'modo_acumulacion', 'orden_aplicacion', 'max_usos', 'max_usos_por_cliente']
         widgets = {
             'titulo': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -83,6 +89,26 @@ class PromocionForm(forms.ModelForm):
                 'placeholder': 'Código único de la promoción (opcional)',
                 'maxlength': '50'
             }),
+            'modo_acumulacion': forms.Select(attrs={
+                'class': 'form-control'
+            }),
+            'orden_aplicacion': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '1'
+            }),
+            'max_usos': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Sin límite',
+                'min': '1',
+                'step': '1'
+            }),
+            'max_usos_por_cliente': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Sin límite',
+                'min': '1',
+                'step': '1'
+            }),
         }
         labels = {
             'titulo': 'Nombre de la Promoción *',
@@ -95,11 +121,19 @@ class PromocionForm(forms.ModelForm):
             'fecha_fin': 'Fecha y Hora de Fin *',
             'activa': 'Promoción Activa',
             'codigo': 'Código Promocional',
+            'modo_acumulacion': 'Modo de Acumulación',
+            'orden_aplicacion': 'Orden de Aplicación',
+            'max_usos': 'Límite Total de Usos',
+            'max_usos_por_cliente': 'Límite de Usos por Cliente',
         }
         help_texts = {
             'categoria': 'Si no selecciona categoría, se aplicará a todos los servicios',
             'servicios': 'Seleccione servicios específicos o deje vacío para aplicar a toda la categoría',
             'codigo': 'Código único que los clientes pueden usar para aplicar la promoción',
+            'modo_acumulacion': 'Una promoción exclusiva no se combina con otras; las acumulables se suman entre sí',
+            'orden_aplicacion': 'Las acumulables se aplican de menor a mayor orden',
+            'max_usos': 'Deje vacío para no limitar la cantidad de turnos que usan la promoción',
+            'max_usos_por_cliente': 'Deje vacío para no limitar los usos de cada cliente',
         }
     
     def clean_valor_descuento(self):
@@ -166,11 +200,11 @@ class PromocionForm(forms.ModelForm):
             # Verificar unicidad
             if self.instance.pk:
                 # Modificación: excluir la instancia actual
-                if Promocion.objects.filter(codigo=codigo).exclude(pk=self.instance.pk).exists():
+                if Promocion.objects.filter(codigo_normalizado=codigo).exclude(pk=self.instance.pk).exists():
                     raise ValidationError(f'Ya existe una promoción con el código "{codigo}"')
             else:
                 # Registro nuevo
-                if Promocion.objects.filter(codigo=codigo).exists():
+                if Promocion.objects.filter(codigo_normalizado=codigo).exists():
                     raise ValidationError(f'Ya existe una promoción con el código "{codigo}"')
         
         return codigo
@@ -0,0 +1,425 @@
+"""
+Importación y exportación masiva de promociones en CSV o JSON.
+El archivo completo se valida en una pasada, con las mismas reglas que
+PromocionService.registrar_promocion pero con consultas por lote (títulos,
+códigos, categorías, servicios y solapamientos), y las filas válidas se
+insertan con un bulk_create de promociones más uno de la tabla intermedia
+de servicios. La exportación se genera por bloques, sin cargar la tabla en
+memoria.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.servicios.models import Categoria, Servicio
+from .indice_services import PromocionIndiceService
+from .models import Promocion
+
+logger = logging.getLogger(__name__)
+
+
+class ImportacionService:
+    """Servicio de importación y exportación masiva de promociones"""
+
+    FORMATOS = ('csv', 'json')
+    COLUMNAS = [
+        'titulo', 'descripcion', 'tipo_descuento', 'valor_descuento', 'categoria', 'servicios',
+        'fecha_inicio', 'fecha_fin', 'codigo', 'modo_acumulacion', 'orden_aplicacion',
+        'max_usos', 'max_usos_por_cliente', 'activa',
+    ]
+    # La exportación agrega los campos que la importación ignora
+    COLUMNAS_EXPORTACION = ['id'] + COLUMNAS + ['usos', 'fecha_creacion']
+    SEPARADOR_SERVICIOS = '|'
+    # (campo, mínimo, máximo) de las columnas enteras opcionales
+    RANGOS_ENTEROS = (
+        ('orden_aplicacion', 0, 32767),
+        ('max_usos', 1, 2147483647),
+        ('max_usos_por_cliente', 1, 2147483647),
+    )
+    VERDADEROS = ('1', 'true', 'si', 'sí', 'yes', 'verdadero')
+    FALSOS = ('0', 'false', 'no', 'falso')
+    # Tamaño de los IN (...) de las consultas de validación
+    LOTE_CONSULTA = 500
+    LOTE_EXPORTACION = 2000
+
+    # ========================================================================
+    # LECTURA
+    # ========================================================================
+
+    @staticmethod
+    def leer(contenido, formato):
+        """
+        Convierte el contenido de un archivo en filas.
+
+        Args:
+            contenido (str|bytes): Texto del archivo (UTF-8, con o sin BOM)
+            formato (str): 'csv' o 'json'. En JSON se acepta una lista de
+                objetos o {"promociones": [...]}
+
+        Returns:
+            tuple: (filas: list|None, error: str)
+        """
+        if isinstance(contenido, bytes):
+            try:
+                contenido = contenido.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                return None, 'El archivo debe estar codificado en UTF-8'
+        contenido = contenido.lstrip('\ufeff')
+
+        if formato == 'csv':
+            lector = csv.DictReader(io.StringIO(contenido))
+            if not lector.fieldnames or 'titulo' not in lector.fieldnames:
+                return None, "El CSV debe tener una fila de encabezado con la columna 'titulo'"
+            return list(lector), ''
+
+        if formato == 'json':
+            try:
+                datos = json.loads(contenido)
+            except json.JSONDecodeError as e:
+                return None, f'JSON inválido: {e}'
+            if isinstance(datos, dict):
+                datos = datos.get('promociones')
+            if not isinstance(datos, list) or not all(isinstance(fila, dict) for fila in datos):
+                return None, 'El JSON debe ser una lista de promociones'
+            return datos, ''
+
+        return None, f"Formato no soportado: {formato}. Use {' o '.join(ImportacionService.FORMATOS)}"
+
+    @staticmethod
+    def formato_de(nombre, formato=None):
+        """Formato indicado o, si no se indicó, el de la extensión del archivo (CSV por defecto)"""
+        if formato:
+            return formato.lower()
+        return 'json' if (nombre or '').lower().endswith('.json') else 'csv'
+
+    # ========================================================================
+    # INTERPRETACIÓN DE FILAS
+    # ========================================================================
+
+    @staticmethod
+    def _texto(valor):
+        return '' if valor is None else str(valor).strip()
+
+    @staticmethod
+    def _fecha(valor, fin=False):
+        """Fecha y hora ISO; una fecha sola abarca el día completo (00:00 o 23:59:59)"""
+        if isinstance(valor, datetime):
+            fecha = valor
+        else:
+            texto = ImportacionService._texto(valor)
+            dia = parse_date(texto) if len(texto) <= len('AAAA-MM-DD') else None
+            if dia is not None:
+                fecha = datetime.combine(dia, time.max.replace(microsecond=0) if fin else time.min)
+            else:
+                fecha = parse_datetime(texto)
+                if fecha is None:
+                    raise ValueError
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
+
+    @staticmethod
+    def _entero(valor, minimo, maximo):
+        texto = ImportacionService._texto(valor)
+        if not texto:
+            return None
+        numero = int(texto)
+        if not minimo <= numero <= maximo:
+            raise ValueError
+        return numero
+
+    @staticmethod
+    def _ids(valor):
+        """IDs de servicios: lista JSON o texto separado por SEPARADOR_SERVICIOS"""
+        if isinstance(valor, (list, tuple)):
+            return [int(v) for v in valor]
+        texto = ImportacionService._texto(valor)
+        return [int(v) for v in texto.split(ImportacionService.SEPARADOR_SERVICIOS) if v.strip()]
+
+    @staticmethod
+    def _interpretar(fila, categorias, servicios):
+        """
+        Convierte una fila en los datos de registrar_promocion.
+
+        Returns:
+            tuple: (datos: dict, errores: dict)
+        """
+        cls = ImportacionService
+        datos, errores = {}, {}
+
+        titulo = cls._texto(fila.get('titulo'))
+        if not titulo:
+            errores['titulo'] = 'El nombre de la promoción es obligatorio'
+        elif len(titulo) > Promocion._meta.get_field('titulo').max_length:
+            errores['titulo'] = 'El nombre de la promoción es demasiado largo'
+        datos['titulo'] = titulo
+        datos['descripcion'] = cls._texto(fila.get('descripcion'))
+
+        datos['tipo_descuento'] = cls._texto(fila.get('tipo_descuento'))
+        if datos['tipo_descuento'] not in dict(Promocion.TIPOS):
+            errores['tipo_descuento'] = "El tipo de descuento debe ser 'porcentaje' o 'monto_fijo'"
+        try:
+            datos['valor_descuento'] = Decimal(cls._texto(fila.get('valor_descuento')))
+            if not datos['valor_descuento'].is_finite():
+                raise InvalidOperation
+        except InvalidOperation:
+            datos['valor_descuento'] = None
+            errores['valor_descuento'] = 'El valor del descuento debe ser un número'
+
+        datos['modo_acumulacion'] = cls._texto(fila.get('modo_acumulacion')) or 'exclusiva'
+        if datos['modo_acumulacion'] not in dict(Promocion.MODOS_ACUMULACION):
+            errores['modo_acumulacion'] = "El modo de acumulación debe ser 'exclusiva' o 'acumulable'"
+
+        for campo, fin in (('fecha_inicio', False), ('fecha_fin', True)):
+            try:
+                datos[campo] = cls._fecha(fila.get(campo), fin)
+            except ValueError:
+                datos[campo] = None
+                errores[campo] = 'Fecha inválida (use el formato AAAA-MM-DD o AAAA-MM-DDTHH:MM)'
+
+        categoria = cls._texto(fila.get('categoria'))
+        datos['categoria'] = None
+        if categoria:
+            datos['categoria'] = categorias.get(int(categoria)) if categoria.isdecimal() else None
+            if datos['categoria'] is None:
+                errores['categoria'] = f'La categoría {categoria} no existe'
+        try:
+            ids = cls._ids(fila.get('servicios'))
+            faltantes = [servicio_id for servicio_id in ids if servicio_id not in servicios]
+            if faltantes:
+                errores['servicios'] = f"Servicios inexistentes: {', '.join(map(str, faltantes))}"
+            datos['servicios'] = [servicios[servicio_id] for servicio_id in dict.fromkeys(ids) if servicio_id in servicios]
+        except (TypeError, ValueError):
+            datos['servicios'] = []
+            errores['servicios'] = 'Los servicios deben ser IDs numéricos'
+
+        codigo = PromocionIndiceService.normalizar_codigo(cls._texto(fila.get('codigo')))
+        if codigo and not codigo.replace('-', '').replace('_', '').isalnum():
+            errores['codigo'] = 'El código solo puede contener letras, números, guiones y guiones bajos'
+        elif len(codigo) > Promocion._meta.get_field('codigo').max_length:
+            errores['codigo'] = 'El código es demasiado largo'
+        datos['codigo'] = codigo or None
+
+        for campo, minimo, maximo in cls.RANGOS_ENTEROS:
+            try:
+                datos[campo] = cls._entero(fila.get(campo), minimo, maximo)
+            except ValueError:
+                errores[campo] = f'Debe ser un número entero entre {minimo} y {maximo}'
+        datos['orden_aplicacion'] = datos.get('orden_aplicacion') or 0
+
+        activa = fila.get('activa')
+        texto = cls._texto(activa).lower()
+        if isinstance(activa, bool):
+            datos['activa'] = activa
+        elif not texto or texto in cls.VERDADEROS:
+            datos['activa'] = True
+        elif texto in cls.FALSOS:
+            datos['activa'] = False
+        else:
+            errores['activa'] = "Valor inválido para 'activa' (use true o false)"
+
+        return datos, errores
+
+    @staticmethod
+    def _en_lotes(valores):
+        valores = list(valores)
+        for inicio in range(0, len(valores), ImportacionService.LOTE_CONSULTA):
+            yield valores[inicio:inicio + ImportacionService.LOTE_CONSULTA]
+
+    @staticmethod
+    def _titulos_existentes(titulos):
+        """Títulos (en minúsculas) que ya existen, en una consulta por lote"""
+        existentes = set()
+        for lote in ImportacionService._en_lotes(titulos):
+            existentes.update(
+                Promocion.objects.annotate(titulo_minusculas=Lower('titulo'))
+                .filter(titulo_minusculas__in=lote).values_list('titulo_minusculas', flat=True)
+            )
+        return existentes
+
+    @staticmethod
+    def _codigos_existentes(codigos):
+        """Códigos normalizados que ya existen, en una consulta por lote"""
+        existentes = set()
+        for lote in ImportacionService._en_lotes(codigos):
+            existentes.update(
+                Promocion.objects.filter(codigo_normalizado__in=lote).values_list('codigo_normalizado', flat=True)
+            )
+        return existentes
+
+    # ========================================================================
+    # IMPORTACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def validar(filas):
+        """
+        Valida todas las filas: formato, fechas, rango del descuento, nombre y
+        código únicos (en la base y dentro del archivo) y solapamientos con
+        las promociones existentes y entre filas.
+
+        Args:
+            filas (list): Diccionarios con las columnas de COLUMNAS
+
+        Returns:
+            tuple: (validas: list de datos, errores: list de
+                    {'fila': n, 'titulo': str, 'errores': dict}); las filas se
+                    numeran desde 1 sin contar el encabezado
+        """
+        from .services import PromocionService
+
+        categorias = {categoria.id: categoria for categoria in Categoria.objects.all()}
+        servicios = {servicio.id: servicio for servicio in Servicio.objects.all()}
+        interpretadas = [ImportacionService._interpretar(fila, categorias, servicios) for fila in filas]
+
+        titulos = [datos['titulo'].lower() for datos, _ in interpretadas if datos['titulo']]
+        codigos = [datos['codigo'] for datos, _ in interpretadas if datos['codigo']]
+        titulos_existentes = ImportacionService._titulos_existentes(set(titulos))
+        codigos_existentes = ImportacionService._codigos_existentes(set(codigos))
+        titulos_vistos, codigos_vistos = set(), set()
+
+        for datos, errores in interpretadas:
+            titulo = datos['titulo'].lower()
+            if titulo and 'titulo' not in errores:
+                if titulo in titulos_existentes:
+                    errores['titulo'] = f"Ya existe una promoción con el nombre '{datos['titulo']}'"
+                elif titulo in titulos_vistos:
+                    errores['titulo'] = f"El nombre '{datos['titulo']}' está repetido en el archivo"
+                titulos_vistos.add(titulo)
+            codigo = datos['codigo']
+            if codigo and 'codigo' not in errores:
+                if codigo in codigos_existentes:
+                    errores['codigo'] = f'Ya existe una promoción con el código "{codigo}"'
+                elif codigo in codigos_vistos:
+                    errores['codigo'] = f'El código "{codigo}" está repetido en el archivo'
+                codigos_vistos.add(codigo)
+
+            if 'fecha_inicio' not in errores and 'fecha_fin' not in errores:
+                valido, mensaje = PromocionService.validar_fechas(datos['fecha_inicio'], datos['fecha_fin'])
+                if not valido:
+                    errores['fechas'] = mensaje
+            if 'tipo_descuento' not in errores and 'valor_descuento' not in errores:
+                valido, mensaje = PromocionService.validar_valor_descuento(datos['tipo_descuento'], datos['valor_descuento'])
+                if not valido:
+                    errores['valor_descuento'] = mensaje
+
+        # Solo las filas activas y sin otros errores compiten por el período
+        candidatas = [
+            (numero, datos) for numero, (datos, errores) in enumerate(interpretadas)
+            if not errores and datos['activa'] and (datos['categoria'] or datos['servicios'])
+        ]
+        conflictos = PromocionService.validar_solapamientos_lote([datos for _, datos in candidatas])
+        for (numero, _), mensajes in zip(candidatas, conflictos):
+            if mensajes:
+                interpretadas[numero][1]['solape'] = '; '.join(mensajes)
+
+        validas, errores_por_fila = [], []
+        for numero, (datos, errores) in enumerate(interpretadas, start=1):
+            if errores:
+                errores_por_fila.append({'fila': numero, 'titulo': datos['titulo'], 'errores': errores})
+            else:
+                validas.append(datos)
+        return validas, errores_por_fila
+
+    @staticmethod
+    def _crear(validas):
+        """Inserta las promociones y sus servicios con dos bulk_create"""
+        campos = [columna for columna in ImportacionService.COLUMNAS if columna != 'servicios']
+        with transaction.atomic():
+            promociones = Promocion.objects.bulk_create(
+                [Promocion(**{campo: datos[campo] for campo in campos}) for datos in validas]
+            )
+            Intermedia = Promocion.servicios.through
+            Intermedia.objects.bulk_create([
+                Intermedia(promocion_id=promocion.id, servicio_id=servicio.id)
+                for promocion, datos in zip(promociones, validas)
+                for servicio in datos['servicios']
+            ])
+            # bulk_create no emite post_save
+            PromocionIndiceService.invalidar()
+        return promociones
+
+    @staticmethod
+    def importar(filas, guardar=True):
+        """
+        Valida e inserta un lote de promociones. Las filas válidas se crean
+        aunque otras tengan errores.
+
+        Args:
+            filas (list): Resultado de leer()
+            guardar (bool): False para solo validar
+
+        Returns:
+            tuple: (resultado: dict con total, validas y creadas, errores: list)
+        """
+        validas, errores = ImportacionService.validar(filas)
+        creadas = len(ImportacionService._crear(validas)) if guardar and validas else 0
+        logger.info(f"Importación de promociones: {len(filas)} filas, {creadas} creadas, {len(errores)} con errores")
+        return {'total': len(filas), 'validas': len(validas), 'creadas': creadas}, errores
+
+    # ========================================================================
+    # EXPORTACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def _registros():
+        """Promociones como diccionarios de COLUMNAS_EXPORTACION, por bloques"""
+        promociones = Promocion.objects.order_by('id').prefetch_related('servicios')
+        for promo in promociones.iterator(chunk_size=ImportacionService.LOTE_EXPORTACION):
+            yield {
+                'id': promo.id,
+                'titulo': promo.titulo,
+                'descripcion': promo.descripcion,
+                'tipo_descuento': promo.tipo_descuento,
+                'valor_descuento': str(promo.valor_descuento),
+                'categoria': promo.categoria_id,
+                'servicios': sorted(servicio.id for servicio in promo.servicios.all()),
+                'fecha_inicio': promo.fecha_inicio.isoformat(),
+                'fecha_fin': promo.fecha_fin.isoformat(),
+                'codigo': promo.codigo,
+                'modo_acumulacion': promo.modo_acumulacion,
+                'orden_aplicacion': promo.orden_aplicacion,
+                'max_usos': promo.max_usos,
+                'max_usos_por_cliente': promo.max_usos_por_cliente,
+                'activa': promo.activa,
+                'usos': promo.usos,
+                'fecha_creacion': promo.fecha_creacion.isoformat(),
+            }
+
+    @staticmethod
+    def exportar(formato):
+        """
+        Exportación de todas las promociones, como generador de fragmentos de
+        texto (para StreamingHttpResponse o para escribir en un archivo).
+        El resultado se puede volver a importar: las columnas id, usos y
+        fecha_creacion se ignoran al importar.
+
+        Args:
+            formato (str): 'csv' o 'json'
+        """
+        if formato == 'json':
+            yield '[\n'
+            for numero, registro in enumerate(ImportacionService._registros()):
+                yield (',\n' if numero else '') + json.dumps(registro, ensure_ascii=False)
+            yield '\n]\n'
+            return
+
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=ImportacionService.COLUMNAS_EXPORTACION)
+        escritor.writeheader()
+        for registro in ImportacionService._registros():
+            registro['servicios'] = ImportacionService.SEPARADOR_SERVICIOS.join(map(str, registro['servicios']))
+            registro['activa'] = 'true' if registro['activa'] else 'false'
+            escritor.writerow(registro)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
@@ -0,0 +1,398 @@
+"""
+Índice compilado en memoria de promociones aplicables.
+Reemplaza el recorrido de todas las promociones vigentes con dos consultas
+por promoción (aplica_a_servicio) por una búsqueda binaria sin consultas.
+El índice se reconstruye con una sola consulta cuando cambia la versión
+guardada en la base (ver invalidar), que se lee una vez por request. Con
+la misma versión se mantiene el conjunto de códigos promocionales
+existentes, para rechazar códigos inventados sin consultar la tabla de
+promociones; un código creado desde otro proceso se reconoce en el
+request siguiente a su commit.
+
+El conjunto de promociones vigentes solo cambia cuando se alcanza un inicio
+o un fin de vigencia: se guarda el tramo actual de la línea de tiempo y se
+sirve desde memoria hasta la próxima frontera, que también fija el TTL de
+las respuestas cacheadas (ver vigentes y segundos_hasta_cambio).
+"""
+from bisect import bisect_right
+from datetime import timedelta
+import logging
+import math
+import threading
+import uuid
+
+from django.utils import timezone
+
+from .models import Promocion, VersionIndicePromociones
+
+logger = logging.getLogger(__name__)
+
+UN_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+class LineaTiempo:
+    """
+    Promociones de una misma clave (servicio, categoría o global) divididas
+    en intervalos elementales: entre dos puntos consecutivos el conjunto de
+    promociones vigentes no cambia, así ubicar el tramo es un bisect.
+
+    Por cada punto se guardan solo las altas y bajas (memoria O(n)) y se
+    materializa el conjunto de un único tramo, el cursor, que se mueve hacia
+    adelante o hacia atrás aplicando los cambios de cada frontera cruzada.
+    Las consultas de "ahora" no mueven el cursor salvo al cruzar una frontera.
+    """
+
+    def __init__(self, promociones):
+        cambios = {}
+        for promo in promociones:
+            if promo.fecha_inicio > promo.fecha_fin:
+                continue
+            cambios.setdefault(promo.fecha_inicio, ([], []))[0].append(promo.id)
+            # La vigencia incluye fecha_fin: deja de aplicar un microsegundo después
+            cambios.setdefault(promo.fecha_fin + UN_MICROSEGUNDO, ([], []))[1].append(promo.id)
+        self.puntos = sorted(cambios)
+        # (altas, bajas) de cada punto
+        self.cambios = [cambios[punto] for punto in self.puntos]
+        # Los IDs de cada tramo salen en el orden de la lista recibida
+        self.orden = {promo.id: posicion for posicion, promo in enumerate(promociones)}
+        # (posición, ids vigentes en ella); se reemplaza entero, así dos
+        # hilos que lo muevan a la vez a lo sumo repiten el recorrido
+        self._cursor = (-1, ())
+
+    def _vigentes_en(self, posicion):
+        """IDs vigentes en el tramo que empieza en puntos[posicion] (-1: antes del primero)"""
+        desde, ids = self._cursor
+        if desde == posicion:
+            return ids
+        if posicion < 0:
+            return ()
+        # Moverse desde el cursor o desde el principio, lo que esté más cerca
+        if abs(posicion - desde) > posicion + 1:
+            desde, ids = -1, ()
+        actuales = set(ids)
+        while desde < posicion:
+            desde += 1
+            altas, bajas = self.cambios[desde]
+            actuales.difference_update(bajas)
+            actuales.update(altas)
+        while desde > posicion:
+            altas, bajas = self.cambios[desde]
+            actuales.difference_update(altas)
+            actuales.update(bajas)
+            desde -= 1
+        ids = tuple(sorted(actuales, key=self.orden.__getitem__))
+        self._cursor = (posicion, ids)
+        return ids
+
+    def en(self, momento):
+        """IDs de las promociones vigentes en un momento"""
+        return self._vigentes_en(bisect_right(self.puntos, momento) - 1)
+
+    def tramo(self, momento):
+        """
+        Intervalo elemental que contiene al momento.
+
+        Returns:
+            tuple: (desde, hasta, ids) con desde inclusivo y hasta exclusivo;
+                   None en un extremo si el tramo no tiene límite por ese lado
+        """
+        posicion = bisect_right(self.puntos, momento) - 1
+        desde = self.puntos[posicion] if posicion >= 0 else None
+        hasta = self.puntos[posicion + 1] if posicion + 1 < len(self.puntos) else None
+        return desde, hasta, self._vigentes_en(posicion)
+
+
+class PromocionIndiceService:
+    """
+    Índice de promociones por servicio, categoría y globales.
+
+    Replica las reglas de Promocion.aplica_a_servicio: una promoción con
+    servicios aplica solo a esos servicios; sin servicios y con categoría,
+    a los servicios de la categoría; sin ninguno de los dos, a todos.
+
+    El índice es local al proceso. Cada consulta compara su versión con la
+    guardada en VersionIndicePromociones y, si cambió, lo reconstruye. Dentro
+    de un request la versión se lee una sola vez (ver las señales de
+    request_started y request_finished); fuera de un request, en cada
+    consulta. Las instancias de Promocion que devuelve son compartidas:
+    solo lectura.
+    """
+
+    _lock = threading.Lock()
+    # Versión leída en el request en curso de cada hilo
+    _local = threading.local()
+    # (version, promociones por id, por servicio, por categoría, globales,
+    # todas); se reemplaza entero para que un lector nunca vea un índice a
+    # medio armar
+    _indice = (None, {}, {}, {}, LineaTiempo([]), LineaTiempo([]))
+    # (version, desde, hasta, ids): tramo de vigencia en curso
+    _tramo = (None, None, None, ())
+    # (version, códigos normalizados de todas las promociones)
+    _codigos = (None, frozenset())
+
+    # ========================================================================
+    # VERSIÓN E INVALIDACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def version_actual():
+        """
+        Versión compartida del índice ('' si todavía no hubo escrituras).
+        Dentro de un request se consulta solo la primera vez.
+        """
+        local = PromocionIndiceService._local
+        version = getattr(local, 'version', None)
+        if version is None:
+            version = VersionIndicePromociones.objects.filter(pk=1).values_list('version', flat=True).first() or ''
+            if getattr(local, 'en_request', False):
+                local.version = version
+        return version
+
+    @staticmethod
+    def iniciar_request():
+        """Descarta la versión memorizada y memoriza la próxima lectura hasta fin del request"""
+        PromocionIndiceService._local.version = None
+        PromocionIndiceService._local.en_request = True
+
+    @staticmethod
+    def finalizar_request():
+        """Deja de memorizar la versión (fuera de un request se lee siempre)"""
+        PromocionIndiceService._local.version = None
+        PromocionIndiceService._local.en_request = False
+
+    @staticmethod
+    def invalidar():
+        """
+        Marca el índice como desactualizado en todos los procesos.
+
+        La versión nueva se escribe en la misma transacción que el cambio,
+        así los otros procesos la ven junto con los datos. Es un valor al
+        azar y no un contador: si la transacción se revierte, una versión
+        posterior nunca coincide con la de un índice armado con datos
+        revertidos.
+        """
+        version = uuid.uuid4().hex
+        versiones = VersionIndicePromociones.objects.filter(pk=1)
+        if not versiones.update(version=version):
+            _, creada = VersionIndicePromociones.objects.get_or_create(pk=1, defaults={'version': version})
+            if not creada:
+                versiones.update(version=version)
+        PromocionIndiceService._local.version = None
+
+    # ========================================================================
+    # CONSTRUCCIÓN
+    # ========================================================================
+
+    @staticmethod
+    def construir(ahora=None, version=None):
+        """
+        Compila el índice con una consulta (más el prefetch de servicios).
+        Solo incluye promociones activas que no terminaron.
+
+        Args:
+            ahora (datetime, optional): Momento de referencia
+            version (str, optional): Versión ya leída (default: la actual)
+        """
+        ahora = ahora or timezone.now()
+        version = PromocionIndiceService.version_actual() if version is None else version
+        promociones = list(
+            Promocion.objects.filter(activa=True, fecha_fin__gte=ahora).prefetch_related('servicios')
+        )
+
+        por_servicio, por_categoria, globales = {}, {}, []
+        for promo in promociones:
+            servicio_ids = [servicio.id for servicio in promo.servicios.all()]
+            if servicio_ids:
+                for servicio_id in servicio_ids:
+                    por_servicio.setdefault(servicio_id, []).append(promo)
+            elif promo.categoria_id:
+                por_categoria.setdefault(promo.categoria_id, []).append(promo)
+            else:
+                globales.append(promo)
+
+        PromocionIndiceService._indice = (
+            version,
+            {promo.id: promo for promo in promociones},
+            {clave: LineaTiempo(lista) for clave, lista in por_servicio.items()},
+            {clave: LineaTiempo(lista) for clave, lista in por_categoria.items()},
+            LineaTiempo(globales),
+            # Ordenadas como Promocion.Meta.ordering, así los tramos ya salen ordenados
+            LineaTiempo(sorted(promociones, key=lambda promo: (promo.fecha_creacion, promo.id), reverse=True)),
+        )
+        logger.debug(f"Índice de promociones compilado: {len(promociones)} promociones, versión {version}")
+
+    @staticmethod
+    def _indice_vigente():
+        """Índice actual; lo reconstruye si otro proceso (o este) lo invalidó"""
+        cls = PromocionIndiceService
+        version = cls.version_actual()
+        if cls._indice[0] != version:
+            with cls._lock:
+                if cls._indice[0] != version:
+                    cls.construir(version=version)
+        return cls._indice
+
+    @staticmethod
+    def _codigos_vigentes():
+        """Conjunto de códigos actual; lo recarga con una consulta si cambió la versión"""
+        cls = PromocionIndiceService
+        version = cls.version_actual()
+        if cls._codigos[0] != version:
+            with cls._lock:
+                if cls._codigos[0] != version:
+                    cls._codigos = (version, frozenset(
+                        Promocion.objects.filter(codigo_normalizado__isnull=False)
+                        .values_list('codigo_normalizado', flat=True)
+                    ))
+        return cls._codigos[1]
+
+    # ========================================================================
+    # CONSULTAS
+    # ========================================================================
+
+    @staticmethod
+    def normalizar_codigo(codigo):
+        """Código como se guarda en codigo_normalizado ('' si viene vacío)"""
+        return (codigo or '').strip().upper()
+
+    @staticmethod
+    def codigo_existe(codigo):
+        """
+        Indica si alguna promoción (vigente o no) tiene el código, sin consultar
+        la tabla de promociones mientras el conjunto esté al día (solo se lee
+        la versión, una vez por request). Un código que no existe se rechaza
+        en memoria; uno que existe se busca igual en la base.
+
+        Args:
+            codigo (str): Código ingresado, en cualquier combinación de mayúsculas
+
+        Returns:
+            bool
+        """
+        codigo = PromocionIndiceService.normalizar_codigo(codigo)
+        return bool(codigo) and codigo in PromocionIndiceService._codigos_vigentes()
+
+    @staticmethod
+    def buscar_por_codigo(codigo):
+        """
+        Promoción con el código (sin distinguir mayúsculas), usando el índice
+        de codigo_normalizado. Los códigos desconocidos no consultan la base.
+
+        Returns:
+            Promocion|None
+        """
+        if not PromocionIndiceService.codigo_existe(codigo):
+            return None
+        return Promocion.objects.filter(
+            codigo_normalizado=PromocionIndiceService.normalizar_codigo(codigo)
+        ).first()
+
+    @staticmethod
+    def aplicables(servicio, momento=None):
+        """
+        Promociones vigentes que aplican a un servicio, sin consultas a la base.
+
+        Args:
+            servicio (Servicio): Servicio (se usan id y categoria_id)
+            momento (datetime, optional): Por defecto, ahora. El índice omite
+                las promociones que ya habían terminado al construirse
+
+        Returns:
+            list: Instancias de Promocion ordenadas como Promocion.Meta.ordering
+        """
+        _, promociones_por_id, por_servicio, por_categoria, globales, _ = PromocionIndiceService._indice_vigente()
+        momento = momento or timezone.now()
+
+        ids = set(globales.en(momento))
+        if servicio.id in por_servicio:
+            ids.update(por_servicio[servicio.id].en(momento))
+        if servicio.categoria_id in por_categoria:
+            ids.update(por_categoria[servicio.categoria_id].en(momento))
+
+        promociones = [promociones_por_id[promo_id] for promo_id in ids]
+        promociones.sort(key=lambda promo: (promo.fecha_creacion, promo.id), reverse=True)
+        return promociones
+
+    # ========================================================================
+    # VIGENCIA
+    # ========================================================================
+
+    @staticmethod
+    def _tramo_vigente(momento=None, indice=None):
+        """
+        Tramo de la línea de tiempo que contiene al momento. El tramo en curso
+        se reutiliza mientras no cambie la versión ni se cruce una frontera.
+
+        Returns:
+            tuple: (version, desde, hasta, ids)
+        """
+        cls = PromocionIndiceService
+        indice = indice or cls._indice_vigente()
+        momento = momento or timezone.now()
+        tramo = cls._tramo
+        version, desde, hasta, _ = tramo
+        if (
+            version != indice[0]
+            or (desde is not None and momento < desde)
+            or (hasta is not None and momento >= hasta)
+        ):
+            tramo = (indice[0], *indice[5].tramo(momento))
+            cls._tramo = tramo
+        return tramo
+
+    @staticmethod
+    def vigentes(momento=None):
+        """
+        Promociones activas y vigentes, sin consultas a la base mientras el
+        índice esté al día. Equivale a filtrar activa=True,
+        fecha_inicio__lte=momento, fecha_fin__gte=momento.
+
+        Args:
+            momento (datetime, optional): Por defecto, ahora
+
+        Returns:
+            list: Instancias de Promocion (solo lectura) ordenadas como
+                  Promocion.Meta.ordering
+        """
+        indice = PromocionIndiceService._indice_vigente()
+        _, _, _, ids = PromocionIndiceService._tramo_vigente(momento, indice)
+        return [indice[1][promo_id] for promo_id in ids]
+
+    @staticmethod
+    def vigentes_ids(momento=None):
+        """IDs de las promociones vigentes (ver vigentes)"""
+        return list(PromocionIndiceService._tramo_vigente(momento)[3])
+
+    @staticmethod
+    def clave_vigencia(momento=None):
+        """
+        Identifica el conjunto de promociones vigentes (versión del índice y
+        comienzo del tramo), para usar en claves de cache que dependan de él.
+        """
+        version, desde, _, _ = PromocionIndiceService._tramo_vigente(momento)
+        return f"{version}:{desde.isoformat() if desde else '-'}"
+
+    @staticmethod
+    def proximo_cambio(momento=None):
+        """
+        Momento en que empieza o termina la próxima vigencia.
+
+        Returns:
+            datetime|None: None si no hay cambios programados
+        """
+        return PromocionIndiceService._tramo_vigente(momento)[2]
+
+    @staticmethod
+    def segundos_hasta_cambio(momento=None):
+        """
+        TTL para cachear algo que dependa de las promociones vigentes:
+        segundos hasta el próximo cambio, redondeado hacia arriba.
+
+        Returns:
+            int|None: None si no hay cambios programados (sin vencimiento)
+        """
+        momento = momento or timezone.now()
+        cambio = PromocionIndiceService.proximo_cambio(momento)
+        if cambio is None:
+            return None
+        return max(1, math.ceil((cambio - momento).total_seconds()))
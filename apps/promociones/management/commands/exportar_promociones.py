@@ -0,0 +1,27 @@
+"""
+Comando para exportar todas las promociones a CSV o JSON.
+
+Uso:
+    python manage.py exportar_promociones > promociones.csv
+    python manage.py exportar_promociones --formato json --salida promociones.json
+"""
+from django.core.management.base import BaseCommand
+
+from apps.promociones.importacion_services import ImportacionService
+
+
+class Command(BaseCommand):
+    help = 'Exporta todas las promociones por bloques, en un formato que importar_promociones acepta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=ImportacionService.FORMATOS, default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto, la salida estándar)')
+
+    def handle(self, *args, **options):
+        fragmentos = ImportacionService.exportar(options['formato'])
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8', newline='') as salida:
+                salida.writelines(fragmentos)
+        else:
+            for fragmento in fragmentos:
+                self.stdout.write(fragmento, ending='')
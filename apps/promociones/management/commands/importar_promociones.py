@@ -0,0 +1,48 @@
+"""
+Comando para importar promociones desde un archivo CSV o JSON.
+
+Uso:
+    python manage.py importar_promociones promociones.csv
+    python manage.py importar_promociones promociones.json --solo-validar
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.promociones.importacion_services import ImportacionService
+
+
+class Command(BaseCommand):
+    help = 'Valida un archivo de promociones completo y crea las filas válidas con bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV o JSON')
+        parser.add_argument(
+            '--formato',
+            choices=ImportacionService.FORMATOS,
+            help='Por defecto se deduce de la extensión del archivo'
+        )
+        parser.add_argument(
+            '--solo-validar',
+            action='store_true',
+            help='Informa los errores sin crear ninguna promoción'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                contenido = archivo.read()
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        filas, error = ImportacionService.leer(contenido, ImportacionService.formato_de(options['archivo'], options['formato']))
+        if filas is None:
+            raise CommandError(error)
+
+        resultado, errores = ImportacionService.importar(filas, guardar=not options['solo_validar'])
+        for error in errores:
+            detalle = '; '.join(f'{campo}: {mensaje}' for campo, mensaje in error['errores'].items())
+            self.stderr.write(f"Fila {error['fila']} ({error['titulo'] or 'sin título'}): {detalle}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filas: {resultado['total']}, válidas: {resultado['validas']}, "
+            f"creadas: {resultado['creadas']}, con errores: {len(errores)}"
+        ))
@@ -0,0 +1,18 @@
+"""
+Comando para recalcular desde cero las métricas de efectividad de las
+promociones (al desplegarlas o para corregir desvíos de los contadores).
+
+Uso:
+    python manage.py reconstruir_metricas_promociones
+"""
+from django.core.management.base import BaseCommand
+
+from apps.promociones.metrica_services import MetricaService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las métricas de todas las promociones a partir de los turnos'
+
+    def handle(self, *args, **options):
+        cantidad = MetricaService.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Métricas reconstruidas para {cantidad} promociones'))
@@ -0,0 +1,378 @@
+"""
+Métricas de efectividad por promoción.
+Cada cambio de un turno vinculado (alta, cambio de estado o de promoción,
+baja) se traduce, al confirmarse la transacción, en un UPDATE con
+expresiones F() sobre la fila de MetricaPromocion, así el endpoint de métricas lee una sola fila y nunca
+agrega la tabla de turnos. El comando reconstruir_metricas_promociones las
+recalcula desde cero.
+"""
+from datetime import timedelta
+from decimal import Decimal
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.turnos.models import Turno
+from .indice_services import PromocionIndiceService
+from .models import MetricaPromocion, Promocion
+
+logger = logging.getLogger(__name__)
+
+CERO = Decimal('0')
+
+
+class MetricaService:
+    """
+    Servicio de métricas de promociones.
+
+    Se cuentan los turnos con Turno.promocion (la promoción principal del
+    turno): cantidad por estado y, de los completados, el precio final
+    cobrado y el descuento de la promoción. Para el uplift se cuentan los
+    turnos solicitados de los servicios alcanzados mientras la promoción
+    está vigente y se comparan con las SEMANAS_BASE semanas previas a su
+    inicio, que se calculan una vez al crear la fila.
+    """
+
+    SEMANAS_BASE = 4
+    CONTADORES = ('turnos', 'turnos_completados', 'turnos_cancelados', 'descuento_otorgado', 'ingresos')
+
+    # ========================================================================
+    # APORTE DE UN TURNO
+    # ========================================================================
+
+    @staticmethod
+    def estado_turno(turno):
+        """
+        Datos del turno que afectan las métricas.
+        Lee __dict__ para no forzar la carga de campos diferidos (.only()).
+
+        Returns:
+            tuple|None: (promocion_id, estado, precio_final, desglose); None si
+                        falta algún campo
+        """
+        datos = turno.__dict__
+        campos = ('promocion_id', 'estado', 'precio_final', 'desglose_promociones')
+        if any(campo not in datos for campo in campos):
+            return None
+        return tuple(datos[campo] for campo in campos)
+
+    @staticmethod
+    def descuento(promocion_id, precio_final, desglose, precio_base):
+        """
+        Descuento de la promoción en un turno: su paso del desglose o, en
+        turnos sin desglose, la diferencia con el precio base.
+        """
+        if desglose:
+            return sum(
+                (Decimal(str(paso['descuento'])) for paso in desglose if paso.get('promocion_id') == promocion_id),
+                CERO
+            )
+        return max(Decimal(precio_base) - Decimal(precio_final), CERO)
+
+    @staticmethod
+    def aporte(estado_turno, precio_base):
+        """
+        Lo que un turno suma a las métricas de su promoción.
+
+        Args:
+            estado_turno (tuple): Resultado de estado_turno
+            precio_base (Decimal|callable): Precio base del servicio, o una
+                función que lo devuelve (solo se usa en turnos completados)
+
+        Returns:
+            dict: Contadores de CONTADORES
+        """
+        promocion_id, estado, precio_final, desglose = estado_turno
+        completado = estado == 'completado'
+        aporte = {
+            'turnos': 1,
+            'turnos_completados': int(completado),
+            'turnos_cancelados': int(estado == 'cancelado'),
+            'descuento_otorgado': CERO,
+            'ingresos': CERO,
+        }
+        if completado:
+            base = precio_base() if callable(precio_base) else precio_base
+            aporte['descuento_otorgado'] = MetricaService.descuento(promocion_id, precio_final, desglose, base)
+            aporte['ingresos'] = Decimal(precio_final)
+        return aporte
+
+    # ========================================================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ========================================================================
+
+    @staticmethod
+    def _base(promocion):
+        """Turnos solicitados de los servicios alcanzados en las SEMANAS_BASE semanas previas al inicio"""
+        inicio = promocion.fecha_inicio
+        turnos = Turno.objects.filter(
+            fecha_solicitud__gte=inicio - timedelta(weeks=MetricaService.SEMANAS_BASE),
+            fecha_solicitud__lt=inicio
+        )
+        servicio_ids = [servicio.id for servicio in promocion.servicios.all()]
+        if servicio_ids:
+            turnos = turnos.filter(servicio_id__in=servicio_ids)
+        elif promocion.categoria_id:
+            turnos = turnos.filter(servicio__categoria_id=promocion.categoria_id)
+        return turnos.count()
+
+    @staticmethod
+    def _crear_faltantes(promocion_ids):
+        """
+        Crea las filas que todavía no existen; la base se calcula solo si la
+        promoción ya empezó (si no, las semanas previas aún no terminaron).
+
+        Returns:
+            list: IDs de las promociones cuyas filas se crearon
+        """
+        existentes = set(MetricaPromocion.objects.filter(promocion_id__in=promocion_ids).values_list('promocion_id', flat=True))
+        faltantes = [promocion_id for promocion_id in promocion_ids if promocion_id not in existentes]
+        if not faltantes:
+            return []
+        ahora = timezone.now()
+        MetricaPromocion.objects.bulk_create([
+            MetricaPromocion(
+                promocion=promocion,
+                turnos_base=MetricaService._base(promocion) if promocion.fecha_inicio <= ahora else None
+            )
+            for promocion in Promocion.objects.filter(id__in=faltantes).prefetch_related('servicios')
+        ], ignore_conflicts=True)
+        return faltantes
+
+    @staticmethod
+    def _actualizar(promocion_ids, **cambios):
+        """UPDATE con F() sobre las filas de las promociones, creándolas si hace falta"""
+        promocion_ids = list(promocion_ids)
+        expresiones = {campo: F(campo) + valor for campo, valor in cambios.items()}
+        expresiones['fecha_actualizacion'] = timezone.now()
+        if MetricaPromocion.objects.filter(promocion_id__in=promocion_ids).update(**expresiones) < len(promocion_ids):
+            # Primera vez que se mide alguna de las promociones
+            faltantes = MetricaService._crear_faltantes(promocion_ids)
+            MetricaPromocion.objects.filter(promocion_id__in=faltantes).update(**expresiones)
+
+    @staticmethod
+    def aplicar(promocion_id, aporte, signo=1):
+        """
+        Suma (signo=1) o resta (signo=-1) el aporte de un turno.
+
+        Returns:
+            bool: True si hubo algo que actualizar
+        """
+        cambios = {campo: signo * valor for campo, valor in aporte.items() if valor}
+        if promocion_id is None or not cambios:
+            return False
+        MetricaService._actualizar([promocion_id], **cambios)
+        return True
+
+    @staticmethod
+    def registrar_cambio(turno, original, actual=None):
+        """
+        Actualiza las métricas al guardar un turno.
+
+        Args:
+            turno (Turno): Turno guardado
+            original (tuple|None): estado_turno con que se cargó; None si es nuevo
+            actual (tuple, optional): estado_turno al guardarlo (default: el de turno)
+        """
+        actual = actual or MetricaService.estado_turno(turno)
+        if actual is None or actual == original:
+            return
+        if not actual[0] and not (original and original[0]):
+            return
+
+        def precio_base():
+            return turno.servicio.precio_base
+
+        nuevo = MetricaService.aporte(actual, precio_base) if actual[0] else None
+        anterior = MetricaService.aporte(original, precio_base) if original and original[0] else None
+        if original and original[0] == actual[0]:
+            diferencia = {campo: nuevo[campo] - anterior[campo] for campo in MetricaService.CONTADORES}
+            MetricaService.aplicar(actual[0], diferencia)
+            return
+        if anterior:
+            MetricaService.aplicar(original[0], anterior, -1)
+        if nuevo:
+            MetricaService.aplicar(actual[0], nuevo)
+
+    @staticmethod
+    def registrar_baja(turno, estado):
+        """Resta un turno eliminado de las métricas de su promoción"""
+        if estado and estado[0]:
+            MetricaService.aplicar(estado[0], MetricaService.aporte(estado, lambda: turno.servicio.precio_base), -1)
+
+    @staticmethod
+    def registrar_solicitud(turno):
+        """
+        Cuenta un turno nuevo en la demanda de las promociones vigentes que
+        alcanzan a su servicio (índice en memoria, sin consultas).
+        """
+        promocion_ids = [promo.id for promo in PromocionIndiceService.aplicables(turno.servicio)]
+        if promocion_ids:
+            MetricaService._actualizar(promocion_ids, turnos_periodo=1)
+
+    @staticmethod
+    def programar_cambio(turno, original, creado=False):
+        """
+        Actualiza las métricas cuando se confirme la transacción del turno,
+        con el estado que tenía al guardarse.
+        """
+        actual = MetricaService.estado_turno(turno)
+
+        def registrar():
+            MetricaService.registrar_cambio(turno, original, actual)
+            if creado:
+                MetricaService.registrar_solicitud(turno)
+        transaction.on_commit(registrar, robust=True)
+
+    @staticmethod
+    def programar_baja(turno, original):
+        """Resta el turno eliminado cuando se confirme la transacción"""
+        estado = original or MetricaService.estado_turno(turno)
+        transaction.on_commit(lambda: MetricaService.registrar_baja(turno, estado), robust=True)
+
+    @staticmethod
+    def registrar_cancelaciones(turnos):
+        """
+        Cuenta como cancelados los turnos pendientes que se cancelaron con un
+        UPDATE masivo (sin señales), como el vencimiento de pendientes.
+
+        Args:
+            turnos (list[dict]): Con promocion_id
+        """
+        por_promocion = {}
+        for turno in turnos:
+            if turno.get('promocion_id'):
+                por_promocion[turno['promocion_id']] = por_promocion.get(turno['promocion_id'], 0) + 1
+        for promocion_id, cantidad in por_promocion.items():
+            MetricaService._actualizar([promocion_id], turnos_cancelados=cantidad)
+
+    @staticmethod
+    def registrar_transiciones(turnos):
+        """
+        Ajusta las métricas de los turnos que cambiaron de estado con un
+        UPDATE en lote (sin señales), como TransicionService.
+
+        Args:
+            turnos (list[dict]): Con id, promocion_id, precio_final,
+                desglose_promociones, origen y destino
+        """
+        con_promocion = [turno for turno in turnos if turno.get('promocion_id')]
+        # El precio base solo hace falta para los completados: una consulta para todos
+        completados = [t['id'] for t in con_promocion if 'completado' in (t['origen'], t['destino'])]
+        precios = dict(
+            Turno.objects.filter(id__in=completados).values_list('id', 'servicio__precio_base')
+        ) if completados else {}
+
+        por_promocion = {}
+        for turno in con_promocion:
+            datos = (turno['promocion_id'], turno['precio_final'], turno['desglose_promociones'])
+            anterior = MetricaService.aporte((datos[0], turno['origen'], *datos[1:]), precios.get(turno['id']))
+            nuevo = MetricaService.aporte((datos[0], turno['destino'], *datos[1:]), precios.get(turno['id']))
+            suma = por_promocion.setdefault(turno['promocion_id'], dict.fromkeys(MetricaService.CONTADORES, 0))
+            for campo in MetricaService.CONTADORES:
+                suma[campo] += nuevo[campo] - anterior[campo]
+        for promocion_id, diferencia in por_promocion.items():
+            MetricaService.aplicar(promocion_id, diferencia)
+
+    # ========================================================================
+    # LECTURA
+    # ========================================================================
+
+    @staticmethod
+    def resumen(promocion, ahora=None):
+        """
+        Métricas de una promoción, leyendo solo su fila de MetricaPromocion.
+
+        Args:
+            promocion (Promocion): Promoción consultada
+            ahora (datetime, optional): Momento de referencia para las semanas
+                transcurridas
+
+        Returns:
+            dict: Contadores, tasa de cancelación (%) y uplift (%) de la
+                  demanda semanal frente a las semanas previas (None si no
+                  hay base para compararla)
+        """
+        ahora = ahora or timezone.now()
+        metrica = MetricaPromocion.objects.filter(promocion=promocion).first() or MetricaPromocion(promocion=promocion)
+
+        tasa_cancelacion = None
+        if metrica.turnos:
+            tasa_cancelacion = round(Decimal(metrica.turnos_cancelados * 100) / metrica.turnos, 2)
+
+        transcurrido = min(ahora, promocion.fecha_fin) - promocion.fecha_inicio
+        semanas = Decimal(max(transcurrido.total_seconds(), 0)) / Decimal(timedelta(weeks=1).total_seconds())
+        uplift = None
+        if metrica.turnos_base and semanas:
+            semanal = metrica.turnos_periodo / semanas
+            semanal_base = Decimal(metrica.turnos_base) / MetricaService.SEMANAS_BASE
+            uplift = round((semanal / semanal_base - 1) * 100, 2)
+
+        return {
+            'promocion_id': promocion.id,
+            'titulo': promocion.titulo,
+            'canjes': metrica.turnos - metrica.turnos_cancelados,
+            'turnos': metrica.turnos,
+            'turnos_completados': metrica.turnos_completados,
+            'turnos_cancelados': metrica.turnos_cancelados,
+            'tasa_cancelacion': tasa_cancelacion,
+            'descuento_otorgado': Decimal(metrica.descuento_otorgado),
+            'ingresos': Decimal(metrica.ingresos),
+            'turnos_periodo': metrica.turnos_periodo,
+            'turnos_base': metrica.turnos_base,
+            'semanas_base': MetricaService.SEMANAS_BASE,
+            'semanas_vigente': round(semanas, 2),
+            'uplift': uplift,
+            'fecha_actualizacion': metrica.fecha_actualizacion,
+        }
+
+    # ========================================================================
+    # RECONSTRUCCIÓN
+    # ========================================================================
+
+    @staticmethod
+    def reconstruir(ahora=None):
+        """
+        Recalcula las métricas de todas las promociones desde los turnos y
+        corrige cualquier desvío de los contadores incrementales.
+
+        Returns:
+            int: Cantidad de promociones actualizadas
+        """
+        ahora = ahora or timezone.now()
+        contadores = {}
+        turnos = Turno.objects.filter(promocion__isnull=False).values_list(
+            'promocion_id', 'estado', 'precio_final', 'desglose_promociones', 'servicio__precio_base'
+        ).order_by()
+        for *estado, precio_base in turnos.iterator(chunk_size=2000):
+            suma = contadores.setdefault(estado[0], dict.fromkeys(MetricaService.CONTADORES, 0))
+            for campo, valor in MetricaService.aporte(tuple(estado), precio_base).items():
+                suma[campo] += valor
+
+        metricas = []
+        for promocion in Promocion.objects.prefetch_related('servicios'):
+            metrica = MetricaPromocion(promocion=promocion, **contadores.get(promocion.id, {}))
+            if promocion.fecha_inicio <= ahora:
+                metrica.turnos_base = MetricaService._base(promocion)
+                periodo = Turno.objects.filter(
+                    fecha_solicitud__gte=promocion.fecha_inicio,
+                    fecha_solicitud__lte=min(ahora, promocion.fecha_fin)
+                )
+                servicio_ids = [servicio.id for servicio in promocion.servicios.all()]
+                if servicio_ids:
+                    periodo = periodo.filter(servicio_id__in=servicio_ids)
+                elif promocion.categoria_id:
+                    periodo = periodo.filter(servicio__categoria_id=promocion.categoria_id)
+                metrica.turnos_periodo = periodo.count()
+            metricas.append(metrica)
+
+        MetricaPromocion.objects.bulk_create(
+            metricas,
+            update_conflicts=True,
+            unique_fields=['promocion'],
+            update_fields=list(MetricaService.CONTADORES) + ['turnos_periodo', 'turnos_base', 'fecha_actualizacion'],
+        )
+        logger.info(f"Métricas de promociones reconstruidas: {len(metricas)}")
+        return len(metricas)
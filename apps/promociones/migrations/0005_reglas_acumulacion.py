@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0004_promocion_fecha_eliminacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocion',
+            name='modo_acumulacion',
+            field=models.CharField(choices=[('exclusiva', 'Exclusiva'), ('acumulable', 'Acumulable')], default='exclusiva', help_text='Una promoción exclusiva no se combina con ninguna otra', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='promocion',
+            name='orden_aplicacion',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Las acumulables se aplican de menor a mayor orden; a igual orden, primero los porcentajes'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:54
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0005_reglas_acumulacion'),
+        ('usuarios', '0005_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocion',
+            name='max_usos',
+            field=models.PositiveIntegerField(blank=True, help_text='Cantidad total de turnos que pueden usar la promoción', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='promocion',
+            name='max_usos_por_cliente',
+            field=models.PositiveIntegerField(blank=True, help_text='Cantidad de turnos en que cada cliente puede usar la promoción', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='promocion',
+            name='usos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='UsoPromocion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usos', models.PositiveIntegerField(default=0)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usos_promociones', to='usuarios.cliente')),
+                ('promocion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usos_por_cliente', to='promociones.promocion')),
+            ],
+            options={
+                'verbose_name': 'Uso de Promoción',
+                'verbose_name_plural': 'Usos de Promociones',
+                'constraints': [models.UniqueConstraint(fields=('promocion', 'cliente'), name='uso_promocion_por_cliente')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:01
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0006_cupos_de_uso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocion',
+            name='codigo_normalizado',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.text.Upper('codigo'), output_field=models.CharField(blank=True, max_length=50, null=True)),
+        ),
+    ]
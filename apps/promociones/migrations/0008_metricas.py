@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0007_codigo_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaPromocion',
+            fields=[
+                ('promocion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrica', serialize=False, to='promociones.promocion')),
+                ('turnos', models.IntegerField(default=0)),
+                ('turnos_completados', models.IntegerField(default=0)),
+                ('turnos_cancelados', models.IntegerField(default=0)),
+                ('descuento_otorgado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('turnos_periodo', models.IntegerField(default=0)),
+                ('turnos_base', models.PositiveIntegerField(blank=True, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica de Promoción',
+                'verbose_name_plural': 'Métricas de Promociones',
+            },
+        ),
+    ]
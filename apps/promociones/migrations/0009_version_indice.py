@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+def crear_version(apps, schema_editor):
+    """La fila de la versión existe desde el principio: invalidar es un solo UPDATE"""
+    VersionIndicePromociones = apps.get_model('promociones', 'VersionIndicePromociones')
+    VersionIndicePromociones.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0008_metricas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionIndicePromociones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(default='', max_length=32)),
+            ],
+            options={
+                'verbose_name': 'Versión del índice de promociones',
+                'verbose_name_plural': 'Versión del índice de promociones',
+            },
+        ),
+        migrations.RunPython(crear_version, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
 from apps.servicios.models import Categoria, Servicio
 
 class Promocion(models.Model):
@@ -8,6 +10,11 @@ class Promocion(models.Model):
         ('monto_fijo', 'Monto Fijo'),
     )
     
+    MODOS_ACUMULACION = (
+        ('exclusiva', 'Exclusiva'),
+        ('acumulable', 'Acumulable'),
+    )
+    
     titulo = models.CharField(max_length=200)
     descripcion = models.TextField()
     tipo_descuento = models.CharField(max_length=20, choices=TIPOS)
@@ -17,7 +24,35 @@ class Promocion(models.Model):
     fecha_inicio = models.DateTimeField()
     fecha_fin = models.DateTimeField()
     activa = models.BooleanField(default=True)
+    # Reglas de combinación (ver combinacion_services)
+    modo_acumulacion = models.CharField(
+        max_length=20, choices=MODOS_ACUMULACION, default='exclusiva',
+        help_text='Una promoción exclusiva no se combina con ninguna otra'
+    )
+    orden_aplicacion = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Las acumulables se aplican de menor a mayor orden; a igual orden, primero los porcentajes'
+    )
     codigo = models.CharField(max_length=50, unique=True, blank=True, null=True)
+    # Código en mayúsculas calculado por la base: las búsquedas sin distinguir
+    # mayúsculas usan este índice en lugar de recorrer la tabla con iexact
+    codigo_normalizado = models.GeneratedField(
+        expression=Upper('codigo'),
+        output_field=models.CharField(max_length=50, blank=True, null=True),
+        db_persist=True,
+        db_index=True,
+    )
+    # Cupos de canje (ver cupo_services): vacío = sin límite
+    max_usos = models.PositiveIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(1)],
+        help_text='Cantidad total de turnos que pueden usar la promoción'
+    )
+    max_usos_por_cliente = models.PositiveIntegerField(
+        blank=True, null=True, validators=[MinValueValidator(1)],
+        help_text='Cantidad de turnos en que cada cliente puede usar la promoción'
+    )
+    # Solo se incrementa con UPDATE condicional; save() nunca lo sobrescribe
+    usos = models.PositiveIntegerField(default=0, editable=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     fecha_eliminacion = models.DateTimeField(blank=True, null=True)
@@ -30,6 +65,15 @@ class Promocion(models.Model):
     def __str__(self):
         return self.titulo
     
+    def save(self, *args, **kwargs):
+        # Una copia vieja de la promoción no debe pisar los canjes contados mientras tanto
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and not campo.generated and campo.name != 'usos'
+            ]
+        super().save(*args, **kwargs)
+    
     def esta_vigente(self):
         """Verifica si la promoción está vigente"""
         from django.utils import timezone
@@ -49,6 +93,14 @@ class Promocion(models.Model):
         # El descuento no puede ser mayor al monto base
         return min(descuento, monto_base)
     
+    def cupo_agotado(self):
+        """Indica si la promoción ya alcanzó su límite total de usos"""
+        return self.max_usos is not None and self.usos >= self.max_usos
+    
+    def es_acumulable(self):
+        """Indica si la promoción puede combinarse con otras acumulables"""
+        return self.modo_acumulacion == 'acumulable'
+    
     def aplica_a_servicio(self, servicio):
         """Verifica si la promoción aplica a un servicio específico"""
         if not self.esta_vigente():
@@ -64,3 +116,66 @@ class Promocion(models.Model):
         
         # Si no tiene servicios ni categoría específica, aplica a todos
         return True
+
+
+class UsoPromocion(models.Model):
+    """Canjes de una promoción por cliente (solo promociones con límite por cliente)"""
+    promocion = models.ForeignKey(Promocion, on_delete=models.CASCADE, related_name='usos_por_cliente')
+    cliente = models.ForeignKey('usuarios.Cliente', on_delete=models.CASCADE, related_name='usos_promociones')
+    usos = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Uso de Promoción'
+        verbose_name_plural = 'Usos de Promociones'
+        constraints = [
+            models.UniqueConstraint(fields=['promocion', 'cliente'], name='uso_promocion_por_cliente'),
+        ]
+    
+    def __str__(self):
+        return f"{self.promocion} - {self.cliente}: {self.usos}"
+
+
+class VersionIndicePromociones(models.Model):
+    """
+    Versión del índice compilado de promociones (una sola fila). Cada
+    escritura la reemplaza por un valor nuevo y cada proceso la compara con
+    la de su índice en memoria (ver indice_services).
+    """
+    version = models.CharField(max_length=32, default='')
+    
+    class Meta:
+        verbose_name = 'Versión del índice de promociones'
+        verbose_name_plural = 'Versión del índice de promociones'
+    
+    def __str__(self):
+        return self.version
+
+
+class MetricaPromocion(models.Model):
+    """
+    Métricas de efectividad de una promoción. Se actualizan en forma
+    incremental cuando cambian los turnos vinculados (ver metrica_services)
+    y el endpoint de métricas las lee sin consultar la tabla de turnos.
+    """
+    promocion = models.OneToOneField(Promocion, on_delete=models.CASCADE, primary_key=True, related_name='metrica')
+    # Turnos con Turno.promocion = esta promoción, por estado. Sin CHECK >= 0:
+    # un turno previo a las métricas puede restar antes de la primera
+    # reconstrucción, y eso no debe impedir guardarlo
+    turnos = models.IntegerField(default=0)
+    turnos_completados = models.IntegerField(default=0)
+    turnos_cancelados = models.IntegerField(default=0)
+    # Sumas de los turnos completados
+    descuento_otorgado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Demanda de los servicios alcanzados (con o sin la promoción): turnos
+    # solicitados mientras estuvo vigente y en las semanas previas al inicio
+    turnos_periodo = models.IntegerField(default=0)
+    turnos_base = models.PositiveIntegerField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Métrica de Promoción'
+        verbose_name_plural = 'Métricas de Promociones'
+    
+    def __str__(self):
+        return f"Métricas {self.promocion} ({self.turnos} turnos)"
@@ -0,0 +1,178 @@
+"""
+Cotización de precios de muchos servicios en una sola pasada.
+Los servicios y los códigos se leen con una consulta cada uno, las
+promociones salen del índice en memoria (el cupo de las que tienen límite
+total, de una consulta más) y los descuentos se calculan vectorizados en
+centavos enteros (sin errores de redondeo de float).
+"""
+from decimal import Decimal
+from itertools import chain
+import logging
+
+import numpy as np
+
+from apps.servicios.models import Servicio
+from .cupo_services import CupoService
+from .indice_services import PromocionIndiceService
+from .models import Promocion
+
+logger = logging.getLogger(__name__)
+
+
+class PrecioService:
+    """Servicio de cotización de precios con promociones"""
+
+    MAX_ITEMS = 200
+    # valor_descuento en porcentaje con 2 decimales -> puntos básicos (1% = 100)
+    ESCALA_PORCENTAJE = 10000
+
+    @staticmethod
+    def a_centavos(monto):
+        """Decimal con 2 decimales -> centavos enteros"""
+        return int((Decimal(monto) * 100).to_integral_value())
+
+    @staticmethod
+    def desde_centavos(centavos):
+        """Centavos enteros -> Decimal con 2 decimales"""
+        return Decimal(int(centavos)).scaleb(-2)
+
+    @staticmethod
+    def descuentos_centavos(bases, es_porcentaje, valores):
+        """
+        Descuento de cada par (precio, promoción) en centavos.
+
+        Args:
+            bases (ndarray): Precio base en centavos
+            es_porcentaje (ndarray): True si la promoción es porcentual
+            valores (ndarray): Puntos básicos (porcentaje) o centavos (monto fijo)
+
+        Returns:
+            ndarray: Descuentos redondeados al centavo (mitad hacia arriba),
+                     nunca mayores al precio base
+        """
+        porcentual = (bases * valores + PrecioService.ESCALA_PORCENTAJE // 2) // PrecioService.ESCALA_PORCENTAJE
+        return np.minimum(np.where(es_porcentaje, porcentual, valores), bases)
+
+    @staticmethod
+    def _promociones_por_codigo(codigos):
+        """
+        Promociones de los códigos pedidos, en una consulta sobre el índice de
+        codigo_normalizado. Los códigos que no existen se descartan en memoria.
+        """
+        codigos = [codigo for codigo in codigos if PromocionIndiceService.codigo_existe(codigo)]
+        if not codigos:
+            return {}
+        promociones = Promocion.objects.filter(codigo_normalizado__in=codigos)
+        return {promo.codigo_normalizado: promo for promo in promociones}
+
+    @staticmethod
+    def cotizar(items):
+        """
+        Cotiza una lista de servicios, cada uno con un código promocional opcional.
+
+        Sin código se aplica la promoción vigente de mayor descuento, igual que
+        Turno.aplicar_promocion_automatica. Con un código válido para el
+        servicio se usa esa promoción; si el código no sirve se informa en
+        'error' y se cotiza con la mejor promoción automática. Si entre las
+        candidatas hay acumulables, el ítem se resuelve con
+        CombinacionService.mejor_combinacion, igual que al reservar.
+
+        Args:
+            items (list): Diccionarios con servicio_id y codigo (opcional)
+
+        Returns:
+            tuple: (cotizaciones: list[dict], errores: list)
+        """
+        if len(items) > PrecioService.MAX_ITEMS:
+            return [], [f'No se pueden cotizar más de {PrecioService.MAX_ITEMS} servicios a la vez']
+
+        servicios = Servicio.objects.in_bulk({item['servicio_id'] for item in items})
+        codigos = {(item.get('codigo') or '').strip().upper() for item in items} - {''}
+        por_codigo = PrecioService._promociones_por_codigo(codigos)
+        aplicables = {pk: PromocionIndiceService.aplicables(servicio) for pk, servicio in servicios.items()}
+        # Sin cliente solo se descartan las promociones con el cupo total agotado (una consulta para todo el lote)
+        agotadas = CupoService.agotadas(chain.from_iterable(aplicables.values()))
+
+        from .combinacion_services import CombinacionService
+
+        cotizaciones = []
+        bases = []
+        # Ítems con acumulables: se resuelven con la búsqueda de combinaciones
+        combinadas = {}
+        # Pares (ítem, promoción candidata) para el cálculo vectorizado
+        pares_item, pares_promo, pares_orden = [], [], []
+
+        for item in items:
+            servicio = servicios.get(item['servicio_id'])
+            cotizacion = {'servicio_id': item['servicio_id'], 'promocion': None, 'error': None}
+            cotizaciones.append(cotizacion)
+            if servicio is None:
+                cotizacion['error'] = 'Servicio no encontrado'
+                bases.append(0)
+                continue
+
+            cotizacion['servicio'] = servicio.nombre
+            bases.append(PrecioService.a_centavos(servicio.precio_base))
+            candidatas = [promo for promo in aplicables[servicio.pk] if promo.pk not in agotadas]
+
+            codigo = (item.get('codigo') or '').strip().upper()
+            obligatoria = None
+            if codigo:
+                promo_codigo = por_codigo.get(codigo)
+                if promo_codigo is None:
+                    cotizacion['error'] = 'Código promocional no válido'
+                elif not promo_codigo.esta_vigente():
+                    cotizacion['error'] = 'El código promocional ha expirado o no está activo'
+                elif promo_codigo.cupo_agotado():
+                    cotizacion['error'] = 'El código promocional alcanzó su límite de usos'
+                elif all(promo.id != promo_codigo.id for promo in candidatas):
+                    cotizacion['error'] = 'Este código no aplica al servicio seleccionado'
+                else:
+                    obligatoria = promo_codigo
+                    if not promo_codigo.es_acumulable():
+                        candidatas = [promo_codigo]
+
+            indice = len(cotizaciones) - 1
+            if any(promo.es_acumulable() for promo in candidatas):
+                combinadas[indice] = (servicio, candidatas, obligatoria)
+                continue
+            for orden, promo in enumerate(candidatas):
+                pares_item.append(indice)
+                pares_promo.append(promo)
+                pares_orden.append(orden)
+
+        bases = np.array(bases, dtype=np.int64)
+        elegidas = {}
+
+        if pares_promo:
+            items_par = np.array(pares_item, dtype=np.int64)
+            descuentos_par = PrecioService.descuentos_centavos(
+                bases[items_par],
+                np.array([promo.tipo_descuento == 'porcentaje' for promo in pares_promo]),
+                np.array([PrecioService.a_centavos(promo.valor_descuento) for promo in pares_promo], dtype=np.int64),
+            )
+            # Por ítem: mayor descuento y, a igualdad, la primera candidata
+            orden = np.lexsort((np.array(pares_orden), -descuentos_par, items_par))
+            _, primeros = np.unique(items_par[orden], return_index=True)
+            for par in orden[primeros]:
+                if descuentos_par[par] > 0:
+                    elegidas[pares_item[par]] = pares_promo[par]
+
+        for indice, cotizacion in enumerate(cotizaciones):
+            if 'servicio' not in cotizacion:
+                continue
+            if indice in combinadas:
+                servicio, candidatas, obligatoria = combinadas[indice]
+                resultado = CombinacionService.mejor_combinacion(servicio.precio_base, candidatas, obligatoria)
+            else:
+                promo = elegidas.get(indice)
+                resultado = CombinacionService.desglosar(int(bases[indice]), [promo] if promo else [])
+            promo = resultado['principal']
+            cotizacion.update({
+                'precio_base': resultado['precio_base'],
+                'descuento': resultado['descuento'],
+                'precio_final': resultado['precio_final'],
+                'promocion': {'id': promo.id, 'titulo': promo.titulo, 'codigo': promo.codigo} if promo else None,
+                'desglose': resultado['desglose'],
+            })
+        return cotizaciones, []
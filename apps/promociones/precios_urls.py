@@ -0,0 +1,12 @@
+"""
+URLs de la API REST de Precios
+"""
+from django.urls import path
+from .api_views import CotizarPreciosAPIView
+
+app_name = 'precios_api'
+
+urlpatterns = [
+    # Cotización de muchos servicios en un request
+    path('cotizar/', CotizarPreciosAPIView.as_view(), name='precios-cotizar'),
+]
@@ -3,6 +3,8 @@ Serializers para la API de Promociones
 """
 from rest_framework import serializers
 from .models import Promocion
+from .precio_services import PrecioService
+from .importacion_services import ImportacionService
 from apps.servicios.models import Categoria, Servicio
 
 
@@ -62,11 +64,16 @@ class PromocionSerializer(serializers.ModelSerializer):
             'fecha_fin',
             'activa',
             'codigo',
+            'modo_acumulacion',
+            'orden_aplicacion',
+            'max_usos',
+            'max_usos_por_cliente',
+            'usos',
             'fecha_creacion',
             'fecha_modificacion',
             'esta_vigente'
         ]
-        read_only_fields = ['id', 'fecha_creacion', 'fecha_modificacion']
+        read_only_fields = ['id', 'usos', 'fecha_creacion', 'fecha_modificacion']
     
     def get_esta_vigente(self, obj):
         """Indica si la promoción está vigente actualmente"""
@@ -150,7 +157,11 @@ class PromocionCreateUpdateSerializer(serializers.ModelSerializer):
             'servicios',
             'fecha_inicio',
             'fecha_fin',
-            'codigo'
+            'codigo',
+            'modo_acumulacion',
+            'orden_aplicacion',
+            'max_usos',
+            'max_usos_por_cliente'
         ]
     
     def validate_titulo(self, value):
@@ -164,3 +175,113 @@ class PromocionCreateUpdateSerializer(serializers.ModelSerializer):
         if value not in ['porcentaje', 'monto_fijo']:
             raise serializers.ValidationError("El tipo de descuento debe ser 'porcentaje' o 'monto_fijo'")
         return value
+
+
+class CotizacionItemSerializer(serializers.Serializer):
+    """Un servicio a cotizar con su código promocional opcional"""
+    servicio_id = serializers.IntegerField()
+    codigo = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=50)
+
+
+class CotizarPreciosRequestSerializer(serializers.Serializer):
+    """Serializer para validar request de cotización de precios"""
+    items = serializers.ListField(
+        child=CotizacionItemSerializer(),
+        allow_empty=False,
+        max_length=PrecioService.MAX_ITEMS,
+        help_text="Lista de {servicio_id, codigo?}"
+    )
+
+
+class CotizacionSerializer(serializers.Serializer):
+    """Precio cotizado de un servicio"""
+    servicio_id = serializers.IntegerField()
+    servicio = serializers.CharField(required=False)
+    precio_base = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    descuento = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    precio_final = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    promocion = serializers.DictField(allow_null=True)
+    desglose = serializers.ListField(child=serializers.DictField(), required=False)
+    error = serializers.CharField(allow_null=True)
+
+
+class SimularPromocionSerializer(serializers.Serializer):
+    """Serializer para validar una promoción candidata a simular"""
+    tipo_descuento = serializers.ChoiceField(choices=Promocion.TIPOS)
+    valor_descuento = serializers.DecimalField(max_digits=10, decimal_places=2)
+    categoria = serializers.PrimaryKeyRelatedField(
+        queryset=Categoria.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    servicios = serializers.PrimaryKeyRelatedField(
+        queryset=Servicio.objects.all(),
+        many=True,
+        required=False
+    )
+    modo_acumulacion = serializers.ChoiceField(
+        choices=Promocion.MODOS_ACUMULACION,
+        default='exclusiva'
+    )
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+
+    def validate(self, data):
+        """Valida que el período sea coherente"""
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError({
+                'hasta': 'La fecha hasta debe ser posterior o igual a la fecha desde'
+            })
+        return data
+
+
+class SimulacionServicioSerializer(serializers.Serializer):
+    """Impacto simulado sobre un servicio"""
+    servicio_id = serializers.IntegerField()
+    servicio = serializers.CharField()
+    turnos = serializers.IntegerField()
+    turnos_afectados = serializers.IntegerField()
+    descuento = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SimulacionSerializer(serializers.Serializer):
+    """Resultado de simular una promoción sobre turnos completados"""
+    desde = serializers.DateField()
+    hasta = serializers.DateField()
+    turnos_analizados = serializers.IntegerField()
+    turnos_afectados = serializers.IntegerField()
+    ingresos_actuales = serializers.DecimalField(max_digits=14, decimal_places=2)
+    ingresos_simulados = serializers.DecimalField(max_digits=14, decimal_places=2)
+    descuento_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+    variacion_ingresos = serializers.DecimalField(max_digits=14, decimal_places=2)
+    servicios = SimulacionServicioSerializer(many=True)
+
+
+class ImportarPromocionesSerializer(serializers.Serializer):
+    """Serializer para validar la carga de un archivo de promociones"""
+    archivo = serializers.FileField(help_text="Archivo CSV o JSON con las promociones")
+    formato = serializers.ChoiceField(
+        choices=ImportacionService.FORMATOS,
+        required=False,
+        help_text="Por defecto se deduce de la extensión del archivo"
+    )
+    solo_validar = serializers.BooleanField(default=False)
+
+
+class MetricaPromocionSerializer(serializers.Serializer):
+    """Métricas de efectividad de una promoción"""
+    promocion_id = serializers.IntegerField()
+    titulo = serializers.CharField()
+    canjes = serializers.IntegerField()
+    turnos = serializers.IntegerField()
+    turnos_completados = serializers.IntegerField()
+    turnos_cancelados = serializers.IntegerField()
+    tasa_cancelacion = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+    descuento_otorgado = serializers.DecimalField(max_digits=14, decimal_places=2)
+    ingresos = serializers.DecimalField(max_digits=14, decimal_places=2)
+    turnos_periodo = serializers.IntegerField()
+    turnos_base = serializers.IntegerField(allow_null=True)
+    semanas_base = serializers.IntegerField()
+    semanas_vigente = serializers.DecimalField(max_digits=8, decimal_places=2)
+    uplift = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+    fecha_actualizacion = serializers.DateTimeField(allow_null=True)
@@ -2,10 +2,12 @@
 Servicio de lógica de negocio para Promociones
 Implementa las validaciones y reglas de negocio para CU-18, CU-19, CU-20
 """
+import heapq
 from django.utils import timezone
 from django.db.models import Q
 from decimal import Decimal
 from .models import Promocion
+from .indice_services import PromocionIndiceService
 from apps.turnos.models import Turno
 
 
@@ -69,13 +71,15 @@ class PromocionService:
         return True, ""
     
     @staticmethod
-    def validar_promociones_solapadas(fecha_inicio, fecha_fin, categoria=None, servicios=None, promocion_id=None):
+    def validar_promociones_solapadas(fecha_inicio, fecha_fin, categoria=None, servicios=None, promocion_id=None,
+                                      acumulable=False):
         """
         Valida que no existan promociones activas solapadas para el mismo período y condiciones.
         
         Dos promociones se consideran solapadas si:
         - Tienen períodos de vigencia que se superponen
         - Aplican a las mismas categorías o servicios
+        - Al menos una de las dos es exclusiva (las acumulables se combinan)
         
         Args:
             fecha_inicio: Fecha de inicio de la nueva/modificada promoción
@@ -83,40 +87,188 @@ class PromocionService:
             categoria: Categoría a la que aplica (puede ser None)
             servicios: Lista de servicios a los que aplica (puede ser None o vacío)
             promocion_id: ID de la promoción a excluir (para modificaciones)
+            acumulable: True si la promoción nueva/modificada es acumulable
             
         Returns:
             tuple: (es_valido: bool, mensaje_error: str)
         """
-        # Buscar promociones activas con períodos solapados
-        promociones_query = Promocion.objects.filter(
+        if not categoria and not servicios:
+            return True, ""
+        
+        mensajes = PromocionService.validar_solapamientos_lote([{
+            'id': promocion_id,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'categoria': categoria,
+            'servicios': servicios,
+            'modo_acumulacion': 'acumulable' if acumulable else 'exclusiva',
+        }])[0]
+        if mensajes:
+            return False, "; ".join(mensajes)
+        
+        return True, ""
+    
+    @staticmethod
+    def validar_solapamientos_lote(lote):
+        """
+        Valida un lote de promociones contra las existentes y entre sí.
+        
+        Las promociones activas candidatas (mismo período global y mismas
+        categorías o servicios) se leen con sus servicios en una consulta;
+        luego un barrido por fecha de inicio, separado por categoría y por
+        servicio, compara solo los pares que comparten alcance y cuyos
+        períodos se superponen. Se informan todos los conflictos, no solo
+        el primero.
+        
+        Args:
+            lote: Lista de diccionarios con fecha_inicio, fecha_fin y
+                opcionalmente id (modificación), titulo, categoria,
+                servicios y modo_acumulacion. Los ítems sin fechas
+                coherentes se omiten
+                
+        Returns:
+            list: Por cada ítem del lote, la lista de mensajes de conflicto
+        """
+        nuevas = [
+            PromocionService._intervalo_nuevo(datos, indice)
+            for indice, datos in enumerate(lote)
+            if datos.get('fecha_inicio') and datos.get('fecha_fin') and datos['fecha_inicio'] <= datos['fecha_fin']
+        ]
+        conflictos = [[] for _ in lote]
+        if not nuevas:
+            return conflictos
+        
+        existentes = PromocionService._intervalos_existentes(nuevas)
+        for anterior, actual in PromocionService._barrido_por_alcance(nuevas + existentes):
+            if actual['indice'] is not None:
+                conflictos[actual['indice']].extend(PromocionService._conflicto(actual, anterior))
+            if anterior['indice'] is not None:
+                conflictos[anterior['indice']].extend(PromocionService._conflicto(anterior, actual))
+        return conflictos
+    
+    @staticmethod
+    def _intervalo_nuevo(datos, indice):
+        """Promoción del lote en el formato del barrido"""
+        categoria = datos.get('categoria')
+        return {
+            'indice': indice,
+            'id': datos.get('id'),
+            'titulo': datos.get('titulo') or '',
+            'inicio': datos['fecha_inicio'],
+            'fin': datos['fecha_fin'],
+            'categoria_id': categoria.id if categoria else None,
+            'categoria': categoria.nombre if categoria else '',
+            'servicios': {servicio.id: servicio.nombre for servicio in (datos.get('servicios') or [])},
+            'acumulable': datos.get('modo_acumulacion') == 'acumulable',
+        }
+    
+    @staticmethod
+    def _intervalos_existentes(nuevas):
+        """
+        Promociones activas que podrían solaparse con el lote, con los IDs de
+        sus servicios, en una sola consulta (LEFT JOIN a servicios).
+        """
+        categoria_ids = {n['categoria_id'] for n in nuevas if n['categoria_id']}
+        servicio_ids = {servicio_id for n in nuevas for servicio_id in n['servicios']}
+        alcance = Q()
+        if categoria_ids:
+            alcance |= Q(categoria_id__in=categoria_ids)
+        if servicio_ids:
+            alcance |= Q(id__in=Promocion.servicios.through.objects.filter(
+                servicio_id__in=servicio_ids
+            ).values('promocion_id'))
+        if not alcance:
+            return []
+        
+        filas = Promocion.objects.filter(
+            alcance,
             activa=True,
-            fecha_fin__gte=fecha_inicio,  # La promoción existente termina después del inicio de la nueva
-            fecha_inicio__lte=fecha_fin    # La promoción existente comienza antes del fin de la nueva
+            fecha_fin__gte=min(n['inicio'] for n in nuevas),
+            fecha_inicio__lte=max(n['fin'] for n in nuevas)
+        ).exclude(
+            id__in=[n['id'] for n in nuevas if n['id']]
+        ).order_by().values_list(
+            'id', 'titulo', 'fecha_inicio', 'fecha_fin', 'categoria_id', 'modo_acumulacion', 'servicios__id'
         )
         
-        # Excluir la promoción actual si es una modificación
-        if promocion_id:
-            promociones_query = promociones_query.exclude(id=promocion_id)
-        
-        # Filtrar por condiciones de aplicación
-        if categoria:
-            # Buscar promociones que apliquen a la misma categoría
-            promociones_query = promociones_query.filter(categoria=categoria)
-        
-        if servicios:
-            # Buscar promociones que apliquen a los mismos servicios
-            for servicio in servicios:
-                promociones_solapadas = promociones_query.filter(servicios=servicio)
-                if promociones_solapadas.exists():
-                    promocion_existente = promociones_solapadas.first()
-                    return False, f"Ya existe una promoción activa '{promocion_existente.titulo}' para el servicio '{servicio.nombre}' en el período indicado"
-        
-        # Si hay promociones solapadas con la misma categoría
-        if categoria and promociones_query.exists():
-            promocion_existente = promociones_query.first()
-            return False, f"Ya existe una promoción activa '{promocion_existente.titulo}' para la categoría '{categoria.nombre}' en el período indicado"
-        
-        return True, ""
+        existentes = {}
+        for promocion_id, titulo, inicio, fin, categoria_id, modo, servicio_id in filas:
+            existente = existentes.setdefault(promocion_id, {
+                'indice': None,
+                'id': promocion_id,
+                'titulo': titulo,
+                'inicio': inicio,
+                'fin': fin,
+                'categoria_id': categoria_id,
+                'servicios': set(),
+                'acumulable': modo == 'acumulable',
+            })
+            if servicio_id:
+                existente['servicios'].add(servicio_id)
+        return list(existentes.values())
+    
+    @staticmethod
+    def _barrido(intervalos):
+        """
+        Pares de intervalos que se superponen (extremos incluidos), en orden
+        de inicio: (el que empezó antes, el actual). Los que ya terminaron
+        salen de los activos con un heap ordenado por fecha de fin.
+        """
+        orden = sorted(range(len(intervalos)), key=lambda i: (intervalos[i]['inicio'], i))
+        activos = []
+        for i in orden:
+            actual = intervalos[i]
+            while activos and activos[0][0] < actual['inicio']:
+                heapq.heappop(activos)
+            for _, j in activos:
+                yield intervalos[j], actual
+            heapq.heappush(activos, (actual['fin'], i))
+    
+    @staticmethod
+    def _barrido_por_alcance(intervalos):
+        """
+        Pares superpuestos que comparten categoría o algún servicio (los
+        únicos que pueden chocar), sin repetir pares que compartan varios.
+        Evita comparar entre sí promociones de alcances distintos en lotes
+        grandes.
+        """
+        grupos = {}
+        for intervalo in intervalos:
+            if intervalo['categoria_id']:
+                grupos.setdefault(('categoria', intervalo['categoria_id']), []).append(intervalo)
+            for servicio_id in intervalo['servicios']:
+                grupos.setdefault(('servicio', servicio_id), []).append(intervalo)
+        
+        vistos = set()
+        for grupo in grupos.values():
+            for anterior, actual in PromocionService._barrido(grupo):
+                par = frozenset((id(anterior), id(actual)))
+                if par not in vistos:
+                    vistos.add(par)
+                    yield anterior, actual
+    
+    @staticmethod
+    def _conflicto(nueva, otra):
+        """
+        Mensajes de conflicto de una promoción del lote con otra superpuesta.
+        Con categoría, choca con las de la misma categoría; sin categoría,
+        con las que comparten algún servicio. Dos acumulables no chocan.
+        """
+        if nueva['acumulable'] and otra['acumulable']:
+            return []
+        if otra['indice'] is None:
+            prefijo = f"Ya existe una promoción activa '{otra['titulo']}'"
+        else:
+            prefijo = f"La promoción '{otra['titulo']}' del mismo lote se superpone"
+        
+        if nueva['categoria_id'] and otra['categoria_id'] != nueva['categoria_id']:
+            return []
+        compartidos = [nombre for servicio_id, nombre in nueva['servicios'].items() if servicio_id in otra['servicios']]
+        if compartidos:
+            return [f"{prefijo} para el servicio '{nombre}' en el período indicado" for nombre in compartidos]
+        if nueva['categoria_id']:
+            return [f"{prefijo} para la categoría '{nueva['categoria']}' en el período indicado"]
+        return []
     
     @staticmethod
     def validar_nombre_unico(titulo, promocion_id=None):
@@ -220,7 +372,8 @@ class PromocionService:
             categoria = datos.get('categoria')
             servicios = datos.get('servicios')
             no_solapada, mensaje_solape = PromocionService.validar_promociones_solapadas(
-                fecha_inicio, fecha_fin, categoria, servicios
+                fecha_inicio, fecha_fin, categoria, servicios,
+                acumulable=datos.get('modo_acumulacion') == 'acumulable'
             )
             if not no_solapada:
                 errores['solape'] = mensaje_solape
@@ -240,6 +393,10 @@ class PromocionService:
                 fecha_inicio=datos['fecha_inicio'],
                 fecha_fin=datos['fecha_fin'],
                 codigo=datos.get('codigo'),
+                modo_acumulacion=datos.get('modo_acumulacion', 'exclusiva'),
+                orden_aplicacion=datos.get('orden_aplicacion', 0),
+                max_usos=datos.get('max_usos'),
+                max_usos_por_cliente=datos.get('max_usos_por_cliente'),
                 activa=True
             )
             
@@ -247,6 +404,7 @@ class PromocionService:
             if datos.get('servicios'):
                 promocion.servicios.set(datos['servicios'])
             
+            PromocionIndiceService.invalidar()
             return promocion, {}
             
         except Exception as e:
@@ -291,7 +449,8 @@ class PromocionService:
             categoria = datos.get('categoria', promocion.categoria)
             servicios = datos.get('servicios', promocion.servicios.all())
             no_solapada, mensaje_solape = PromocionService.validar_promociones_solapadas(
-                fecha_inicio, fecha_fin, categoria, servicios, promocion.id
+                fecha_inicio, fecha_fin, categoria, servicios, promocion.id,
+                acumulable=datos.get('modo_acumulacion', promocion.modo_acumulacion) == 'acumulable'
             )
             if not no_solapada:
                 errores['solape'] = mensaje_solape
@@ -312,6 +471,7 @@ class PromocionService:
             if 'servicios' in datos:
                 promocion.servicios.set(datos['servicios'])
             
+            PromocionIndiceService.invalidar()
             return promocion, {}
             
         except Exception as e:
@@ -338,6 +498,7 @@ class PromocionService:
         try:
             promocion.activa = False
             promocion.save()
+            PromocionIndiceService.invalidar()
             return True, "Promoción eliminada exitosamente"
         except Exception as e:
             return False, f"Error al eliminar la promoción: {str(e)}"
@@ -0,0 +1,93 @@
+"""
+Señales de la app Promociones.
+Invalidan el índice compilado de promociones ante cualquier alta, baja o
+cambio de una promoción o de sus servicios (incluido el admin), acotan la
+lectura de su versión a una por request, devuelven el cupo de las
+promociones de un turno al cancelarlo, y mantienen las métricas de
+efectividad al guardar, eliminar, vencer o cambiar de estado en lote los
+turnos.
+"""
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.turnos.models import Turno
+from apps.turnos.signals import turnos_expirados, turnos_transicionados
+from .cupo_services import CupoService
+from .indice_services import PromocionIndiceService
+from .metrica_services import MetricaService
+from .models import Promocion
+
+
+@receiver(post_save, sender=Promocion)
+@receiver(post_delete, sender=Promocion)
+def invalidar_indice_promocion(sender, instance, **kwargs):
+    """Una promoción creada, modificada o eliminada invalida el índice"""
+    PromocionIndiceService.invalidar()
+
+
+@receiver(m2m_changed, sender=Promocion.servicios.through)
+def invalidar_indice_servicios(sender, action, **kwargs):
+    """Agregar o quitar servicios de una promoción invalida el índice"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        PromocionIndiceService.invalidar()
+
+
+@receiver(request_started)
+def iniciar_version_indice(sender, **kwargs):
+    """Cada request lee la versión del índice una sola vez"""
+    PromocionIndiceService.iniciar_request()
+
+
+@receiver(request_finished)
+def finalizar_version_indice(sender, **kwargs):
+    PromocionIndiceService.finalizar_request()
+
+
+@receiver(post_init, sender=Turno)
+def guardar_metrica_original(sender, instance, **kwargs):
+    """Guarda la promoción, estado y precio con que se cargó el turno"""
+    instance._metrica_original = MetricaService.estado_turno(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Turno)
+def liberar_cupos_turno(sender, instance, created, **kwargs):
+    """
+    Cancelar un turno devuelve el cupo de sus promociones, en la misma
+    transacción. Se conecta antes de actualizar_metricas_turno, que
+    renueva _metrica_original.
+    """
+    original = getattr(instance, '_metrica_original', None)
+    if created or original is None or original[1] == 'cancelado':
+        return
+    if instance.__dict__.get('estado') == 'cancelado':
+        promocion_id, _, _, desglose = original
+        CupoService.liberar([(instance.cliente_id, promocion_id, desglose)])
+
+
+@receiver(post_save, sender=Turno)
+def actualizar_metricas_turno(sender, instance, created, **kwargs):
+    """Suma, resta o ajusta el turno en las métricas de su promoción"""
+    original = getattr(instance, '_metrica_original', None)
+    # Sin estado original (campos diferidos) no hay con qué comparar
+    if created or original is not None:
+        MetricaService.programar_cambio(instance, None if created else original, creado=created)
+    instance._metrica_original = MetricaService.estado_turno(instance)
+
+
+@receiver(post_delete, sender=Turno)
+def descontar_metricas_turno(sender, instance, **kwargs):
+    """Un turno eliminado deja de contar en las métricas de su promoción"""
+    MetricaService.programar_baja(instance, getattr(instance, '_metrica_original', None))
+
+
+@receiver(turnos_expirados)
+def registrar_turnos_expirados(sender, turnos, **kwargs):
+    """Los pendientes vencidos se cancelan sin señales de modelo: contarlos aquí"""
+    MetricaService.registrar_cancelaciones(turnos)
+
+
+@receiver(turnos_transicionados)
+def registrar_turnos_transicionados(sender, turnos, **kwargs):
+    """Los cambios de estado en lote no disparan señales de modelo: ajustar aquí"""
+    MetricaService.registrar_transiciones(turnos)
@@ -0,0 +1,174 @@
+"""
+Simulador de impacto de una promoción sobre turnos históricos.
+Recorre los turnos completados de un período por bloques (paginación por
+id, sin instanciar modelos) y recalcula el precio final de cada uno en
+centavos enteros con NumPy, para estimar cuánto habría costado la
+promoción antes de lanzarla.
+"""
+import logging
+
+import numpy as np
+from django.db.models import Q
+
+from apps.servicios.models import Servicio
+from apps.turnos.models import Turno
+from .precio_services import PrecioService
+
+logger = logging.getLogger(__name__)
+
+
+class SimulacionService:
+    """Servicio de simulación de promociones candidatas"""
+
+    CHUNK = 5000
+
+    @staticmethod
+    def _alcance(datos):
+        """
+        Filtro de los servicios a los que aplicaría la promoción, con las
+        mismas reglas que Promocion.aplica_a_servicio.
+        """
+        servicios = datos.get('servicios') or []
+        if servicios:
+            return Q(servicio_id__in=[servicio.id for servicio in servicios])
+        if datos.get('categoria'):
+            return Q(servicio__categoria_id=datos['categoria'].id)
+        return Q()
+
+    @staticmethod
+    def _bloques(turnos):
+        """
+        Filas (id, servicio_id, precio base, precio final, modo de la
+        promoción aplicada) en bloques de CHUNK, una consulta por bloque.
+        """
+        ultimo_id = 0
+        while True:
+            filas = list(
+                turnos.filter(id__gt=ultimo_id).order_by('id').values_list(
+                    'id', 'servicio_id', 'servicio__precio_base', 'precio_final', 'promocion__modo_acumulacion'
+                )[:SimulacionService.CHUNK]
+            )
+            if not filas:
+                return
+            yield filas
+            if len(filas) < SimulacionService.CHUNK:
+                return
+            ultimo_id = filas[-1][0]
+
+    @staticmethod
+    def precios_simulados(bases, finales, combinable, es_porcentaje, valor, acumulable):
+        """
+        Precio final de cada turno si la promoción hubiera estado vigente.
+
+        Una exclusiva compite con lo que el turno ya tenía: el cliente paga
+        el menor de los dos precios. Una acumulable se aplica en cadena sobre
+        el precio ya descontado cuando lo aplicado también era acumulable (o
+        no había promoción), y si no compite como una exclusiva.
+
+        Args:
+            bases (ndarray): Precio base del servicio en centavos
+            finales (ndarray): Precio final cobrado en centavos
+            combinable (ndarray): True si lo aplicado admite acumular
+            es_porcentaje (bool): Tipo de descuento de la promoción
+            valor (int): Puntos básicos (porcentaje) o centavos (monto fijo)
+            acumulable (bool): Modo de acumulación de la promoción
+
+        Returns:
+            ndarray: Precios simulados en centavos
+        """
+        sola = np.minimum(finales, bases - PrecioService.descuentos_centavos(bases, es_porcentaje, valor))
+        if not acumulable:
+            return sola
+        encadenada = finales - PrecioService.descuentos_centavos(finales, es_porcentaje, valor)
+        return np.where(combinable, encadenada, sola)
+
+    @staticmethod
+    def simular(datos, desde, hasta):
+        """
+        Reproduce una promoción candidata sobre los turnos completados.
+
+        Args:
+            datos (dict): tipo_descuento, valor_descuento y opcionalmente
+                categoria, servicios y modo_acumulacion (igual que en
+                PromocionService.registrar_promocion)
+            desde (date): Primer día del período (inclusive)
+            hasta (date): Último día del período (inclusive)
+
+        Returns:
+            tuple: (resultado: dict|None, errores: list)
+        """
+        from .services import PromocionService
+
+        errores = []
+        if desde > hasta:
+            errores.append('La fecha desde debe ser anterior o igual a la fecha hasta')
+        valido, mensaje = PromocionService.validar_valor_descuento(datos.get('tipo_descuento'), datos.get('valor_descuento'))
+        if not valido:
+            errores.append(mensaje)
+        if errores:
+            return None, errores
+
+        es_porcentaje = datos['tipo_descuento'] == 'porcentaje'
+        valor = PrecioService.a_centavos(datos['valor_descuento'])
+        acumulable = datos.get('modo_acumulacion') == 'acumulable'
+        turnos = Turno.objects.filter(
+            SimulacionService._alcance(datos), estado='completado', fecha__range=(desde, hasta)
+        )
+
+        analizados = afectados = ingresos_actuales = ingresos_simulados = 0
+        por_servicio = {}  # servicio_id -> [turnos, afectados, descuento]
+        for filas in SimulacionService._bloques(turnos):
+            cantidad = len(filas)
+            servicio_ids = np.fromiter((fila[1] for fila in filas), dtype=np.int64, count=cantidad)
+            bases = np.fromiter((PrecioService.a_centavos(fila[2]) for fila in filas), dtype=np.int64, count=cantidad)
+            finales = np.fromiter((PrecioService.a_centavos(fila[3]) for fila in filas), dtype=np.int64, count=cantidad)
+            combinable = np.fromiter((fila[4] in (None, 'acumulable') for fila in filas), dtype=bool, count=cantidad)
+
+            simulados = SimulacionService.precios_simulados(bases, finales, combinable, es_porcentaje, valor, acumulable)
+            descuentos = finales - simulados
+
+            analizados += cantidad
+            afectados += int(np.count_nonzero(descuentos))
+            ingresos_actuales += int(finales.sum())
+            ingresos_simulados += int(simulados.sum())
+
+            ids, posiciones = np.unique(servicio_ids, return_inverse=True)
+            turnos_servicio = np.bincount(posiciones, minlength=len(ids))
+            afectados_servicio = np.bincount(posiciones, weights=descuentos > 0, minlength=len(ids))
+            descuento_servicio = np.zeros(len(ids), dtype=np.int64)
+            np.add.at(descuento_servicio, posiciones, descuentos)
+            for servicio_id, total, con_descuento, descuento in zip(
+                ids.tolist(), turnos_servicio.tolist(), afectados_servicio.tolist(), descuento_servicio.tolist()
+            ):
+                acumulado = por_servicio.setdefault(servicio_id, [0, 0, 0])
+                acumulado[0] += total
+                acumulado[1] += int(con_descuento)
+                acumulado[2] += descuento
+
+        nombres = dict(Servicio.objects.filter(id__in=por_servicio).order_by().values_list('id', 'nombre')) if por_servicio else {}
+        servicios = sorted(
+            (
+                {
+                    'servicio_id': servicio_id,
+                    'servicio': nombres.get(servicio_id, ''),
+                    'turnos': total,
+                    'turnos_afectados': con_descuento,
+                    'descuento': PrecioService.desde_centavos(descuento),
+                }
+                for servicio_id, (total, con_descuento, descuento) in por_servicio.items()
+            ),
+            key=lambda fila: (-fila['descuento'], fila['servicio_id'])
+        )
+        logger.info(f"Simulación de promoción: {analizados} turnos entre {desde} y {hasta}")
+
+        return {
+            'desde': desde,
+            'hasta': hasta,
+            'turnos_analizados': analizados,
+            'turnos_afectados': afectados,
+            'ingresos_actuales': PrecioService.desde_centavos(ingresos_actuales),
+            'ingresos_simulados': PrecioService.desde_centavos(ingresos_simulados),
+            'descuento_total': PrecioService.desde_centavos(ingresos_actuales - ingresos_simulados),
+            'variacion_ingresos': PrecioService.desde_centavos(ingresos_simulados - ingresos_actuales),
+            'servicios': servicios,
+        }, []
@@ -0,0 +1,145 @@
+"""
+Tests para la búsqueda de códigos promocionales sin distinguir mayúsculas.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_codigos
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario, Cliente
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.forms import SolicitarTurnoForm
+from apps.promociones.models import Promocion
+from apps.promociones.indice_services import PromocionIndiceService
+
+TABLA = Promocion._meta.db_table
+
+
+class CodigoPromocionalTestCase(TestCase):
+    """Tests para PromocionIndiceService.codigo_existe y buscar_por_codigo"""
+
+    def setUp(self):
+        ahora = timezone.now()
+        self.categoria = Categoria.objects.create(nombre='Pintura', descripcion='Pintura')
+        self.servicio = Servicio.objects.create(
+            nombre='Pintura de ambiente', descripcion='Pintura', categoria=self.categoria,
+            precio_base=Decimal('8000.00'), duracion_estimada=240
+        )
+        self.promo = Promocion.objects.create(
+            titulo='Primavera', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            codigo='Primavera10', fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=10)
+        )
+
+    def test_columna_normalizada(self):
+        """La base calcula el código en mayúsculas, también en UPDATE masivos"""
+        self.promo.refresh_from_db()
+        self.assertEqual(self.promo.codigo_normalizado, 'PRIMAVERA10')
+        Promocion.objects.filter(pk=self.promo.pk).update(codigo='otono5')
+        self.assertTrue(Promocion.objects.filter(pk=self.promo.pk, codigo_normalizado='OTONO5').exists())
+
+    def test_codigo_inexistente_sin_consultas(self):
+        """Con el conjunto cargado, un código desconocido no consulta la base (en el mismo request)"""
+        PromocionIndiceService.iniciar_request()
+        try:
+            self.assertTrue(PromocionIndiceService.codigo_existe(' primavera10 '))
+            with self.assertNumQueries(0):
+                for intento in range(100):
+                    self.assertIsNone(PromocionIndiceService.buscar_por_codigo(f'PRIMAVERA{intento + 11}'))
+            with self.assertNumQueries(1):
+                self.assertEqual(PromocionIndiceService.buscar_por_codigo('pRiMaVeRa10'), self.promo)
+        finally:
+            PromocionIndiceService.finalizar_request()
+
+    def test_se_actualiza_con_las_escrituras(self):
+        """Crear, modificar o eliminar una promoción actualiza el conjunto"""
+        self.assertFalse(PromocionIndiceService.codigo_existe('INVIERNO'))
+        self.promo.codigo = 'INVIERNO'
+        self.promo.save()
+        self.assertTrue(PromocionIndiceService.codigo_existe('invierno'))
+        self.assertFalse(PromocionIndiceService.codigo_existe('PRIMAVERA10'))
+        self.promo.delete()
+        self.assertFalse(PromocionIndiceService.codigo_existe('INVIERNO'))
+
+    def test_formulario_rechaza_sin_consultas(self):
+        """El formulario de turno rechaza un código inventado sin tocar la tabla de promociones"""
+        PromocionIndiceService.codigo_existe('PRIMAVERA10')
+        form = SolicitarTurnoForm({'codigo_promocion': 'ADIVINO', 'direccion_servicio': 'Calle 123'})
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertFalse(form.is_valid())
+        self.assertIn('no es válido', form.errors['codigo_promocion'][0])
+        self.assertFalse(any(TABLA in consulta['sql'] for consulta in consultas))
+
+        form = SolicitarTurnoForm({'codigo_promocion': 'primavera10', 'direccion_servicio': 'Calle 123'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['codigo_promocion'], self.promo)
+
+    def test_endpoint_validar_codigo(self):
+        """El endpoint de validación acepta el código en minúsculas y rechaza los inventados"""
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        Cliente.objects.create(usuario=usuario)
+        self.client.force_login(usuario)
+        url = reverse('turnos:validar_codigo_promocional')
+
+        datos = self.client.get(url, {'codigo': 'primavera10', 'servicio_id': self.servicio.id}).json()
+        self.assertTrue(datos['valido'])
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get(url, {'codigo': 'ADIVINO', 'servicio_id': self.servicio.id}).json()
+        self.assertEqual(datos['mensaje'], 'Código promocional no válido')
+        self.assertFalse(any(TABLA in consulta['sql'] for consulta in consultas))
+
+    def test_codigo_creado_en_otro_proceso(self):
+        """Un código creado por otro proceso se acepta aunque este tenga el conjunto anterior cargado"""
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        Cliente.objects.create(usuario=usuario)
+        self.client.force_login(usuario)
+        self.assertFalse(PromocionIndiceService.codigo_existe('OTONO15'))
+        # Lo que este proceso tiene en memoria mientras otro crea la promoción
+        viejo = PromocionIndiceService._codigos
+        ahora = timezone.now()
+        nueva = Promocion.objects.create(
+            titulo='Otoño', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('15'),
+            codigo='Otono15', fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=10)
+        )
+
+        PromocionIndiceService._codigos = viejo
+        form = SolicitarTurnoForm({'codigo_promocion': 'otono15', 'direccion_servicio': 'Calle 123'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['codigo_promocion'], nueva)
+
+        PromocionIndiceService._codigos = viejo
+        datos = self.client.get(
+            reverse('turnos:validar_codigo_promocional'), {'codigo': 'otono15', 'servicio_id': self.servicio.id}
+        ).json()
+        self.assertTrue(datos['valido'])
+
+        PromocionIndiceService._codigos = viejo
+        response = APIClient().post(
+            '/api/precios/cotizar/', {'items': [{'servicio_id': self.servicio.id, 'codigo': 'otono15'}]}, format='json'
+        )
+        cotizacion, = response.json()['data']
+        self.assertIsNone(cotizacion['error'])
+        self.assertEqual(cotizacion['promocion']['id'], nueva.id)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+    def test_busqueda_usa_indice(self):
+        """La búsqueda por código normalizado no recorre la tabla"""
+        sql, params = Promocion.objects.filter(codigo_normalizado='PRIMAVERA10').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            detalle = '\n'.join(fila[-1] for fila in cursor.fetchall())
+        self.assertNotIn(f'SCAN {TABLA}', detalle)
+        self.assertIn('codigo_normalizado', detalle)
@@ -0,0 +1,191 @@
+"""
+Tests para la combinación de promociones exclusivas y acumulables.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_combinacion
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+from itertools import combinations
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.promociones.models import Promocion
+from apps.promociones.combinacion_services import CombinacionService
+from apps.promociones.precio_services import PrecioService
+from apps.promociones.services import PromocionService
+
+
+def promo(pk, valor, tipo='porcentaje', modo='acumulable', orden=0):
+    """Promoción sin guardar para los tests del motor"""
+    return Promocion(
+        id=pk, titulo=f'Promo {pk}', tipo_descuento=tipo, valor_descuento=Decimal(str(valor)),
+        modo_acumulacion=modo, orden_aplicacion=orden
+    )
+
+
+class CombinacionServiceTestCase(SimpleTestCase):
+    """Tests para CombinacionService.mejor_combinacion"""
+
+    def _ids(self, resultado):
+        return [p.id for p in resultado['promociones']]
+
+    def test_exclusiva_contra_acumulables(self):
+        """Gana la opción más barata; a igual precio, la exclusiva"""
+        exclusiva = promo(1, 15, modo='exclusiva')
+        diez = promo(2, 10)
+        cincuenta = promo(3, 50, tipo='monto_fijo')
+
+        # 1000 -> 900 -> 850 empata con el 15% exclusivo
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [exclusiva, diez, cincuenta])
+        self.assertEqual(self._ids(resultado), [1])
+        self.assertEqual(resultado['precio_final'], Decimal('850.00'))
+
+        sesenta = promo(3, 60, tipo='monto_fijo')
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [exclusiva, diez, sesenta])
+        self.assertEqual(self._ids(resultado), [2, 3])
+        self.assertEqual(resultado['precio_final'], Decimal('840.00'))
+        self.assertEqual(resultado['descuento'], Decimal('160.00'))
+        self.assertEqual(resultado['principal'].id, 2)
+
+    def test_orden_de_aplicacion(self):
+        """A igual orden, porcentajes antes que montos fijos; orden_aplicacion manda"""
+        fijo, veinte = promo(1, 100, tipo='monto_fijo'), promo(2, 20)
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [fijo, veinte])
+        self.assertEqual(self._ids(resultado), [2, 1])
+        self.assertEqual(resultado['precio_final'], Decimal('700.00'))
+        self.assertEqual(
+            [(paso['precio_antes'], paso['descuento'], paso['precio_despues']) for paso in resultado['desglose']],
+            [('1000.00', '200.00', '800.00'), ('800.00', '100.00', '700.00')]
+        )
+
+        veinte.orden_aplicacion = 1
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [fijo, veinte])
+        self.assertEqual(self._ids(resultado), [1, 2])
+        self.assertEqual(resultado['precio_final'], Decimal('720.00'))
+
+    def test_tope_de_acumuladas(self):
+        """No se acumulan más de MAX_ACUMULADAS promociones"""
+        promociones = [promo(pk, 10 + pk) for pk in range(1, 6)]
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), promociones)
+        self.assertEqual(sorted(self._ids(resultado)), [3, 4, 5])
+        # 1000 * 0.87 * 0.86 * 0.85
+        self.assertEqual(resultado['precio_final'], Decimal('635.97'))
+
+    def test_obligatoria(self):
+        """La promoción del código siempre se incluye; si es exclusiva va sola"""
+        exclusiva = promo(1, 50, modo='exclusiva')
+        cinco, diez = promo(2, 5), promo(3, 10)
+
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [exclusiva, cinco, diez], obligatoria=cinco)
+        self.assertEqual(sorted(self._ids(resultado)), [2, 3])
+
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), [exclusiva, cinco, diez], obligatoria=exclusiva)
+        self.assertEqual(self._ids(resultado), [1])
+
+        # Una copia distinta de la misma promoción (p. ej. leída por código) también cuenta
+        copia = promo(2, 5)
+        promociones = [promo(pk, 20) for pk in range(10, 14)] + [cinco]
+        resultado = CombinacionService.mejor_combinacion(Decimal('1000'), promociones, obligatoria=copia)
+        self.assertIn(2, self._ids(resultado))
+        self.assertEqual(len(resultado['promociones']), CombinacionService.MAX_ACUMULADAS)
+
+    def test_equivale_a_fuerza_bruta(self):
+        """Con decenas de promociones aleatorias, coincide con probar todos los subconjuntos"""
+        generador = random.Random(17)
+        for _ in range(30):
+            promociones = [
+                promo(
+                    pk, generador.choice([5, 10, 15, 25]) if generador.random() < 0.6 else generador.choice([50, 120, 300]),
+                    tipo='porcentaje' if generador.random() < 0.6 else 'monto_fijo',
+                    modo='acumulable' if generador.random() < 0.8 else 'exclusiva',
+                    orden=generador.randint(0, 2)
+                )
+                for pk in range(1, 41)
+            ]
+            # Coherencia del tipo con el valor sorteado
+            for p in promociones:
+                if p.tipo_descuento == 'porcentaje' and p.valor_descuento > 100:
+                    p.tipo_descuento = 'monto_fijo'
+            base = PrecioService.a_centavos(Decimal(generador.randint(500, 5000)))
+
+            acumulables = sorted((p for p in promociones if p.es_acumulable()), key=CombinacionService.clave_aplicacion)
+            mejor = min(
+                [base] +
+                [base - CombinacionService.descuento_centavos(base, p) for p in promociones if not p.es_acumulable()] +
+                [
+                    CombinacionService._aplicar_cadena(base, list(combinacion))
+                    for tamanio in range(1, CombinacionService.MAX_ACUMULADAS + 1)
+                    for combinacion in combinations(acumulables, tamanio)
+                ]
+            )
+            resultado = CombinacionService.mejor_combinacion(PrecioService.desde_centavos(base), promociones)
+            self.assertEqual(PrecioService.a_centavos(resultado['precio_final']), mejor)
+
+
+class TurnoDesgloseTestCase(TestCase):
+    """Tests del desglose persistido en el turno"""
+
+    def setUp(self):
+        ahora = timezone.now()
+        self.categoria = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.servicio = Servicio.objects.create(
+            nombre='Limpieza General', descripcion='General', categoria=self.categoria,
+            precio_base=Decimal('1000.00'), duracion_estimada=60
+        )
+        self.vigencia = {'fecha_inicio': ahora - timedelta(days=1), 'fecha_fin': ahora + timedelta(days=10)}
+        self.veinte = Promocion.objects.create(
+            titulo='20% Limpieza', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('20'),
+            categoria=self.categoria, modo_acumulacion='acumulable', **self.vigencia
+        )
+        self.fijo = Promocion.objects.create(
+            titulo='$100 menos', descripcion='-', tipo_descuento='monto_fijo', valor_descuento=Decimal('100'),
+            modo_acumulacion='acumulable', **self.vigencia
+        )
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario)
+        usuario = Usuario.objects.create_user(
+            username='tecnico', email='tecnico@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Limpieza')
+
+    def test_turno_guarda_desglose(self):
+        """El turno guarda la combinación, su desglose y el precio final"""
+        turno = Turno(
+            cliente=self.cliente, profesional=self.profesional, servicio=self.servicio, fecha=timezone.localdate() + timedelta(days=2),
+            hora=time(10, 0), direccion_servicio='Calle 123'
+        )
+        principal = turno.aplicar_promocion_automatica()
+        turno.save()
+        turno.refresh_from_db()
+
+        self.assertEqual(principal, self.veinte)
+        self.assertEqual(turno.promocion, self.veinte)
+        self.assertEqual(turno.precio_final, Decimal('700.00'))
+        self.assertEqual([paso['promocion_id'] for paso in turno.desglose_promociones], [self.veinte.id, self.fijo.id])
+        self.assertEqual(turno.calcular_descuento(), Decimal('300.00'))
+        self.assertEqual(turno.calcular_precio_final(), Decimal('700.00'))
+
+    def test_acumulables_no_se_solapan(self):
+        """Dos acumulables en la misma categoría y período no son un solapamiento"""
+        datos = {'fecha_inicio': self.vigencia['fecha_inicio'], 'fecha_fin': self.vigencia['fecha_fin']}
+        valido, _ = PromocionService.validar_promociones_solapadas(categoria=self.categoria, acumulable=True, **datos)
+        self.assertTrue(valido)
+        valido, mensaje = PromocionService.validar_promociones_solapadas(categoria=self.categoria, **datos)
+        self.assertFalse(valido)
+        self.assertIn('20% Limpieza', mensaje)
+
+    def test_cotizacion_con_acumulables(self):
+        """La cotización en lote aplica la misma combinación que la reserva"""
+        cotizaciones, errores = PrecioService.cotizar([{'servicio_id': self.servicio.id}])
+        self.assertEqual(errores, [])
+        cotizacion, = cotizaciones
+        self.assertEqual(cotizacion['precio_final'], Decimal('700.00'))
+        self.assertEqual(len(cotizacion['desglose']), 2)
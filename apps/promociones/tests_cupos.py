@@ -0,0 +1,322 @@
+"""
+Tests para los cupos de uso de promociones.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_cupos
+"""
+import threading
+import time as reloj
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, ReservaSlot
+from apps.turnos.expiracion_services import ExpiracionService
+from apps.turnos.reserva_services import ReservaService
+from apps.turnos.transicion_services import TransicionService
+from apps.promociones.models import Promocion, UsoPromocion
+from apps.promociones.cupo_services import CupoService
+
+
+def crear_datos(cantidad_clientes):
+    categoria = Categoria.objects.create(nombre='Plomería', descripcion='Plomería')
+    usuario = Usuario.objects.create_user(
+        username='plomero', email='plomero@test.com', password='Profesional123', rol='profesional'
+    )
+    profesional = Profesional.objects.create(usuario=usuario, especialidades='Plomería')
+    servicio = Servicio.objects.create(
+        categoria=categoria, profesional=profesional, nombre='Destapación', descripcion='Destapación',
+        precio_base=Decimal('5000.00'), duracion_estimada=60
+    )
+    clientes = []
+    for i in range(cantidad_clientes):
+        usuario_cliente = Usuario.objects.create_user(
+            username=f'cliente{i}', email=f'cliente{i}@test.com', password='Cliente123', rol='cliente'
+        )
+        clientes.append(Cliente.objects.create(usuario=usuario_cliente))
+    return categoria, profesional, servicio, clientes
+
+
+def crear_promocion(titulo, categoria, **limites):
+    ahora = timezone.now()
+    return Promocion.objects.create(
+        titulo=titulo, descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+        categoria=categoria, fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=10),
+        **limites
+    )
+
+
+class CupoServiceTestCase(TestCase):
+    """Tests del canje de promociones al confirmar turnos"""
+
+    def setUp(self):
+        self.categoria, self.profesional, self.servicio, self.clientes = crear_datos(3)
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        self.hora = 8
+
+    def _turno(self, cliente, promociones=()):
+        self.hora += 1
+        turno = Turno(
+            cliente=cliente, profesional=self.profesional, servicio=self.servicio, fecha=self.fecha,
+            hora=time(self.hora, 0), direccion_servicio='Calle 123', precio_final=self.servicio.precio_base
+        )
+        turno.promociones_aplicadas = list(promociones)
+        return turno
+
+    def test_limite_total(self):
+        """Con el cupo total agotado el turno no se guarda"""
+        promo = crear_promocion('Dos usos', self.categoria, max_usos=2)
+        resultados = [ReservaService.confirmar_turno(self._turno(cliente, [promo])) for cliente in self.clientes]
+
+        self.assertEqual([exitoso for exitoso, _ in resultados], [True, True, False])
+        self.assertIn('límite de usos', resultados[2][1])
+        promo.refresh_from_db()
+        self.assertEqual(promo.usos, 2)
+        self.assertEqual(Turno.objects.count(), 2)
+
+    def test_limite_por_cliente(self):
+        """Cada cliente tiene su propio cupo"""
+        promo = crear_promocion('Una por cliente', self.categoria, max_usos_por_cliente=1)
+        primero, segundo = self.clientes[:2]
+
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(primero, [promo]))[0])
+        exitoso, mensaje = ReservaService.confirmar_turno(self._turno(primero, [promo]))
+        self.assertFalse(exitoso)
+        self.assertIn('cantidad máxima', mensaje)
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(segundo, [promo]))[0])
+
+        self.assertEqual(
+            dict(UsoPromocion.objects.values_list('cliente_id', 'usos')),
+            {primero.id: 1, segundo.id: 1}
+        )
+        promo.refresh_from_db()
+        self.assertEqual(promo.usos, 2)
+
+    def test_rechazo_revierte_todo(self):
+        """Si una promoción no tiene cupo no se cuentan las demás ni se consume la retención"""
+        libre = crear_promocion('Libre', self.categoria)
+        agotada = crear_promocion('Agotada', self.categoria, max_usos=1)
+        Promocion.objects.filter(pk=agotada.pk).update(usos=1)
+        cliente = self.clientes[0]
+        turno = self._turno(cliente, [libre, agotada])
+        reserva, _ = ReservaService.tomar_reserva(cliente, self.profesional.id, self.servicio, turno.fecha, turno.hora)
+
+        exitoso, _ = ReservaService.confirmar_turno(turno, reserva.id)
+        self.assertFalse(exitoso)
+        libre.refresh_from_db()
+        self.assertEqual(libre.usos, 0)
+        self.assertFalse(Turno.objects.exists())
+        self.assertTrue(ReservaSlot.objects.filter(pk=reserva.pk).exists())
+
+    def test_una_consulta_por_canje(self):
+        """Canjear una promoción con límite total agrega una sola consulta al turno"""
+        promo = crear_promocion('Con cupo', self.categoria, max_usos=100)
+        with CaptureQueriesContext(connection) as sin_promocion:
+            ReservaService.confirmar_turno(self._turno(self.clientes[0]))
+        with CaptureQueriesContext(connection) as con_promocion:
+            ReservaService.confirmar_turno(self._turno(self.clientes[1], [promo]))
+        self.assertEqual(len(con_promocion), len(sin_promocion) + 1)
+
+    def test_consultas_con_limite_por_cliente(self):
+        """El límite por cliente suma una sola sentencia (INSERT ... ON CONFLICT), también en el primer canje"""
+        promo = crear_promocion('Por cliente', self.categoria, max_usos_por_cliente=2)
+        cliente = self.clientes[0]
+        with CaptureQueriesContext(connection) as sin_promocion:
+            ReservaService.confirmar_turno(self._turno(self.clientes[1]))
+        with CaptureQueriesContext(connection) as primero:
+            ReservaService.confirmar_turno(self._turno(cliente, [promo]))
+        with CaptureQueriesContext(connection) as segundo:
+            ReservaService.confirmar_turno(self._turno(cliente, [promo]))
+        self.assertEqual(len(segundo), len(sin_promocion) + 2)
+        self.assertEqual(len(primero), len(sin_promocion) + 2)
+        self.assertEqual(UsoPromocion.objects.get(promocion=promo, cliente=cliente).usos, 2)
+        self.assertFalse(ReservaService.confirmar_turno(self._turno(cliente, [promo]))[0])
+        self.assertEqual(UsoPromocion.objects.get(promocion=promo, cliente=cliente).usos, 2)
+
+    def test_automatica_omite_agotadas(self):
+        """La promoción automática descarta las que el cliente ya no puede usar"""
+        mejor = crear_promocion('Mejor', self.categoria, max_usos_por_cliente=1)
+        Promocion.objects.filter(pk=mejor.pk).update(valor_descuento=Decimal('30'))
+        otra = crear_promocion('Otra', self.categoria)
+        cliente = self.clientes[0]
+        UsoPromocion.objects.create(promocion=mejor, cliente=cliente, usos=1)
+
+        turno = self._turno(cliente)
+        self.assertEqual(turno.aplicar_promocion_automatica(), otra)
+        self.assertEqual(CupoService.disponibles([mejor, otra], self.clientes[1].id), [mejor, otra])
+
+    def test_cupo_leido_de_la_base(self):
+        """Las candidatas salen del índice pero el cupo se lee en una consulta, con los canjes recientes"""
+        promo = crear_promocion('Uno', self.categoria, max_usos=1)
+        por_cliente = crear_promocion('Por cliente', self.categoria, max_usos_por_cliente=1)
+        libre = crear_promocion('Libre', self.categoria)
+        cliente = self.clientes[0]
+        with self.assertNumQueries(1):
+            self.assertEqual(CupoService.disponibles([promo, por_cliente, libre], cliente.id), [promo, por_cliente, libre])
+
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(cliente, [promo, por_cliente]))[0])
+        with self.assertNumQueries(1):
+            self.assertEqual(CupoService.disponibles([promo, por_cliente, libre], cliente.id), [libre])
+        with self.assertNumQueries(0):
+            self.assertEqual(CupoService.disponibles([libre], cliente.id), [libre])
+
+    def test_reserva_despues_de_agotar_cupo(self):
+        """Agotado el cupo, las reservas siguientes se guardan sin la promoción"""
+        promo = crear_promocion('Dos usos', self.categoria, max_usos=2)
+        for cliente in self.clientes:
+            turno = self._turno(cliente)
+            self.assertEqual(turno.aplicar_promocion_automatica(), promo if cliente != self.clientes[2] else None)
+            self.assertTrue(ReservaService.confirmar_turno(turno)[0])
+
+        turno = self._turno(self.clientes[0])
+        self.assertIsNone(turno.aplicar_promocion_automatica())
+        self.assertTrue(ReservaService.confirmar_turno(turno)[0])
+        self.assertEqual(self._usos(promo), 2)
+        self.assertEqual(Turno.objects.filter(promocion=promo).count(), 2)
+
+    def test_recotiza_si_se_agota_al_confirmar(self):
+        """Si otra reserva agota la promoción entre la cotización y la confirmación, se cotiza de nuevo sin ella"""
+        promo = crear_promocion('Último uso', self.categoria, max_usos=1)
+        turno = self._turno(self.clientes[0])
+        self.assertEqual(turno.aplicar_promocion_automatica(), promo)
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(self.clientes[1], [promo]))[0])
+
+        exitoso, _ = ReservaService.confirmar_turno(turno)
+        self.assertTrue(exitoso)
+        turno.refresh_from_db()
+        self.assertIsNone(turno.promocion)
+        self.assertEqual(turno.precio_final, self.servicio.precio_base)
+        self.assertEqual(self._usos(promo), 1)
+
+    def test_codigo_agotado_no_se_recotiza(self):
+        """Un código ingresado por el cliente se mantiene: si se agotó, el turno no se guarda"""
+        promo = crear_promocion('Código', self.categoria, max_usos=1)
+        turno = self._turno(self.clientes[0])
+        turno.aplicar_promociones(obligatoria=promo)
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(self.clientes[1], [promo]))[0])
+
+        exitoso, mensaje = ReservaService.confirmar_turno(turno)
+        self.assertFalse(exitoso)
+        self.assertIn('límite de usos', mensaje)
+        self.assertEqual(Turno.objects.count(), 1)
+
+    def _usos(self, promo, cliente=None):
+        promo.refresh_from_db()
+        if cliente is None:
+            return promo.usos
+        return promo.usos, UsoPromocion.objects.get(promocion=promo, cliente=cliente).usos
+
+    def test_cancelar_devuelve_cupo(self):
+        """Cancelar un turno guardándolo devuelve su canje una sola vez"""
+        promo = crear_promocion('Un uso', self.categoria, max_usos=1, max_usos_por_cliente=1)
+        primero, segundo = self.clientes[:2]
+        turno = self._turno(primero, [promo])
+        turno.promocion = promo
+        self.assertTrue(ReservaService.confirmar_turno(turno)[0])
+        self.assertFalse(ReservaService.confirmar_turno(self._turno(segundo, [promo]))[0])
+
+        turno = Turno.objects.get(pk=turno.pk)
+        turno.estado = 'cancelado'
+        turno.save()
+        self.assertEqual(self._usos(promo, primero), (0, 0))
+        turno.save()  # ya estaba cancelado: no se devuelve de nuevo
+        Promocion.objects.filter(pk=promo.pk).update(usos=1)
+        turno.save()
+        self.assertEqual(self._usos(promo), 1)
+
+        Promocion.objects.filter(pk=promo.pk).update(usos=0)
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(segundo, [promo]))[0])
+
+    def test_cancelacion_en_lote_devuelve_cupo(self):
+        """TransicionService devuelve el cupo de todas las promociones del desglose"""
+        promo = crear_promocion('Acumulable A', self.categoria, max_usos=5, max_usos_por_cliente=3)
+        otra = crear_promocion('Acumulable B', self.categoria, max_usos=5)
+        cliente = self.clientes[0]
+        turnos = []
+        for _ in range(2):
+            turno = self._turno(cliente, [promo, otra])
+            turno.promocion = promo
+            turno.desglose_promociones = [{'promocion_id': promo.id}, {'promocion_id': otra.id}]
+            self.assertTrue(ReservaService.confirmar_turno(turno)[0])
+            turnos.append(turno.pk)
+        self.assertEqual((self._usos(promo, cliente), self._usos(otra)), ((2, 2), 2))
+
+        resultados, _ = TransicionService.aplicar_transiciones(self.profesional.usuario, turnos, 'cancelado')
+        self.assertTrue(all(exitoso for exitoso, _ in resultados.values()))
+        self.assertEqual((self._usos(promo, cliente), self._usos(otra)), ((0, 0), 0))
+
+    def test_vencimiento_devuelve_cupo(self):
+        """Los pendientes que vence ExpiracionService devuelven su cupo; un agotado vuelve a ofrecerse"""
+        promo = crear_promocion('Dos usos', self.categoria, max_usos=2)
+        vencido = self._turno(self.clientes[0], [promo])
+        vencido.promocion = promo
+        vencido.fecha = timezone.localdate() - timedelta(days=1)
+        self.assertTrue(ReservaService.confirmar_turno(vencido)[0])
+        self.assertTrue(ReservaService.confirmar_turno(self._turno(self.clientes[1], [promo]))[0])
+        self.assertEqual(self._turno(self.clientes[2]).aplicar_promocion_automatica(), None)
+
+        self.assertEqual(ExpiracionService.expirar_pendientes(), 1)
+        self.assertEqual(self._usos(promo), 1)
+        self.assertEqual(self._turno(self.clientes[2]).aplicar_promocion_automatica(), promo)
+
+    def test_save_no_pisa_usos(self):
+        """Guardar una copia vieja de la promoción conserva los canjes contados"""
+        promo = crear_promocion('Copia', self.categoria, max_usos=10)
+        Promocion.objects.filter(pk=promo.pk).update(usos=4)
+        promo.titulo = 'Copia editada'
+        promo.save()
+        promo.refresh_from_db()
+        self.assertEqual((promo.titulo, promo.usos), ('Copia editada', 4))
+
+
+class CupoConcurrenteTestCase(TransactionTestCase):
+    """Muchos clientes canjean la misma promoción al mismo tiempo"""
+
+    HILOS = 12
+    CUPO = 5
+
+    def setUp(self):
+        self.categoria, self.profesional, self.servicio, self.clientes = crear_datos(self.HILOS)
+        self.promo = crear_promocion('Cupo limitado', self.categoria, max_usos=self.CUPO)
+        self.fecha = timezone.localdate() + timedelta(days=2)
+
+    def test_sin_canjes_de_mas(self):
+        """Solo CUPO turnos se guardan con la promoción"""
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+
+        def ejecutar(numero, cliente):
+            barrera.wait()
+            try:
+                for _ in range(50):
+                    turno = Turno(
+                        cliente=cliente, profesional=self.profesional, servicio=self.servicio, fecha=self.fecha,
+                        hora=time(8 + numero, 0), direccion_servicio='Calle 123', promocion=self.promo,
+                        precio_final=self.servicio.precio_base
+                    )
+                    try:
+                        resultados.append(ReservaService.confirmar_turno(turno)[0])
+                        return
+                    except OperationalError:
+                        # SQLite serializa escrituras; reintentar si la base está ocupada
+                        reloj.sleep(0.01)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=ejecutar, args=par) for par in enumerate(self.clientes)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(len(resultados), self.HILOS)
+        self.assertEqual(resultados.count(True), self.CUPO)
+        self.promo.refresh_from_db()
+        self.assertEqual(self.promo.usos, self.CUPO)
+        self.assertEqual(Turno.objects.filter(promocion=self.promo).count(), self.CUPO)
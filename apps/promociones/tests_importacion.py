@@ -0,0 +1,271 @@
+"""
+Tests para la importación y exportación masiva de promociones.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_importacion
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario
+from apps.servicios.models import Categoria, Servicio
+from apps.promociones.models import Promocion
+from apps.promociones.importacion_services import ImportacionService
+from apps.promociones.indice_services import PromocionIndiceService
+
+
+class ImportacionBaseTestCase(TestCase):
+    """Datos comunes: dos categorías con servicios"""
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.limpieza = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.general = Servicio.objects.create(
+            nombre='General', descripcion='General', categoria=self.limpieza,
+            precio_base=Decimal('1000.00'), duracion_estimada=60
+        )
+        self.vidrios = Servicio.objects.create(
+            nombre='Vidrios', descripcion='Vidrios', categoria=self.limpieza,
+            precio_base=Decimal('500.00'), duracion_estimada=60
+        )
+        self.estufa = Servicio.objects.create(
+            nombre='Estufa', descripcion='Estufa', categoria=self.gas,
+            precio_base=Decimal('3000.00'), duracion_estimada=60
+        )
+
+    def _fila(self, titulo, inicio=0, fin=10, **extra):
+        fila = {
+            'titulo': titulo, 'descripcion': f'{titulo} importada', 'tipo_descuento': 'porcentaje',
+            'valor_descuento': '10', 'fecha_inicio': str(self.hoy + timedelta(days=inicio)),
+            'fecha_fin': str(self.hoy + timedelta(days=fin)),
+        }
+        fila.update(extra)
+        return fila
+
+    def _csv(self, filas):
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=ImportacionService.COLUMNAS)
+        escritor.writeheader()
+        escritor.writerows(filas)
+        return buffer.getvalue().encode('utf-8')
+
+
+class ImportacionServiceTestCase(ImportacionBaseTestCase):
+    """Tests para ImportacionService"""
+
+    def test_importa_validas_y_reporta_errores(self):
+        """Las filas válidas se crean con sus servicios; las inválidas se informan por fila"""
+        Promocion.objects.create(
+            titulo='Existente', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('5'),
+            fecha_inicio=timezone.now() + timedelta(days=100), fecha_fin=timezone.now() + timedelta(days=110),
+            codigo='EXISTE'
+        )
+        contenido = self._csv([
+            self._fila('Servicios', servicios=f'{self.general.id}|{self.vidrios.id}', codigo='serv10'),
+            self._fila('Gas', categoria=self.gas.id, tipo_descuento='monto_fijo', valor_descuento='300',
+                       max_usos='50', modo_acumulacion='acumulable'),
+            self._fila('existente'),
+            self._fila('Fechas', inicio=5, fin=1),
+            self._fila('Porcentaje', valor_descuento='150'),
+            self._fila('Código', codigo='existe'),
+            self._fila('Servicio inexistente', servicios='999'),
+            self._fila('Inactiva', activa='false', fecha_inicio='no es fecha'),
+        ])
+        filas, error = ImportacionService.leer(contenido, 'csv')
+        self.assertEqual(error, '')
+
+        resultado, errores = ImportacionService.importar(filas)
+        self.assertEqual(resultado, {'total': 8, 'validas': 2, 'creadas': 2})
+        self.assertEqual(
+            {e['fila']: sorted(e['errores']) for e in errores},
+            {3: ['titulo'], 4: ['fechas'], 5: ['valor_descuento'], 6: ['codigo'], 7: ['servicios'], 8: ['fecha_inicio']}
+        )
+
+        servicios = Promocion.objects.get(titulo='Servicios')
+        self.assertEqual(set(servicios.servicios.all()), {self.general, self.vidrios})
+        self.assertEqual(servicios.codigo, 'SERV10')
+        self.assertEqual(timezone.localtime(servicios.fecha_fin).hour, 23)
+        gas = Promocion.objects.get(titulo='Gas')
+        self.assertEqual((gas.categoria, gas.max_usos, gas.modo_acumulacion), (self.gas, 50, 'acumulable'))
+        # bulk_create no emite señales: la importación invalida el índice
+        self.assertEqual(
+            sorted(p.titulo for p in PromocionIndiceService.aplicables(self.general)), ['Servicios']
+        )
+
+    def test_solapamientos_y_repetidos_en_el_archivo(self):
+        """Se detectan solapamientos y nombres o códigos repetidos entre filas y contra la base"""
+        Promocion.objects.create(
+            titulo='Vigente', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('5'),
+            categoria=self.gas, fecha_inicio=timezone.now(), fecha_fin=timezone.now() + timedelta(days=5)
+        )
+        filas = [
+            self._fila('Limpieza A', categoria=self.limpieza.id, fin=5),
+            self._fila('Limpieza B', categoria=self.limpieza.id, inicio=5, fin=8),
+            self._fila('Acumulable 1', servicios=str(self.estufa.id), inicio=20, fin=30, modo_acumulacion='acumulable'),
+            self._fila('Acumulable 2', servicios=str(self.estufa.id), inicio=25, fin=35, modo_acumulacion='acumulable'),
+            self._fila('Gas', categoria=self.gas.id, inicio=1, fin=2),
+            self._fila('Gas inactiva', categoria=self.gas.id, inicio=1, fin=2, activa='no'),
+            self._fila('acumulable 1', inicio=50, fin=60, codigo='X1'),
+            self._fila('Otra', inicio=50, fin=60, codigo='x1'),
+        ]
+        validas, errores = ImportacionService.validar(filas)
+
+        self.assertEqual(
+            sorted(datos['titulo'] for datos in validas), ['Acumulable 1', 'Acumulable 2', 'Gas inactiva']
+        )
+        por_fila = {e['fila']: e['errores'] for e in errores}
+        self.assertIn("'Limpieza B' del mismo lote", por_fila[1]['solape'])
+        self.assertIn("'Limpieza A' del mismo lote", por_fila[2]['solape'])
+        self.assertIn("'Vigente'", por_fila[5]['solape'])
+        self.assertIn('repetido', por_fila[7]['titulo'])
+        self.assertIn('repetido', por_fila[8]['codigo'])
+        self.assertEqual(sorted(por_fila), [1, 2, 5, 7, 8])
+
+        # Con los mismos nombres dentro del archivo, la segunda fila es la repetida
+        _, errores = ImportacionService.validar([self._fila('Doble'), self._fila('DOBLE')])
+        self.assertEqual([(e['fila'], list(e['errores'])) for e in errores], [(2, ['titulo'])])
+
+    def test_consultas_independientes_de_la_cantidad(self):
+        """Validar e insertar cuesta las mismas consultas con 10 o con 40 filas"""
+        def consultas(cantidad, prefijo, servicio):
+            filas = [
+                self._fila(f'{prefijo} {numero}', servicios=str(servicio.id), inicio=numero * 3, fin=numero * 3 + 1,
+                           codigo=f'{prefijo}{numero}')
+                for numero in range(cantidad)
+            ]
+            with CaptureQueriesContext(connection) as capturadas:
+                resultado, errores = ImportacionService.importar(filas)
+            self.assertEqual((resultado['creadas'], errores), (cantidad, []))
+            return len(capturadas)
+
+        self.assertEqual(consultas(10, 'A', self.general), consultas(40, 'B', self.vidrios))
+
+    def test_solo_validar(self):
+        """Con guardar=False no se crea nada"""
+        resultado, errores = ImportacionService.importar([self._fila('Prueba')], guardar=False)
+        self.assertEqual((resultado['validas'], resultado['creadas'], errores), (1, 0, []))
+        self.assertFalse(Promocion.objects.exists())
+
+    def test_categoria_con_digitos_no_decimales(self):
+        """Una categoría como '²' (isdigit pero no entero) se informa como error de la fila"""
+        _, errores = ImportacionService.validar([self._fila('Superíndice', categoria='²')])
+        self.assertEqual([(e['fila'], list(e['errores'])) for e in errores], [(1, ['categoria'])])
+
+    def test_formatos_invalidos(self):
+        """Archivos ilegibles devuelven un error general"""
+        self.assertIsNone(ImportacionService.leer(b'nombre,valor\nx,1\n', 'csv')[0])
+        self.assertIsNone(ImportacionService.leer('{"otra": 1}', 'json')[0])
+        self.assertIsNone(ImportacionService.leer('[1, 2]', 'json')[0])
+        self.assertIsNone(ImportacionService.leer(b'\xff\xfe', 'csv')[0])
+        self.assertIsNone(ImportacionService.leer('', 'xml')[0])
+
+    def test_exportacion_se_puede_reimportar(self):
+        """Exportar, borrar e importar reproduce las promociones"""
+        ImportacionService.importar([
+            self._fila('Uno', servicios=f'{self.general.id}|{self.estufa.id}', codigo='UNO', max_usos_por_cliente='2'),
+            self._fila('Dos', categoria=self.gas.id, tipo_descuento='monto_fijo', valor_descuento='99.90', activa='false'),
+        ])
+        campos = ['titulo', 'tipo_descuento', 'valor_descuento', 'categoria_id', 'fecha_inicio', 'fecha_fin',
+                  'codigo', 'max_usos_por_cliente', 'activa']
+        originales = list(Promocion.objects.order_by('titulo').values(*campos))
+
+        for formato in ImportacionService.FORMATOS:
+            with self.subTest(formato=formato):
+                contenido = ''.join(ImportacionService.exportar(formato))
+                Promocion.objects.all().delete()
+                filas, _ = ImportacionService.leer(contenido, formato)
+                resultado, errores = ImportacionService.importar(filas)
+                self.assertEqual((resultado['creadas'], errores), (2, []))
+                self.assertEqual(list(Promocion.objects.order_by('titulo').values(*campos)), originales)
+                self.assertEqual(
+                    set(Promocion.objects.get(titulo='Uno').servicios.all()), {self.general, self.estufa}
+                )
+
+        registros = json.loads(''.join(ImportacionService.exportar('json')))
+        self.assertEqual([r['titulo'] for r in registros], ['Uno', 'Dos'])
+
+    def test_comando(self):
+        """Los comandos importan y exportan archivos"""
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'promociones.json')
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                json.dump({'promociones': [self._fila('Por comando', servicios=[self.vidrios.id]), self._fila('')]}, archivo)
+
+            salida, errores = io.StringIO(), io.StringIO()
+            call_command('importar_promociones', ruta, stdout=salida, stderr=errores)
+            self.assertIn('creadas: 1', salida.getvalue())
+            self.assertIn('Fila 2', errores.getvalue())
+            self.assertEqual(list(Promocion.objects.get(titulo='Por comando').servicios.all()), [self.vidrios])
+
+            exportado = os.path.join(directorio, 'exportado.csv')
+            call_command('exportar_promociones', salida=exportado)
+            with open(exportado, encoding='utf-8') as archivo:
+                self.assertEqual([fila['titulo'] for fila in csv.DictReader(archivo)], ['Por comando'])
+
+
+class ImportacionAPITestCase(ImportacionBaseTestCase):
+    """Tests para /api/promociones/importar/ y /api/promociones/exportar/"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.admin = Usuario.objects.create_user(
+            username='admin_test', email='admin@test.com', password='admin123', rol='administrador'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def _subir(self, filas, **extra):
+        archivo = SimpleUploadedFile('promociones.csv', self._csv(filas), content_type='text/csv')
+        return self.client.post('/api/promociones/importar/', {'archivo': archivo, **extra}, format='multipart')
+
+    def test_importar(self):
+        """Crea las válidas (201) e informa los errores por fila"""
+        response = self._subir([self._fila('Nueva'), self._fila('Mala', valor_descuento='abc')])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.data['success'])
+        self.assertEqual(response.data['data']['creadas'], 1)
+        self.assertEqual(response.data['errors'][0]['fila'], 2)
+
+        response = self._subir([self._fila('Nueva')])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self._subir([self._fila('Otra')], solo_validar='true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['success'])
+        self.assertFalse(Promocion.objects.filter(titulo='Otra').exists())
+
+    def test_exportar(self):
+        """La exportación es un archivo descargable por streaming"""
+        self._subir([self._fila('Nueva', servicios=str(self.general.id))])
+        response = self.client.get('/api/promociones/exportar/', {'formato': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('promociones.json', response['Content-Disposition'])
+        registros = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(registros[0]['servicios'], [self.general.id])
+
+        self.assertEqual(
+            self.client.get('/api/promociones/exportar/', {'formato': 'xml'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_requiere_administrador(self):
+        """Solo un administrador puede importar o exportar"""
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self._subir([self._fila('Nueva')]).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get('/api/promociones/exportar/').status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,255 @@
+"""
+Tests para el índice compilado de promociones aplicables.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_indice
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+import random
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.servicios.models import Categoria, Servicio
+from apps.promociones.models import Promocion, VersionIndicePromociones
+from apps.promociones.indice_services import LineaTiempo, PromocionIndiceService
+from apps.promociones.services import PromocionService
+
+
+@contextmanager
+def en_request():
+    """Como un request: la versión del índice se lee una sola vez"""
+    PromocionIndiceService.iniciar_request()
+    try:
+        yield
+    finally:
+        PromocionIndiceService.finalizar_request()
+
+
+class PromocionIndiceTestCase(TestCase):
+    """Tests para PromocionIndiceService"""
+
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.limpieza = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.general = Servicio.objects.create(
+            nombre='Limpieza General', descripcion='General', categoria=self.limpieza,
+            precio_base=Decimal('1000.00'), duracion_estimada=60
+        )
+        self.profunda = Servicio.objects.create(
+            nombre='Limpieza Profunda', descripcion='Profunda', categoria=self.limpieza,
+            precio_base=Decimal('2000.00'), duracion_estimada=120
+        )
+        self.estufa = Servicio.objects.create(
+            nombre='Revisión de estufa', descripcion='Estufa', categoria=self.gas,
+            precio_base=Decimal('3000.00'), duracion_estimada=60
+        )
+
+    def _promo(self, titulo, inicio=-1, fin=10, categoria=None, servicios=(), activa=True):
+        promo = Promocion.objects.create(
+            titulo=titulo, descripcion=titulo, tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            categoria=categoria, activa=activa,
+            fecha_inicio=self.ahora + timedelta(days=inicio), fecha_fin=self.ahora + timedelta(days=fin)
+        )
+        if servicios:
+            promo.servicios.set(servicios)
+        return promo
+
+    def _titulos(self, servicio, momento=None):
+        return sorted(p.titulo for p in PromocionIndiceService.aplicables(servicio, momento))
+
+    def test_reglas_de_aplicacion(self):
+        """Servicios, categoría y globales se resuelven igual que aplica_a_servicio"""
+        self._promo('Global')
+        self._promo('Limpieza', categoria=self.limpieza)
+        # Con servicios, la categoría se ignora
+        self._promo('Solo profunda', categoria=self.gas, servicios=[self.profunda])
+        self._promo('Inactiva', activa=False)
+        self._promo('Futura', inicio=2)
+        self._promo('Vencida', inicio=-5, fin=-1)
+
+        self.assertEqual(self._titulos(self.general), ['Global', 'Limpieza'])
+        self.assertEqual(self._titulos(self.profunda), ['Global', 'Limpieza', 'Solo profunda'])
+        self.assertEqual(self._titulos(self.estufa), ['Global'])
+        self.assertEqual(self._titulos(self.general, self.ahora + timedelta(days=3)), ['Futura', 'Global', 'Limpieza'])
+
+    def test_equivale_a_aplica_a_servicio(self):
+        """Sobre promociones aleatorias, el índice coincide con el recorrido original"""
+        generador = random.Random(11)
+        servicios = [self.general, self.profunda, self.estufa]
+        for numero in range(40):
+            inicio = generador.randint(-10, 5)
+            alcance = generador.choice(['global', 'categoria', 'servicios'])
+            self._promo(
+                f'Promo {numero}', inicio=inicio, fin=inicio + generador.randint(0, 10),
+                categoria=generador.choice([self.limpieza, self.gas]) if alcance != 'global' else None,
+                servicios=generador.sample(servicios, 2) if alcance == 'servicios' else (),
+                activa=generador.random() > 0.2
+            )
+
+        for servicio in servicios:
+            esperadas = sorted(p.titulo for p in Promocion.objects.all() if p.aplica_a_servicio(servicio))
+            self.assertEqual(self._titulos(servicio), esperadas)
+
+    def test_sin_consultas_con_indice_vigente(self):
+        """Con el índice compilado, la búsqueda solo lee la versión, una vez por request"""
+        self._promo('Global')
+        self._promo('Limpieza', categoria=self.limpieza)
+        PromocionIndiceService.aplicables(self.general)
+        with CaptureQueriesContext(connection) as consultas:
+            PromocionIndiceService.aplicables(self.general)
+            PromocionIndiceService.aplicables(self.estufa)
+        self.assertEqual(len(consultas), 2)
+        self.assertFalse(any(Promocion._meta.db_table in consulta['sql'] for consulta in consultas))
+
+        with en_request():
+            PromocionIndiceService.aplicables(self.general)
+            with self.assertNumQueries(0):
+                PromocionIndiceService.aplicables(self.general)
+                PromocionIndiceService.aplicables(self.estufa)
+
+    def test_construccion_en_dos_consultas(self):
+        """Reconstruir el índice cuesta una consulta más el prefetch de servicios (y leer la versión)"""
+        for numero in range(10):
+            self._promo(f'Promo {numero}', servicios=[self.general])
+        with self.assertNumQueries(3):
+            PromocionIndiceService.aplicables(self.general)
+
+    def test_cambio_en_otro_proceso(self):
+        """Un índice armado antes de una escritura hecha por otro proceso se reconstruye"""
+        self._promo('Global')
+        with en_request():
+            self.assertEqual(self._titulos(self.general), ['Global'])
+            # Lo que otro proceso tiene en memoria: el índice viejo con su versión
+            viejo = PromocionIndiceService._indice
+            self._promo('Limpieza', categoria=self.limpieza)
+            PromocionIndiceService._indice = viejo
+            PromocionIndiceService.iniciar_request()  # request siguiente en ese proceso
+            self.assertEqual(self._titulos(self.general), ['Global', 'Limpieza'])
+
+        version = VersionIndicePromociones.objects.get(pk=1).version
+        self.assertEqual(PromocionIndiceService._indice[0], version)
+        PromocionIndiceService.invalidar()
+        self.assertNotEqual(VersionIndicePromociones.objects.get(pk=1).version, version)
+
+    def test_invalidacion(self):
+        """Modificar la promoción o sus servicios invalida el índice"""
+        promo = self._promo('Limpieza', categoria=self.limpieza)
+        self.assertEqual(self._titulos(self.general), ['Limpieza'])
+
+        promo.servicios.add(self.profunda)
+        self.assertEqual(self._titulos(self.general), [])
+
+        PromocionService.eliminar_promocion(promo)
+        self.assertEqual(self._titulos(self.profunda), [])
+
+
+class LineaTiempoTestCase(SimpleTestCase):
+    """Tests para LineaTiempo sin base de datos"""
+
+    def _promociones(self, cantidad, semilla=7):
+        generador = random.Random(semilla)
+        ahora = timezone.now()
+        promociones = []
+        for numero in range(cantidad):
+            inicio = ahora + timedelta(hours=generador.randint(-100, 100))
+            promociones.append(SimpleNamespace(
+                id=numero + 1, fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=generador.randint(0, 48))
+            ))
+        return ahora, promociones
+
+    def test_cursor_en_cualquier_orden(self):
+        """Consultas hacia adelante, hacia atrás y salteadas coinciden con el filtro directo"""
+        ahora, promociones = self._promociones(300)
+        linea = LineaTiempo(promociones)
+        generador = random.Random(11)
+        momentos = [ahora + timedelta(minutes=generador.randint(-7000, 7000)) for _ in range(200)]
+        momentos += [promo.fecha_fin for promo in promociones[:20]] + [promo.fecha_inicio for promo in promociones[:20]]
+        for momento in momentos:
+            esperadas = tuple(p.id for p in promociones if p.fecha_inicio <= momento <= p.fecha_fin)
+            self.assertEqual(linea.en(momento), esperadas)
+            self.assertEqual(linea.tramo(momento)[2], esperadas)
+
+    def test_memoria_lineal(self):
+        """Se guardan dos cambios por promoción, no un conjunto por tramo"""
+        _, promociones = self._promociones(10000)
+        linea = LineaTiempo(promociones)
+        self.assertEqual(sum(len(altas) + len(bajas) for altas, bajas in linea.cambios), 20000)
+
+
+class VigenciaTestCase(TestCase):
+    """Tests para la línea de tiempo de promociones vigentes"""
+
+    def setUp(self):
+        self.ahora = timezone.now()
+
+    def _promo(self, titulo, inicio=-1, fin=10, activa=True):
+        return Promocion.objects.create(
+            titulo=titulo, descripcion=titulo, tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            activa=activa, fecha_inicio=self.ahora + timedelta(hours=inicio), fecha_fin=self.ahora + timedelta(hours=fin)
+        )
+
+    def test_equivale_al_filtro(self):
+        """En cualquier momento posterior, coincide con filtrar por activa y fechas"""
+        generador = random.Random(3)
+        for numero in range(40):
+            inicio = generador.randint(-10, 10)
+            self._promo(f'Promo {numero}', inicio=inicio, fin=inicio + generador.randint(0, 12),
+                        activa=generador.random() > 0.2)
+
+        for horas in range(1, 30):
+            momento = self.ahora + timedelta(hours=horas, minutes=generador.randint(0, 59))
+            esperadas = list(Promocion.objects.filter(
+                activa=True, fecha_inicio__lte=momento, fecha_fin__gte=momento
+            ).values_list('id', flat=True))
+            self.assertEqual([promo.id for promo in PromocionIndiceService.vigentes(momento)], esperadas)
+
+    def test_fronteras(self):
+        """El conjunto cambia justo al empezar y un microsegundo después de fecha_fin"""
+        actual = self._promo('Actual', inicio=-1, fin=2)
+        futura = self._promo('Futura', inicio=1, fin=5)
+        uno = self.ahora + timedelta(hours=1)
+        fin_actual = actual.fecha_fin + timedelta(microseconds=1)
+
+        self.assertEqual(PromocionIndiceService.vigentes_ids(self.ahora), [actual.id])
+        self.assertEqual(PromocionIndiceService.proximo_cambio(self.ahora), uno)
+        self.assertEqual(PromocionIndiceService.segundos_hasta_cambio(self.ahora), 3600)
+        self.assertEqual(PromocionIndiceService.vigentes_ids(uno), [futura.id, actual.id])
+        self.assertEqual(PromocionIndiceService.vigentes_ids(actual.fecha_fin), [futura.id, actual.id])
+        self.assertEqual(PromocionIndiceService.vigentes_ids(fin_actual), [futura.id])
+        self.assertIsNone(PromocionIndiceService.proximo_cambio(futura.fecha_fin + timedelta(days=1)))
+        self.assertIsNone(PromocionIndiceService.segundos_hasta_cambio(futura.fecha_fin + timedelta(days=1)))
+
+    def test_sin_consultas_entre_fronteras(self):
+        """Entre fronteras se sirve el tramo en memoria; una escritura lo renueva"""
+        self._promo('Actual', inicio=-1, fin=2)
+        with en_request():
+            PromocionIndiceService.vigentes(self.ahora)
+            with self.assertNumQueries(0):
+                for minutos in range(0, 120, 7):
+                    PromocionIndiceService.vigentes(self.ahora + timedelta(minutes=minutos))
+
+            nueva = self._promo('Nueva', inicio=-1, fin=1)
+            self.assertIn(nueva.id, PromocionIndiceService.vigentes_ids(self.ahora))
+
+    def test_endpoint_vigentes_cacheado(self):
+        """El endpoint público responde desde cache hasta el próximo cambio"""
+        client = APIClient()
+        self._promo('Actual')
+        self._promo('Inactiva', activa=False)
+
+        response = client.get('/api/promociones/vigentes/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['data'][0]['titulo'], 'Actual')
+        with self.assertNumQueries(1):  # solo la versión del índice
+            self.assertEqual(client.get('/api/promociones/vigentes/').data['count'], 1)
+
+        self._promo('Otra')
+        self.assertEqual(client.get('/api/promociones/vigentes/').data['count'], 2)
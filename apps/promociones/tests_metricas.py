@@ -0,0 +1,258 @@
+"""
+Tests para las métricas de efectividad de promociones.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_metricas
+"""
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.turnos.expiracion_services import ExpiracionService
+from apps.turnos.transicion_services import TransicionService
+from apps.promociones.models import MetricaPromocion, Promocion
+from apps.promociones.metrica_services import MetricaService
+
+
+class MetricasBaseTestCase(TestCase):
+    """Datos comunes: un servicio de $1000 y una promoción del 10% vigente"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario)
+        usuario = Usuario.objects.create_user(
+            username='tecnico', email='tecnico@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Limpieza')
+        categoria = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.servicio = Servicio.objects.create(
+            nombre='General', descripcion='General', categoria=categoria, profesional=self.profesional,
+            precio_base=Decimal('1000.00'), duracion_estimada=60
+        )
+        self.otro = Servicio.objects.create(
+            nombre='Vidrios', descripcion='Vidrios', categoria=categoria, profesional=self.profesional,
+            precio_base=Decimal('500.00'), duracion_estimada=60
+        )
+        ahora = timezone.now()
+        self.promocion = self._promo('Verano', ahora - timedelta(weeks=2), ahora + timedelta(weeks=2))
+        self.otra = self._promo('Invierno', ahora - timedelta(weeks=2), ahora + timedelta(weeks=2), self.otro)
+
+    def _promo(self, titulo, inicio, fin, servicio=None):
+        promocion = Promocion.objects.create(
+            titulo=titulo, descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            fecha_inicio=inicio, fecha_fin=fin
+        )
+        promocion.servicios.add(servicio or self.servicio)
+        return promocion
+
+    def _turno(self, promocion=None, estado='pendiente', precio='900.00', dia=1, servicio=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Turno.objects.create(
+                cliente=self.cliente, profesional=self.profesional, servicio=servicio or self.servicio,
+                promocion=promocion, fecha=date.today() + timedelta(days=dia), hora=time(9 + dia % 8, 0),
+                direccion_servicio='Calle 123', precio_final=Decimal(precio), estado=estado
+            )
+
+    def _guardar(self, turno):
+        """Guarda y ejecuta la actualización de métricas programada para el commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.save()
+
+    def _metrica(self, promocion=None):
+        return MetricaService.resumen(promocion or self.promocion)
+
+    def _contadores(self, promocion=None):
+        metrica = self._metrica(promocion)
+        return (
+            metrica['turnos'], metrica['turnos_completados'], metrica['turnos_cancelados'],
+            metrica['descuento_otorgado'], metrica['ingresos']
+        )
+
+
+class MetricaIncrementalTestCase(MetricasBaseTestCase):
+    """Tests de la actualización incremental"""
+
+    def test_transiciones_de_estado(self):
+        """Completar suma descuento e ingresos; cancelar un completado los resta"""
+        turno = self._turno(self.promocion)
+        self.assertEqual(self._contadores(), (1, 0, 0, Decimal('0'), Decimal('0')))
+
+        turno.estado = 'completado'
+        self._guardar(turno)
+        self.assertEqual(self._contadores(), (1, 1, 0, Decimal('100.00'), Decimal('900.00')))
+
+        # Hasta el commit no cambia nada
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.estado = 'en_curso'
+            turno.save()
+            self.assertEqual(self._contadores()[:2], (1, 1))
+        self.assertEqual(self._contadores()[:2], (1, 0))
+        turno.estado = 'completado'
+        self._guardar(turno)
+
+        # Guardar sin cambios no vuelve a sumar
+        self._guardar(turno)
+        self._guardar(Turno.objects.get(id=turno.id))
+        self.assertEqual(self._contadores(), (1, 1, 0, Decimal('100.00'), Decimal('900.00')))
+
+        turno.estado = 'cancelado'
+        self._guardar(turno)
+        self.assertEqual(self._contadores(), (1, 0, 1, Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual(self._metrica()['canjes'], 0)
+        self.assertEqual(self._metrica()['tasa_cancelacion'], Decimal('100.00'))
+
+    def test_usa_el_desglose(self):
+        """Con desglose se cuenta solo el paso de la promoción"""
+        turno = self._turno(self.promocion, estado='completado', precio='850.00')
+        turno.desglose_promociones = [
+            {'promocion_id': self.promocion.id, 'descuento': '100.00'},
+            {'promocion_id': self.otra.id, 'descuento': '50.00'},
+        ]
+        self._guardar(turno)
+        self.assertEqual(self._contadores(), (1, 1, 0, Decimal('100.00'), Decimal('850.00')))
+
+    def test_cambio_de_promocion_y_baja(self):
+        """Pasar el turno a otra promoción mueve su aporte; eliminarlo lo resta"""
+        turno = self._turno(self.promocion, estado='completado')
+        turno.promocion = self.otra
+        self._guardar(turno)
+        self.assertEqual(self._contadores(), (0, 0, 0, Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual(self._contadores(self.otra), (1, 1, 0, Decimal('100.00'), Decimal('900.00')))
+
+        turno.promocion = None
+        self._guardar(turno)
+        self.assertEqual(self._contadores(self.otra)[0], 0)
+
+        turno = self._turno(self.otra, estado='completado', dia=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Turno.objects.get(id=turno.id).delete()
+        self.assertEqual(self._contadores(self.otra), (0, 0, 0, Decimal('0.00'), Decimal('0.00')))
+
+    def test_vencimiento_de_pendientes(self):
+        """Los pendientes que vence ExpiracionService cuentan como cancelados"""
+        self._turno(self.promocion, dia=-3)
+        self._turno(self.promocion, dia=-2)
+        self._turno(None, dia=-1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExpiracionService.expirar_pendientes()
+        self.assertEqual(self._contadores()[:3], (2, 0, 2))
+
+    def test_transiciones_en_lote(self):
+        """Completar y cancelar con TransicionService ajusta las métricas como un guardado"""
+        completar = self._turno(self.promocion, estado='confirmado', dia=1)
+        cancelar = self._turno(self.promocion, estado='en_curso', dia=2)
+        sin_promocion = self._turno(None, estado='confirmado', dia=3)
+        self.assertEqual(self._contadores(), (2, 0, 0, Decimal('0'), Decimal('0')))
+
+        usuario = self.profesional.usuario
+        with self.captureOnCommitCallbacks(execute=True):
+            resultados, errores = TransicionService.aplicar_transiciones(usuario, [completar.id], 'completado')
+            self.assertEqual(self._contadores()[:2], (2, 0))
+        self.assertEqual((resultados[completar.id], errores), ((True, ''), []))
+        self.assertEqual(self._contadores(), (2, 1, 0, Decimal('100.00'), Decimal('900.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultados, _ = TransicionService.aplicar_transiciones(
+                usuario, [completar.id, cancelar.id, sin_promocion.id], 'cancelado'
+            )
+        self.assertFalse(resultados[completar.id][0])  # completado -> cancelado no se permite
+        self.assertEqual(self._contadores(), (2, 1, 1, Decimal('100.00'), Decimal('900.00')))
+        self.assertEqual(self._metrica()['canjes'], 1)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        """La reconstrucción desde cero da los mismos valores"""
+        for dia, (estado, precio) in enumerate([
+            ('completado', '900.00'), ('completado', '800.00'), ('cancelado', '900.00'), ('confirmado', '900.00')
+        ]):
+            self._turno(self.promocion, estado=estado, precio=precio, dia=dia)
+        self._turno(self.otra, estado='completado', precio='450.00', servicio=self.otro, dia=5)
+        Turno.objects.filter(estado='confirmado').update(estado='pendiente')  # sin señales: desvío
+        incremental = [self._metrica(), self._metrica(self.otra)]
+
+        self.assertEqual(MetricaService.reconstruir(), 2)
+        reconstruidas = [self._metrica(), self._metrica(self.otra)]
+        for antes, despues in zip(incremental, reconstruidas):
+            antes.pop('fecha_actualizacion'), despues.pop('fecha_actualizacion')
+            antes.pop('semanas_vigente'), despues.pop('semanas_vigente')
+            self.assertEqual(antes, despues)
+        self.assertEqual(self._contadores(), (4, 2, 1, Decimal('300.00'), Decimal('1700.00')))
+
+        MetricaPromocion.objects.update(turnos=99)
+        call_command('reconstruir_metricas_promociones', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self._metrica()['turnos'], 4)
+
+
+class UpliftTestCase(MetricasBaseTestCase):
+    """Tests de la demanda comparada con las semanas previas"""
+
+    def test_uplift(self):
+        """8 solicitudes en 4 semanas previas (2/sem) contra 6 en 2 semanas (3/sem): +50%"""
+        inicio = self.promocion.fecha_inicio
+        turnos = [self._turno(dia=numero) for numero in range(8)]
+        for numero, turno in enumerate(turnos):
+            Turno.objects.filter(id=turno.id).update(fecha_solicitud=inicio - timedelta(days=2 + numero * 3))
+        # La fila se creó con la primera solicitud, cuando la base aún no estaba cargada
+        MetricaPromocion.objects.all().delete()
+
+        for numero in range(6):
+            self._turno(dia=10 + numero)
+        self._turno(servicio=self.otro, dia=20)  # fuera del alcance
+
+        metrica = MetricaService.resumen(self.promocion, ahora=inicio + timedelta(weeks=2))
+        self.assertEqual((metrica['turnos_periodo'], metrica['turnos_base']), (6, 8))
+        self.assertEqual(metrica['uplift'], Decimal('50.00'))
+        self.assertEqual(self._metrica(self.otra)['turnos_periodo'], 1)
+
+    def test_sin_base(self):
+        """Sin turnos previos no hay uplift"""
+        self._turno()
+        metrica = self._metrica()
+        self.assertEqual((metrica['turnos_periodo'], metrica['turnos_base']), (1, 0))
+        self.assertIsNone(metrica['uplift'])
+
+
+class PromocionMetricasAPITestCase(MetricasBaseTestCase):
+    """Tests para GET /api/promociones/:id/metricas/"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = f'/api/promociones/{self.promocion.id}/metricas/'
+        self.admin = Usuario.objects.create_user(
+            username='admin_test', email='admin@test.com', password='admin123', rol='administrador'
+        )
+
+    def test_requiere_administrador(self):
+        """Solo un administrador puede ver las métricas"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=self.cliente.usuario)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lee_sin_consultar_turnos(self):
+        """Promoción y fila de métricas: ninguna consulta a turnos"""
+        for dia in range(5):
+            self._turno(self.promocion, estado='completado', dia=dia)
+        self.client.force_authenticate(user=self.admin)
+        self.client.get(self.url)  # sesión y usuario en caché de la prueba
+
+        with self.assertNumQueries(2) as consultas:
+            response = self.client.get(self.url)
+        self.assertFalse(any('turnos_turno' in consulta['sql'] for consulta in consultas.captured_queries))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual((data['canjes'], data['descuento_otorgado'], data['ingresos']), (5, '500.00', '4500.00'))
+
+    def test_promocion_inexistente(self):
+        """Una promoción inexistente devuelve 404"""
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get('/api/promociones/9999/metricas/').status_code, status.HTTP_404_NOT_FOUND)
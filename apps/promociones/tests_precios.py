@@ -0,0 +1,132 @@
+"""
+Tests para la cotización de precios en lote.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_precios
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.servicios.models import Categoria, Servicio
+from apps.promociones.models import Promocion
+from apps.promociones.precio_services import PrecioService
+
+URL = '/api/precios/cotizar/'
+
+
+class DescuentosCentavosTestCase(SimpleTestCase):
+    """Tests del cálculo vectorizado en centavos"""
+
+    def test_porcentaje_y_monto_fijo(self):
+        """Redondeo al centavo y tope en el precio base"""
+        descuentos = PrecioService.descuentos_centavos(
+            np.array([99999, 100000, 50000]),
+            np.array([True, True, False]),
+            np.array([1500, 1250, 80000]),
+        )
+        # 999,99 * 15% = 149,9985 -> 150,00; 1000 * 12,5% = 125; fijo de 800 sobre 500 -> 500
+        self.assertEqual(descuentos.tolist(), [15000, 12500, 50000])
+
+    def test_conversion_decimal(self):
+        """Ida y vuelta entre Decimal y centavos"""
+        self.assertEqual(PrecioService.a_centavos(Decimal('1234.56')), 123456)
+        self.assertEqual(PrecioService.desde_centavos(123456), Decimal('1234.56'))
+
+
+class CotizarPreciosAPITestCase(TestCase):
+    """Tests para POST /api/precios/cotizar/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        ahora = timezone.now()
+        self.limpieza = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.general = Servicio.objects.create(
+            nombre='Limpieza General', descripcion='General', categoria=self.limpieza,
+            precio_base=Decimal('1000.00'), duracion_estimada=60
+        )
+        self.estufa = Servicio.objects.create(
+            nombre='Revisión de estufa', descripcion='Estufa', categoria=self.gas,
+            precio_base=Decimal('3000.00'), duracion_estimada=60
+        )
+        vigencia = {'fecha_inicio': ahora - timedelta(days=1), 'fecha_fin': ahora + timedelta(days=10)}
+        self.diez = Promocion.objects.create(
+            titulo='10% Limpieza', descripcion='-', tipo_descuento='porcentaje',
+            valor_descuento=Decimal('10'), categoria=self.limpieza, **vigencia
+        )
+        self.fijo = Promocion.objects.create(
+            titulo='$200 menos', descripcion='-', tipo_descuento='monto_fijo',
+            valor_descuento=Decimal('200'), categoria=self.limpieza, codigo='Ahorro200', **vigencia
+        )
+        self.vencida = Promocion.objects.create(
+            titulo='Vencida', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('50'),
+            codigo='VIEJA', fecha_inicio=ahora - timedelta(days=10), fecha_fin=ahora - timedelta(days=1)
+        )
+
+    def _cotizar(self, items):
+        response = self.client.post(URL, {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_mejor_promocion(self):
+        """Sin código se aplica la de mayor descuento; sin promociones, el precio base"""
+        general, estufa = self._cotizar([{'servicio_id': self.general.id}, {'servicio_id': self.estufa.id}])
+        self.assertEqual(general['promocion']['id'], self.fijo.id)
+        self.assertEqual((general['precio_base'], general['descuento'], general['precio_final']),
+                         ('1000.00', '200.00', '800.00'))
+        self.assertIsNone(estufa['promocion'])
+        self.assertEqual(estufa['precio_final'], '3000.00')
+
+    def test_codigo(self):
+        """Un código válido fuerza su promoción; uno inválido se informa y se cotiza igual"""
+        self.fijo.codigo = 'DIEZ'
+        self.fijo.save()
+        self.diez.codigo = 'MENOS'
+        self.diez.save()
+        valido, vencido, otro_servicio, inexistente = self._cotizar([
+            {'servicio_id': self.general.id, 'codigo': 'menos'},
+            {'servicio_id': self.general.id, 'codigo': 'VIEJA'},
+            {'servicio_id': self.estufa.id, 'codigo': 'DIEZ'},
+            {'servicio_id': self.general.id, 'codigo': 'NOEXISTE'},
+        ])
+        self.assertEqual(valido['promocion']['id'], self.diez.id)
+        self.assertEqual(valido['precio_final'], '900.00')
+        self.assertIsNone(valido['error'])
+        self.assertIn('expirado', vencido['error'])
+        self.assertEqual(vencido['promocion']['id'], self.fijo.id)
+        self.assertIn('no aplica', otro_servicio['error'])
+        self.assertEqual(inexistente['error'], 'Código promocional no válido')
+
+    def test_servicio_inexistente(self):
+        """Un servicio que no existe se informa en su ítem sin cortar la cotización"""
+        cotizacion, = self._cotizar([{'servicio_id': 999999}])
+        self.assertEqual(cotizacion['error'], 'Servicio no encontrado')
+
+    def test_catalogo_con_consultas_fijas(self):
+        """100 servicios se cotizan con la misma cantidad de consultas que 2"""
+        servicios = [
+            Servicio(nombre=f'Servicio {n}', descripcion='-', categoria=self.limpieza,
+                     precio_base=Decimal('100.00') + n, duracion_estimada=60)
+            for n in range(100)
+        ]
+        Servicio.objects.bulk_create(servicios)
+        ids = list(Servicio.objects.values_list('id', flat=True))
+        # Compila el índice y el conjunto de códigos antes de medir
+        self._cotizar([{'servicio_id': self.general.id, 'codigo': 'AHORRO200'}])
+
+        with self.assertNumQueries(3):  # servicios, versión del índice y promoción del código
+            datos = self._cotizar([{'servicio_id': pk, 'codigo': 'AHORRO200'} for pk in ids])
+        self.assertEqual(len(datos), len(ids))
+        self.assertTrue(all(d['error'] is None for d in datos if d['servicio_id'] != self.estufa.id))
+
+    def test_validacion(self):
+        """Lista vacía o de más de MAX_ITEMS servicios"""
+        response = self.client.post(URL, {'items': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(URL, {'items': [{'servicio_id': 1}] * 201}, format='json')
+        self.assertEqual(response.status_code, 400)
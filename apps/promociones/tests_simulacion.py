@@ -0,0 +1,243 @@
+"""
+Tests para el simulador de impacto de promociones sobre turnos históricos.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_simulacion
+"""
+from datetime import date, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from unittest import mock
+import random
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.promociones.models import Promocion
+from apps.promociones.simulacion_services import SimulacionService
+
+CENTAVO = Decimal('0.01')
+
+
+class SimulacionServiceTestCase(TestCase):
+    """Tests para SimulacionService.simular"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario)
+        usuario = Usuario.objects.create_user(
+            username='tecnico', email='tecnico@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Varios')
+        self.limpieza = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.general = self._servicio('General', self.limpieza, '1000.00')
+        self.vidrios = self._servicio('Vidrios', self.limpieza, '333.33')
+        self.estufa = self._servicio('Estufa', self.gas, '3000.00')
+        ahora = timezone.now()
+        self.exclusiva = self._promo('Exclusiva', 'exclusiva', ahora)
+        self.acumulable = self._promo('Acumulable', 'acumulable', ahora)
+        self.desde = date(2025, 3, 1)
+        self.hasta = date(2025, 3, 31)
+
+    def _servicio(self, nombre, categoria, precio):
+        return Servicio.objects.create(
+            nombre=nombre, descripcion=nombre, categoria=categoria, profesional=self.profesional,
+            precio_base=Decimal(precio), duracion_estimada=60
+        )
+
+    def _promo(self, titulo, modo, ahora):
+        return Promocion.objects.create(
+            titulo=titulo, descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            fecha_inicio=ahora - timedelta(days=400), fecha_fin=ahora - timedelta(days=200),
+            modo_acumulacion=modo, activa=False
+        )
+
+    def _turnos(self, cantidad, semilla=1):
+        """Turnos al azar (estado, servicio, promoción y precio) dentro y fuera del período"""
+        generador = random.Random(semilla)
+        turnos = []
+        for numero in range(cantidad):
+            servicio = generador.choice([self.general, self.vidrios, self.estufa])
+            promocion = generador.choice([None, None, self.exclusiva, self.acumulable])
+            precio = servicio.precio_base
+            if promocion:
+                precio -= (precio * Decimal(generador.choice([5, 10, 30])) / 100).quantize(CENTAVO)
+            turnos.append(Turno(
+                cliente=self.cliente, profesional=self.profesional, servicio=servicio, promocion=promocion,
+                fecha=self.desde + timedelta(days=generador.randint(-5, 35)), hora=time(numero % 24, 0),
+                direccion_servicio='Calle 123', precio_final=precio,
+                estado=generador.choice(['completado', 'completado', 'completado', 'cancelado']),
+            ))
+        return Turno.objects.bulk_create(turnos)
+
+    def _esperado(self, datos):
+        """Cálculo turno por turno con Decimal, como referencia"""
+        valor = datos['valor_descuento']
+        servicios = {servicio.id for servicio in datos.get('servicios') or []}
+        categoria = datos.get('categoria')
+        acumulable = datos.get('modo_acumulacion') == 'acumulable'
+
+        def descuento(precio):
+            if datos['tipo_descuento'] == 'porcentaje':
+                return min((precio * valor / 100).quantize(CENTAVO, ROUND_HALF_UP), precio)
+            return min(valor, precio)
+
+        actuales = simulados = Decimal('0')
+        por_servicio = {}
+        for turno in Turno.objects.select_related('servicio', 'promocion').filter(estado='completado'):
+            if not self.desde <= turno.fecha <= self.hasta:
+                continue
+            if servicios and turno.servicio_id not in servicios:
+                continue
+            if not servicios and categoria and turno.servicio.categoria_id != categoria.id:
+                continue
+            base, final = turno.servicio.precio_base, turno.precio_final
+            combinable = turno.promocion is None or turno.promocion.es_acumulable()
+            if acumulable and combinable:
+                simulado = final - descuento(final)
+            else:
+                simulado = min(final, base - descuento(base))
+            actuales += final
+            simulados += simulado
+            fila = por_servicio.setdefault(turno.servicio_id, [0, 0, Decimal('0')])
+            fila[0] += 1
+            fila[1] += simulado < final
+            fila[2] += final - simulado
+        return actuales, simulados, por_servicio
+
+    def _comparar(self, datos):
+        resultado, errores = SimulacionService.simular(datos, self.desde, self.hasta)
+        self.assertEqual(errores, [])
+        actuales, simulados, por_servicio = self._esperado(datos)
+
+        self.assertEqual(resultado['turnos_analizados'], sum(fila[0] for fila in por_servicio.values()))
+        self.assertEqual(resultado['turnos_afectados'], sum(fila[1] for fila in por_servicio.values()))
+        self.assertEqual(resultado['ingresos_actuales'], actuales)
+        self.assertEqual(resultado['ingresos_simulados'], simulados)
+        self.assertEqual(resultado['descuento_total'], actuales - simulados)
+        self.assertEqual(resultado['variacion_ingresos'], simulados - actuales)
+        self.assertEqual(
+            {fila['servicio_id']: [fila['turnos'], fila['turnos_afectados'], fila['descuento']] for fila in resultado['servicios']},
+            por_servicio
+        )
+        descuentos = [fila['descuento'] for fila in resultado['servicios']]
+        self.assertEqual(descuentos, sorted(descuentos, reverse=True))
+        return resultado
+
+    def test_coincide_con_el_calculo_por_turno(self):
+        """Los totales coinciden con recalcular cada turno en Decimal"""
+        self._turnos(300)
+        casos = [
+            {'tipo_descuento': 'porcentaje', 'valor_descuento': Decimal('15')},
+            {'tipo_descuento': 'porcentaje', 'valor_descuento': Decimal('12.5'), 'modo_acumulacion': 'acumulable'},
+            {'tipo_descuento': 'monto_fijo', 'valor_descuento': Decimal('150'), 'categoria': self.limpieza},
+            {'tipo_descuento': 'monto_fijo', 'valor_descuento': Decimal('400'), 'categoria': self.gas,
+             'servicios': [self.vidrios], 'modo_acumulacion': 'acumulable'},
+        ]
+        for datos in casos:
+            with self.subTest(datos=datos):
+                self._comparar(datos)
+
+    def test_procesa_por_bloques(self):
+        """Una consulta por bloque más la de nombres, con el mismo resultado"""
+        self._turnos(120, semilla=7)
+        datos = {'tipo_descuento': 'porcentaje', 'valor_descuento': Decimal('20')}
+        completo, _ = SimulacionService.simular(datos, self.desde, self.hasta)
+        bloques = -(-completo['turnos_analizados'] // 25)
+
+        with mock.patch.object(SimulacionService, 'CHUNK', 25):
+            with self.assertNumQueries(bloques + 1):
+                resultado, _ = SimulacionService.simular(datos, self.desde, self.hasta)
+        self.assertEqual(resultado, completo)
+        self._comparar(datos)
+
+    def test_exclusiva_no_mejora_descuento_mayor(self):
+        """Un turno que ya pagó menos que con la candidata no cambia"""
+        Turno.objects.create(
+            cliente=self.cliente, profesional=self.profesional, servicio=self.general, promocion=self.exclusiva,
+            fecha=self.desde, hora=time(9, 0), direccion_servicio='Calle 123',
+            precio_final=Decimal('700.00'), estado='completado'
+        )
+        resultado, _ = SimulacionService.simular(
+            {'tipo_descuento': 'porcentaje', 'valor_descuento': Decimal('20')}, self.desde, self.hasta
+        )
+        self.assertEqual((resultado['turnos_analizados'], resultado['turnos_afectados']), (1, 0))
+        self.assertEqual(resultado['descuento_total'], Decimal('0.00'))
+
+    def test_sin_turnos_y_datos_invalidos(self):
+        """Sin turnos devuelve ceros; valores fuera de rango devuelven errores"""
+        resultado, errores = SimulacionService.simular(
+            {'tipo_descuento': 'monto_fijo', 'valor_descuento': Decimal('100')}, self.desde, self.hasta
+        )
+        self.assertEqual(errores, [])
+        self.assertEqual((resultado['turnos_analizados'], resultado['servicios']), (0, []))
+        self.assertEqual(resultado['variacion_ingresos'], Decimal('0.00'))
+
+        resultado, errores = SimulacionService.simular(
+            {'tipo_descuento': 'porcentaje', 'valor_descuento': Decimal('150')}, self.hasta, self.desde
+        )
+        self.assertIsNone(resultado)
+        self.assertEqual(len(errores), 2)
+
+
+class SimularPromocionAPITestCase(TestCase):
+    """Tests para POST /api/promociones/simular/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = '/api/promociones/simular/'
+        self.admin = Usuario.objects.create_user(
+            username='admin_test', email='admin@test.com', password='admin123', rol='administrador'
+        )
+        usuario = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        cliente = Cliente.objects.create(usuario=usuario)
+        usuario = Usuario.objects.create_user(
+            username='tecnico', email='tecnico@test.com', password='Profesional123', rol='profesional'
+        )
+        profesional = Profesional.objects.create(usuario=usuario, especialidades='Gas')
+        categoria = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.servicio = Servicio.objects.create(
+            nombre='Estufa', descripcion='Estufa', categoria=categoria, profesional=profesional,
+            precio_base=Decimal('3000.00'), duracion_estimada=60
+        )
+        Turno.objects.create(
+            cliente=cliente, profesional=profesional, servicio=self.servicio, fecha=date(2025, 3, 10),
+            hora=time(9, 0), direccion_servicio='Calle 123', precio_final=Decimal('3000.00'), estado='completado'
+        )
+        self.datos = {
+            'tipo_descuento': 'porcentaje', 'valor_descuento': '10', 'servicios': [self.servicio.id],
+            'desde': '2025-03-01', 'hasta': '2025-03-31',
+        }
+
+    def test_requiere_administrador(self):
+        """Solo un administrador puede simular"""
+        self.assertEqual(self.client.post(self.url, self.datos, format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=Usuario.objects.get(username='cliente'))
+        self.assertEqual(self.client.post(self.url, self.datos, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_simula(self):
+        """Devuelve totales y detalle por servicio"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, self.datos, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['turnos_afectados'], 1)
+        self.assertEqual(data['descuento_total'], '300.00')
+        self.assertEqual(data['variacion_ingresos'], '-300.00')
+        self.assertEqual(data['servicios'][0]['servicio'], 'Estufa')
+
+    def test_periodo_invertido(self):
+        """Un período invertido es rechazado"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(self.url, {**self.datos, 'desde': '2025-04-01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('hasta', response.data['errors'])
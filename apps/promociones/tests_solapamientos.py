@@ -0,0 +1,143 @@
+"""
+Tests para la validación de promociones solapadas con barrido de intervalos.
+
+Para ejecutar:
+    python manage.py test apps.promociones.tests_solapamientos
+"""
+from datetime import timedelta
+from decimal import Decimal
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.servicios.models import Categoria, Servicio
+from apps.promociones.models import Promocion
+from apps.promociones.services import PromocionService
+
+
+class BarridoTestCase(SimpleTestCase):
+    """Tests del barrido de intervalos"""
+
+    def test_equivale_a_comparar_todos_los_pares(self):
+        """El barrido devuelve exactamente los pares superpuestos (extremos incluidos)"""
+        generador = random.Random(5)
+        base = timezone.now()
+        for _ in range(20):
+            intervalos = []
+            for numero in range(60):
+                inicio = base + timedelta(days=generador.randint(0, 60))
+                intervalos.append({'id': numero, 'inicio': inicio, 'fin': inicio + timedelta(days=generador.randint(0, 8))})
+
+            pares = {frozenset((a['id'], b['id'])) for a, b in PromocionService._barrido(intervalos)}
+            esperados = {
+                frozenset((a['id'], b['id']))
+                for i, a in enumerate(intervalos) for b in intervalos[i + 1:]
+                if a['inicio'] <= b['fin'] and b['inicio'] <= a['fin']
+            }
+            self.assertEqual(pares, esperados)
+
+
+class SolapamientosTestCase(TestCase):
+    """Tests para validar_promociones_solapadas y validar_solapamientos_lote"""
+
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.limpieza = Categoria.objects.create(nombre='Limpieza', descripcion='Limpieza')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.general, self.profunda, self.vidrios = [
+            Servicio.objects.create(
+                nombre=nombre, descripcion=nombre, categoria=self.limpieza,
+                precio_base=Decimal('1000.00'), duracion_estimada=60
+            )
+            for nombre in ('General', 'Profunda', 'Vidrios')
+        ]
+        self.estufa = Servicio.objects.create(
+            nombre='Estufa', descripcion='Estufa', categoria=self.gas,
+            precio_base=Decimal('3000.00'), duracion_estimada=60
+        )
+
+    def _promo(self, titulo, inicio=0, fin=10, categoria=None, servicios=(), **extra):
+        promo = Promocion.objects.create(
+            titulo=titulo, descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('10'),
+            categoria=categoria, fecha_inicio=self.ahora + timedelta(days=inicio),
+            fecha_fin=self.ahora + timedelta(days=fin), **extra
+        )
+        promo.servicios.set(servicios)
+        return promo
+
+    def _datos(self, titulo='Nueva', inicio=0, fin=10, categoria=None, servicios=(), **extra):
+        return {
+            'titulo': titulo, 'fecha_inicio': self.ahora + timedelta(days=inicio),
+            'fecha_fin': self.ahora + timedelta(days=fin), 'categoria': categoria, 'servicios': list(servicios),
+            **extra
+        }
+
+    def test_informa_todos_los_conflictos(self):
+        """Se reportan todos los conflictos en un solo mensaje, con una consulta"""
+        self._promo('Uno', categoria=self.limpieza, servicios=[self.general])
+        self._promo('Dos', inicio=5, fin=20, categoria=self.limpieza, servicios=[self.profunda])
+        self._promo('Categoría', inicio=8, fin=9, categoria=self.limpieza)
+        self._promo('Fuera de período', inicio=11, fin=20, categoria=self.limpieza)
+        self._promo('Inactiva', categoria=self.limpieza, activa=False)
+        self._promo('Otra categoría', categoria=self.gas, servicios=[self.estufa])
+
+        datos = self._datos(categoria=self.limpieza, servicios=[self.general, self.profunda])
+        with self.assertNumQueries(1):
+            valido, mensaje = PromocionService.validar_promociones_solapadas(
+                datos['fecha_inicio'], datos['fecha_fin'], self.limpieza, datos['servicios']
+            )
+        self.assertFalse(valido)
+        self.assertIn("'Uno' para el servicio 'General'", mensaje)
+        self.assertIn("'Dos' para el servicio 'Profunda'", mensaje)
+        self.assertIn("'Categoría' para la categoría 'Limpieza'", mensaje)
+        for ajena in ('Fuera de período', 'Inactiva', 'Otra categoría'):
+            self.assertNotIn(ajena, mensaje)
+
+    def test_reglas_de_alcance(self):
+        """Sin categoría solo chocan servicios compartidos; sin alcance no hay validación"""
+        self._promo('Servicio', servicios=[self.general], categoria=self.gas)
+        self._promo('Solo categoría', categoria=self.limpieza)
+
+        conflictos, = PromocionService.validar_solapamientos_lote([self._datos(servicios=[self.general])])
+        self.assertEqual(len(conflictos), 1)
+        self.assertIn("'Servicio'", conflictos[0])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                PromocionService.validar_promociones_solapadas(self.ahora, self.ahora + timedelta(days=1)),
+                (True, "")
+            )
+
+    def test_modificacion_se_excluye(self):
+        """Al modificar, la promoción no choca consigo misma"""
+        promo = self._promo('Existente', categoria=self.limpieza)
+        valido, _ = PromocionService.validar_promociones_solapadas(
+            promo.fecha_inicio, promo.fecha_fin, self.limpieza, None, promo.id
+        )
+        self.assertTrue(valido)
+
+    def test_lote(self):
+        """El lote se valida contra la base y entre sus propios ítems"""
+        self._promo('En base', inicio=0, fin=3, categoria=self.gas)
+        lote = [
+            self._datos('A', inicio=0, fin=5, categoria=self.limpieza),
+            self._datos('B', inicio=5, fin=9, categoria=self.limpieza),
+            self._datos('C', inicio=6, fin=9, categoria=self.limpieza, modo_acumulacion='acumulable'),
+            self._datos('D', inicio=7, fin=8, servicios=[self.vidrios], modo_acumulacion='acumulable'),
+            self._datos('E', inicio=2, fin=4, categoria=self.gas),
+            self._datos('Sin fechas', inicio=0, fin=-1, categoria=self.limpieza),
+        ]
+
+        with self.assertNumQueries(1):
+            a, b, c, d, e, sin_fechas = PromocionService.validar_solapamientos_lote(lote)
+        # A y B se tocan en el día 5; C (acumulable) choca con B (exclusiva)
+        self.assertEqual(len(a), 1)
+        self.assertIn("'B' del mismo lote", a[0])
+        self.assertEqual(sorted(m.split("'")[1] for m in b), ['A', 'C'])
+        self.assertEqual(len(c), 1)
+        # D y C son acumulables: no chocan
+        self.assertEqual(d, [])
+        self.assertEqual(len(e), 1)
+        self.assertIn("'En base'", e[0])
+        self.assertEqual(sin_fechas, [])
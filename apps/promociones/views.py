@@ -241,13 +241,8 @@ def buscar_promocion(request):
 @login_required
 def promociones_vigentes(request):
     """Ver promociones vigentes (para clientes)"""
-    from django.utils import timezone
-    now = timezone.now()
-    promociones = Promocion.objects.filter(
-        activa=True,
-        fecha_inicio__lte=now,
-        fecha_fin__gte=now
-    ).order_by('-fecha_creacion')
+    from .indice_services import PromocionIndiceService
+    promociones = PromocionIndiceService.vigentes()
     
     return render(request, 'promociones/promociones_vigentes.html', {'promociones': promociones})
 
@@ -0,0 +1,277 @@
+"""
+Agregados diarios para las estadísticas (CU-16).
+Turnos, altas de usuarios y calificaciones se resumen por día en tablas
+chicas (ver models). Cada actualización toma solo los días con filas
+cambiadas desde la marca de agua, más los marcados por bajas y ediciones
+(ver signals), y los recalcula desde las tablas originales; así las
+estadísticas dependen de la cantidad de días y no de la de turnos.
+"""
+from datetime import datetime, time, timedelta
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario
+from apps.turnos.models import Turno, Calificacion
+from .models import (
+    ActividadDiaria,
+    AltaDiaria,
+    CalificacionDiaria,
+    DiaPendiente,
+    MarcaAgregacion,
+    TurnoDiario,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AgregacionService:
+    """
+    Servicio de mantenimiento de los agregados diarios.
+
+    Recalcular un día completo (en lugar de sumar y restar cada cambio) hace
+    que volver a procesar un día no tenga efecto, por eso cada corrida mira
+    también los MARGEN anteriores a la marca: cubre transacciones que se
+    confirmaron después con una fecha de modificación previa.
+    """
+
+    CLAVE = 'estadisticas_diarias'
+    MARGEN = timedelta(minutes=5)
+    DIAS_POR_LOTE = 90
+    TAMANIO_LOTE = 1000
+
+    # ========================================================================
+    # DÍAS
+    # ========================================================================
+
+    @staticmethod
+    def inicio_dia(fecha):
+        """Medianoche local del día (datetime con zona horaria)"""
+        return timezone.make_aware(datetime.combine(fecha, time.min))
+
+    @staticmethod
+    def dia_local(momento):
+        """Día local de un datetime"""
+        return timezone.localdate(momento) if timezone.is_aware(momento) else momento.date()
+
+    @staticmethod
+    def _filtro_dias(campo, dias):
+        """
+        Filtro por días locales completos sobre un DateTimeField, uniendo los
+        días consecutivos en un solo rango para que use el índice del campo.
+        """
+        rangos = []
+        for dia in sorted(dias):
+            if rangos and rangos[-1][1] == dia:
+                rangos[-1][1] = dia + timedelta(days=1)
+            else:
+                rangos.append([dia, dia + timedelta(days=1)])
+        filtro = Q()
+        for desde, hasta in rangos:
+            filtro |= Q(**{
+                f'{campo}__gte': AgregacionService.inicio_dia(desde),
+                f'{campo}__lt': AgregacionService.inicio_dia(hasta),
+            })
+        return filtro
+
+    # ========================================================================
+    # CÁLCULO DESDE LAS TABLAS ORIGINALES
+    # ========================================================================
+
+    @staticmethod
+    def _calcular_turnos(dias=None):
+        """Filas de TurnoDiario y ActividadDiaria de los días (None: todos)"""
+        turnos = Turno.objects.order_by()
+        calificaciones = Calificacion.objects.order_by()
+        if dias is not None:
+            turnos = turnos.filter(AgregacionService._filtro_dias('fecha_solicitud', dias))
+            calificaciones = calificaciones.filter(AgregacionService._filtro_dias('turno__fecha_solicitud', dias))
+        turnos = turnos.annotate(dia=TruncDate('fecha_solicitud'))
+
+        filas = {}
+        for dia, estado, servicio_id, profesional_id, cantidad, ingresos in turnos.values_list(
+            'dia', 'estado', 'servicio_id', 'profesional_id'
+        ).annotate(cantidad=Count('id'), ingresos=Sum('precio_final')):
+            filas[(dia, estado, servicio_id, profesional_id)] = TurnoDiario(
+                fecha=dia, estado=estado, servicio_id=servicio_id, profesional_id=profesional_id,
+                cantidad=cantidad, ingresos=ingresos
+            )
+        for *clave, cantidad, suma in calificaciones.annotate(dia=TruncDate('turno__fecha_solicitud')).values_list(
+            'dia', 'turno__estado', 'turno__servicio_id', 'turno__profesional_id'
+        ).annotate(cantidad=Count('id'), suma=Sum('puntuacion')):
+            diario = filas.get(tuple(clave))
+            if diario:
+                diario.calificaciones, diario.suma_puntuacion = cantidad, suma
+
+        activos = set()
+        for campo in ('cliente__usuario_id', 'profesional__usuario_id'):
+            activos.update(turnos.values_list('dia', campo).distinct())
+
+        return {
+            TurnoDiario: list(filas.values()),
+            ActividadDiaria: [ActividadDiaria(fecha=dia, usuario_id=usuario_id) for dia, usuario_id in activos],
+        }
+
+    @staticmethod
+    def _calcular_usuarios(dias=None):
+        """Filas de AltaDiaria de los días (None: todos)"""
+        usuarios = Usuario.objects.order_by()
+        if dias is not None:
+            usuarios = usuarios.filter(AgregacionService._filtro_dias('date_joined', dias))
+        altas = usuarios.annotate(dia=TruncDate('date_joined')).values_list('dia', 'rol').annotate(cantidad=Count('id'))
+        return {
+            AltaDiaria: [AltaDiaria(fecha=dia, rol=rol, cantidad=cantidad) for dia, rol, cantidad in altas],
+        }
+
+    @staticmethod
+    def _calcular_calificaciones(dias=None):
+        """Filas de CalificacionDiaria de los días (None: todos)"""
+        calificaciones = Calificacion.objects.order_by()
+        if dias is not None:
+            calificaciones = calificaciones.filter(AgregacionService._filtro_dias('fecha', dias))
+        filas = calificaciones.annotate(dia=TruncDate('fecha')).values_list(
+            'dia', 'turno__servicio_id', 'turno__profesional_id', 'puntuacion'
+        ).annotate(cantidad=Count('id'))
+        return {
+            CalificacionDiaria: [
+                CalificacionDiaria(
+                    fecha=dia, servicio_id=servicio_id, profesional_id=profesional_id,
+                    puntuacion=puntuacion, cantidad=cantidad
+                )
+                for dia, servicio_id, profesional_id, puntuacion, cantidad in filas
+            ],
+        }
+
+    @staticmethod
+    def _recalcular(fuente, dias=None):
+        """
+        Reemplaza los agregados de una fuente en los días indicados.
+
+        Args:
+            fuente (str): 'turnos', 'usuarios' o 'calificaciones'
+            dias (set[date], optional): Días a recalcular (None: todos)
+        """
+        calcular = {
+            'turnos': AgregacionService._calcular_turnos,
+            'usuarios': AgregacionService._calcular_usuarios,
+            'calificaciones': AgregacionService._calcular_calificaciones,
+        }[fuente]
+        if dias is None:
+            lotes = [None]
+        else:
+            dias = sorted(dias)
+            lotes = [dias[i:i + AgregacionService.DIAS_POR_LOTE] for i in range(0, len(dias), AgregacionService.DIAS_POR_LOTE)]
+
+        for lote in lotes:
+            for modelo, filas in calcular(lote).items():
+                anteriores = modelo.objects.all() if lote is None else modelo.objects.filter(fecha__in=lote)
+                anteriores.delete()
+                modelo.objects.bulk_create(filas, batch_size=AgregacionService.TAMANIO_LOTE)
+
+    # ========================================================================
+    # ACTUALIZACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def _bloquear_marca(esperar):
+        """
+        Marca de agua bloqueada hasta el fin de la transacción, para que dos
+        actualizaciones no recalculen los mismos días a la vez.
+
+        Returns:
+            MarcaAgregacion|None: None si otra actualización la tiene y esperar es False
+        """
+        MarcaAgregacion.objects.get_or_create(clave=AgregacionService.CLAVE)
+        saltear = not esperar and connection.features.has_select_for_update_skip_locked
+        return MarcaAgregacion.objects.select_for_update(skip_locked=saltear).filter(
+            clave=AgregacionService.CLAVE
+        ).first()
+
+    @staticmethod
+    def dias_modificados(desde):
+        """
+        Días a recalcular por fuente: los de filas modificadas desde la marca
+        de agua y los marcados como pendientes (que se consumen).
+
+        Returns:
+            dict: fuente -> set[date]
+        """
+        dias = {fuente: set() for fuente, _ in DiaPendiente.FUENTES}
+        pendientes = list(DiaPendiente.objects.values_list('id', 'fuente', 'fecha'))
+        if pendientes:
+            DiaPendiente.objects.filter(id__in=[pendiente[0] for pendiente in pendientes]).delete()
+        for _, fuente, fecha in pendientes:
+            dias[fuente].add(fecha)
+
+        def dias_de(consulta, campo):
+            return consulta.order_by().annotate(dia=TruncDate(campo)).values_list('dia', flat=True).distinct()
+
+        calificaciones = Calificacion.objects.filter(fecha__gte=desde)
+        dias['turnos'].update(dias_de(Turno.objects.filter(fecha_actualizacion__gte=desde), 'fecha_solicitud'))
+        dias['turnos'].update(dias_de(calificaciones, 'turno__fecha_solicitud'))
+        dias['calificaciones'].update(dias_de(calificaciones, 'fecha'))
+        dias['usuarios'].update(dias_de(Usuario.objects.filter(fecha_modificacion__gte=desde), 'date_joined'))
+        return dias
+
+    @staticmethod
+    def actualizar(esperar=True):
+        """
+        Recalcula los días con cambios desde la marca de agua y la avanza.
+        Sin marca (primera vez) reconstruye todos los agregados.
+
+        Args:
+            esperar (bool): Si otra actualización está en curso, esperarla
+                (True) o volver sin hacer nada (False)
+
+        Returns:
+            dict|None: Días recalculados por fuente (None: todos); None si se
+                       salteó por otra actualización en curso
+        """
+        with transaction.atomic():
+            marca = AgregacionService._bloquear_marca(esperar)
+            if marca is None:
+                return None
+            inicio = timezone.now()
+            if marca.marca is None:
+                dias = dict.fromkeys(fuente for fuente, _ in DiaPendiente.FUENTES)
+                DiaPendiente.objects.all().delete()
+            else:
+                dias = AgregacionService.dias_modificados(marca.marca - AgregacionService.MARGEN)
+            for fuente, fechas in dias.items():
+                if fechas is None or fechas:
+                    AgregacionService._recalcular(fuente, fechas)
+            marca.marca = inicio
+            marca.save(update_fields=['marca'])
+
+        resumen = {fuente: None if fechas is None else len(fechas) for fuente, fechas in dias.items()}
+        logger.info(f"Agregados diarios actualizados hasta {inicio}: {resumen}")
+        return resumen
+
+    @staticmethod
+    def reconstruir():
+        """
+        Descarta la marca de agua y recalcula todos los agregados.
+
+        Returns:
+            dict: Filas de cada agregado
+        """
+        MarcaAgregacion.objects.filter(clave=AgregacionService.CLAVE).update(marca=None)
+        AgregacionService.actualizar()
+        return {
+            modelo.__name__: modelo.objects.count()
+            for modelo in (TurnoDiario, ActividadDiaria, AltaDiaria, CalificacionDiaria)
+        }
+
+    @staticmethod
+    def marcar_pendiente(fuente, *momentos):
+        """
+        Marca para recalcular los días de los momentos dados (cambios que la
+        marca de agua no detecta, como filas eliminadas).
+        """
+        DiaPendiente.objects.bulk_create(
+            [DiaPendiente(fuente=fuente, fecha=AgregacionService.dia_local(momento)) for momento in momentos if momento],
+            ignore_conflicts=True
+        )
@@ -0,0 +1,34 @@
+"""
+Comando para mantener los agregados diarios de las estadísticas.
+
+Uso (por ejemplo, cada cinco minutos desde cron):
+    python manage.py actualizar_agregados_diarios
+    python manage.py actualizar_agregados_diarios --reconstruir
+"""
+from django.core.management.base import BaseCommand
+
+from apps.reportes.agregacion_services import AgregacionService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los días con cambios desde la última actualización (o todos los agregados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Recalcula todos los días en lugar de solo los modificados'
+        )
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            filas = AgregacionService.reconstruir()
+            detalle = ', '.join(f'{modelo}: {cantidad}' for modelo, cantidad in filas.items())
+            self.stdout.write(self.style.SUCCESS(f'Agregados reconstruidos ({detalle})'))
+        else:
+            dias = AgregacionService.actualizar()
+            if None in dias.values():
+                self.stdout.write(self.style.SUCCESS('Agregados calculados por primera vez'))
+            else:
+                detalle = ', '.join(f'{fuente}: {cantidad}' for fuente, cantidad in dias.items())
+                self.stdout.write(self.style.SUCCESS(f'Días recalculados ({detalle})'))
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_initial'),
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('usuarios', '0006_indices_agregados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAgregacion',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('marca', models.DateTimeField(blank=True, help_text='Vacía: reconstruir todo', null=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Agregación',
+                'verbose_name_plural': 'Marcas de Agregación',
+            },
+        ),
+        migrations.CreateModel(
+            name='AltaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día local de date_joined')),
+                ('rol', models.CharField(max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Altas por Día',
+                'verbose_name_plural': 'Altas por Día',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'rol'), name='alta_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DiaPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fuente', models.CharField(choices=[('turnos', 'Turnos'), ('usuarios', 'Usuarios'), ('calificaciones', 'Calificaciones')], max_length=20)),
+                ('fecha', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Día Pendiente',
+                'verbose_name_plural': 'Días Pendientes',
+                'constraints': [models.UniqueConstraint(fields=('fuente', 'fecha'), name='dia_pendiente_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActividadDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Actividad Diaria',
+                'verbose_name_plural': 'Actividad Diaria',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'usuario'), name='actividad_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalificacionDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día local de la calificación')),
+                ('puntuacion', models.PositiveSmallIntegerField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('profesional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.profesional')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'Calificaciones por Día',
+                'verbose_name_plural': 'Calificaciones por Día',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'servicio', 'profesional', 'puntuacion'), name='calificacion_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TurnoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Día local de fecha_solicitud')),
+                ('estado', models.CharField(max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, help_text='Suma de precio_final', max_digits=14)),
+                ('calificaciones', models.PositiveIntegerField(default=0)),
+                ('suma_puntuacion', models.PositiveIntegerField(default=0)),
+                ('profesional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.profesional')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'Turnos por Día',
+                'verbose_name_plural': 'Turnos por Día',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'estado', 'servicio', 'profesional'), name='turno_diario_unico')],
+            },
+        ),
+    ]
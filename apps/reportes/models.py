@@ -1,5 +1,6 @@
 from django.db import models
-from apps.usuarios.models import Usuario
+from apps.usuarios.models import Usuario, Profesional
+from apps.servicios.models import Servicio
 
 class Reporte(models.Model):
     """Reportes generados del sistema"""
@@ -24,3 +25,128 @@ class Reporte(models.Model):
         
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.fecha_generacion}"
+
+
+
+# ============================================================================
+# AGREGADOS DIARIOS PARA ESTADÍSTICAS (CU-16)
+# Los mantiene AgregacionService a partir de una marca de agua y se leen sin
+# consultar turnos, usuarios ni calificaciones (ver agregacion_services).
+# ============================================================================
+
+class TurnoDiario(models.Model):
+    """Turnos solicitados por día × estado × servicio × profesional"""
+    fecha = models.DateField(help_text='Día local de fecha_solicitud')
+    estado = models.CharField(max_length=20)
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='+')
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='+')
+    cantidad = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text='Suma de precio_final')
+    # Calificaciones de esos turnos, para el promedio por servicio
+    calificaciones = models.PositiveIntegerField(default=0)
+    suma_puntuacion = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Turnos por Día'
+        verbose_name_plural = 'Turnos por Día'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'estado', 'servicio', 'profesional'], name='turno_diario_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.estado}: {self.cantidad} turnos"
+
+
+class ActividadDiaria(models.Model):
+    """Usuarios (cliente o profesional) con turnos solicitados cada día"""
+    fecha = models.DateField()
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = 'Actividad Diaria'
+        verbose_name_plural = 'Actividad Diaria'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'usuario'], name='actividad_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.usuario_id}"
+
+
+class AltaDiaria(models.Model):
+    """Usuarios registrados por día × rol"""
+    fecha = models.DateField(help_text='Día local de date_joined')
+    rol = models.CharField(max_length=20)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Altas por Día'
+        verbose_name_plural = 'Altas por Día'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'rol'], name='alta_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.rol}: {self.cantidad}"
+
+
+class CalificacionDiaria(models.Model):
+    """Calificaciones por día × servicio × profesional × puntuación"""
+    fecha = models.DateField(help_text='Día local de la calificación')
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='+')
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='+')
+    puntuacion = models.PositiveSmallIntegerField()
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Calificaciones por Día'
+        verbose_name_plural = 'Calificaciones por Día'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'servicio', 'profesional', 'puntuacion'], name='calificacion_diaria_unica'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.puntuacion}/5: {self.cantidad}"
+
+
+class MarcaAgregacion(models.Model):
+    """
+    Marca de agua de los agregados diarios: momento hasta el que se
+    procesaron los cambios de turnos, usuarios y calificaciones.
+    """
+    clave = models.CharField(max_length=50, primary_key=True)
+    marca = models.DateTimeField(null=True, blank=True, help_text='Vacía: reconstruir todo')
+
+    class Meta:
+        verbose_name = 'Marca de Agregación'
+        verbose_name_plural = 'Marcas de Agregación'
+
+    def __str__(self):
+        return f"{self.clave}: {self.marca}"
+
+
+class DiaPendiente(models.Model):
+    """
+    Día a recalcular por un cambio que la marca de agua no ve: filas
+    eliminadas o calificaciones editadas (no tienen fecha de modificación).
+    """
+    FUENTES = (
+        ('turnos', 'Turnos'),
+        ('usuarios', 'Usuarios'),
+        ('calificaciones', 'Calificaciones'),
+    )
+
+    fuente = models.CharField(max_length=20, choices=FUENTES)
+    fecha = models.DateField()
+
+    class Meta:
+        verbose_name = 'Día Pendiente'
+        verbose_name_plural = 'Días Pendientes'
+        constraints = [
+            models.UniqueConstraint(fields=['fuente', 'fecha'], name='dia_pendiente_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.fuente} {self.fecha}"
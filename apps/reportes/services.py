@@ -2,8 +2,8 @@
 Servicio de Estadísticas y Reportes
 Implementa la lógica de negocio para CU-16, CU-30, CU-31
 """
-from django.db.models import Count, Avg, Sum, Q, F
-from django.db.models.functions import TruncMonth, TruncDay
+from django.db.models import Count, Avg, Sum, Q, F, ExpressionWrapper, FloatField
+from django.db.models.functions import Cast, TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
@@ -14,7 +14,8 @@ from apps.usuarios.models import Usuario, Cliente, Profesional
 from apps.servicios.models import Servicio, Categoria
 from apps.turnos.models import Turno, Calificacion
 from apps.promociones.models import Promocion
-from .models import Reporte
+from .models import Reporte, TurnoDiario, ActividadDiaria, AltaDiaria, CalificacionDiaria
+from .agregacion_services import AgregacionService
 
 logger = logging.getLogger(__name__)
 
@@ -63,52 +64,52 @@ class EstadisticasService:
         logger.info(f"Rango de fechas calculado: {fecha_inicio} - {fecha_fin}")
         return fecha_inicio, fecha_fin
     
+    @staticmethod
+    def rango_dias(fecha_inicio, fecha_fin):
+        """
+        Días locales que abarca el rango: los agregados tienen resolución
+        diaria, así que los días de los extremos se cuentan completos.
+
+        Returns:
+            tuple: (primer_dia, ultimo_dia)
+        """
+        return AgregacionService.dia_local(fecha_inicio), AgregacionService.dia_local(fecha_fin)
+    
     @staticmethod
     def estadisticas_usuarios(fecha_inicio, fecha_fin):
         """
-        Genera estadísticas de usuarios.
+        Genera estadísticas de usuarios desde AltaDiaria y ActividadDiaria.
         
         Returns:
             dict: Estadísticas de usuarios
         """
         try:
-            # Total de usuarios por rol
-            total_usuarios = Usuario.objects.filter(
-                date_joined__range=(fecha_inicio, fecha_fin)
-            ).count()
-            
-            usuarios_por_rol = Usuario.objects.filter(
-                date_joined__range=(fecha_inicio, fecha_fin)
-            ).values('rol').annotate(
-                cantidad=Count('id')
-            ).order_by('-cantidad')
+            dias = EstadisticasService.rango_dias(fecha_inicio, fecha_fin)
+            altas = AltaDiaria.objects.filter(fecha__range=dias)
             
-            # Usuarios activos (que tienen turnos)
-            usuarios_activos = Usuario.objects.filter(
-                Q(cliente__turnos__fecha_solicitud__range=(fecha_inicio, fecha_fin)) |
-                Q(profesional__turnos__fecha_solicitud__range=(fecha_inicio, fecha_fin))
-            ).distinct().count()
+            # Altas por rol
+            usuarios_por_rol = list(
+                altas.values('rol').annotate(cantidad=Sum('cantidad')).order_by('-cantidad')
+            )
+            total_usuarios = sum(item['cantidad'] for item in usuarios_por_rol)
             
-            # Nuevos registros en el período
-            nuevos_usuarios = Usuario.objects.filter(
-                date_joined__range=(fecha_inicio, fecha_fin)
-            ).count()
+            # Usuarios activos (que tienen turnos como cliente o profesional)
+            usuarios_activos = ActividadDiaria.objects.filter(
+                fecha__range=dias
+            ).values('usuario_id').distinct().count()
             
-            # Distribución por fecha (últimos 30 días del rango)
-            usuarios_por_dia = Usuario.objects.filter(
-                date_joined__range=(fecha_inicio, fecha_fin)
-            ).annotate(
-                dia=TruncDay('date_joined')
-            ).values('dia').annotate(
-                cantidad=Count('id')
-            ).order_by('dia')
+            # Distribución por fecha
+            usuarios_por_dia = [
+                {'dia': AgregacionService.inicio_dia(fecha), 'cantidad': cantidad}
+                for fecha, cantidad in altas.values_list('fecha').annotate(cantidad=Sum('cantidad')).order_by('fecha')
+            ]
             
             estadisticas = {
                 'total_usuarios': total_usuarios,
-                'usuarios_por_rol': list(usuarios_por_rol),
+                'usuarios_por_rol': usuarios_por_rol,
                 'usuarios_activos': usuarios_activos,
-                'nuevos_usuarios': nuevos_usuarios,
-                'usuarios_por_dia': list(usuarios_por_dia),
+                'nuevos_usuarios': total_usuarios,
+                'usuarios_por_dia': usuarios_por_dia,
                 'periodo': {
                     'inicio': fecha_inicio.isoformat(),
                     'fin': fecha_fin.isoformat()
@@ -125,26 +126,32 @@ class EstadisticasService:
     @staticmethod
     def estadisticas_servicios(fecha_inicio, fecha_fin):
         """
-        Genera estadísticas de servicios.
+        Genera estadísticas de servicios desde TurnoDiario.
         
         Returns:
             dict: Estadísticas de servicios
         """
         try:
+            turnos = TurnoDiario.objects.filter(fecha__range=EstadisticasService.rango_dias(fecha_inicio, fecha_fin))
+            
             # Total de servicios registrados
             total_servicios = Servicio.objects.filter(activo=True).count()
             
             # Servicios más solicitados
-            servicios_populares = Turno.objects.filter(
-                fecha_solicitud__range=(fecha_inicio, fecha_fin)
-            ).values(
+            servicios_populares = []
+            for item in turnos.values(
                 'servicio__id',
                 'servicio__nombre',
                 'servicio__categoria__nombre'
             ).annotate(
-                cantidad_solicitudes=Count('id'),
-                calificacion_promedio=Avg('calificacion__puntuacion')
-            ).order_by('-cantidad_solicitudes')[:10]
+                cantidad_solicitudes=Sum('cantidad'),
+                calificaciones=Sum('calificaciones'),
+                suma_puntuacion=Sum('suma_puntuacion')
+            ).order_by('-cantidad_solicitudes')[:10]:
+                calificaciones = item.pop('calificaciones')
+                suma_puntuacion = item.pop('suma_puntuacion')
+                item['calificacion_promedio'] = suma_puntuacion / calificaciones if calificaciones else None
+                servicios_populares.append(item)
             
             # Servicios por categoría
             servicios_por_categoria = Servicio.objects.filter(
@@ -156,30 +163,23 @@ class EstadisticasService:
             ).order_by('-cantidad')
             
             # Turnos por estado
-            turnos_por_estado = Turno.objects.filter(
-                fecha_solicitud__range=(fecha_inicio, fecha_fin)
-            ).values('estado').annotate(
-                cantidad=Count('id')
-            ).order_by('-cantidad')
-            
-            # Turnos completados
-            turnos_completados = Turno.objects.filter(
-                fecha_solicitud__range=(fecha_inicio, fecha_fin),
-                estado='completado'
-            ).count()
+            turnos_por_estado = list(
+                turnos.values('estado').annotate(cantidad=Sum('cantidad')).order_by('-cantidad')
+            )
             
             # Tasa de completitud
-            total_turnos = Turno.objects.filter(
-                fecha_solicitud__range=(fecha_inicio, fecha_fin)
-            ).count()
+            total_turnos = sum(item['cantidad'] for item in turnos_por_estado)
+            turnos_completados = next(
+                (item['cantidad'] for item in turnos_por_estado if item['estado'] == 'completado'), 0
+            )
             
             tasa_completitud = (turnos_completados / total_turnos * 100) if total_turnos > 0 else 0
             
             estadisticas = {
                 'total_servicios': total_servicios,
-                'servicios_populares': list(servicios_populares),
+                'servicios_populares': servicios_populares,
                 'servicios_por_categoria': list(servicios_por_categoria),
-                'turnos_por_estado': list(turnos_por_estado),
+                'turnos_por_estado': turnos_por_estado,
                 'total_turnos': total_turnos,
                 'turnos_completados': turnos_completados,
                 'tasa_completitud': round(tasa_completitud, 2),
@@ -199,42 +199,39 @@ class EstadisticasService:
     @staticmethod
     def estadisticas_ingresos(fecha_inicio, fecha_fin):
         """
-        Genera estadísticas de ingresos.
+        Genera estadísticas de ingresos desde TurnoDiario.
         
         Returns:
             dict: Estadísticas financieras
         """
         try:
-            # Ingresos totales de turnos completados
-            turnos_completados = Turno.objects.filter(
-                fecha_solicitud__range=(fecha_inicio, fecha_fin),
+            # Ingresos de turnos completados
+            turnos_completados = TurnoDiario.objects.filter(
+                fecha__range=EstadisticasService.rango_dias(fecha_inicio, fecha_fin),
                 estado='completado'
             )
             
-            ingresos_totales = turnos_completados.aggregate(
-                total=Sum('precio_final')
-            )['total'] or Decimal('0.00')
+            totales = turnos_completados.aggregate(total=Sum('ingresos'), cantidad=Sum('cantidad'))
+            ingresos_totales = totales['total'] or Decimal('0.00')
             
             # Ingresos por mes
             ingresos_por_mes = turnos_completados.annotate(
-                mes=TruncMonth('fecha_solicitud')
+                mes=TruncMonth('fecha')
             ).values('mes').annotate(
-                total=Sum('precio_final'),
-                cantidad_turnos=Count('id')
+                total=Sum('ingresos'),
+                cantidad_turnos=Sum('cantidad')
             ).order_by('mes')
             
             # Ingresos por categoría de servicio
             ingresos_por_categoria = turnos_completados.values(
                 'servicio__categoria__nombre'
             ).annotate(
-                total=Sum('precio_final'),
-                cantidad=Count('id')
+                total=Sum('ingresos'),
+                cantidad=Sum('cantidad')
             ).order_by('-total')
             
             # Ticket promedio
-            ticket_promedio = turnos_completados.aggregate(
-                promedio=Avg('precio_final')
-            )['promedio'] or Decimal('0.00')
+            ticket_promedio = ingresos_totales / totales['cantidad'] if totales['cantidad'] else Decimal('0.00')
             
             # Profesionales top por ingresos
             profesionales_top = turnos_completados.values(
@@ -242,15 +239,15 @@ class EstadisticasService:
                 'profesional__usuario__first_name',
                 'profesional__usuario__last_name'
             ).annotate(
-                ingresos=Sum('precio_final'),
-                cantidad_turnos=Count('id')
+                ingresos=Sum('ingresos'),
+                cantidad_turnos=Sum('cantidad')
             ).order_by('-ingresos')[:10]
             
             estadisticas = {
                 'ingresos_totales': float(ingresos_totales),
                 'ingresos_por_mes': [
                     {
-                        'mes': item['mes'].isoformat() if item['mes'] else None,
+                        'mes': AgregacionService.inicio_dia(item['mes']).isoformat() if item['mes'] else None,
                         'total': float(item['total']),
                         'cantidad_turnos': item['cantidad_turnos']
                     }
@@ -282,53 +279,62 @@ class EstadisticasService:
     @staticmethod
     def estadisticas_calificaciones(fecha_inicio, fecha_fin):
         """
-        Genera estadísticas de calificaciones.
+        Genera estadísticas de calificaciones desde CalificacionDiaria.
         
         Returns:
             dict: Estadísticas de satisfacción
         """
         try:
-            # Calificación promedio general
-            calificaciones = Calificacion.objects.filter(
-                fecha_calificacion__range=(fecha_inicio, fecha_fin)
+            calificaciones = CalificacionDiaria.objects.filter(
+                fecha__range=EstadisticasService.rango_dias(fecha_inicio, fecha_fin)
+            )
+            # Promedio ponderado: cada fila agrupa `cantidad` calificaciones de igual puntuación
+            promedio = ExpressionWrapper(
+                Cast(Sum(F('puntuacion') * F('cantidad')), FloatField()) / Sum('cantidad'),
+                output_field=FloatField()
             )
-            
-            calificacion_promedio = calificaciones.aggregate(
-                promedio=Avg('puntuacion')
-            )['promedio'] or 0
             
             # Distribución de calificaciones
-            distribucion = calificaciones.values('puntuacion').annotate(
-                cantidad=Count('id')
-            ).order_by('puntuacion')
+            distribucion = list(
+                calificaciones.values('puntuacion').annotate(cantidad=Sum('cantidad')).order_by('puntuacion')
+            )
+            
+            # Calificación promedio general y total
+            total_calificaciones = sum(item['cantidad'] for item in distribucion)
+            calificacion_promedio = (
+                sum(item['puntuacion'] * item['cantidad'] for item in distribucion) / total_calificaciones
+                if total_calificaciones else 0
+            )
             
             # Calificaciones por servicio
-            por_servicio = calificaciones.values(
-                'turno__servicio__nombre'
-            ).annotate(
-                promedio=Avg('puntuacion'),
-                cantidad=Count('id')
-            ).order_by('-promedio')[:10]
+            por_servicio = [
+                {'turno__servicio__nombre': item['servicio__nombre'], 'promedio': item['promedio'], 'cantidad': item['cantidad']}
+                for item in calificaciones.values('servicio__nombre').annotate(
+                    promedio=promedio,
+                    cantidad=Sum('cantidad')
+                ).order_by('-promedio')[:10]
+            ]
             
             # Profesionales mejor calificados
-            profesionales_mejor = calificaciones.values(
-                'turno__profesional__usuario__username',
-                'turno__profesional__usuario__first_name',
-                'turno__profesional__usuario__last_name'
-            ).annotate(
-                promedio=Avg('puntuacion'),
-                cantidad=Count('id')
-            ).filter(cantidad__gte=3).order_by('-promedio')[:10]
-            
-            # Total de calificaciones
-            total_calificaciones = calificaciones.count()
+            profesionales_mejor = [
+                {f'turno__{campo}': valor for campo, valor in item.items() if campo.startswith('profesional__')}
+                | {'promedio': item['promedio'], 'cantidad': item['cantidad']}
+                for item in calificaciones.values(
+                    'profesional__usuario__username',
+                    'profesional__usuario__first_name',
+                    'profesional__usuario__last_name'
+                ).annotate(
+                    promedio=promedio,
+                    cantidad=Sum('cantidad')
+                ).filter(cantidad__gte=3).order_by('-promedio')[:10]
+            ]
             
             estadisticas = {
                 'calificacion_promedio': round(float(calificacion_promedio), 2),
                 'total_calificaciones': total_calificaciones,
-                'distribucion': list(distribucion),
-                'por_servicio': list(por_servicio),
-                'profesionales_mejor': list(profesionales_mejor),
+                'distribucion': distribucion,
+                'por_servicio': por_servicio,
+                'profesionales_mejor': profesionales_mejor,
                 'periodo': {
                     'inicio': fecha_inicio.isoformat(),
                     'fin': fecha_fin.isoformat()
@@ -347,6 +353,10 @@ class EstadisticasService:
         """
         Método principal para consultar estadísticas (CU-16).
         
+        Antes de leer los agregados diarios procesa los cambios pendientes
+        desde la marca de agua; si otra actualización está en curso, lee
+        lo ya agregado.
+        
         Args:
             tipo: Tipo de estadística ('usuarios', 'servicios', 'ingresos', 'calificaciones')
             periodo: Período de análisis
@@ -363,16 +373,17 @@ class EstadisticasService:
             )
             
             # Generar estadísticas según tipo
-            if tipo == 'usuarios':
-                return EstadisticasService.estadisticas_usuarios(fecha_inicio, fecha_fin)
-            elif tipo == 'servicios':
-                return EstadisticasService.estadisticas_servicios(fecha_inicio, fecha_fin)
-            elif tipo == 'ingresos':
-                return EstadisticasService.estadisticas_ingresos(fecha_inicio, fecha_fin)
-            elif tipo == 'calificaciones':
-                return EstadisticasService.estadisticas_calificaciones(fecha_inicio, fecha_fin)
-            else:
+            consultas = {
+                'usuarios': EstadisticasService.estadisticas_usuarios,
+                'servicios': EstadisticasService.estadisticas_servicios,
+                'ingresos': EstadisticasService.estadisticas_ingresos,
+                'calificaciones': EstadisticasService.estadisticas_calificaciones,
+            }
+            if tipo not in consultas:
                 raise ValueError(f"Tipo de estadística inválido: {tipo}")
+            
+            AgregacionService.actualizar(esperar=False)
+            return consultas[tipo](fecha_inicio, fecha_fin)
                 
         except Exception as e:
             logger.error(f"Error al consultar estadísticas tipo {tipo}: {str(e)}")
@@ -0,0 +1,38 @@
+"""
+Señales de la app Reportes.
+Marcan para recalcular los días de los agregados diarios afectados por
+cambios que la marca de agua no detecta: filas eliminadas y calificaciones
+editadas (no tienen fecha de modificación).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.usuarios.models import Usuario
+from apps.turnos.models import Turno, Calificacion
+from .agregacion_services import AgregacionService
+
+
+@receiver(post_delete, sender=Turno)
+def marcar_turno_eliminado(sender, instance, **kwargs):
+    """El día de solicitud del turno eliminado debe recalcularse"""
+    AgregacionService.marcar_pendiente('turnos', instance.__dict__.get('fecha_solicitud'))
+
+
+@receiver(post_delete, sender=Usuario)
+def marcar_usuario_eliminado(sender, instance, **kwargs):
+    """El día de alta del usuario eliminado debe recalcularse"""
+    AgregacionService.marcar_pendiente('usuarios', instance.__dict__.get('date_joined'))
+
+
+@receiver(post_save, sender=Calificacion)
+@receiver(post_delete, sender=Calificacion)
+def marcar_calificacion_modificada(sender, instance, created=False, **kwargs):
+    """
+    Una calificación editada o eliminada cambia su día y el del turno
+    calificado (promedio por servicio); las nuevas las ve la marca de agua.
+    """
+    if created:
+        return
+    AgregacionService.marcar_pendiente('calificaciones', instance.__dict__.get('fecha'))
+    solicitud = Turno.objects.filter(id=instance.turno_id).values_list('fecha_solicitud', flat=True).first()
+    AgregacionService.marcar_pendiente('turnos', solicitud)
@@ -0,0 +1,242 @@
+"""
+Tests para las estadísticas leídas desde los agregados diarios.
+
+Para ejecutar:
+    python manage.py test apps.reportes.tests_estadisticas
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+import random
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, Calificacion
+from apps.reportes.models import TurnoDiario, ActividadDiaria, AltaDiaria, CalificacionDiaria, DiaPendiente
+from apps.reportes.agregacion_services import AgregacionService
+from apps.reportes.services import EstadisticasService
+
+
+class AgregadosBaseTestCase(TestCase):
+    """Turnos, altas y calificaciones al azar repartidos en los últimos 60 días"""
+
+    DIAS = 60
+
+    def setUp(self):
+        self.generador = random.Random(3)
+        self.hoy = timezone.localdate()
+        self.clientes = [self._usuario(f'cliente{numero}', 'cliente') for numero in range(4)]
+        self.clientes = [Cliente.objects.create(usuario=usuario) for usuario in self.clientes]
+        self.profesionales = [
+            Profesional.objects.create(usuario=self._usuario(f'tecnico{numero}', 'profesional'), especialidades='-')
+            for numero in range(3)
+        ]
+        self.servicios = []
+        for nombre in ('Limpieza', 'Gas'):
+            categoria = Categoria.objects.create(nombre=nombre, descripcion=nombre)
+            for numero, profesional in enumerate(self.profesionales):
+                self.servicios.append(Servicio.objects.create(
+                    nombre=f'{nombre} {numero}', descripcion='-', categoria=categoria, profesional=profesional,
+                    precio_base=Decimal('1000.00'), duracion_estimada=60
+                ))
+        self.turnos = [self._turno(self.generador.randint(0, self.DIAS)) for _ in range(150)]
+        for turno in self.generador.sample(self.turnos, 60):
+            self._calificar(turno)
+
+    def _momento(self, dias_atras, hora=None):
+        """Un momento local del día indicado (hora al azar por defecto)"""
+        hora = self.generador.randint(0, 23) if hora is None else hora
+        return AgregacionService.inicio_dia(self.hoy - timedelta(days=dias_atras)) + timedelta(hours=hora, minutes=30)
+
+    def _usuario(self, username, rol, dias_atras=None):
+        usuario = Usuario.objects.create_user(username=username, email=f'{username}@test.com', password='x', rol=rol)
+        dias_atras = self.generador.randint(0, self.DIAS) if dias_atras is None else dias_atras
+        Usuario.objects.filter(pk=usuario.pk).update(date_joined=self._momento(dias_atras))
+        return Usuario.objects.get(pk=usuario.pk)
+
+    def _turno(self, dias_atras, estado=None):
+        servicio = self.generador.choice(self.servicios)
+        turno = Turno.objects.create(
+            cliente=self.generador.choice(self.clientes), profesional=servicio.profesional, servicio=servicio,
+            fecha=self.hoy + timedelta(days=self.generador.randint(1, 400)),
+            hora=time(self.generador.randint(0, 23), self.generador.choice([0, 15, 30, 45])),
+            direccion_servicio='Calle 123', precio_final=Decimal(self.generador.randint(500, 1000)),
+            estado=estado or self.generador.choice(['pendiente', 'completado', 'completado', 'cancelado']),
+        )
+        Turno.objects.filter(pk=turno.pk).update(fecha_solicitud=self._momento(dias_atras))
+        turno.refresh_from_db()
+        return turno
+
+    def _calificar(self, turno, puntuacion=None):
+        calificacion = Calificacion.objects.create(
+            turno=turno, cliente=turno.cliente.usuario, puntuacion=puntuacion or self.generador.randint(1, 5)
+        )
+        Calificacion.objects.filter(pk=calificacion.pk).update(
+            fecha=turno.fecha_solicitud + timedelta(days=self.generador.randint(0, 5))
+        )
+        return calificacion
+
+    def _filas(self):
+        """Contenido de todos los agregados, para comparar actualización y reconstrucción"""
+        return {
+            modelo.__name__: sorted(
+                tuple(str(valor) for valor in fila)
+                for fila in modelo.objects.values_list(*[campo.attname for campo in modelo._meta.fields if campo.name != 'id'])
+            )
+            for modelo in (TurnoDiario, ActividadDiaria, AltaDiaria, CalificacionDiaria)
+        }
+
+
+class EstadisticasAgregadasTestCase(AgregadosBaseTestCase):
+    """Las estadísticas coinciden con recorrer las tablas originales"""
+
+    def _consultar(self, tipo, desde, hasta):
+        return EstadisticasService.consultar_estadisticas(
+            tipo, 'personalizado', AgregacionService.inicio_dia(desde), AgregacionService.inicio_dia(hasta)
+        )
+
+    def test_coinciden_con_las_tablas_originales(self):
+        """Cada tipo de estadística da lo mismo que el cálculo fila por fila"""
+        for desde_atras, hasta_atras in [(self.DIAS, 0), (20, 10), (5, 5)]:
+            desde = self.hoy - timedelta(days=desde_atras)
+            hasta = self.hoy - timedelta(days=hasta_atras)
+            with self.subTest(desde=desde, hasta=hasta):
+                turnos = [t for t in Turno.objects.all() if desde <= timezone.localdate(t.fecha_solicitud) <= hasta]
+                completados = [t for t in turnos if t.estado == 'completado']
+
+                servicios = self._consultar('servicios', desde, hasta)
+                self.assertEqual(servicios['total_turnos'], len(turnos))
+                self.assertEqual(servicios['turnos_completados'], len(completados))
+                self.assertEqual(
+                    {item['estado']: item['cantidad'] for item in servicios['turnos_por_estado']},
+                    {estado: sum(t.estado == estado for t in turnos) for estado in {t.estado for t in turnos}}
+                )
+                for item in servicios['servicios_populares']:
+                    propios = [t for t in turnos if t.servicio_id == item['servicio__id']]
+                    puntos = [c.puntuacion for t in propios for c in t.calificaciones.all()]
+                    self.assertEqual(item['cantidad_solicitudes'], len(propios))
+                    self.assertAlmostEqual(item['calificacion_promedio'] or 0, sum(puntos) / len(puntos) if puntos else 0)
+
+                ingresos = self._consultar('ingresos', desde, hasta)
+                self.assertEqual(Decimal(str(ingresos['ingresos_totales'])), sum(t.precio_final for t in completados))
+                self.assertEqual(
+                    {item['categoria']: item['cantidad'] for item in ingresos['ingresos_por_categoria']},
+                    {
+                        nombre: sum(t.servicio.categoria.nombre == nombre for t in completados)
+                        for nombre in {t.servicio.categoria.nombre for t in completados}
+                    }
+                )
+                self.assertEqual(sum(item['cantidad_turnos'] for item in ingresos['ingresos_por_mes']), len(completados))
+
+                calificaciones = [
+                    c for c in Calificacion.objects.all() if desde <= timezone.localdate(c.fecha) <= hasta
+                ]
+                resultado = self._consultar('calificaciones', desde, hasta)
+                self.assertEqual(resultado['total_calificaciones'], len(calificaciones))
+                self.assertEqual(
+                    {item['puntuacion']: item['cantidad'] for item in resultado['distribucion']},
+                    {p: sum(c.puntuacion == p for c in calificaciones) for p in {c.puntuacion for c in calificaciones}}
+                )
+                if calificaciones:
+                    self.assertEqual(
+                        resultado['calificacion_promedio'],
+                        round(sum(c.puntuacion for c in calificaciones) / len(calificaciones), 2)
+                    )
+
+                usuarios = [u for u in Usuario.objects.all() if desde <= timezone.localdate(u.date_joined) <= hasta]
+                resultado = self._consultar('usuarios', desde, hasta)
+                self.assertEqual(resultado['total_usuarios'], len(usuarios))
+                self.assertEqual(
+                    resultado['usuarios_activos'],
+                    len({t.cliente.usuario_id for t in turnos} | {t.profesional.usuario_id for t in turnos})
+                )
+
+    def test_lectura_no_recorre_las_tablas_originales(self):
+        """Con los agregados al día, ninguna estadística consulta turnos ni calificaciones"""
+        AgregacionService.actualizar()
+        inicio, fin = EstadisticasService.obtener_rango_fechas('anio')
+        for tipo in ('usuarios', 'servicios', 'ingresos', 'calificaciones'):
+            with self.subTest(tipo=tipo), CaptureQueriesContext(connection) as consultas:
+                getattr(EstadisticasService, f'estadisticas_{tipo}')(inicio, fin)
+            tablas = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+            self.assertNotIn('"turnos_turno"', tablas)
+            self.assertNotIn('"turnos_calificacion"', tablas)
+        self.assertLess(TurnoDiario.objects.count(), Turno.objects.count())
+
+
+class AgregacionIncrementalTestCase(AgregadosBaseTestCase):
+    """Tests de la actualización desde la marca de agua"""
+
+    def setUp(self):
+        super().setUp()
+        # Sin margen: solo lo modificado después de cada actualización
+        patcher = mock.patch.object(AgregacionService, 'MARGEN', timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertEqual(set(AgregacionService.actualizar().values()), {None})
+
+    def test_solo_recalcula_dias_modificados(self):
+        """Sin cambios no recalcula nada; un cambio recalcula solo su día"""
+        self.assertEqual(AgregacionService.actualizar(), {'turnos': 0, 'usuarios': 0, 'calificaciones': 0})
+
+        viejo = min(self.turnos, key=lambda turno: turno.fecha_solicitud)
+        Turno.objects.filter(pk=viejo.pk).update(estado='cancelado', fecha_actualizacion=timezone.now())
+        with mock.patch.object(AgregacionService, '_calcular_turnos', wraps=AgregacionService._calcular_turnos) as calcular:
+            self.assertEqual(AgregacionService.actualizar(), {'turnos': 1, 'usuarios': 0, 'calificaciones': 0})
+        calcular.assert_called_once_with([timezone.localdate(viejo.fecha_solicitud)])
+
+    def test_actualizacion_igual_a_reconstruccion(self):
+        """Altas, ediciones, cambios masivos y bajas llegan a los agregados"""
+        nuevo = self._turno(0, estado='pendiente')
+        nuevo.estado = 'completado'
+        nuevo.save()
+        # UPDATE masivo con fecha de modificación, como las transiciones
+        ids = [turno.id for turno in self.turnos[:10]]
+        Turno.objects.filter(id__in=ids).update(estado='cancelado', fecha_actualizacion=timezone.now())
+        # Bajas y edición de calificaciones: días pendientes
+        Turno.objects.filter(id__in=[turno.id for turno in self.turnos[10:15]]).delete()
+        calificacion = Calificacion.objects.filter(turno_id__in=[t.id for t in self.turnos[20:]]).first()
+        calificacion.puntuacion = 6 - calificacion.puntuacion if calificacion.puntuacion != 3 else 1
+        calificacion.save()
+        self._calificar(nuevo, 4)
+        self._usuario('nuevo', 'cliente', dias_atras=0)
+        Usuario.objects.get(username='cliente0').delete()
+        self.assertTrue(DiaPendiente.objects.exists())
+
+        AgregacionService.actualizar()
+        incremental = self._filas()
+        self.assertFalse(DiaPendiente.objects.exists())
+        AgregacionService.reconstruir()
+        self.assertEqual(incremental, self._filas())
+
+    def test_comando(self):
+        """El comando actualiza y reconstruye"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        salida = StringIO()
+        call_command('actualizar_agregados_diarios', stdout=salida)
+        call_command('actualizar_agregados_diarios', '--reconstruir', stdout=salida)
+        self.assertIn('Días recalculados', salida.getvalue())
+        self.assertIn('Agregados reconstruidos', salida.getvalue())
+
+
+class EstadisticasAPITestCase(AgregadosBaseTestCase):
+    """Tests para GET /api/reportes/estadisticas/"""
+
+    def test_todos_los_tipos(self):
+        """Los cuatro tipos responden desde los agregados"""
+        cliente = APIClient()
+        cliente.force_authenticate(user=self._usuario('admin', 'administrador'))
+        for tipo in ('usuarios', 'servicios', 'ingresos', 'calificaciones'):
+            with self.subTest(tipo=tipo):
+                response = cliente.get('/api/reportes/estadisticas/', {'tipo': tipo, 'periodo': 'anio'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertTrue(response.data['success'])
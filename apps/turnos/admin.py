@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Turno, Pago, Calificacion
+from .models import Turno, Pago, Calificacion, SlotDisponible, EsperaSlot
 
 @admin.register(Turno)
 class TurnoAdmin(admin.ModelAdmin):
@@ -19,4 +19,16 @@ class CalificacionAdmin(admin.ModelAdmin):
     list_display = ('turno', 'cliente', 'puntuacion', 'fecha')
     list_filter = ('puntuacion', 'fecha')
     search_fields = ('cliente__username', 'turno__id', 'comentario')
-    readonly_fields = ('fecha',)
\ No newline at end of file
+    readonly_fields = ('fecha',)
+
+@admin.register(SlotDisponible)
+class SlotDisponibleAdmin(admin.ModelAdmin):
+    list_display = ('servicio', 'profesional', 'fecha', 'hora')
+    list_filter = ('fecha',)
+    search_fields = ('servicio__nombre', 'profesional__usuario__username')
+
+@admin.register(EsperaSlot)
+class EsperaSlotAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'servicio', 'fecha_desde', 'fecha_hasta', 'estado', 'fecha_creacion')
+    list_filter = ('estado',)
+    search_fields = ('cliente__usuario__username', 'servicio__nombre')
@@ -5,3 +5,6 @@ class TurnosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.turnos'
     verbose_name = 'Turnos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
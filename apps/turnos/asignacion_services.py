@@ -0,0 +1,192 @@
+"""
+Asignación automática de profesionales.
+Puntúa a los profesionales que pueden atender un servicio en una fecha
+(y opcionalmente una hora) y devuelve los mejores o asigna uno.
+"""
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.usuarios.geo_services import GeoService
+from .models import Turno, SlotDisponible
+
+
+class AsignacionService:
+    """
+    Servicio de ranking de profesionales.
+
+    Las características de cada candidato (calificación, distancia, carga
+    del día y experiencia) se cargan en bloque con una cantidad constante
+    de consultas y el puntaje se calcula en una sola pasada en memoria.
+    """
+
+    PESOS = {
+        'calificacion': 0.40,
+        'distancia': 0.30,
+        'carga': 0.20,
+        'experiencia': 0.10,
+    }
+    EXPERIENCIA_MAXIMA = 20  # Años a partir de los cuales no suma más puntaje
+    K_DEFAULT = 5
+
+    @staticmethod
+    def cargar_candidatos(servicio, fecha, hora=None):
+        """
+        Profesionales con un slot libre para servicios de la misma categoría.
+
+        Args:
+            servicio (Servicio): Servicio solicitado
+            fecha (date): Día del turno
+            hora (time, optional): Hora exacta del turno
+
+        Returns:
+            dict: {profesional_id: {'profesional', 'servicio_id', 'hora'}}
+                  con el primer slot libre de cada profesional
+        """
+        slots = SlotDisponible.objects.filter(
+            servicio__categoria_id=servicio.categoria_id,
+            servicio__activo=True,
+            fecha=fecha,
+            profesional__usuario__activo=True,
+            profesional__disponible=True
+        )
+        if hora is not None:
+            slots = slots.filter(hora=hora)
+        if fecha == timezone.localdate():
+            slots = slots.filter(hora__gt=timezone.localtime().time())
+
+        candidatos = {}
+        # Se prefiere el slot del servicio solicitado, luego el más temprano
+        for slot in slots.select_related('profesional__usuario').order_by('hora'):
+            actual = candidatos.get(slot.profesional_id)
+            if actual is None or (slot.servicio_id == servicio.id and actual['servicio_id'] != servicio.id):
+                candidatos[slot.profesional_id] = {
+                    'profesional': slot.profesional,
+                    'servicio_id': slot.servicio_id,
+                    'hora': slot.hora,
+                }
+        return candidatos
+
+    @staticmethod
+    def cargar_carga_dia(profesional_ids, fecha):
+        """
+        Turnos activos de cada profesional en el día, en una sola consulta.
+
+        Returns:
+            dict: {profesional_id: cantidad}
+        """
+        return dict(
+            Turno.objects.filter(
+                profesional_id__in=profesional_ids,
+                fecha=fecha,
+                estado__in=Turno.ESTADOS_ACTIVOS
+            ).values('profesional_id').annotate(cantidad=Count('id')).values_list('profesional_id', 'cantidad')
+        )
+
+    @staticmethod
+    def puntuar(caracteristicas):
+        """
+        Calcula el puntaje de cada candidato a partir de sus características.
+
+        Cada característica se normaliza a [0, 1] (1 es mejor) y se combina
+        con PESOS. Sin ubicación, la distancia no discrimina entre candidatos.
+
+        Args:
+            caracteristicas (list[dict]): Con claves calificacion, distancia_km,
+                radio_km, carga y experiencia
+
+        Returns:
+            list[float]: Puntaje de cada candidato, en el mismo orden
+        """
+        if not caracteristicas:
+            return []
+
+        carga_maxima = max(c['carga'] for c in caracteristicas) or 1
+        pesos = AsignacionService.PESOS
+        puntajes = []
+        for c in caracteristicas:
+            if c['distancia_km'] is None:
+                cercania = 0.5
+            else:
+                cercania = 1 - min(c['distancia_km'] / c['radio_km'], 1) if c['radio_km'] else 0
+            puntajes.append(round(
+                pesos['calificacion'] * c['calificacion'] / 5 +
+                pesos['distancia'] * cercania +
+                pesos['carga'] * (1 - c['carga'] / carga_maxima) +
+                pesos['experiencia'] * min(c['experiencia'], AsignacionService.EXPERIENCIA_MAXIMA) /
+                AsignacionService.EXPERIENCIA_MAXIMA,
+                4
+            ))
+        return puntajes
+
+    @staticmethod
+    def rankear_profesionales(servicio, fecha, hora=None, latitud=None, longitud=None, k=None):
+        """
+        Devuelve los k mejores profesionales para un servicio y horario.
+
+        Args:
+            servicio (Servicio): Servicio solicitado
+            fecha (date): Día del turno
+            hora (time, optional): Hora exacta del turno
+            latitud (float, optional): Ubicación del turno
+            longitud (float, optional): Ubicación del turno
+            k (int, optional): Cantidad de candidatos (default: K_DEFAULT)
+
+        Returns:
+            list[dict]: Candidatos ordenados por puntaje descendente
+        """
+        k = k or AsignacionService.K_DEFAULT
+        candidatos = AsignacionService.cargar_candidatos(servicio, fecha, hora)
+
+        # Con ubicación, descartar a quienes no llegan al punto
+        distancias = {}
+        if latitud is not None and longitud is not None:
+            distancias = {
+                p.id: p.distancia_km for p in GeoService.profesionales_cercanos(latitud, longitud)
+            }
+            candidatos = {pid: c for pid, c in candidatos.items() if pid in distancias}
+
+        if not candidatos:
+            return []
+
+        carga = AsignacionService.cargar_carga_dia(list(candidatos), fecha)
+
+        profesional_ids = list(candidatos)
+        caracteristicas = []
+        for pid in profesional_ids:
+            profesional = candidatos[pid]['profesional']
+            caracteristicas.append({
+                'calificacion': float(profesional.calificacion_promedio),
+                'distancia_km': distancias.get(pid),
+                'radio_km': float(profesional.radio_cobertura_km),
+                'carga': carga.get(pid, 0),
+                'experiencia': profesional.anios_experiencia,
+            })
+
+        puntajes = AsignacionService.puntuar(caracteristicas)
+
+        ranking = []
+        for pid, datos, puntaje in zip(profesional_ids, caracteristicas, puntajes):
+            candidato = candidatos[pid]
+            ranking.append({
+                'profesional_id': pid,
+                'nombre': candidato['profesional'].usuario.get_full_name(),
+                'servicio_id': candidato['servicio_id'],
+                'fecha': fecha,
+                'hora': candidato['hora'],
+                'puntaje': puntaje,
+                **datos,
+            })
+
+        ranking.sort(key=lambda c: (-c['puntaje'], c['profesional_id']))
+        return ranking[:k]
+
+    @staticmethod
+    def mejor_candidato(servicio, fecha, hora=None, latitud=None, longitud=None):
+        """
+        Candidato con mayor puntaje, para asignación automática.
+
+        Returns:
+            dict|None: Mejor candidato o None si nadie está disponible
+        """
+        ranking = AsignacionService.rankear_profesionales(servicio, fecha, hora, latitud, longitud, k=1)
+        return ranking[0] if ranking else None
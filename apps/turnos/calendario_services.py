@@ -0,0 +1,250 @@
+"""
+Calendario materializado de slots disponibles.
+Mantiene la tabla SlotDisponible para un horizonte móvil de días, de modo
+que la búsqueda de disponibilidad sea un único rango sobre un índice.
+"""
+import threading
+from datetime import datetime, timedelta
+import logging
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from apps.servicios.models import Servicio
+from .models import SlotDisponible, ReservaSlot
+from .disponibilidad_services import DisponibilidadService
+
+logger = logging.getLogger(__name__)
+
+# Recálculos pendientes del hilo actual: {profesional_id: set(fechas) | None (todo el horizonte)}
+_local = threading.local()
+
+
+class CalendarioSlotsService:
+    """
+    Servicio para construir y mantener el calendario de slots.
+
+    Los cambios de turnos recalculan solo el día afectado del profesional;
+    los cambios de horarios o servicios recalculan su horizonte completo.
+    """
+
+    HORIZONTE_DIAS = 30
+
+    @staticmethod
+    def fin_horizonte(dias=None):
+        """
+        Último día (inclusive) del horizonte materializado.
+
+        Args:
+            dias (int, optional): Días del horizonte (default: HORIZONTE_DIAS)
+        """
+        return timezone.localdate() + timedelta(days=(dias or CalendarioSlotsService.HORIZONTE_DIAS) - 1)
+
+    @staticmethod
+    @transaction.atomic
+    def recalcular(profesional_ids, fecha_desde, fecha_hasta):
+        """
+        Regenera los slots de varios profesionales en un rango de fechas.
+
+        Usa una cantidad constante de consultas: servicios, horarios,
+        turnos bloqueantes, borrado e inserción masiva.
+
+        Args:
+            profesional_ids (list[int]): IDs de los profesionales
+            fecha_desde (date): Primer día a regenerar
+            fecha_hasta (date): Último día a regenerar (inclusive)
+
+        Returns:
+            int: Cantidad de slots creados
+        """
+        profesional_ids = list(profesional_ids)
+        if not profesional_ids or fecha_desde > fecha_hasta:
+            return 0
+
+        servicios = list(Servicio.objects.filter(
+            profesional_id__in=profesional_ids,
+            activo=True
+        ).values_list('id', 'profesional_id', 'duracion_estimada'))
+
+        # Se borran también los slots de servicios que cambiaron de profesional
+        SlotDisponible.objects.filter(
+            Q(profesional_id__in=profesional_ids) | Q(servicio_id__in=[s[0] for s in servicios]),
+            fecha__range=(fecha_desde, fecha_hasta)
+        ).delete()
+
+        if not servicios:
+            return 0
+
+        dias = (fecha_hasta - fecha_desde).days + 1
+        horarios = DisponibilidadService.cargar_horarios(profesional_ids)
+        ocupacion = DisponibilidadService.cargar_ocupacion(profesional_ids, fecha_desde, fecha_hasta)
+
+        nuevos = []
+        for servicio_id, profesional_id, duracion_estimada in servicios:
+            slots = DisponibilidadService.slots_profesional(
+                horarios.get(profesional_id),
+                ocupacion,
+                profesional_id,
+                fecha_desde,
+                dias,
+                DisponibilidadService.duracion_slot(duracion_estimada),
+                datetime.min
+            )
+            nuevos.extend(
+                SlotDisponible(
+                    profesional_id=profesional_id,
+                    servicio_id=servicio_id,
+                    fecha=slot.date(),
+                    hora=slot.time()
+                )
+                for slot in slots
+            )
+
+        SlotDisponible.objects.bulk_create(nuevos, batch_size=1000)
+        return len(nuevos)
+
+    @staticmethod
+    def recalcular_dia(profesional_id, fecha):
+        """Regenera los slots de un profesional para un día del horizonte"""
+        if not (timezone.localdate() <= fecha <= CalendarioSlotsService.fin_horizonte()):
+            return 0
+        return CalendarioSlotsService.recalcular([profesional_id], fecha, fecha)
+
+    @staticmethod
+    def recalcular_profesional(profesional_id):
+        """Regenera todo el horizonte de un profesional"""
+        return CalendarioSlotsService.recalcular(
+            [profesional_id], timezone.localdate(), CalendarioSlotsService.fin_horizonte()
+        )
+
+    @staticmethod
+    def reconstruir(dias=None):
+        """
+        Reconstruye el calendario completo desde cero.
+
+        Args:
+            dias (int, optional): Días del horizonte (default: HORIZONTE_DIAS)
+
+        Returns:
+            int: Cantidad de slots creados
+        """
+        hoy = timezone.localdate()
+        SlotDisponible.objects.filter(fecha__lt=hoy).delete()
+        profesional_ids = Servicio.objects.filter(
+            profesional__isnull=False,
+            activo=True
+        ).values_list('profesional_id', flat=True).distinct()
+
+        # Se incluyen los profesionales que ya tenían slots (p. ej. sin servicios activos)
+        profesional_ids = set(profesional_ids) | set(
+            SlotDisponible.objects.values_list('profesional_id', flat=True).distinct()
+        )
+        return CalendarioSlotsService.recalcular(profesional_ids, hoy, CalendarioSlotsService.fin_horizonte(dias))
+
+    @staticmethod
+    def extender_horizonte(dias=None):
+        """
+        Descarta los días pasados y materializa los días nuevos del horizonte.
+        Pensado para ejecutarse una vez por noche.
+
+        Args:
+            dias (int, optional): Días del horizonte (default: HORIZONTE_DIAS)
+
+        Returns:
+            int: Cantidad de slots creados
+        """
+        hoy = timezone.localdate()
+        SlotDisponible.objects.filter(fecha__lt=hoy).delete()
+
+        ultima_fecha = SlotDisponible.objects.aggregate(ultima=Max('fecha'))['ultima']
+        fecha_desde = max(ultima_fecha + timedelta(days=1), hoy) if ultima_fecha else hoy
+
+        profesional_ids = Servicio.objects.filter(
+            profesional__isnull=False,
+            activo=True
+        ).values_list('profesional_id', flat=True).distinct()
+        return CalendarioSlotsService.recalcular(
+            profesional_ids, fecha_desde, CalendarioSlotsService.fin_horizonte(dias)
+        )
+
+    @staticmethod
+    def programar_recalculo(profesional_id, fecha=None):
+        """
+        Agenda un recálculo para cuando se confirme la transacción actual.
+        Los pedidos repetidos dentro de la misma transacción se agrupan.
+
+        Args:
+            profesional_id (int): ID del profesional
+            fecha (date, optional): Día afectado; None recalcula todo el horizonte
+        """
+        if not profesional_id:
+            return
+
+        pendientes = _local.__dict__.setdefault('pendientes', {})
+        if fecha is None:
+            pendientes[profesional_id] = None
+        elif pendientes.get(profesional_id, set()) is not None:
+            pendientes.setdefault(profesional_id, set()).add(fecha)
+
+        # robust: un fallo del recálculo se registra pero no afecta a la
+        # operación ya confirmada (actualizar_calendario_slots --reconstruir lo corrige)
+        transaction.on_commit(CalendarioSlotsService.procesar_pendientes, robust=True)
+
+    @staticmethod
+    def procesar_pendientes():
+        """Ejecuta los recálculos agendados en el hilo actual"""
+        pendientes = _local.__dict__.pop('pendientes', None)
+        if not pendientes:
+            return
+
+        completos = [pid for pid, fechas in pendientes.items() if fechas is None]
+        if completos:
+            CalendarioSlotsService.recalcular(
+                completos, timezone.localdate(), CalendarioSlotsService.fin_horizonte()
+            )
+
+        for profesional_id, fechas in pendientes.items():
+            for fecha in sorted(fechas or ()):
+                CalendarioSlotsService.recalcular_dia(profesional_id, fecha)
+
+    @staticmethod
+    def buscar_slots(servicio, fecha_desde=None, dias=None, profesional_ids=None):
+        """
+        Obtiene los slots libres de un servicio con un único rango indexado.
+
+        Solo incluye profesionales activos y disponibles, y descarta los
+        horarios de hoy que ya pasaron y los retenidos por una reserva vigente.
+
+        Args:
+            servicio (Servicio): Servicio a reservar
+            fecha_desde (date, optional): Primer día (default: hoy)
+            dias (int, optional): Cantidad de días (default: DIAS_A_MOSTRAR)
+            profesional_ids (list[int], optional): Restringir a estos profesionales
+
+        Returns:
+            QuerySet: SlotDisponible ordenados por profesional, fecha y hora
+        """
+        ahora = timezone.localtime()
+        fecha_desde = fecha_desde or ahora.date()
+        dias = dias or DisponibilidadService.DIAS_A_MOSTRAR
+
+        slots = SlotDisponible.objects.filter(
+            servicio=servicio,
+            fecha__range=(fecha_desde, fecha_desde + timedelta(days=dias - 1)),
+            profesional__usuario__activo=True,
+            profesional__disponible=True
+        )
+        # Ocultar los horarios retenidos por otro cliente
+        slots = slots.exclude(Exists(ReservaSlot.objects.filter(
+            profesional_id=OuterRef('profesional_id'),
+            fecha=OuterRef('fecha'),
+            hora=OuterRef('hora'),
+            vence__gt=ahora
+        )))
+        if profesional_ids is not None:
+            slots = slots.filter(profesional_id__in=profesional_ids)
+        if fecha_desde <= ahora.date():
+            slots = slots.exclude(fecha=ahora.date(), hora__lte=ahora.time())
+
+        return slots.select_related('profesional__usuario').order_by('profesional_id', 'fecha', 'hora')
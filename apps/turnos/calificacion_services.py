@@ -0,0 +1,108 @@
+"""
+Agregados de calificaciones de profesionales.
+Mantiene cantidad, suma, histograma de estrellas y promedio en Profesional
+con actualizaciones atómicas, sin releer las calificaciones existentes.
+"""
+from decimal import Decimal
+import logging
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+
+from apps.usuarios.models import Profesional
+from .models import Calificacion
+
+logger = logging.getLogger(__name__)
+
+
+class CalificacionService:
+    """
+    Servicio de agregados de calificaciones.
+
+    Cada alta o baja de una Calificacion se traduce en un único UPDATE con
+    expresiones F() sobre la fila del profesional, por lo que calificar
+    cuesta lo mismo sin importar cuántas reseñas tenga. El comando
+    reconciliar_calificaciones reconstruye los agregados desde cero.
+    """
+
+    PUNTUACIONES = range(1, 6)
+
+    @staticmethod
+    def campo_estrellas(puntuacion):
+        """Nombre del campo del histograma para una puntuación"""
+        return f'estrellas_{puntuacion}'
+
+    @staticmethod
+    def aplicar(profesional_id, puntuacion, delta):
+        """
+        Suma (delta=1) o resta (delta=-1) una calificación a los agregados.
+
+        El promedio se calcula en el mismo UPDATE con los valores previos
+        de la fila, así dos calificaciones simultáneas no se pisan.
+
+        Args:
+            profesional_id (int): ID del profesional calificado
+            puntuacion (int): Puntuación de 1 a 5
+            delta (int): 1 al crear la calificación, -1 al eliminarla
+
+        Returns:
+            bool: True si se actualizó el profesional
+        """
+        if puntuacion not in CalificacionService.PUNTUACIONES:
+            logger.warning(f"Puntuación fuera de rango para profesional {profesional_id}: {puntuacion}")
+            return False
+
+        suma = F('calificaciones_suma') + delta * puntuacion
+        cantidad = F('calificaciones_cantidad') + delta
+        campo = CalificacionService.campo_estrellas(puntuacion)
+
+        return Profesional.objects.filter(pk=profesional_id).update(
+            calificaciones_cantidad=cantidad,
+            calificaciones_suma=suma,
+            **{campo: F(campo) + delta},
+            calificacion_promedio=Case(
+                When(calificaciones_cantidad=-delta, then=Value(Decimal('0'))),
+                # Convertir a real evita la división entera
+                default=Round(Cast(suma, FloatField()) / cantidad, 2),
+                output_field=DecimalField(max_digits=3, decimal_places=2)
+            )
+        ) > 0
+
+    @staticmethod
+    def reconciliar():
+        """
+        Reconstruye los agregados de todos los profesionales.
+
+        Lee las calificaciones con un único GROUP BY por (profesional, puntuación)
+        y corrige cualquier desvío de los contadores incrementales.
+
+        Returns:
+            int: Cantidad de profesionales actualizados
+        """
+        agregados = {}
+        filas = Calificacion.objects.filter(
+            puntuacion__range=(1, 5)
+        ).values_list('turno__profesional_id', 'puntuacion').annotate(
+            cantidad=Count('id')
+        ).order_by()
+        for profesional_id, puntuacion, cantidad in filas:
+            agregados.setdefault(profesional_id, {})[puntuacion] = cantidad
+
+        campos = ['calificacion_promedio', 'calificaciones_cantidad', 'calificaciones_suma'] + [
+            CalificacionService.campo_estrellas(p) for p in CalificacionService.PUNTUACIONES
+        ]
+        profesionales = list(Profesional.objects.only(*campos))
+        for profesional in profesionales:
+            histograma = agregados.get(profesional.id, {})
+            cantidad = sum(histograma.values())
+            suma = sum(p * n for p, n in histograma.items())
+            profesional.calificaciones_cantidad = cantidad
+            profesional.calificaciones_suma = suma
+            profesional.calificacion_promedio = round(Decimal(suma) / cantidad, 2) if cantidad else Decimal('0')
+            for puntuacion in CalificacionService.PUNTUACIONES:
+                setattr(profesional, CalificacionService.campo_estrellas(puntuacion), histograma.get(puntuacion, 0))
+
+        with transaction.atomic():
+            Profesional.objects.bulk_update(profesionales, campos, batch_size=500)
+        return len(profesionales)
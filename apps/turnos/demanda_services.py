@@ -0,0 +1,148 @@
+"""
+Mapa de calor de la demanda por categoría, día de la semana y hora.
+Cada categoría guarda una matriz 7×24 de enteros que se incrementa al
+crear un turno; el endpoint lee solo esas filas, nunca la tabla de turnos.
+"""
+import logging
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+from apps.servicios.models import Categoria, Servicio
+from apps.usuarios.models import HorarioDisponibilidad
+from .models import Turno, DemandaHoraria
+
+logger = logging.getLogger(__name__)
+
+
+class DemandaService:
+    """
+    Servicio del mapa de calor de demanda.
+
+    Los turnos se cuentan cuando se solicitan, aunque después se cancelen o
+    reprogramen: el mapa refleja en qué horarios piden los clientes. El
+    comando reconstruir_demanda lo recalcula desde cero.
+    """
+
+    TIPO = np.dtype('<i4')
+    FORMA = (DemandaHoraria.DIAS, DemandaHoraria.HORAS)
+
+    @staticmethod
+    def matriz(demanda):
+        """
+        Matriz 7×24 editable de una DemandaHoraria.
+
+        Returns:
+            numpy.ndarray: Conteos int32; ceros si la fila todavía no tiene datos
+        """
+        if not demanda.conteos:
+            return np.zeros(DemandaService.FORMA, dtype=DemandaService.TIPO)
+        return np.frombuffer(bytes(demanda.conteos), dtype=DemandaService.TIPO).reshape(DemandaService.FORMA).copy()
+
+    @staticmethod
+    def registrar(servicio_id, fecha, hora, delta=1):
+        """
+        Suma (o resta) un turno a la celda día/hora de la categoría del servicio.
+
+        Args:
+            servicio_id (int): Servicio del turno
+            fecha (date): Fecha del turno
+            hora (time): Hora del turno
+            delta (int): 1 al crear el turno, -1 al eliminarlo
+
+        Returns:
+            bool: True si se actualizó el mapa
+        """
+        categoria_id = Servicio.objects.filter(pk=servicio_id).values_list('categoria_id', flat=True).first()
+        if categoria_id is None or fecha is None or hora is None:
+            return False
+
+        with transaction.atomic():
+            demanda, _ = DemandaHoraria.objects.select_for_update().get_or_create(categoria_id=categoria_id)
+            matriz = DemandaService.matriz(demanda)
+            celda = (fecha.weekday(), hora.hour)
+            matriz[celda] = max(matriz[celda] + delta, 0)
+            demanda.conteos = matriz.tobytes()
+            demanda.total = int(matriz.sum())
+            demanda.save(update_fields=['conteos', 'total', 'fecha_actualizacion'])
+        return True
+
+    @staticmethod
+    def programar_registro(servicio_id, fecha, hora, delta=1):
+        """Actualiza el mapa cuando se confirme la transacción del turno"""
+        transaction.on_commit(
+            lambda: DemandaService.registrar(servicio_id, fecha, hora, delta),
+            robust=True
+        )
+
+    @staticmethod
+    def reconstruir():
+        """
+        Recalcula el mapa de todas las categorías con un único GROUP BY.
+
+        Returns:
+            int: Cantidad de categorías actualizadas
+        """
+        matrices = {
+            categoria_id: np.zeros(DemandaService.FORMA, dtype=DemandaService.TIPO)
+            for categoria_id in Categoria.objects.values_list('id', flat=True)
+        }
+        filas = (
+            Turno.objects
+            .annotate(dia=ExtractIsoWeekDay('fecha'), hora_del_dia=ExtractHour('hora'))
+            .values('servicio__categoria_id', 'dia', 'hora_del_dia')
+            .annotate(cantidad=Count('id'))
+            .order_by()
+        )
+        for fila in filas:
+            matrices[fila['servicio__categoria_id']][fila['dia'] - 1, fila['hora_del_dia']] = fila['cantidad']
+
+        DemandaHoraria.objects.bulk_create(
+            [
+                DemandaHoraria(categoria_id=categoria_id, conteos=matriz.tobytes(), total=int(matriz.sum()))
+                for categoria_id, matriz in matrices.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['categoria'],
+            update_fields=['conteos', 'total']
+        )
+        return len(matrices)
+
+    @staticmethod
+    def mapa(categoria_ids=None):
+        """
+        Mapa de calor listo para serializar como JSON.
+
+        Args:
+            categoria_ids (iterable, optional): Limitar a estas categorías
+
+        Returns:
+            dict: dias (etiquetas), horas y una entrada por categoría con
+                  conteos (7 listas de 24), total y el día/hora pico
+        """
+        demandas = DemandaHoraria.objects.select_related('categoria').order_by('categoria__nombre')
+        if categoria_ids is not None:
+            demandas = demandas.filter(categoria_id__in=categoria_ids)
+
+        categorias = []
+        for demanda in demandas:
+            matriz = DemandaService.matriz(demanda)
+            pico = None
+            if demanda.total:
+                dia, hora = np.unravel_index(int(matriz.argmax()), DemandaService.FORMA)
+                pico = {'dia': HorarioDisponibilidad.DIAS_SEMANA[dia][0], 'hora': int(hora)}
+            categorias.append({
+                'categoria_id': demanda.categoria_id,
+                'categoria': demanda.categoria.nombre,
+                'total': demanda.total,
+                'conteos': matriz.tolist(),
+                'pico': pico,
+            })
+
+        return {
+            'dias': [dia for dia, _ in HorarioDisponibilidad.DIAS_SEMANA],
+            'horas': list(range(DemandaHoraria.HORAS)),
+            'categorias': categorias,
+        }
@@ -0,0 +1,195 @@
+"""
+Motor de disponibilidad de turnos.
+Calcula los horarios libres de varios profesionales con una cantidad
+constante de consultas, sin importar cuántos profesionales o días se evalúen.
+Lo usa CalendarioSlotsService para materializar el calendario de slots.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from apps.usuarios.models import HorarioDisponibilidad
+from .models import Turno
+
+
+class DisponibilidadService:
+    """
+    Servicio para calcular la disponibilidad de profesionales.
+
+    Carga todos los horarios y todos los turnos que bloquean la ventana
+    en dos consultas, arma en memoria los intervalos ocupados de cada
+    profesional y genera los slots libres a partir de ellos.
+    """
+
+    DIAS_A_MOSTRAR = 14
+    DURACION_MINIMA = 60  # Los slots se generan cada hora como mínimo
+    DIAS_SEMANA = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
+
+    @staticmethod
+    def duracion_slot(duracion_estimada):
+        """
+        Duración en minutos que ocupa un turno de un servicio.
+
+        Args:
+            duracion_estimada (int): Duración estimada del servicio en minutos
+
+        Returns:
+            int: Duración del slot (nunca menor a DURACION_MINIMA)
+        """
+        return max(duracion_estimada or 0, DisponibilidadService.DURACION_MINIMA)
+
+    @staticmethod
+    def _minutos(hora):
+        """Convierte un time a minutos desde la medianoche"""
+        return hora.hour * 60 + hora.minute
+
+    @staticmethod
+    def cargar_horarios(profesional_ids):
+        """
+        Carga los horarios de todos los profesionales en una sola consulta.
+
+        Args:
+            profesional_ids (list[int]): IDs de los profesionales
+
+        Returns:
+            dict: {profesional_id: {dia_semana: (hora_inicio, hora_fin)}}
+        """
+        horarios = defaultdict(dict)
+        filas = HorarioDisponibilidad.objects.filter(
+            profesional_id__in=profesional_ids
+        ).values_list('profesional_id', 'dia_semana', 'hora_inicio', 'hora_fin')
+
+        for profesional_id, dia_semana, hora_inicio, hora_fin in filas:
+            horarios[profesional_id][dia_semana] = (hora_inicio, hora_fin)
+
+        return horarios
+
+    @staticmethod
+    def cargar_ocupacion(profesional_ids, fecha_desde, fecha_hasta):
+        """
+        Carga los turnos que bloquean horarios en la ventana en una sola consulta.
+
+        Args:
+            profesional_ids (list[int]): IDs de los profesionales
+            fecha_desde (date): Primer día de la ventana
+            fecha_hasta (date): Último día de la ventana (inclusive)
+
+        Returns:
+            dict: {(profesional_id, fecha): [(inicio_min, fin_min), ...]} ordenado y sin solapes
+        """
+        ocupacion = defaultdict(list)
+        filas = Turno.objects.filter(
+            profesional_id__in=profesional_ids,
+            fecha__range=(fecha_desde, fecha_hasta),
+            estado__in=Turno.ESTADOS_ACTIVOS
+        ).values_list('profesional_id', 'fecha', 'hora', 'servicio__duracion_estimada')
+
+        for profesional_id, fecha, hora, duracion in filas:
+            inicio = DisponibilidadService._minutos(hora)
+            fin = inicio + DisponibilidadService.duracion_slot(duracion)
+            ocupacion[(profesional_id, fecha)].append((inicio, fin))
+
+        return {
+            clave: DisponibilidadService._fusionar(intervalos)
+            for clave, intervalos in ocupacion.items()
+        }
+
+    @staticmethod
+    def _fusionar(intervalos):
+        """Ordena y fusiona intervalos superpuestos"""
+        fusionados = []
+        for inicio, fin in sorted(intervalos):
+            if fusionados and inicio < fusionados[-1][1]:
+                fusionados[-1] = (fusionados[-1][0], max(fusionados[-1][1], fin))
+            else:
+                fusionados.append((inicio, fin))
+        return fusionados
+
+    @staticmethod
+    def esta_libre(ocupados, inicio, fin):
+        """
+        Verifica si el intervalo [inicio, fin) no se superpone con ningún intervalo ocupado.
+
+        Args:
+            ocupados (list[tuple]): Intervalos ocupados, ordenados y sin solapes
+            inicio (int): Minuto de inicio del slot
+            fin (int): Minuto de fin del slot
+
+        Returns:
+            bool: True si el slot está libre
+        """
+        if not ocupados:
+            return True
+
+        # Solo pueden superponerse el intervalo anterior y los que empiezan antes del fin
+        pos = bisect_left(ocupados, (inicio,))
+        if pos > 0 and ocupados[pos - 1][1] > inicio:
+            return False
+        return not (pos < len(ocupados) and ocupados[pos][0] < fin)
+
+    @staticmethod
+    def generar_slots(fecha, hora_inicio, hora_fin, duracion, ocupados, ahora):
+        """
+        Genera los slots libres de un día de trabajo.
+
+        Args:
+            fecha (date): Día a evaluar
+            hora_inicio (time): Inicio de la jornada
+            hora_fin (time): Fin de la jornada
+            duracion (int): Duración del slot en minutos
+            ocupados (list[tuple]): Intervalos ocupados del profesional ese día
+            ahora (datetime): Momento actual (naive, hora local)
+
+        Returns:
+            list[datetime]: Inicio de cada slot libre
+        """
+        slots = []
+        hora_actual = datetime.combine(fecha, hora_inicio)
+        limite = datetime.combine(fecha, hora_fin)
+        paso = timedelta(minutes=duracion)
+
+        while hora_actual < limite:
+            inicio = DisponibilidadService._minutos(hora_actual)
+            if hora_actual > ahora and DisponibilidadService.esta_libre(ocupados, inicio, inicio + duracion):
+                slots.append(hora_actual)
+            hora_actual += paso
+
+        return slots
+
+    @staticmethod
+    def slots_profesional(horarios_profesional, ocupacion, profesional_id, fecha_desde, dias, duracion, ahora):
+        """
+        Genera los slots libres de un profesional a partir de datos ya cargados.
+
+        Args:
+            horarios_profesional (dict): {dia_semana: (hora_inicio, hora_fin)} o None
+            ocupacion (dict): Resultado de cargar_ocupacion
+            profesional_id (int): ID del profesional
+            fecha_desde (date): Primer día
+            dias (int): Cantidad de días
+            duracion (int): Duración del slot en minutos
+            ahora (datetime): Los slots anteriores a este momento se descartan
+
+        Returns:
+            list[datetime]: Inicio de cada slot libre
+        """
+        if not horarios_profesional:
+            return []
+
+        slots = []
+        for i in range(dias):
+            fecha = fecha_desde + timedelta(days=i)
+            horario_dia = horarios_profesional.get(DisponibilidadService.DIAS_SEMANA[fecha.weekday()])
+            if not horario_dia:
+                continue
+
+            slots.extend(DisponibilidadService.generar_slots(
+                fecha,
+                horario_dia[0],
+                horario_dia[1],
+                duracion,
+                ocupacion.get((profesional_id, fecha), []),
+                ahora
+            ))
+
+        return slots
@@ -0,0 +1,62 @@
+"""
+Emails a clientes sobre sus turnos.
+Por ahora, el aviso de un horario liberado ofrecido desde la lista de espera.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TurnoEmailService:
+    """
+    Servicio de emails de turnos.
+    """
+
+    @staticmethod
+    def enviar_oferta_espera(espera):
+        """
+        Avisa al cliente que se le retuvo un horario de su lista de espera.
+
+        Args:
+            espera (EsperaSlot): Espera ofrecida, con su reserva
+
+        Returns:
+            bool: True si el email se envió exitosamente
+        """
+        try:
+            reserva = espera.reserva
+            usuario = espera.cliente.usuario
+            vence = timezone.localtime(reserva.vence)
+
+            asunto = 'ServiHogar - Se liberó un horario para tu servicio'
+            mensaje = f"""
+            Hola {usuario.first_name},
+            
+            Se liberó un horario para {espera.servicio.nombre} que estabas esperando:
+            {reserva.fecha.strftime('%d/%m/%Y')} a las {reserva.hora.strftime('%H:%M')} con {reserva.profesional}.
+            
+            Te lo reservamos hasta las {vence.strftime('%H:%M')} del {vence.strftime('%d/%m/%Y')}.
+            Ingresá a ServiHogar para confirmar el turno. Si no lo confirmás a tiempo,
+            el horario se ofrecerá al siguiente cliente y saldrás de la lista de espera.
+            
+            Saludos,
+            El equipo de ServiHogar
+            """
+
+            send_mail(
+                asunto,
+                mensaje,
+                getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@servihogar.com'),
+                [usuario.email],
+                fail_silently=False,
+            )
+
+            logger.info(f"Oferta de lista de espera #{espera.pk} enviada a {usuario.email}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error al enviar la oferta de lista de espera #{espera.pk}: {str(e)}")
+            return False
@@ -0,0 +1,195 @@
+"""
+Lista de espera para servicios sin horarios libres.
+Cuando un turno cancelado libera un slot, se ofrece con una retención al
+cliente en espera más antiguo cuyo rango de fechas y zona son compatibles.
+Si la retención vence o se libera sin que confirme el turno, la espera
+queda vencida y el slot se ofrece al siguiente cliente compatible.
+"""
+from datetime import datetime, timedelta
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.usuarios.geo_services import GeoService
+from apps.usuarios.models import CeldaCobertura
+from .models import Turno, ReservaSlot, EsperaSlot
+
+logger = logging.getLogger(__name__)
+
+
+class EsperaService:
+    """
+    Servicio de lista de espera.
+
+    La búsqueda del cliente a quien ofrecer un slot filtra en la base las
+    esperas activas del servicio cuyo rango incluye la fecha (índice
+    parcial espera_servicio_fechas_idx) y toma la más antigua compatible.
+    Nunca se ofrece el slot al cliente que acaba de liberarlo.
+    """
+
+    TTL_OFERTA_MINUTOS = 30
+    DIAS_MAXIMOS = 60
+
+    @staticmethod
+    def unirse(cliente, servicio, fecha_desde, fecha_hasta, latitud=None, longitud=None):
+        """
+        Anota al cliente en la lista de espera de un servicio.
+        Si ya estaba en espera para el mismo servicio, se actualizan el rango y la zona.
+
+        Args:
+            cliente (Cliente): Cliente que espera
+            servicio (Servicio): Servicio buscado
+            fecha_desde (date): Primer día aceptable
+            fecha_hasta (date): Último día aceptable
+            latitud (float, optional): Ubicación donde se prestaría el servicio
+            longitud (float, optional): Ubicación donde se prestaría el servicio
+
+        Returns:
+            tuple: (espera: EsperaSlot|None, errores: list)
+        """
+        errores = []
+        if fecha_desde > fecha_hasta:
+            errores.append('La fecha de inicio debe ser anterior a la fecha de fin')
+        if fecha_hasta < timezone.localdate():
+            errores.append('El rango de fechas ya pasó')
+        if (fecha_hasta - fecha_desde).days > EsperaService.DIAS_MAXIMOS:
+            errores.append(f'El rango no puede superar {EsperaService.DIAS_MAXIMOS} días')
+        if errores:
+            return None, errores
+
+        zona = {'latitud': latitud, 'longitud': longitud, 'fila': None, 'columna': None}
+        if latitud is not None and longitud is not None:
+            zona['fila'], zona['columna'] = GeoService.celda(latitud, longitud)
+
+        espera, _ = EsperaSlot.objects.update_or_create(
+            cliente=cliente,
+            servicio=servicio,
+            estado='activa',
+            defaults={'fecha_desde': fecha_desde, 'fecha_hasta': fecha_hasta, **zona}
+        )
+        return espera, []
+
+    @staticmethod
+    def buscar_compatible(profesional_id, servicio_id, fecha, excluir_cliente_id=None):
+        """
+        Espera activa más antigua compatible con un slot liberado.
+
+        La zona es compatible si la espera no indica ubicación o si su
+        celda está en la cobertura del profesional.
+
+        Args:
+            profesional_id (int): Profesional del slot
+            servicio_id (int): Servicio del slot
+            fecha (date): Día del slot
+            excluir_cliente_id (int, optional): Cliente que liberó el slot
+
+        Returns:
+            EsperaSlot|None
+        """
+        cubre_zona = Exists(CeldaCobertura.objects.filter(
+            profesional_id=profesional_id,
+            fila=OuterRef('fila'),
+            columna=OuterRef('columna')
+        ))
+        esperas = EsperaSlot.objects.filter(
+            Q(fila__isnull=True) | cubre_zona,
+            servicio_id=servicio_id,
+            estado='activa',
+            fecha_hasta__gte=fecha,
+            fecha_desde__lte=fecha
+        )
+        if excluir_cliente_id is not None:
+            esperas = esperas.exclude(cliente_id=excluir_cliente_id)
+        return esperas.select_related('cliente').order_by('fecha_creacion').first()
+
+    @staticmethod
+    def ofrecer_slot(profesional_id, servicio_id, fecha, hora, excluir_cliente_id=None):
+        """
+        Ofrece un slot liberado al primer cliente compatible de la lista
+        (salvo excluir_cliente_id, el que lo liberó).
+
+        La oferta es una ReservaSlot a nombre del cliente que vence en
+        TTL_OFERTA_MINUTOS: con ella puede confirmar el turno como en el
+        flujo normal de solicitud.
+
+        Returns:
+            EsperaSlot|None: Espera a la que se ofreció el slot
+        """
+        ahora = timezone.now()
+        if timezone.make_aware(datetime.combine(fecha, hora)) <= ahora:
+            return None
+
+        slot = {'profesional_id': profesional_id, 'fecha': fecha, 'hora': hora}
+        if Turno.objects.filter(estado__in=Turno.ESTADOS_ACTIVOS, **slot).exists():
+            return None
+
+        espera = EsperaService.buscar_compatible(profesional_id, servicio_id, fecha, excluir_cliente_id)
+        if espera is None:
+            return None
+
+        # Liberación perezosa de una retención vencida del mismo slot (el slot se ofrece ahora)
+        EsperaService.liberar_reservas(ReservaSlot.objects.filter(vence__lte=ahora, **slot), reofrecer=False)
+
+        try:
+            with transaction.atomic():
+                reserva = ReservaSlot.objects.create(
+                    cliente=espera.cliente,
+                    servicio_id=servicio_id,
+                    vence=ahora + timedelta(minutes=EsperaService.TTL_OFERTA_MINUTOS),
+                    **slot
+                )
+                # Condicionado al estado: si otra oferta ganó la espera, se descarta esta
+                if not EsperaSlot.objects.filter(pk=espera.pk, estado='activa').update(
+                    estado='ofrecida', reserva=reserva
+                ):
+                    raise IntegrityError('La espera ya fue atendida')
+        except IntegrityError:
+            logger.info(f"No se pudo ofrecer el slot {slot} a la espera #{espera.pk}")
+            return None
+
+        espera.estado = 'ofrecida'
+        espera.reserva = reserva
+
+        from .signals import espera_ofrecida
+        transaction.on_commit(lambda: espera_ofrecida.send(sender=EsperaSlot, espera=espera))
+        return espera
+
+    @staticmethod
+    def liberar_reservas(reservas, reofrecer=True):
+        """
+        Elimina retenciones que no se convirtieron en turno. Las esperas a
+        las que se habían ofrecido quedan vencidas y cada slot se ofrece al
+        siguiente cliente compatible cuando se confirme la transacción.
+
+        Args:
+            reservas (QuerySet): Retenciones a eliminar
+            reofrecer (bool): False si el slot se vuelve a retener en la misma operación
+
+        Returns:
+            int: Cantidad de retenciones eliminadas
+        """
+        ofertas = list(EsperaSlot.objects.filter(estado='ofrecida', reserva__in=reservas).values_list(
+            'id', 'reserva__profesional_id', 'servicio_id', 'reserva__fecha', 'reserva__hora'
+        ))
+        if ofertas:
+            EsperaSlot.objects.filter(id__in=[oferta[0] for oferta in ofertas], estado='ofrecida').update(
+                estado='vencida', reserva=None
+            )
+            logger.info(f"Ofertas de lista de espera vencidas: {[oferta[0] for oferta in ofertas]}")
+
+        eliminadas = reservas.delete()[0]
+
+        if reofrecer:
+            for _, profesional_id, servicio_id, fecha, hora in ofertas:
+                EsperaService.programar_oferta(profesional_id, servicio_id, fecha, hora)
+        return eliminadas
+
+    @staticmethod
+    def programar_oferta(profesional_id, servicio_id, fecha, hora, excluir_cliente_id=None):
+        """Ofrece el slot a la lista de espera cuando se confirme la cancelación"""
+        transaction.on_commit(
+            lambda: EsperaService.ofrecer_slot(profesional_id, servicio_id, fecha, hora, excluir_cliente_id),
+            robust=True
+        )
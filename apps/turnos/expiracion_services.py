@@ -0,0 +1,117 @@
+"""
+Vencimiento de turnos pendientes.
+Cancela los turnos que siguen pendientes cuando su fecha y hora ya pasaron,
+para que dejen de bloquear horarios y de contar como pendientes.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.promociones.cupo_services import CupoService
+from .models import Turno
+from .calendario_services import CalendarioSlotsService
+from .signals import turnos_expirados
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiracionService:
+    """
+    Servicio de vencimiento de turnos pendientes.
+
+    Es idempotente: cada lote se cancela con un UPDATE condicionado a que
+    el turno siga pendiente, así dos ejecuciones simultáneas (o una cada
+    minuto) no cancelan ni notifican dos veces el mismo turno.
+    """
+
+    TAMANIO_LOTE = 500
+    CAMPOS_EVENTO = ('id', 'cliente_id', 'profesional_id', 'fecha', 'hora', 'promocion_id', 'desglose_promociones')
+
+    @staticmethod
+    def pendientes_vencidos(ahora=None):
+        """
+        Turnos pendientes cuya fecha y hora ya pasaron.
+        Usa el índice parcial turno_pendiente_fecha_idx.
+
+        Args:
+            ahora (datetime, optional): Momento de referencia (default: ahora)
+
+        Returns:
+            QuerySet: Turnos vencidos ordenados por fecha y hora
+        """
+        ahora = timezone.localtime(ahora or timezone.now())
+        return Turno.objects.filter(
+            Q(fecha__lt=ahora.date()) | Q(fecha=ahora.date(), hora__lte=ahora.time()),
+            estado='pendiente'
+        ).order_by('fecha', 'hora')
+
+    @staticmethod
+    def expirar_lote(ahora=None, tamanio_lote=None):
+        """
+        Cancela un lote de turnos pendientes vencidos.
+
+        Args:
+            ahora (datetime, optional): Momento de referencia
+            tamanio_lote (int, optional): Máximo de turnos (default: TAMANIO_LOTE)
+
+        Returns:
+            tuple: (cancelados: list[dict], encontrados: int)
+        """
+        tamanio_lote = tamanio_lote or ExpiracionService.TAMANIO_LOTE
+        marca = timezone.now()
+
+        with transaction.atomic():
+            lote = list(ExpiracionService.pendientes_vencidos(ahora).values(
+                *ExpiracionService.CAMPOS_EVENTO
+            )[:tamanio_lote])
+            if not lote:
+                return [], 0
+
+            ids = [turno['id'] for turno in lote]
+            actualizados = Turno.objects.filter(id__in=ids, estado='pendiente').update(
+                estado='cancelado', fecha_actualizacion=marca
+            )
+            if actualizados != len(ids):
+                # Otra ejecución o un usuario cambió algún turno del lote
+                propios = set(Turno.objects.filter(
+                    id__in=ids, estado='cancelado', fecha_actualizacion=marca
+                ).values_list('id', flat=True))
+                cancelados = [turno for turno in lote if turno['id'] in propios]
+            else:
+                cancelados = lote
+
+            # El UPDATE no dispara señales: liberar los días del horizonte a mano
+            for profesional_id, fecha in {(t['profesional_id'], t['fecha']) for t in cancelados}:
+                CalendarioSlotsService.programar_recalculo(profesional_id, fecha)
+
+            # Y devolver el cupo de sus promociones en la misma transacción
+            CupoService.liberar([(t['cliente_id'], t['promocion_id'], t['desglose_promociones']) for t in cancelados])
+
+            if cancelados:
+                transaction.on_commit(
+                    lambda: turnos_expirados.send(sender=Turno, turnos=cancelados)
+                )
+
+        return cancelados, len(lote)
+
+    @staticmethod
+    def expirar_pendientes(ahora=None, tamanio_lote=None):
+        """
+        Cancela todos los turnos pendientes vencidos, lote por lote.
+
+        Returns:
+            int: Cantidad de turnos cancelados
+        """
+        tamanio_lote = tamanio_lote or ExpiracionService.TAMANIO_LOTE
+        total = 0
+        while True:
+            cancelados, encontrados = ExpiracionService.expirar_lote(ahora, tamanio_lote)
+            total += len(cancelados)
+            if encontrados < tamanio_lote:
+                break
+
+        if total:
+            logger.info(f"Turnos pendientes vencidos cancelados: {total}")
+        return total
@@ -67,21 +67,10 @@ class SolicitarTurnoForm(forms.ModelForm):
         
         # Si se proporciona un servicio, cargar promociones aplicables
         if servicio:
-            from django.utils import timezone
-            now = timezone.now()
+            from apps.promociones.indice_services import PromocionIndiceService
             
-            # Buscar promociones vigentes para este servicio
-            promociones_vigentes = Promocion.objects.filter(
-                activa=True,
-                fecha_inicio__lte=now,
-                fecha_fin__gte=now
-            )
-            
-            # Filtrar las que aplican al servicio
-            promociones_aplicables = []
-            for promo in promociones_vigentes:
-                if promo.aplica_a_servicio(servicio):
-                    promociones_aplicables.append(promo.id)
+            # Promociones vigentes para este servicio (índice en memoria)
+            promociones_aplicables = [promo.id for promo in PromocionIndiceService.aplicables(servicio)]
             
             self.fields['promocion'].queryset = Promocion.objects.filter(
                 id__in=promociones_aplicables
@@ -94,19 +83,27 @@ class SolicitarTurnoForm(forms.ModelForm):
         if not codigo:
             return None
         
-        try:
-            promocion = Promocion.objects.get(codigo__iexact=codigo)
-            
-            if not promocion.esta_vigente():
-                raise forms.ValidationError(
-                    'El código promocional ha expirado o no está activo.'
-                )
-            
-            return promocion
-        except Promocion.DoesNotExist:
+        from apps.promociones.indice_services import PromocionIndiceService
+        
+        # Los códigos inexistentes se rechazan sin consultar la tabla de promociones
+        promocion = PromocionIndiceService.buscar_por_codigo(codigo)
+        if promocion is None:
             raise forms.ValidationError(
                 'El código promocional ingresado no es válido.'
             )
+        
+        if not promocion.esta_vigente():
+            raise forms.ValidationError(
+                'El código promocional ha expirado o no está activo.'
+            )
+        
+        # Aviso temprano; el cupo se descuenta de forma atómica al confirmar el turno
+        if promocion.cupo_agotado():
+            raise forms.ValidationError(
+                'El código promocional alcanzó su límite de usos.'
+            )
+        
+        return promocion
 
 
 class ModificarTurnoForm(forms.ModelForm):
@@ -0,0 +1,180 @@
+"""
+Historial de turnos con paginación por cursor.
+Las páginas se recorren con un cursor sobre (fecha, hora, id) en lugar de
+OFFSET, y la exportación completa se transmite por partes, así el costo y
+la memoria no dependen de cuántos turnos tenga el usuario.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, time
+import binascii
+import json
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Turno, Calificacion
+
+
+class HistorialService:
+    """
+    Servicio de consulta del historial de turnos.
+
+    El orden es (-fecha, -hora, -id): el id desempata turnos del mismo
+    horario (p. ej. cancelados y reprogramados) y hace el orden total.
+    """
+
+    PAGINA_DEFAULT = 20
+    PAGINA_MAXIMA = 100
+    CHUNK_EXPORTACION = 500
+
+    ORDEN = ('-fecha', '-hora', '-id')
+
+    # Columnas que usan los listados (ver historial_turnos.html y buscar_turno.html)
+    CAMPOS_LISTADO = (
+        'id', 'fecha', 'hora', 'estado', 'direccion_servicio', 'precio_final',
+        'servicio', 'servicio__nombre',
+        'cliente', 'cliente__usuario', 'cliente__usuario__first_name', 'cliente__usuario__last_name',
+        'profesional', 'profesional__usuario', 'profesional__usuario__first_name',
+        'profesional__usuario__last_name',
+    )
+
+    CAMPOS_EXPORTACION = (
+        'id', 'fecha', 'hora', 'estado', 'direccion_servicio', 'precio_final', 'observaciones',
+        'servicio__nombre', 'profesional__usuario__first_name', 'profesional__usuario__last_name',
+        'cliente__usuario__first_name', 'cliente__usuario__last_name', 'fecha_solicitud',
+    )
+
+    @staticmethod
+    def turnos_visibles(usuario):
+        """
+        Turnos que el usuario puede ver según su rol, sin ordenar.
+
+        Args:
+            usuario (Usuario): Usuario autenticado
+
+        Returns:
+            QuerySet: Turnos del cliente, del profesional o todos (administrador)
+        """
+        if usuario.is_cliente():
+            return Turno.objects.filter(cliente=usuario.perfil_cliente)
+        if usuario.is_profesional():
+            return Turno.objects.filter(profesional=usuario.perfil_profesional)
+        return Turno.objects.all()
+
+    @staticmethod
+    def para_listado(queryset):
+        """Limita el queryset a las columnas de los listados y marca los turnos calificados"""
+        return queryset.select_related(
+            'servicio', 'cliente__usuario', 'profesional__usuario'
+        ).only(*HistorialService.CAMPOS_LISTADO).annotate(
+            calificado=Exists(Calificacion.objects.filter(turno=OuterRef('pk')))
+        )
+
+    @staticmethod
+    def codificar_cursor(turno):
+        """Cursor opaco con la posición (fecha, hora, id) de un turno"""
+        clave = f'{turno.fecha.isoformat()}|{turno.hora.isoformat()}|{turno.id}'
+        return urlsafe_b64encode(clave.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decodificar_cursor(cursor):
+        """
+        Lee un cursor generado por codificar_cursor.
+
+        Returns:
+            tuple: (fecha, hora, id)
+
+        Raises:
+            ValueError: Si el cursor es inválido
+        """
+        try:
+            clave = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            fecha, hora, turno_id = clave.split('|')
+            return date.fromisoformat(fecha), time.fromisoformat(hora), int(turno_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError('Cursor inválido') from e
+
+    @staticmethod
+    def paginar(queryset, cursor=None, limite=None):
+        """
+        Devuelve una página de turnos posterior al cursor.
+
+        La condición sobre (fecha, hora, id) reemplaza al OFFSET: la base
+        salta directamente a la posición del cursor y lee solo limite + 1 filas.
+
+        Args:
+            queryset (QuerySet): Turnos ya filtrados
+            cursor (str, optional): Cursor de la página anterior
+            limite (int, optional): Turnos por página (default: PAGINA_DEFAULT)
+
+        Returns:
+            tuple: (turnos: list, siguiente_cursor: str|None)
+
+        Raises:
+            ValueError: Si el cursor es inválido
+        """
+        limite = max(1, min(limite or HistorialService.PAGINA_DEFAULT, HistorialService.PAGINA_MAXIMA))
+
+        if cursor:
+            fecha, hora, turno_id = HistorialService.decodificar_cursor(cursor)
+            queryset = queryset.filter(
+                Q(fecha__lt=fecha) |
+                Q(fecha=fecha, hora__lt=hora) |
+                Q(fecha=fecha, hora=hora, id__lt=turno_id)
+            )
+
+        turnos = list(queryset.order_by(*HistorialService.ORDEN)[:limite + 1])
+        if len(turnos) <= limite:
+            return turnos, None
+        turnos = turnos[:limite]
+        return turnos, HistorialService.codificar_cursor(turnos[-1])
+
+    @staticmethod
+    def serializar(turno):
+        """Representación JSON de un turno del listado"""
+        return {
+            'id': turno.id,
+            'fecha': turno.fecha.strftime('%Y-%m-%d'),
+            'hora': turno.hora.strftime('%H:%M'),
+            'estado': turno.estado,
+            'servicio': turno.servicio.nombre,
+            'direccion_servicio': turno.direccion_servicio,
+            'precio_final': str(turno.precio_final),
+            'cliente': turno.cliente.usuario.get_full_name(),
+            'profesional': turno.profesional.usuario.get_full_name(),
+        }
+
+    @staticmethod
+    def exportar_ndjson(queryset, chunk_size=None):
+        """
+        Genera el historial completo como NDJSON, una línea por turno.
+
+        Lee con un cursor del lado de la base en bloques de chunk_size
+        filas, sin cachear el queryset, para que la memoria sea constante.
+
+        Args:
+            queryset (QuerySet): Turnos a exportar
+            chunk_size (int, optional): Filas por bloque (default: CHUNK_EXPORTACION)
+
+        Yields:
+            str: Un objeto JSON por línea
+        """
+        filas = queryset.order_by(*HistorialService.ORDEN).values(
+            *HistorialService.CAMPOS_EXPORTACION
+        ).iterator(chunk_size=chunk_size or HistorialService.CHUNK_EXPORTACION)
+
+        for fila in filas:
+            yield json.dumps({
+                'id': fila['id'],
+                'fecha': fila['fecha'].isoformat(),
+                'hora': fila['hora'].strftime('%H:%M'),
+                'estado': fila['estado'],
+                'servicio': fila['servicio__nombre'],
+                'direccion_servicio': fila['direccion_servicio'],
+                'precio_final': str(fila['precio_final']),
+                'observaciones': fila['observaciones'],
+                'cliente': f"{fila['cliente__usuario__first_name']} {fila['cliente__usuario__last_name']}".strip(),
+                'profesional': (
+                    f"{fila['profesional__usuario__first_name']} {fila['profesional__usuario__last_name']}".strip()
+                ),
+                'fecha_solicitud': fila['fecha_solicitud'].isoformat(),
+            }, ensure_ascii=False) + '\n'
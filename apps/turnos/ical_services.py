@@ -0,0 +1,233 @@
+"""
+Feed iCalendar (.ics) con los turnos de un profesional.
+Los clientes de calendario consultan el feed cada pocos minutos: la versión
+se resuelve con un solo aggregate y, si no cambió, se responde 304 sin
+generar nada. Cada VEVENT se cachea por turno y por las fechas de
+modificación del turno, su servicio y su cliente (el resumen muestra sus
+nombres), así solo se regeneran los eventos que cambiaron desde la última
+versión.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+import logging
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Turno
+
+logger = logging.getLogger(__name__)
+
+
+class ICalService:
+    """Servicio de generación del feed iCalendar"""
+
+    SALT_TOKEN = 'turnos.calendario'
+    DIAS_HISTORIA = 30
+    CHUNK = 500
+    TTL_CACHE_SEGUNDOS = 7 * 24 * 3600
+    LARGO_LINEA = 75
+
+    ESTADOS_ICS = {
+        'pendiente': 'TENTATIVE',
+        'confirmado': 'CONFIRMED',
+        'en_curso': 'CONFIRMED',
+        'completado': 'CONFIRMED',
+        'cancelado': 'CANCELLED',
+    }
+
+    # ========================================================================
+    # TOKEN DE SUSCRIPCIÓN
+    # ========================================================================
+
+    @staticmethod
+    def token_para(profesional):
+        """Token firmado que identifica al profesional en la URL del feed"""
+        return signing.Signer(salt=ICalService.SALT_TOKEN).sign(str(profesional.pk))
+
+    @staticmethod
+    def profesional_id_desde_token(token):
+        """
+        Obtiene el id del profesional de un token de feed.
+
+        Returns:
+            int|None: None si la firma no es válida
+        """
+        try:
+            return int(signing.Signer(salt=ICalService.SALT_TOKEN).unsign(token))
+        except (signing.BadSignature, ValueError):
+            return None
+
+    # ========================================================================
+    # VERSIÓN DEL FEED
+    # ========================================================================
+
+    @staticmethod
+    def turnos_feed(profesional_id, hoy=None):
+        """Turnos que publica el feed: desde DIAS_HISTORIA atrás en adelante"""
+        hoy = hoy or timezone.localdate()
+        return Turno.objects.filter(
+            profesional_id=profesional_id,
+            fecha__gte=hoy - timedelta(days=ICalService.DIAS_HISTORIA)
+        )
+
+    # Fechas de modificación de lo que se publica en cada VEVENT
+    CAMPOS_MODIFICACION = ('fecha_actualizacion', 'servicio__fecha_modificacion', 'cliente__usuario__fecha_modificacion')
+
+    @staticmethod
+    def version(profesional_id, hoy=None):
+        """
+        Versión del feed resuelta con un solo aggregate.
+
+        La cantidad de turnos detecta los borrados, las modificaciones de
+        servicios y clientes cambian el resumen de sus eventos, y el inicio
+        de la ventana hace que el feed cambie de versión al pasar el día.
+
+        Returns:
+            tuple: (etag: str, ultima_modificacion: datetime|None)
+        """
+        hoy = hoy or timezone.localdate()
+        datos = ICalService.turnos_feed(profesional_id, hoy).aggregate(
+            total=Count('id'),
+            **{f'ultima_{k}': Max(campo) for k, campo in enumerate(ICalService.CAMPOS_MODIFICACION)}
+        )
+        marcas = [datos[f'ultima_{k}'] for k in range(len(ICalService.CAMPOS_MODIFICACION))]
+        ultima = max((marca for marca in marcas if marca), default=None)
+        huella = '-'.join(f'{marca.timestamp() if marca else 0:.6f}' for marca in marcas)
+        etag = f'"{profesional_id}-{hoy.isoformat()}-{datos["total"]}-{huella}"'
+        return etag, ultima
+
+    # ========================================================================
+    # GENERACIÓN
+    # ========================================================================
+
+    @staticmethod
+    def _escapar(texto):
+        """Escapa un valor TEXT según RFC 5545"""
+        return (
+            str(texto or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n')
+        )
+
+    @staticmethod
+    def _plegar(linea):
+        """Parte una línea en segmentos de hasta 75 octetos (continuación con espacio)"""
+        datos = linea.encode('utf-8')
+        if len(datos) <= ICalService.LARGO_LINEA:
+            return linea + '\r\n'
+        partes = []
+        inicio = 0
+        limite = ICalService.LARGO_LINEA
+        while inicio < len(datos):
+            fin = min(inicio + limite, len(datos))
+            # No cortar en medio de un carácter multibyte
+            while fin < len(datos) and (datos[fin] & 0xC0) == 0x80:
+                fin -= 1
+            partes.append(datos[inicio:fin].decode('utf-8'))
+            inicio = fin
+            limite = ICalService.LARGO_LINEA - 1
+        return '\r\n '.join(partes) + '\r\n'
+
+    @staticmethod
+    def _utc(momento):
+        """Fecha y hora en UTC con el formato de iCalendar"""
+        return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+    @staticmethod
+    def vevent(turno):
+        """
+        Serializa un turno como VEVENT.
+
+        Args:
+            turno (Turno): Turno con servicio y cliente__usuario cargados
+
+        Returns:
+            str: Bloque BEGIN:VEVENT ... END:VEVENT con saltos CRLF
+        """
+        inicio = timezone.make_aware(datetime.combine(turno.fecha, turno.hora))
+        fin = inicio + timedelta(minutes=turno.servicio.duracion_estimada or 60)
+        resumen = f"{turno.servicio.nombre} - {turno.cliente.usuario.get_full_name()}"
+        descripcion = f"Estado: {turno.get_estado_display()}"
+        if turno.observaciones:
+            descripcion += f"\n{turno.observaciones}"
+
+        lineas = [
+            'BEGIN:VEVENT',
+            f'UID:turno-{turno.id}@servihogar',
+            f'DTSTAMP:{ICalService._utc(turno.fecha_actualizacion)}',
+            f'LAST-MODIFIED:{ICalService._utc(turno.fecha_actualizacion)}',
+            f'DTSTART:{ICalService._utc(inicio)}',
+            f'DTEND:{ICalService._utc(fin)}',
+            f'SUMMARY:{ICalService._escapar(resumen)}',
+            f'LOCATION:{ICalService._escapar(turno.direccion_servicio)}',
+            f'DESCRIPTION:{ICalService._escapar(descripcion)}',
+            f'STATUS:{ICalService.ESTADOS_ICS.get(turno.estado, "CONFIRMED")}',
+            'END:VEVENT',
+        ]
+        return ''.join(ICalService._plegar(linea) for linea in lineas)
+
+    @staticmethod
+    def _clave_cache(turno_id, *marcas):
+        """Clave del VEVENT cacheado; cambia con cada modificación del turno, su servicio o su cliente"""
+        return f'turnos:vevent:{turno_id}:' + ':'.join(f'{marca.timestamp():.6f}' for marca in marcas)
+
+    @staticmethod
+    def _eventos_chunk(filas):
+        """
+        VEVENTs de un chunk de (id, *CAMPOS_MODIFICACION).
+        Solo se consultan y serializan los turnos que no están en cache.
+        """
+        claves = {turno_id: ICalService._clave_cache(turno_id, *marcas) for turno_id, *marcas in filas}
+        cacheados = cache.get_many(claves.values())
+        faltantes = [turno_id for turno_id, clave in claves.items() if clave not in cacheados]
+
+        if faltantes:
+            nuevos = {}
+            for turno in Turno.objects.filter(id__in=faltantes).select_related('servicio', 'cliente__usuario'):
+                clave = ICalService._clave_cache(
+                    turno.id, turno.fecha_actualizacion, turno.servicio.fecha_modificacion,
+                    turno.cliente.usuario.fecha_modificacion
+                )
+                nuevos[clave] = ICalService.vevent(turno)
+            cache.set_many(nuevos, ICalService.TTL_CACHE_SEGUNDOS)
+            cacheados.update(nuevos)
+
+        for clave in claves.values():
+            # Un turno modificado entre las dos lecturas sale en la próxima versión
+            if clave in cacheados:
+                yield cacheados[clave]
+
+    @staticmethod
+    def generar_feed(profesional_id, hoy=None):
+        """
+        Generador del calendario completo, pensado para StreamingHttpResponse.
+        Recorre los turnos por chunks sin cargar el feed entero en memoria.
+        """
+        yield (
+            'BEGIN:VCALENDAR\r\n'
+            'VERSION:2.0\r\n'
+            'PRODID:-//ServiHogar//Turnos//ES\r\n'
+            'CALSCALE:GREGORIAN\r\n'
+            'METHOD:PUBLISH\r\n'
+            'X-WR-CALNAME:Turnos ServiHogar\r\n'
+        )
+        filas = (
+            ICalService.turnos_feed(profesional_id, hoy)
+            .order_by('fecha', 'hora', 'id')
+            .values_list('id', *ICalService.CAMPOS_MODIFICACION)
+            .iterator(chunk_size=ICalService.CHUNK)
+        )
+        chunk = []
+        for fila in filas:
+            chunk.append(fila)
+            if len(chunk) == ICalService.CHUNK:
+                yield from ICalService._eventos_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from ICalService._eventos_chunk(chunk)
+        yield 'END:VCALENDAR\r\n'
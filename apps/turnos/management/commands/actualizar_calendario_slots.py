@@ -0,0 +1,35 @@
+"""
+Comando para mantener el calendario materializado de slots disponibles.
+
+Uso (por ejemplo, todas las noches desde cron):
+    python manage.py actualizar_calendario_slots
+    python manage.py actualizar_calendario_slots --reconstruir
+"""
+from django.core.management.base import BaseCommand
+
+from apps.turnos.calendario_services import CalendarioSlotsService
+
+
+class Command(BaseCommand):
+    help = 'Extiende (o reconstruye) el horizonte del calendario de slots disponibles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Regenera todo el horizonte en lugar de agregar solo los días nuevos'
+        )
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=CalendarioSlotsService.HORIZONTE_DIAS,
+            help=f'Días del horizonte (default: {CalendarioSlotsService.HORIZONTE_DIAS})'
+        )
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            creados = CalendarioSlotsService.reconstruir(options['dias'])
+            self.stdout.write(self.style.SUCCESS(f'Calendario reconstruido: {creados} slots'))
+        else:
+            creados = CalendarioSlotsService.extender_horizonte(options['dias'])
+            self.stdout.write(self.style.SUCCESS(f'Horizonte extendido: {creados} slots nuevos'))
@@ -0,0 +1,26 @@
+"""
+Comando para cancelar los turnos pendientes cuya fecha y hora ya pasaron.
+
+Uso (por ejemplo, cada minuto desde cron):
+    python manage.py expirar_turnos_pendientes
+    python manage.py expirar_turnos_pendientes --lote 1000
+"""
+from django.core.management.base import BaseCommand
+
+from apps.turnos.expiracion_services import ExpiracionService
+
+
+class Command(BaseCommand):
+    help = 'Cancela en lotes los turnos que siguen pendientes después de su fecha y hora'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=ExpiracionService.TAMANIO_LOTE,
+            help=f'Turnos por UPDATE (default: {ExpiracionService.TAMANIO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        cancelados = ExpiracionService.expirar_pendientes(tamanio_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Turnos pendientes vencidos cancelados: {cancelados}'))
@@ -0,0 +1,19 @@
+"""
+Comando para liberar las retenciones de slots vencidas.
+Las ofertas de lista de espera que vencieron sin confirmarse pasan al
+siguiente cliente compatible.
+
+Uso (por ejemplo, cada minuto desde cron):
+    python manage.py liberar_reservas_vencidas
+"""
+from django.core.management.base import BaseCommand
+
+from apps.turnos.reserva_services import ReservaService
+
+
+class Command(BaseCommand):
+    help = 'Elimina las retenciones de slots vencidas y ofrece sus horarios a la lista de espera'
+
+    def handle(self, *args, **options):
+        liberadas = ReservaService.liberar_vencidas()
+        self.stdout.write(self.style.SUCCESS(f'Retenciones vencidas liberadas: {liberadas}'))
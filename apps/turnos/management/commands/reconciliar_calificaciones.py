@@ -0,0 +1,17 @@
+"""
+Comando para reconstruir los agregados de calificaciones de los profesionales.
+
+Uso:
+    python manage.py reconciliar_calificaciones
+"""
+from django.core.management.base import BaseCommand
+
+from apps.turnos.calificacion_services import CalificacionService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula cantidad, suma, histograma y promedio de calificaciones de todos los profesionales'
+
+    def handle(self, *args, **options):
+        actualizados = CalificacionService.reconciliar()
+        self.stdout.write(self.style.SUCCESS(f'Profesionales reconciliados: {actualizados}'))
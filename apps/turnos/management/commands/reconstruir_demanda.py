@@ -0,0 +1,17 @@
+"""
+Comando para reconstruir el mapa de calor de demanda por categoría.
+
+Uso:
+    python manage.py reconstruir_demanda
+"""
+from django.core.management.base import BaseCommand
+
+from apps.turnos.demanda_services import DemandaService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde los turnos la matriz día × hora de demanda de cada categoría'
+
+    def handle(self, *args, **options):
+        actualizadas = DemandaService.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Categorías actualizadas: {actualizadas}'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0005_turno_promocion'),
+        ('usuarios', '0003_usuario_fecha_eliminacion_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotDisponible',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('profesional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots_disponibles', to='usuarios.profesional')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots_disponibles', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'Slot Disponible',
+                'verbose_name_plural': 'Slots Disponibles',
+                'ordering': ['fecha', 'hora'],
+                'indexes': [models.Index(fields=['servicio', 'fecha', 'hora'], name='slot_servicio_fecha_idx')],
+                'unique_together': {('profesional', 'servicio', 'fecha', 'hora')},
+            },
+        ),
+    ]
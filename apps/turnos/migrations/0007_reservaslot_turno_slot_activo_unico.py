@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0004_promocion_fecha_eliminacion'),
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0006_slotdisponible'),
+        ('usuarios', '0004_celdacobertura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('vence', models.DateTimeField()),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Reserva de Slot',
+                'verbose_name_plural': 'Reservas de Slot',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='turno',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ('pendiente', 'confirmado', 'en_curso'))), fields=('profesional', 'fecha', 'hora'), name='turno_slot_activo_unico'),
+        ),
+        migrations.AddField(
+            model_name='reservaslot',
+            name='cliente',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_slot', to='usuarios.cliente'),
+        ),
+        migrations.AddField(
+            model_name='reservaslot',
+            name='profesional',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_slot', to='usuarios.profesional'),
+        ),
+        migrations.AddField(
+            model_name='reservaslot',
+            name='servicio',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_slot', to='servicios.servicio'),
+        ),
+        migrations.AddIndex(
+            model_name='reservaslot',
+            index=models.Index(fields=['vence'], name='reserva_slot_vence_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservaslot',
+            constraint=models.UniqueConstraint(fields=('profesional', 'fecha', 'hora'), name='reserva_slot_unica'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0004_promocion_fecha_eliminacion'),
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0007_reservaslot_turno_slot_activo_unico'),
+        ('usuarios', '0004_celdacobertura'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['profesional', 'fecha', 'hora', 'estado'], name='turno_prof_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['cliente', 'estado', 'fecha', 'hora'], name='turno_cliente_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha_solicitud', 'estado'], name='turno_solicitud_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(condition=models.Q(('promocion__isnull', False)), fields=['promocion', 'estado'], name='turno_promocion_estado_idx'),
+        ),
+    ]
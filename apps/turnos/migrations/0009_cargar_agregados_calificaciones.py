@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def cargar_agregados(apps, schema_editor):
+    """Inicializa los agregados de calificaciones con un GROUP BY"""
+    Calificacion = apps.get_model('turnos', 'Calificacion')
+    Profesional = apps.get_model('usuarios', 'Profesional')
+
+    agregados = {}
+    filas = Calificacion.objects.filter(
+        puntuacion__range=(1, 5)
+    ).values_list('turno__profesional_id', 'puntuacion').annotate(cantidad=Count('id')).order_by()
+    for profesional_id, puntuacion, cantidad in filas:
+        agregados.setdefault(profesional_id, {})[puntuacion] = cantidad
+
+    for profesional_id, histograma in agregados.items():
+        cantidad = sum(histograma.values())
+        suma = sum(p * n for p, n in histograma.items())
+        Profesional.objects.filter(pk=profesional_id).update(
+            calificaciones_cantidad=cantidad,
+            calificaciones_suma=suma,
+            calificacion_promedio=round(Decimal(suma) / cantidad, 2),
+            **{f'estrellas_{p}': histograma.get(p, 0) for p in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0008_indices_turno'),
+        ('usuarios', '0005_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_agregados, migrations.RunPython.noop),
+    ]
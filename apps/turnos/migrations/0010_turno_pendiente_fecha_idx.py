@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0004_promocion_fecha_eliminacion'),
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0009_cargar_agregados_calificaciones'),
+        ('usuarios', '0005_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['fecha', 'hora'], name='turno_pendiente_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0010_turno_pendiente_fecha_idx'),
+        ('usuarios', '0005_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsperaSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_desde', models.DateField()),
+                ('fecha_hasta', models.DateField()),
+                ('latitud', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('longitud', models.DecimalField(blank=True, decimal_places=7, max_digits=10, null=True)),
+                ('fila', models.IntegerField(blank=True, null=True)),
+                ('columna', models.IntegerField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('ofrecida', 'Ofrecida'), ('atendida', 'Atendida'), ('cancelada', 'Cancelada')], default='activa', max_length=20)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='esperas', to='usuarios.cliente')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='esperas', to='turnos.reservaslot')),
+                ('servicio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='esperas', to='servicios.servicio')),
+            ],
+            options={
+                'verbose_name': 'Espera de Slot',
+                'verbose_name_plural': 'Esperas de Slot',
+                'ordering': ['fecha_creacion'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'activa')), fields=['servicio', 'fecha_creacion'], name='espera_servicio_activa_idx')],
+            },
+        ),
+    ]
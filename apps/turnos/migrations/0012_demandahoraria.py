@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0011_esperaslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandaHoraria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conteos', models.BinaryField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('categoria', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demanda_horaria', to='servicios.categoria')),
+            ],
+            options={
+                'verbose_name': 'Demanda Horaria',
+                'verbose_name_plural': 'Demanda Horaria',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+import struct
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+
+def cargar_demanda(apps, schema_editor):
+    """Inicializa el mapa de calor de cada categoría con un GROUP BY"""
+    Turno = apps.get_model('turnos', 'Turno')
+    Categoria = apps.get_model('servicios', 'Categoria')
+    DemandaHoraria = apps.get_model('turnos', 'DemandaHoraria')
+
+    conteos = {categoria_id: [0] * (7 * 24) for categoria_id in Categoria.objects.values_list('id', flat=True)}
+    filas = (
+        Turno.objects
+        .annotate(dia=ExtractIsoWeekDay('fecha'), hora_del_dia=ExtractHour('hora'))
+        .values_list('servicio__categoria_id', 'dia', 'hora_del_dia')
+        .annotate(cantidad=Count('id'))
+        .order_by()
+    )
+    for categoria_id, dia, hora, cantidad in filas:
+        conteos[categoria_id][(dia - 1) * 24 + hora] = cantidad
+
+    DemandaHoraria.objects.bulk_create([
+        DemandaHoraria(categoria_id=categoria_id, conteos=struct.pack('<168i', *valores), total=sum(valores))
+        for categoria_id, valores in conteos.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0012_demandahoraria'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_demanda, migrations.RunPython.noop),
+    ]
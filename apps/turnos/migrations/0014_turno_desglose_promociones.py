@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0013_cargar_demanda_horaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turno',
+            name='desglose_promociones',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
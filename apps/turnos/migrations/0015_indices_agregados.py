@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0008_metricas'),
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0014_turno_desglose_promociones'),
+        ('usuarios', '0005_agregados_calificaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(fields=['fecha'], name='calificacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha_actualizacion'], name='turno_actualizacion_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('turnos', '0015_indices_agregados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='esperaslot',
+            name='estado',
+            field=models.CharField(choices=[('activa', 'Activa'), ('ofrecida', 'Ofrecida'), ('atendida', 'Atendida'), ('vencida', 'Vencida'), ('cancelada', 'Cancelada')], default='activa', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0004_rename_fecha_actualizacion_servicio_fecha_modificacion_and_more'),
+        ('turnos', '0016_espera_vencida'),
+        ('usuarios', '0006_indices_agregados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='esperaslot',
+            index=models.Index(condition=models.Q(('estado', 'activa')), fields=['servicio', 'fecha_hasta', 'fecha_desde'], name='espera_servicio_fechas_idx'),
+        ),
+    ]
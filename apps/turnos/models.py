@@ -1,8 +1,10 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from apps.usuarios.models import Cliente, Profesional
-from apps.servicios.models import Servicio
+from apps.servicios.models import Servicio, Categoria
 from apps.promociones.models import Promocion
 
 class Turno(models.Model):
@@ -15,6 +17,9 @@ class Turno(models.Model):
         ('cancelado', 'Cancelado'),
     )
     
+    # Estados que ocupan el horario del profesional
+    ESTADOS_ACTIVOS = ('pendiente', 'confirmado', 'en_curso')
+    
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='turnos')
     profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='turnos')
     servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='turnos')
@@ -27,6 +32,8 @@ class Turno(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
     observaciones = models.TextField(blank=True, null=True)
     precio_final = models.DecimalField(max_digits=10, decimal_places=2)
+    # Paso a paso de las promociones combinadas aplicadas (ver combinacion_services)
+    desglose_promociones = models.JSONField(default=list, blank=True)
     fecha_solicitud = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     
@@ -34,35 +41,53 @@ class Turno(models.Model):
         verbose_name = 'Turno'
         verbose_name_plural = 'Turnos'
         ordering = ['-fecha', '-hora']
-        
+        constraints = [
+            # Un profesional no puede tener dos turnos activos en el mismo horario
+            models.UniqueConstraint(
+                fields=['profesional', 'fecha', 'hora'],
+                condition=models.Q(estado__in=('pendiente', 'confirmado', 'en_curso')),
+                name='turno_slot_activo_unico'
+            ),
+        ]
+        indexes = [
+            # Disponibilidad, carga del día y dashboard del profesional
+            models.Index(fields=['profesional', 'fecha', 'hora', 'estado'], name='turno_prof_fecha_idx'),
+            # Dashboard del cliente: turnos por estado ordenados por fecha
+            models.Index(fields=['cliente', 'estado', 'fecha', 'hora'], name='turno_cliente_estado_idx'),
+            # Reportes por rango de fecha de solicitud
+            models.Index(fields=['fecha_solicitud', 'estado'], name='turno_solicitud_estado_idx'),
+            # Cambios desde la marca de agua de los agregados diarios
+            models.Index(fields=['fecha_actualizacion'], name='turno_actualizacion_idx'),
+            # Turnos con promoción (la mayoría no tiene, el índice parcial los omite)
+            models.Index(
+                fields=['promocion', 'estado'],
+                condition=models.Q(promocion__isnull=False),
+                name='turno_promocion_estado_idx'
+            ),
+            # Vencimiento de pendientes: solo indexa los turnos pendientes
+            models.Index(
+                fields=['fecha', 'hora'],
+                condition=models.Q(estado='pendiente'),
+                name='turno_pendiente_fecha_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"Turno #{self.id} - {self.servicio.nombre} - {self.estado}"
     
     def buscar_promociones_aplicables(self):
         """Busca todas las promociones que aplican a este turno"""
-        from django.utils import timezone
-        now = timezone.now()
-        
-        # Buscar promociones vigentes que apliquen al servicio
-        promociones = Promocion.objects.filter(
-            activa=True,
-            fecha_inicio__lte=now,
-            fecha_fin__gte=now
-        )
-        
-        promociones_validas = []
-        for promo in promociones:
-            if promo.aplica_a_servicio(self.servicio):
-                promociones_validas.append(promo)
-        
-        return promociones_validas
+        from apps.promociones.indice_services import PromocionIndiceService
+        return PromocionIndiceService.aplicables(self.servicio)
     
     def calcular_precio_base(self):
         """Calcula el precio base del servicio"""
-        return self.servicio.precio
+        return self.servicio.precio_base
     
     def calcular_descuento(self):
-        """Calcula el descuento aplicado si hay promoción"""
+        """Calcula el descuento aplicado: la suma del desglose o, sin él, el de la promoción"""
+        if self.desglose_promociones:
+            return sum((Decimal(paso['descuento']) for paso in self.desglose_promociones), Decimal('0'))
         if self.promocion and self.promocion.esta_vigente():
             return self.promocion.calcular_descuento(self.calcular_precio_base())
         return 0
@@ -73,29 +98,42 @@ class Turno(models.Model):
         descuento = self.calcular_descuento()
         return precio_base - descuento
     
-    def aplicar_promocion_automatica(self):
-        """Aplica automáticamente la mejor promoción disponible"""
-        promociones = self.buscar_promociones_aplicables()
-        
-        if not promociones:
-            self.promocion = None
-            self.precio_final = self.calcular_precio_base()
-            return None
+    def aplicar_promociones(self, obligatoria=None):
+        """
+        Aplica la mejor combinación legal de promociones y guarda el desglose.
+        Solo compiten las promociones con cupo para el cliente; la obligatoria
+        se incluye igual y su cupo se verifica al confirmar el turno.
         
-        # Encontrar la promoción con mayor descuento
-        mejor_promocion = None
-        mayor_descuento = 0
+        Args:
+            obligatoria (Promocion, optional): Promoción que debe incluirse
+                (código ingresado o promoción elegida)
         
-        precio_base = self.calcular_precio_base()
-        for promo in promociones:
-            descuento = promo.calcular_descuento(precio_base)
-            if descuento > mayor_descuento:
-                mayor_descuento = descuento
-                mejor_promocion = promo
-        
-        self.promocion = mejor_promocion
-        self.precio_final = self.calcular_precio_final()
-        return mejor_promocion
+        Returns:
+            Promocion|None: La promoción de mayor descuento de la combinación
+        """
+        from apps.promociones.combinacion_services import CombinacionService
+        from apps.promociones.cupo_services import CupoService
+        candidatas = CupoService.disponibles(self.buscar_promociones_aplicables(), self.cliente_id)
+        combinacion = CombinacionService.mejor_combinacion(self.calcular_precio_base(), candidatas, obligatoria)
+        self.promocion = combinacion['principal']
+        self.desglose_promociones = combinacion['desglose']
+        self.precio_final = combinacion['precio_final']
+        # Promociones a canjear al confirmar (ReservaService.confirmar_turno),
+        # que vuelve a cotizar con la misma obligatoria si alguna se agotó
+        self.promociones_aplicadas = combinacion['promociones']
+        self.promocion_obligatoria = obligatoria
+        return combinacion['principal']
+    
+    def promociones_a_canjear(self):
+        """Promociones aplicadas al turno cuyo uso se cuenta al guardarlo"""
+        aplicadas = getattr(self, 'promociones_aplicadas', None)
+        if aplicadas is not None:
+            return aplicadas
+        return [self.promocion] if self.promocion else []
+    
+    def aplicar_promocion_automatica(self):
+        """Aplica automáticamente la mejor promoción (o combinación de promociones) disponible"""
+        return self.aplicar_promociones()
 
 
 class Pago(models.Model):
@@ -140,6 +178,143 @@ class Calificacion(models.Model):
         verbose_name = 'Calificación'
         verbose_name_plural = 'Calificaciones'
         ordering = ['-fecha']
+        indexes = [
+            # Altas desde la marca de agua de los agregados diarios
+            models.Index(fields=['fecha'], name='calificacion_fecha_idx'),
+        ]
 
     def __str__(self):
         return f'Calificación {self.puntuacion}/5 - Turno #{self.turno_id}'
+
+
+class SlotDisponible(models.Model):
+    """
+    Calendario materializado de horarios libres por servicio.
+    Se precalcula desde HorarioDisponibilidad y Servicio.duracion_estimada
+    y se mantiene de forma incremental (ver calendario_services).
+    """
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='slots_disponibles')
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='slots_disponibles')
+    fecha = models.DateField()
+    hora = models.TimeField()
+
+    class Meta:
+        verbose_name = 'Slot Disponible'
+        verbose_name_plural = 'Slots Disponibles'
+        ordering = ['fecha', 'hora']
+        unique_together = ('profesional', 'servicio', 'fecha', 'hora')
+        indexes = [
+            # Búsqueda de disponibilidad: rango de fechas de un servicio
+            models.Index(fields=['servicio', 'fecha', 'hora'], name='slot_servicio_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.servicio.nombre} - {self.fecha} {self.hora}"
+
+
+class ReservaSlot(models.Model):
+    """
+    Retención temporal de un horario mientras el cliente completa la solicitud.
+    Vence a los pocos minutos; las vencidas se liberan de forma perezosa
+    (ver reserva_services).
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='reservas_slot')
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='reservas_slot')
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='reservas_slot')
+    fecha = models.DateField()
+    hora = models.TimeField()
+    vence = models.DateTimeField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reserva de Slot'
+        verbose_name_plural = 'Reservas de Slot'
+        constraints = [
+            models.UniqueConstraint(fields=['profesional', 'fecha', 'hora'], name='reserva_slot_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['vence'], name='reserva_slot_vence_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reserva {self.profesional} - {self.fecha} {self.hora}"
+
+    def esta_vigente(self):
+        """Verifica si la reserva todavía no venció"""
+        return self.vence > timezone.now()
+
+
+class EsperaSlot(models.Model):
+    """
+    Lista de espera de un cliente para un servicio sin horarios libres.
+    Cuando se cancela un turno del servicio, el slot se ofrece con una
+    retención al primer cliente compatible (ver espera_services). Si la
+    retención se pierde sin confirmar el turno, la espera queda vencida.
+    """
+    ESTADOS = (
+        ('activa', 'Activa'),
+        ('ofrecida', 'Ofrecida'),
+        ('atendida', 'Atendida'),
+        ('vencida', 'Vencida'),
+        ('cancelada', 'Cancelada'),
+    )
+
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='esperas')
+    servicio = models.ForeignKey(Servicio, on_delete=models.CASCADE, related_name='esperas')
+    fecha_desde = models.DateField()
+    fecha_hasta = models.DateField()
+    # Zona: celda de la grilla de cobertura donde se prestaría el servicio (opcional)
+    latitud = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    longitud = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    fila = models.IntegerField(blank=True, null=True)
+    columna = models.IntegerField(blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='activa')
+    reserva = models.ForeignKey(
+        ReservaSlot, on_delete=models.SET_NULL, related_name='esperas', blank=True, null=True
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Espera de Slot'
+        verbose_name_plural = 'Esperas de Slot'
+        ordering = ['fecha_creacion']
+        indexes = [
+            # Primer cliente en espera de un servicio; solo indexa las esperas activas
+            models.Index(
+                fields=['servicio', 'fecha_creacion'],
+                condition=models.Q(estado='activa'),
+                name='espera_servicio_activa_idx'
+            ),
+            # Esperas activas de un servicio cuyo rango incluye la fecha del slot liberado
+            models.Index(
+                fields=['servicio', 'fecha_hasta', 'fecha_desde'],
+                condition=models.Q(estado='activa'),
+                name='espera_servicio_fechas_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Espera {self.cliente} - {self.servicio.nombre} ({self.fecha_desde} a {self.fecha_hasta})"
+
+
+class DemandaHoraria(models.Model):
+    """
+    Mapa de calor de turnos solicitados por categoría: día de la semana × hora.
+    Se actualiza de forma incremental al crear turnos (ver demanda_services)
+    y se lee sin consultar la tabla de turnos.
+    """
+    DIAS = 7
+    HORAS = 24
+
+    categoria = models.OneToOneField(Categoria, on_delete=models.CASCADE, related_name='demanda_horaria')
+    # Matriz 7×24 de enteros int32 little-endian; fila = día (0 = lunes), columna = hora
+    conteos = models.BinaryField()
+    total = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Demanda Horaria'
+        verbose_name_plural = 'Demanda Horaria'
+
+    def __str__(self):
+        return f"Demanda {self.categoria.nombre} ({self.total} turnos)"
@@ -0,0 +1,189 @@
+"""
+Reserva de horarios sin condiciones de carrera.
+El cliente retiene un slot por unos minutos al elegirlo y la retención se
+convierte en Turno dentro de una transacción protegida por restricciones
+únicas, sin bloquear tablas completas.
+"""
+from datetime import timedelta
+import logging
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.promociones.cupo_services import CupoService
+from .models import Turno, ReservaSlot, EsperaSlot
+from .espera_services import EsperaService
+
+logger = logging.getLogger(__name__)
+
+
+class ReservaService:
+    """
+    Servicio de retenciones temporales de slots.
+
+    La unicidad la garantizan dos restricciones de la base de datos:
+    una retención por (profesional, fecha, hora) y un turno activo por
+    (profesional, fecha, hora). Las retenciones vencidas se liberan de
+    forma perezosa cuando alguien intenta tomar el mismo slot, o con
+    liberar_vencidas. Las retenciones que se eliminan sin convertirse en
+    turno pasan por EsperaService.liberar_reservas, por si eran la
+    oferta de la lista de espera.
+    """
+
+    TTL_MINUTOS = 5
+    # Veces que se vuelve a cotizar un turno cuyas promociones se agotaron al confirmarlo
+    REINTENTOS_CUPO = 2
+
+    @staticmethod
+    def _slot(profesional_id, fecha, hora):
+        return {'profesional_id': profesional_id, 'fecha': fecha, 'hora': hora}
+
+    @staticmethod
+    def tomar_reserva(cliente, profesional_id, servicio, fecha, hora):
+        """
+        Retiene un slot para el cliente durante TTL_MINUTOS.
+
+        Si el cliente ya retenía el mismo slot, se renueva el vencimiento.
+        Las retenciones anteriores del cliente sobre otros slots se liberan.
+
+        Args:
+            cliente (Cliente): Cliente que elige el slot
+            profesional_id (int): ID del profesional
+            servicio (Servicio): Servicio a reservar
+            fecha (date): Día del slot
+            hora (time): Hora del slot
+
+        Returns:
+            tuple: (reserva: ReservaSlot|None, mensaje_error: str)
+        """
+        ahora = timezone.now()
+        vence = ahora + timedelta(minutes=ReservaService.TTL_MINUTOS)
+        slot = ReservaService._slot(profesional_id, fecha, hora)
+
+        if Turno.objects.filter(estado__in=Turno.ESTADOS_ACTIVOS, **slot).exists():
+            return None, 'El horario ya fue reservado'
+
+        # Un cliente retiene un único slot a la vez
+        EsperaService.liberar_reservas(ReservaSlot.objects.filter(cliente=cliente).exclude(**slot))
+
+        # Renovar si el slot ya es del cliente (UPDATE condicional, sin lectura previa)
+        if ReservaSlot.objects.filter(cliente=cliente, **slot).update(vence=vence, servicio=servicio):
+            return ReservaSlot.objects.get(cliente=cliente, **slot), ''
+
+        # Liberación perezosa de la retención vencida de este slot (la toma este cliente)
+        EsperaService.liberar_reservas(ReservaSlot.objects.filter(vence__lte=ahora, **slot), reofrecer=False)
+
+        try:
+            with transaction.atomic():
+                reserva = ReservaSlot.objects.create(cliente=cliente, servicio=servicio, vence=vence, **slot)
+        except IntegrityError:
+            return None, 'Otro cliente está reservando este horario. Intente con otro.'
+
+        return reserva, ''
+
+    @staticmethod
+    def liberar_reserva(cliente, reserva_id):
+        """Libera una retención del cliente (p. ej. al elegir otro slot)"""
+        return EsperaService.liberar_reservas(ReservaSlot.objects.filter(id=reserva_id, cliente=cliente)) > 0
+
+    @staticmethod
+    def liberar_vencidas():
+        """
+        Elimina todas las retenciones vencidas y ofrece al siguiente cliente
+        de la lista de espera los slots de las ofertas que vencieron.
+
+        Returns:
+            int: Cantidad de retenciones eliminadas
+        """
+        with transaction.atomic():
+            return EsperaService.liberar_reservas(ReservaSlot.objects.filter(vence__lte=timezone.now()))
+
+    @staticmethod
+    def confirmar_turno(turno, reserva_id=None):
+        """
+        Guarda un turno nuevo consumiendo la retención del slot.
+
+        Todo ocurre en una transacción: si otro cliente ya tiene un turno
+        activo en el slot, la restricción única hace fallar el INSERT y la
+        retención no se consume. Si alguna promoción aplicada se quedó sin
+        cupo (ver CupoService.consumir) se revierte todo; si el turno se
+        cotizó con Turno.aplicar_promociones, se vuelve a cotizar sin las
+        agotadas (la obligatoria se mantiene) y se reintenta.
+
+        Args:
+            turno (Turno): Turno sin guardar, con cliente/profesional/fecha/hora
+            reserva_id (int, optional): ID de la retención tomada por el cliente
+
+        Returns:
+            tuple: (exitoso: bool, mensaje_error: str)
+        """
+        for _ in range(ReservaService.REINTENTOS_CUPO + 1):
+            exitoso, mensaje, sin_cupo = ReservaService._guardar_turno(turno, reserva_id)
+            if exitoso or not sin_cupo or not ReservaService._recotizar(turno):
+                break
+        return exitoso, mensaje
+
+    @staticmethod
+    def _recotizar(turno):
+        """
+        Vuelve a cotizar el turno con el cupo actual.
+
+        Returns:
+            bool: True si cambiaron las promociones a canjear (vale la pena reintentar)
+        """
+        if not hasattr(turno, 'promocion_obligatoria'):
+            return False
+        anteriores = [p.pk for p in turno.promociones_a_canjear()]
+        turno.aplicar_promociones(turno.promocion_obligatoria)
+        nuevas = [p.pk for p in turno.promociones_a_canjear()]
+        if nuevas == anteriores:
+            return False
+        logger.info(f"Turno recotizado sin promociones agotadas: {anteriores} -> {nuevas}")
+        return True
+
+    @staticmethod
+    def _guardar_turno(turno, reserva_id):
+        """
+        Un intento de confirmar_turno.
+
+        Returns:
+            tuple: (exitoso: bool, mensaje_error: str, sin_cupo: bool)
+        """
+        ahora = timezone.now()
+        slot = ReservaService._slot(turno.profesional_id, turno.fecha, turno.hora)
+
+        try:
+            with transaction.atomic():
+                if reserva_id:
+                    consumidas, _ = ReservaSlot.objects.filter(
+                        id=reserva_id, cliente_id=turno.cliente_id, vence__gt=ahora, **slot
+                    ).delete()
+                    if not consumidas:
+                        return False, 'La reserva del horario venció. Vuelva a seleccionar el horario.', False
+                elif ReservaSlot.objects.filter(vence__gt=ahora, **slot).exclude(
+                    cliente_id=turno.cliente_id
+                ).exists():
+                    return False, 'Otro cliente está reservando este horario. Intente con otro.', False
+
+                # Canje de promociones: sin cupo se revierte también la retención consumida
+                canjeado, mensaje = CupoService.consumir(turno.promociones_a_canjear(), turno.cliente_id)
+                if not canjeado:
+                    transaction.set_rollback(True)
+                    return False, mensaje, True
+
+                turno.save()
+
+                if not reserva_id:
+                    ReservaSlot.objects.filter(cliente_id=turno.cliente_id, **slot).delete()
+
+                # El cliente ya tiene turno para el servicio: sale de la lista de espera
+                EsperaSlot.objects.filter(
+                    cliente_id=turno.cliente_id,
+                    servicio_id=turno.servicio_id,
+                    estado__in=('activa', 'ofrecida')
+                ).update(estado='atendida', reserva=None)
+        except IntegrityError:
+            logger.info(f"Slot ocupado al confirmar turno: {slot}")
+            return False, 'El horario ya fue reservado por otro cliente', False
+
+        return True, '', False
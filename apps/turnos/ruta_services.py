@@ -0,0 +1,112 @@
+"""
+Ruta diaria de un profesional.
+Cada turno tiene hora fija, así que el orden de las visitas es el de la
+agenda; el servicio calcula con NumPy (haversine vectorizado) la distancia
+de cada tramo y marca los turnos consecutivos a los que no se llega a
+tiempo.
+"""
+import numpy as np
+
+from apps.usuarios.geo_services import GeoService
+from .models import Turno
+
+
+class RutaService:
+    """
+    Servicio de rutas del profesional.
+
+    El tramo de un turno al siguiente es factible si, terminando el
+    primero a su hora, queda tiempo de viajar hasta el segundo antes de que
+    empiece. Si el profesional tiene ubicación, el recorrido parte de ella.
+    """
+
+    ESTADOS_RUTA = ('confirmado', 'en_curso')
+    VELOCIDAD_KMH = 25          # Velocidad media urbana
+    FACTOR_RECORRIDO = 1.3      # Calles vs. línea recta
+
+    @staticmethod
+    def distancias_tramos(coordenadas):
+        """
+        Distancias haversine entre cada punto y el siguiente.
+
+        Args:
+            coordenadas (array-like): Puntos (latitud, longitud) en grados, forma (n, 2)
+
+        Returns:
+            ndarray: n - 1 distancias en km
+        """
+        puntos = np.radians(np.asarray(coordenadas, dtype=float).reshape(-1, 2))
+        desde, hasta = puntos[:-1], puntos[1:]
+        dlat = hasta[:, 0] - desde[:, 0]
+        dlng = hasta[:, 1] - desde[:, 1]
+        a = np.sin(dlat / 2) ** 2 + np.cos(desde[:, 0]) * np.cos(hasta[:, 0]) * np.sin(dlng / 2) ** 2
+        return 2 * GeoService.RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    @staticmethod
+    def minutos_viaje(distancia_km):
+        return distancia_km * RutaService.FACTOR_RECORRIDO / RutaService.VELOCIDAD_KMH * 60
+
+    @staticmethod
+    def planificar_dia(profesional, fecha):
+        """
+        Arma la ruta del día de un profesional.
+
+        Args:
+            profesional (Profesional): Profesional (con usuario cargado)
+            fecha (date): Día a planificar
+
+        Returns:
+            dict: {
+                'paradas': turnos con ubicación, por hora,
+                'distancia_km': largo del recorrido (desde la ubicación del
+                                profesional, si la tiene),
+                'tramos': tramos entre turnos consecutivos, con distancia,
+                          viaje, margen y si es factible,
+                'conflictos': cantidad de tramos no factibles,
+                'sin_ubicacion': turnos sin coordenadas
+            }
+        """
+        turnos = list(Turno.objects.filter(
+            profesional=profesional,
+            fecha=fecha,
+            estado__in=RutaService.ESTADOS_RUTA
+        ).select_related('servicio', 'cliente__usuario').order_by('hora'))
+
+        con_ubicacion = [t for t in turnos if t.latitud is not None and t.longitud is not None]
+        plan = {
+            'paradas': con_ubicacion,
+            'distancia_km': 0.0,
+            'tramos': [],
+            'conflictos': 0,
+            'sin_ubicacion': [t for t in turnos if t.latitud is None or t.longitud is None],
+        }
+        if not con_ubicacion:
+            return plan
+
+        usuario = profesional.usuario
+        coordenadas = [(t.latitud, t.longitud) for t in con_ubicacion]
+        origen = usuario.latitud is not None and usuario.longitud is not None
+        if origen:
+            coordenadas.insert(0, (usuario.latitud, usuario.longitud))
+        distancias = RutaService.distancias_tramos(coordenadas)
+        plan['distancia_km'] = round(float(distancias.sum()), 2)
+
+        # Tramos entre turnos (sin el de la ubicación del profesional al primero)
+        distancias = distancias[1:] if origen else distancias
+        inicios = np.array([t.hora.hour * 60 + t.hora.minute for t in con_ubicacion], dtype=float)
+        fines = inicios + [t.servicio.duracion_estimada for t in con_ubicacion]
+        margenes = inicios[1:] - fines[:-1]
+        viajes = RutaService.minutos_viaje(distancias)
+
+        for k in range(len(con_ubicacion) - 1):
+            plan['tramos'].append({
+                'desde': con_ubicacion[k],
+                'hasta': con_ubicacion[k + 1],
+                'distancia_km': round(float(distancias[k]), 2),
+                'viaje_min': round(float(viajes[k])),
+                'margen_min': round(float(margenes[k])),
+                'factible': bool(viajes[k] <= margenes[k]),
+            })
+
+        plan['conflictos'] = sum(1 for tramo in plan['tramos'] if not tramo['factible'])
+        return plan
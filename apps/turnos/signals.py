@@ -0,0 +1,141 @@
+"""
+Señales de la app Turnos.
+Mantienen el calendario de slots sincronizado con turnos, horarios y servicios,
+ofrecen los horarios liberados a la lista de espera (y avisan al cliente),
+mantienen el mapa de calor de demanda y actualizan los agregados de
+calificaciones de cada profesional.
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from apps.usuarios.models import HorarioDisponibilidad
+from apps.servicios.models import Servicio
+from .models import Turno, Calificacion
+from .calendario_services import CalendarioSlotsService
+from .calificacion_services import CalificacionService
+from .espera_services import EsperaService
+from .demanda_services import DemandaService
+from .emails import TurnoEmailService
+
+# Se envía después de confirmar cada lote de turnos pendientes vencidos.
+# Argumentos: turnos (list[dict] con id, cliente_id, profesional_id, fecha, hora,
+# promocion_id y desglose_promociones)
+turnos_expirados = Signal()
+
+# Se envía después de confirmar un cambio de estado en lote (TransicionService).
+# Argumentos: turnos (list[dict] con id, cliente_id, promocion_id, precio_final,
+# desglose_promociones, origen y destino)
+turnos_transicionados = Signal()
+
+# Se envía cuando un slot liberado se ofrece a un cliente de la lista de espera.
+# Argumentos: espera (EsperaSlot con la reserva ofrecida)
+espera_ofrecida = Signal()
+
+
+def _ocupacion_turno(turno):
+    """
+    Datos del turno que afectan la disponibilidad.
+    Lee __dict__ para no forzar la carga de campos diferidos (.only()).
+    """
+    datos = turno.__dict__
+    fecha = datos.get('fecha')
+    if isinstance(fecha, str):
+        fecha = Turno._meta.get_field('fecha').to_python(fecha)
+    return (datos.get('profesional_id'), fecha, str(datos.get('hora')), datos.get('estado'))
+
+
+def _ofrecer_slot_liberado(turno, ocupacion):
+    """Ofrece a la lista de espera el slot que ocupaba el turno (no a su propio cliente)"""
+    profesional_id, fecha, hora, estado = ocupacion
+    if estado not in Turno.ESTADOS_ACTIVOS or fecha is None or hora == 'None':
+        return
+    hora = Turno._meta.get_field('hora').to_python(hora)
+    EsperaService.programar_oferta(
+        profesional_id, turno.servicio_id, fecha, hora, excluir_cliente_id=turno.__dict__.get('cliente_id')
+    )
+
+
+def _registrar_demanda(turno, delta):
+    """Suma o resta el turno en el mapa de calor de su categoría"""
+    fecha = Turno._meta.get_field('fecha').to_python(turno.fecha)
+    hora = Turno._meta.get_field('hora').to_python(turno.hora)
+    DemandaService.programar_registro(turno.servicio_id, fecha, hora, delta)
+
+
+@receiver(post_init, sender=Turno)
+def guardar_ocupacion_original(sender, instance, **kwargs):
+    """Guarda el profesional/fecha/hora/estado con que se cargó el turno"""
+    instance._ocupacion_original = _ocupacion_turno(instance)
+
+
+@receiver(post_save, sender=Turno)
+def actualizar_slots_turno(sender, instance, created, **kwargs):
+    """Recalcula el día afectado al crear, cancelar o reprogramar un turno"""
+    actual = _ocupacion_turno(instance)
+    original = getattr(instance, '_ocupacion_original', None)
+
+    if created:
+        _registrar_demanda(instance, 1)
+
+    if created or original is None:
+        CalendarioSlotsService.programar_recalculo(actual[0], actual[1])
+    elif actual != original:
+        CalendarioSlotsService.programar_recalculo(original[0], original[1])
+        CalendarioSlotsService.programar_recalculo(actual[0], actual[1])
+        # Cancelado o reprogramado: el horario original quedó libre
+        if actual[3] not in Turno.ESTADOS_ACTIVOS or actual[:3] != original[:3]:
+            _ofrecer_slot_liberado(instance, original)
+
+    instance._ocupacion_original = actual
+
+
+@receiver(post_delete, sender=Turno)
+def liberar_slots_turno(sender, instance, **kwargs):
+    """Recalcula el día de un turno eliminado y ofrece su horario a la lista de espera"""
+    ocupacion = _ocupacion_turno(instance)
+    CalendarioSlotsService.programar_recalculo(ocupacion[0], ocupacion[1])
+    _ofrecer_slot_liberado(instance, ocupacion)
+    _registrar_demanda(instance, -1)
+
+
+@receiver(espera_ofrecida)
+def notificar_espera_ofrecida(sender, espera, **kwargs):
+    """Avisa al cliente de la lista de espera que se le retuvo un horario"""
+    TurnoEmailService.enviar_oferta_espera(espera)
+
+
+@receiver(post_save, sender=HorarioDisponibilidad)
+@receiver(post_delete, sender=HorarioDisponibilidad)
+def actualizar_slots_horario(sender, instance, **kwargs):
+    """Recalcula el horizonte del profesional al cambiar sus horarios"""
+    CalendarioSlotsService.programar_recalculo(instance.profesional_id)
+
+
+@receiver(post_save, sender=Servicio)
+@receiver(post_delete, sender=Servicio)
+def actualizar_slots_servicio(sender, instance, **kwargs):
+    """Recalcula el horizonte del profesional al cambiar duración, estado o asignación del servicio"""
+    CalendarioSlotsService.programar_recalculo(instance.profesional_id)
+
+
+@receiver(post_init, sender=Calificacion)
+def guardar_puntuacion_original(sender, instance, **kwargs):
+    instance._puntuacion_original = instance.__dict__.get('puntuacion') if instance.pk else None
+
+
+@receiver(post_save, sender=Calificacion)
+def sumar_calificacion(sender, instance, created, **kwargs):
+    """Suma la calificación nueva (o el cambio de puntuación) a los agregados del profesional"""
+    original = instance._puntuacion_original
+    if created:
+        CalificacionService.aplicar(instance.turno.profesional_id, instance.puntuacion, 1)
+    elif original is not None and original != instance.puntuacion:
+        CalificacionService.aplicar(instance.turno.profesional_id, original, -1)
+        CalificacionService.aplicar(instance.turno.profesional_id, instance.puntuacion, 1)
+    instance._puntuacion_original = instance.puntuacion
+
+
+@receiver(post_delete, sender=Calificacion)
+def restar_calificacion(sender, instance, **kwargs):
+    """Resta la calificación eliminada de los agregados del profesional"""
+    CalificacionService.aplicar(instance.turno.profesional_id, instance.puntuacion, -1)
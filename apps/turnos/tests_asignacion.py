@@ -0,0 +1,160 @@
+"""
+Tests para la asignación automática de profesionales.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_asignacion
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional, HorarioDisponibilidad
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.promociones.models import Promocion
+from apps.turnos.asignacion_services import AsignacionService
+from apps.turnos.disponibilidad_services import DisponibilidadService
+
+
+class AsignacionServiceTestCase(TestCase):
+    """Tests para AsignacionService"""
+
+    def setUp(self):
+        self.manana = timezone.localdate() + timedelta(days=1)
+        self.categoria = Categoria.objects.create(nombre='Jardinería', descripcion='Jardinería')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experto = self._crear_profesional('experto', Decimal('4.90'), 15)
+            self.novato = self._crear_profesional('novato', Decimal('3.00'), 1)
+            self.medio = self._crear_profesional('medio', Decimal('4.00'), 5)
+        self.servicio = self.novato.servicios.first()
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+
+    def _crear_profesional(self, username, calificacion, experiencia):
+        usuario = Usuario.objects.create_user(
+            username=username, email=f'{username}@test.com', password='Profesional123',
+            first_name=username.capitalize(), rol='profesional'
+        )
+        profesional = Profesional.objects.create(
+            usuario=usuario,
+            especialidades='Jardinería',
+            calificacion_promedio=calificacion,
+            anios_experiencia=experiencia
+        )
+        HorarioDisponibilidad.objects.create(
+            profesional=profesional,
+            dia_semana=DisponibilidadService.DIAS_SEMANA[self.manana.weekday()],
+            hora_inicio=time(8, 0),
+            hora_fin=time(18, 0)
+        )
+        Servicio.objects.create(
+            categoria=self.categoria,
+            profesional=profesional,
+            nombre=f'Poda ({username})',
+            descripcion='Poda',
+            precio_base=Decimal('4000.00'),
+            duracion_estimada=60
+        )
+        return profesional
+
+    def test_ranking_por_puntaje(self):
+        """El mejor calificado y más experimentado queda primero"""
+        ranking = AsignacionService.rankear_profesionales(self.servicio, self.manana, time(10, 0))
+        self.assertEqual(
+            [c['profesional_id'] for c in ranking],
+            [self.experto.id, self.medio.id, self.novato.id]
+        )
+        self.assertEqual(ranking[0]['servicio_id'], self.experto.servicios.first().id)
+
+    def test_top_k(self):
+        """Devuelve como máximo k candidatos"""
+        ranking = AsignacionService.rankear_profesionales(self.servicio, self.manana, k=2)
+        self.assertEqual(len(ranking), 2)
+
+    def test_carga_del_dia_penaliza(self):
+        """Un profesional con el día cargado baja en el ranking"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for hora in [time(8, 0), time(9, 0), time(11, 0), time(12, 0)]:
+                Turno.objects.create(
+                    cliente=self.cliente,
+                    profesional=self.experto,
+                    servicio=self.experto.servicios.first(),
+                    fecha=self.manana,
+                    hora=hora,
+                    direccion_servicio='Calle 123',
+                    precio_final=Decimal('4000.00')
+                )
+        ranking = AsignacionService.rankear_profesionales(self.servicio, self.manana, time(10, 0))
+        self.assertEqual(ranking[0]['profesional_id'], self.medio.id)
+
+    def test_consultas_constantes(self):
+        """El ranking usa dos consultas sin importar la cantidad de candidatos"""
+        with self.assertNumQueries(2):
+            AsignacionService.rankear_profesionales(self.servicio, self.manana)
+
+    def test_sin_disponibilidad(self):
+        """Sin slots libres no hay candidato"""
+        self.assertIsNone(AsignacionService.mejor_candidato(self.servicio, self.manana, time(20, 0)))
+
+    def test_endpoint(self):
+        """El endpoint JSON devuelve el ranking"""
+        self.client.login(username='cliente', password='Cliente123')
+        response = self.client.get(reverse('turnos:candidatos_asignacion'), {
+            'servicio_id': self.servicio.id,
+            'fecha': self.manana.strftime('%Y-%m-%d'),
+            'hora': '10:00',
+            'k': 1
+        })
+        self.assertEqual(response.status_code, 200)
+        candidatos = response.json()['candidatos']
+        self.assertEqual(len(candidatos), 1)
+        self.assertEqual(candidatos[0]['profesional_id'], self.experto.id)
+        self.assertEqual(candidatos[0]['hora'], '10:00')
+
+    def _solicitar_sin_profesional(self, **datos):
+        self.client.login(username='cliente', password='Cliente123')
+        return self.client.post(reverse('turnos:solicitar_turno'), {
+            'servicio_id': self.servicio.id,
+            'fecha': self.manana.strftime('%Y-%m-%d'),
+            'hora': '10:00',
+            'direccion_servicio': 'Calle 123',
+            **datos
+        }, follow=True)
+
+    def test_solicitar_asigna_con_el_mismo_precio(self):
+        """Sin profesional elegido se asigna el mejor candidato y se cobra su servicio"""
+        self._solicitar_sin_profesional()
+        turno = Turno.objects.get()
+        self.assertEqual(turno.profesional, self.experto)
+        self.assertEqual(turno.servicio.profesional, self.experto)
+        self.assertEqual(turno.precio_final, Decimal('4000.00'))
+
+    def test_solicitar_rechaza_si_cambia_el_precio(self):
+        """Si el servicio asignado cuesta distinto no se reserva y se informa el precio nuevo"""
+        self.experto.servicios.update(precio_base=Decimal('5500.00'))
+        response = self._solicitar_sin_profesional()
+        self.assertFalse(Turno.objects.exists())
+        mensajes = [str(mensaje) for mensaje in response.context['messages']]
+        self.assertTrue(any('$5500.00' in mensaje and '$4000.00' in mensaje for mensaje in mensajes))
+
+    def test_promocion_elegida_se_verifica_con_el_servicio_asignado(self):
+        """Una promoción de otro servicio no se aplica al servicio del profesional asignado"""
+        ahora = timezone.now()
+        promocion = Promocion.objects.create(
+            titulo='Poda novato', descripcion='-', tipo_descuento='porcentaje', valor_descuento=Decimal('20'),
+            fecha_inicio=ahora - timedelta(days=1), fecha_fin=ahora + timedelta(days=10)
+        )
+        promocion.servicios.add(self.servicio)
+
+        response = self._solicitar_sin_profesional(promocion=promocion.id)
+        turno = Turno.objects.get()
+        self.assertEqual(turno.profesional, self.experto)
+        self.assertIsNone(turno.promocion)
+        self.assertEqual(turno.precio_final, Decimal('4000.00'))
+        mensajes = [str(mensaje) for mensaje in response.context['messages']]
+        self.assertTrue(any('no aplica a este servicio' in mensaje for mensaje in mensajes))
@@ -0,0 +1,115 @@
+"""
+Tests para los agregados incrementales de calificaciones.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_calificaciones
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, Calificacion
+from apps.turnos.calificacion_services import CalificacionService
+
+
+class CalificacionServiceTestCase(TestCase):
+    """Tests para CalificacionService y las señales de Calificacion"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='pintor', email='pintor@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Pintura')
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Pintura', descripcion='Pintura'),
+            profesional=self.profesional,
+            nombre='Pintura de ambiente',
+            descripcion='Pintura',
+            precio_base=Decimal('8000.00'),
+            duracion_estimada=60
+        )
+        self.usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=self.usuario_cliente)
+        self.hora = 8
+
+    def _turno_completado(self):
+        self.hora += 1
+        return Turno.objects.create(
+            cliente=self.cliente,
+            profesional=self.profesional,
+            servicio=self.servicio,
+            fecha=timezone.localdate() - timedelta(days=1),
+            hora=time(self.hora, 0),
+            direccion_servicio='Calle 123',
+            estado='completado',
+            precio_final=self.servicio.precio_base
+        )
+
+    def _calificar(self, puntuacion):
+        return Calificacion.objects.create(
+            turno=self._turno_completado(), cliente=self.usuario_cliente, puntuacion=puntuacion
+        )
+
+    def test_agregados_al_crear(self):
+        """Cada calificación suma a cantidad, suma, histograma y promedio"""
+        for puntuacion in [5, 4, 4]:
+            self._calificar(puntuacion)
+        self.profesional.refresh_from_db()
+        self.assertEqual(self.profesional.calificaciones_cantidad, 3)
+        self.assertEqual(self.profesional.calificaciones_suma, 13)
+        self.assertEqual(self.profesional.calificacion_promedio, Decimal('4.33'))
+        self.assertEqual(self.profesional.histograma_calificaciones(), {1: 0, 2: 0, 3: 0, 4: 2, 5: 1})
+
+    def test_agregados_al_eliminar_y_editar(self):
+        """Eliminar o cambiar la puntuación corrige los agregados"""
+        primera = self._calificar(5)
+        segunda = self._calificar(1)
+        segunda.puntuacion = 3
+        segunda.save()
+        self.profesional.refresh_from_db()
+        self.assertEqual(self.profesional.calificacion_promedio, Decimal('4.00'))
+        self.assertEqual(self.profesional.estrellas_1, 0)
+
+        primera.delete()
+        segunda.delete()
+        self.profesional.refresh_from_db()
+        self.assertEqual(self.profesional.calificaciones_cantidad, 0)
+        self.assertEqual(self.profesional.calificacion_promedio, Decimal('0'))
+
+    def test_calificar_cuesta_lo_mismo(self):
+        """Actualizar los agregados es un único UPDATE sin leer calificaciones"""
+        for _ in range(10):
+            self._calificar(5)
+        with self.assertNumQueries(1):
+            CalificacionService.aplicar(self.profesional.id, 4, 1)
+
+    def test_reconciliar(self):
+        """El comando reconstruye los agregados desviados"""
+        self._calificar(2)
+        self._calificar(4)
+        Profesional.objects.filter(pk=self.profesional.pk).update(
+            calificaciones_cantidad=99, estrellas_5=7, calificacion_promedio=Decimal('1.00')
+        )
+        call_command('reconciliar_calificaciones', stdout=open('/dev/null', 'w'))
+        self.profesional.refresh_from_db()
+        self.assertEqual(self.profesional.calificaciones_cantidad, 2)
+        self.assertEqual(self.profesional.estrellas_5, 0)
+        self.assertEqual(self.profesional.calificacion_promedio, Decimal('3.00'))
+
+    def test_vista_calificar_turno(self):
+        """Calificar desde la vista actualiza el promedio del profesional"""
+        self._calificar(2)
+        turno = self._turno_completado()
+        self.client.login(username='cliente', password='Cliente123')
+        self.client.post(reverse('turnos:calificar_turno', args=[turno.id]), {'puntuacion': 5, 'comentario': ''})
+        self.profesional.refresh_from_db()
+        self.assertEqual(self.profesional.calificaciones_cantidad, 2)
+        self.assertEqual(self.profesional.calificacion_promedio, Decimal('3.50'))
@@ -0,0 +1,116 @@
+"""
+Tests para el mapa de calor de demanda por categoría.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_demanda
+"""
+from datetime import date, time
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, DemandaHoraria
+from apps.turnos.demanda_services import DemandaService
+
+# Lunes y miércoles
+LUNES = date(2030, 1, 7)
+MIERCOLES = date(2030, 1, 9)
+
+
+class DemandaServiceTestCase(TestCase):
+    """Tests para DemandaService y el endpoint mapa_demanda"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='pintor', email='pintor@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Pintura')
+        self.pintura = Categoria.objects.create(nombre='Pintura', descripcion='Pintura')
+        self.gas = Categoria.objects.create(nombre='Gas', descripcion='Gas')
+        self.servicio = Servicio.objects.create(
+            categoria=self.pintura,
+            profesional=self.profesional,
+            nombre='Pintura de ambiente',
+            descripcion='Pintura',
+            precio_base=Decimal('15000.00'),
+            duracion_estimada=60
+        )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+
+    def _turno(self, fecha, hora):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Turno.objects.create(
+                cliente=self.cliente,
+                profesional=self.profesional,
+                servicio=self.servicio,
+                fecha=fecha,
+                hora=hora,
+                direccion_servicio='Calle 123',
+                precio_final=self.servicio.precio_base
+            )
+
+    def _matriz(self, categoria):
+        return DemandaService.matriz(DemandaHoraria.objects.get(categoria=categoria))
+
+    def test_incremental_al_crear_y_eliminar(self):
+        """Crear suma en la celda día/hora; eliminar la resta"""
+        self._turno(LUNES, time(9, 0))
+        self._turno(LUNES, time(9, 30))
+        turno = self._turno(MIERCOLES, time(15, 0))
+
+        matriz = self._matriz(self.pintura)
+        self.assertEqual(matriz[0, 9], 2)
+        self.assertEqual(matriz[2, 15], 1)
+        self.assertEqual(matriz.sum(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.delete()
+        self.assertEqual(self._matriz(self.pintura)[2, 15], 0)
+        self.assertEqual(DemandaHoraria.objects.get(categoria=self.pintura).total, 2)
+
+    def test_cancelar_no_descuenta(self):
+        """Un turno cancelado sigue contando como demanda del horario"""
+        turno = self._turno(LUNES, time(9, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.estado = 'cancelado'
+            turno.save()
+        self.assertEqual(self._matriz(self.pintura)[0, 9], 1)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        """El GROUP BY del comando produce la misma matriz que las señales"""
+        self._turno(LUNES, time(9, 0))
+        self._turno(MIERCOLES, time(18, 0))
+        incremental = self._matriz(self.pintura)
+
+        DemandaHoraria.objects.all().delete()
+        self.assertEqual(DemandaService.reconstruir(), 2)
+        self.assertTrue((self._matriz(self.pintura) == incremental).all())
+        self.assertEqual(self._matriz(self.gas).sum(), 0)
+
+    def test_endpoint_sin_leer_turnos(self):
+        """El endpoint responde la matriz sin consultar la tabla de turnos"""
+        self._turno(LUNES, time(9, 0))
+        self._turno(LUNES, time(9, 45))
+        self.client.login(username='pintor', password='Profesional123')
+
+        with self.assertNumQueries(4) as consultas:
+            response = self.client.get(reverse('turnos:mapa_demanda'))
+        self.assertFalse(any('turnos_turno' in consulta['sql'] for consulta in consultas.captured_queries))
+
+        datos = response.json()
+        self.assertEqual(len(datos['categorias']), 1)
+        categoria = datos['categorias'][0]
+        self.assertEqual(categoria['categoria'], 'Pintura')
+        self.assertEqual(categoria['conteos'][0][9], 2)
+        self.assertEqual(categoria['pico'], {'dia': 'lunes', 'hora': 9})
+
+    def test_endpoint_solo_profesionales_y_admins(self):
+        """Los clientes no acceden al mapa de demanda"""
+        self.client.login(username='cliente', password='Cliente123')
+        self.assertEqual(self.client.get(reverse('turnos:mapa_demanda')).status_code, 403)
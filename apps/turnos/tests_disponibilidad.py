@@ -0,0 +1,276 @@
+"""
+Tests para el motor de disponibilidad de turnos.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_disponibilidad
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional, HorarioDisponibilidad
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, SlotDisponible
+from apps.turnos.disponibilidad_services import DisponibilidadService
+from apps.turnos.calendario_services import CalendarioSlotsService
+
+
+class DisponibilidadServiceTestCase(TestCase):
+    """Tests para DisponibilidadService"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Plomería', descripcion='Plomería')
+        self.profesionales = [self._crear_profesional(i) for i in range(5)]
+        self.servicio = Servicio.objects.create(
+            categoria=self.categoria,
+            profesional=self.profesionales[0],
+            nombre='Destapación',
+            descripcion='Destapación de cañerías',
+            precio_base=Decimal('5000.00'),
+            duracion_estimada=60
+        )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+        # Un lunes lejano para no depender de la hora actual
+        self.lunes = date.today() + timedelta(days=(7 - date.today().weekday()) + 7)
+
+    def _crear_profesional(self, indice):
+        usuario = Usuario.objects.create_user(
+            username=f'profesional{indice}',
+            email=f'profesional{indice}@test.com',
+            password='Profesional123',
+            rol='profesional'
+        )
+        profesional = Profesional.objects.create(usuario=usuario, especialidades='Plomería')
+        for dia in ['lunes', 'miercoles']:
+            HorarioDisponibilidad.objects.create(
+                profesional=profesional, dia_semana=dia, hora_inicio=time(9, 0), hora_fin=time(12, 0)
+            )
+        return profesional
+
+    def _ids(self):
+        return [p.id for p in self.profesionales]
+
+    def _slots(self, dias):
+        """Materializa el calendario desde el lunes y devuelve los slots del servicio"""
+        CalendarioSlotsService.recalcular(self._ids()[:1], self.lunes, self.lunes + timedelta(days=dias - 1))
+        slots = SlotDisponible.objects.filter(servicio=self.servicio).order_by('fecha', 'hora')
+        return [datetime.combine(fecha, hora) for fecha, hora in slots.values_list('fecha', 'hora')]
+
+    def test_consultas_constantes(self):
+        """La cantidad de consultas no depende de profesionales ni días"""
+        with CaptureQueriesContext(connection) as uno:
+            CalendarioSlotsService.recalcular(self._ids()[:1], self.lunes, self.lunes)
+        with CaptureQueriesContext(connection) as todos:
+            CalendarioSlotsService.recalcular(self._ids(), self.lunes, self.lunes + timedelta(days=27))
+        self.assertEqual(len(uno), len(todos))
+
+    def test_genera_slots_por_dia_con_horario(self):
+        """Genera un slot por hora solo en los días con horario"""
+        slots = self._slots(7)
+        self.assertEqual(len(slots), 6)  # lunes y miércoles, 9 a 12
+        self.assertEqual(slots[0].time(), time(9, 0))
+
+    def test_excluye_horarios_ocupados(self):
+        """Un turno activo bloquea los slots que se superponen con su duración"""
+        servicio_largo = Servicio.objects.create(
+            categoria=self.categoria,
+            nombre='Instalación',
+            descripcion='Instalación completa',
+            precio_base=Decimal('9000.00'),
+            duracion_estimada=120
+        )
+        Turno.objects.create(
+            cliente=self.cliente,
+            profesional=self.profesionales[0],
+            servicio=servicio_largo,
+            fecha=self.lunes,
+            hora=time(9, 0),
+            direccion_servicio='Calle 123',
+            precio_final=Decimal('9000.00')
+        )
+        self.assertEqual([slot.time() for slot in self._slots(1)], [time(11, 0)])
+
+    def test_turno_cancelado_no_bloquea(self):
+        """Los turnos cancelados no ocupan el horario"""
+        Turno.objects.create(
+            cliente=self.cliente,
+            profesional=self.profesionales[0],
+            servicio=self.servicio,
+            fecha=self.lunes,
+            hora=time(10, 0),
+            estado='cancelado',
+            direccion_servicio='Calle 123',
+            precio_final=Decimal('5000.00')
+        )
+        self.assertEqual(len(self._slots(1)), 3)
+
+    def test_esta_libre(self):
+        """Detecta superposición con intervalos semiabiertos"""
+        ocupados = [(600, 660), (720, 780)]
+        self.assertTrue(DisponibilidadService.esta_libre(ocupados, 540, 600))
+        self.assertFalse(DisponibilidadService.esta_libre(ocupados, 630, 690))
+        self.assertTrue(DisponibilidadService.esta_libre(ocupados, 660, 720))
+        self.assertFalse(DisponibilidadService.esta_libre(ocupados, 700, 730))
+
+
+class ProfesionalesDisponiblesViewTestCase(TestCase):
+    """Tests para la API de profesionales disponibles"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._crear_datos()
+        Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.client.login(username='cliente', password='Cliente123')
+
+    def _crear_datos(self):
+        categoria = Categoria.objects.create(nombre='Electricidad', descripcion='Electricidad')
+        usuario = Usuario.objects.create_user(
+            username='electricista', email='electricista@test.com', password='Profesional123',
+            first_name='Ana', last_name='Pérez', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Electricidad')
+        for dia, _ in HorarioDisponibilidad.DIAS_SEMANA:
+            HorarioDisponibilidad.objects.create(
+                profesional=self.profesional, dia_semana=dia, hora_inicio=time(0, 0), hora_fin=time(23, 0)
+            )
+        self.servicio = Servicio.objects.create(
+            categoria=categoria,
+            profesional=self.profesional,
+            nombre='Instalación eléctrica',
+            descripcion='Instalación',
+            precio_base=Decimal('3000.00'),
+            duracion_estimada=30
+        )
+
+    def test_formato_respuesta(self):
+        """La respuesta conserva el formato esperado por el frontend"""
+        response = self.client.get(
+            reverse('turnos:profesionales_disponibles'), {'servicio_id': self.servicio.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        profesionales = response.json()['profesionales']
+        self.assertEqual(len(profesionales), 1)
+        self.assertEqual(profesionales[0]['id'], self.profesional.id)
+        self.assertEqual(profesionales[0]['nombre'], 'Ana Pérez')
+        slot = profesionales[0]['disponibilidad'][0]
+        self.assertEqual(
+            set(slot.keys()), {'fecha', 'fecha_formato', 'dia_semana', 'hora', 'precio'}
+        )
+        self.assertEqual(slot['precio'], 3000.0)
+
+    def test_ubicacion_invalida(self):
+        """Una ubicación no finita o fuera de rango responde 400"""
+        for latitud in ('inf', '1e400', '-91', 'abc'):
+            response = self.client.get(
+                reverse('turnos:profesionales_disponibles'),
+                {'servicio_id': self.servicio.id, 'latitud': latitud, 'longitud': '-58.38'}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_lectura_en_una_consulta(self):
+        """La búsqueda de slots es un único rango sobre el calendario"""
+        with self.assertNumQueries(1):
+            list(CalendarioSlotsService.buscar_slots(self.servicio))
+
+
+class CalendarioSlotsServiceTestCase(TestCase):
+    """Tests para el mantenimiento incremental del calendario de slots"""
+
+    def setUp(self):
+        self.manana = timezone.localdate() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            categoria = Categoria.objects.create(nombre='Pintura', descripcion='Pintura')
+            usuario = Usuario.objects.create_user(
+                username='pintor', email='pintor@test.com', password='Profesional123', rol='profesional'
+            )
+            self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Pintura')
+            HorarioDisponibilidad.objects.create(
+                profesional=self.profesional,
+                dia_semana=DisponibilidadService.DIAS_SEMANA[self.manana.weekday()],
+                hora_inicio=time(9, 0),
+                hora_fin=time(12, 0)
+            )
+            self.servicio = Servicio.objects.create(
+                categoria=categoria,
+                profesional=self.profesional,
+                nombre='Pintura de ambiente',
+                descripcion='Pintura',
+                precio_base=Decimal('8000.00'),
+                duracion_estimada=60
+            )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+
+    def _horas(self, fecha):
+        return list(SlotDisponible.objects.filter(
+            servicio=self.servicio, fecha=fecha
+        ).values_list('hora', flat=True))
+
+    def _crear_turno(self, hora):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Turno.objects.create(
+                cliente=self.cliente,
+                profesional=self.profesional,
+                servicio=self.servicio,
+                fecha=self.manana,
+                hora=hora,
+                direccion_servicio='Calle 123',
+                precio_final=Decimal('8000.00')
+            )
+
+    def test_materializa_horizonte_al_cargar_horarios(self):
+        """Los cambios de horarios y servicios generan el horizonte del profesional"""
+        self.assertEqual(self._horas(self.manana), [time(9, 0), time(10, 0), time(11, 0)])
+
+    def test_crear_turno_ocupa_slot(self):
+        """Crear un turno quita el slot del calendario"""
+        self._crear_turno(time(10, 0))
+        self.assertEqual(self._horas(self.manana), [time(9, 0), time(11, 0)])
+
+    def test_cancelar_turno_libera_slot(self):
+        """Cancelar un turno vuelve a publicar el slot"""
+        turno = self._crear_turno(time(10, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.estado = 'cancelado'
+            turno.save()
+        self.assertEqual(len(self._horas(self.manana)), 3)
+
+    def test_reprogramar_turno_mueve_slot(self):
+        """Reprogramar un turno libera el horario anterior y ocupa el nuevo"""
+        turno = Turno.objects.get(pk=self._crear_turno(time(10, 0)).pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            turno.hora = time(11, 0)
+            turno.save()
+        self.assertEqual(self._horas(self.manana), [time(9, 0), time(10, 0)])
+
+    def test_extender_horizonte_es_idempotente(self):
+        """Extender el horizonte dos veces no duplica slots"""
+        CalendarioSlotsService.reconstruir()
+        total = SlotDisponible.objects.count()
+        CalendarioSlotsService.extender_horizonte()
+        self.assertEqual(SlotDisponible.objects.count(), total)
+
+    def test_comando_con_horizonte_propio(self):
+        """--dias acota el horizonte de esa ejecución sin cambiar el default"""
+        SlotDisponible.objects.all().delete()
+        call_command('actualizar_calendario_slots', '--reconstruir', '--dias', '2', stdout=StringIO())
+        self.assertEqual(CalendarioSlotsService.HORIZONTE_DIAS, 30)
+        ultima = SlotDisponible.objects.aggregate(ultima=Max('fecha'))['ultima']
+        self.assertEqual(ultima, self.manana)
+        self.assertEqual(CalendarioSlotsService.fin_horizonte(2), self.manana)
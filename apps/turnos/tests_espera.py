@@ -0,0 +1,231 @@
+"""
+Tests para la lista de espera con oferta automática de slots liberados.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_espera
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, ReservaSlot, EsperaSlot
+from apps.turnos.espera_services import EsperaService
+from apps.turnos.reserva_services import ReservaService
+from apps.turnos.signals import espera_ofrecida
+from apps.turnos.transicion_services import TransicionService
+
+# Obelisco, Buenos Aires
+OBELISCO = (-34.6037, -58.3816)
+
+
+class EsperaServiceTestCase(TestCase):
+    """Tests para EsperaService"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='tecnico', email='tecnico@test.com', password='Profesional123', rol='profesional',
+            latitud=Decimal(str(OBELISCO[0])), longitud=Decimal(str(OBELISCO[1]))
+        )
+        self.profesional = Profesional.objects.create(
+            usuario=usuario, especialidades='Aire acondicionado', radio_cobertura_km=Decimal('10')
+        )
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Climatización', descripcion='Climatización'),
+            profesional=self.profesional,
+            nombre='Instalación de aire',
+            descripcion='Aire',
+            precio_base=Decimal('20000.00'),
+            duracion_estimada=120
+        )
+        self.clientes = []
+        for nombre in ['titular', 'primero', 'segundo', 'lejano']:
+            usuario_cliente = Usuario.objects.create_user(
+                username=nombre, email=f'{nombre}@test.com', password='Cliente123', rol='cliente'
+            )
+            self.clientes.append(Cliente.objects.create(usuario=usuario_cliente))
+        self.titular, self.primero, self.segundo, self.lejano = self.clientes
+
+        self.fecha = timezone.localdate() + timedelta(days=3)
+        self.turno = Turno.objects.create(
+            cliente=self.titular,
+            profesional=self.profesional,
+            servicio=self.servicio,
+            fecha=self.fecha,
+            hora=time(10, 0),
+            direccion_servicio='Calle 123',
+            precio_final=self.servicio.precio_base
+        )
+
+    def _esperar(self, cliente, desde=0, hasta=7, ubicacion=OBELISCO):
+        hoy = timezone.localdate()
+        espera, errores = EsperaService.unirse(
+            cliente, self.servicio, hoy + timedelta(days=desde), hoy + timedelta(days=hasta), *ubicacion
+        )
+        self.assertEqual(errores, [])
+        return espera
+
+    def _cancelar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.turno.estado = 'cancelado'
+            self.turno.save()
+
+    def test_cancelar_ofrece_al_primero_compatible(self):
+        """El slot va al cliente más antiguo cuyo rango y zona son compatibles"""
+        self._esperar(self.lejano, ubicacion=(-34.9214, -57.9544))   # La Plata: fuera de cobertura
+        self._esperar(self.primero, desde=5)                           # El rango no incluye la fecha
+        segundo = self._esperar(self.segundo)
+
+        ofertas = []
+        espera_ofrecida.connect(lambda sender, espera, **kwargs: ofertas.append(espera.pk), weak=False,
+                                dispatch_uid='test_espera')
+        try:
+            self._cancelar()
+        finally:
+            espera_ofrecida.disconnect(dispatch_uid='test_espera')
+
+        segundo.refresh_from_db()
+        self.assertEqual(segundo.estado, 'ofrecida')
+        self.assertEqual(ofertas, [segundo.pk])
+        reserva = ReservaSlot.objects.get()
+        self.assertEqual((reserva.cliente, reserva.fecha, reserva.hora), (self.segundo, self.fecha, time(10, 0)))
+        self.assertGreater(reserva.vence, timezone.now() + timedelta(minutes=EsperaService.TTL_OFERTA_MINUTOS - 1))
+
+    def test_sin_espera_compatible_no_retiene(self):
+        """Sin clientes compatibles el slot queda libre para cualquiera"""
+        self._esperar(self.primero, desde=5)
+        self._cancelar()
+        self.assertFalse(ReservaSlot.objects.exists())
+
+    def test_confirmar_oferta_atiende_la_espera(self):
+        """El cliente confirma el turno con la retención ofrecida y sale de la lista"""
+        espera = self._esperar(self.primero)
+        self._cancelar()
+        espera.refresh_from_db()
+        turno = Turno(
+            cliente=self.primero, profesional=self.profesional, servicio=self.servicio,
+            fecha=self.fecha, hora=time(10, 0), direccion_servicio='Calle 456',
+            precio_final=self.servicio.precio_base
+        )
+        exitoso, _ = ReservaService.confirmar_turno(turno, espera.reserva_id)
+        self.assertTrue(exitoso)
+        espera.refresh_from_db()
+        self.assertEqual(espera.estado, 'atendida')
+
+    def test_oferta_vencida_pasa_al_siguiente(self):
+        """Si la retención vence sin confirmar, la espera vence y el slot se ofrece al siguiente"""
+        primero = self._esperar(self.primero)
+        segundo = self._esperar(self.segundo)
+        self._cancelar()
+        primero.refresh_from_db()
+        self.assertEqual(primero.estado, 'ofrecida')
+        self.assertEqual(mail.outbox[-1].to, ['primero@test.com'])
+        self.assertIn('10:00', mail.outbox[-1].body)
+
+        ReservaSlot.objects.update(vence=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            salida = StringIO()
+            call_command('liberar_reservas_vencidas', stdout=salida)
+        self.assertIn('1', salida.getvalue())
+
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual((primero.estado, primero.reserva), ('vencida', None))
+        self.assertEqual(segundo.estado, 'ofrecida')
+        self.assertEqual(segundo.reserva.cliente, self.segundo)
+        self.assertEqual((segundo.reserva.fecha, segundo.reserva.hora), (self.fecha, time(10, 0)))
+        self.assertEqual(mail.outbox[-1].to, ['segundo@test.com'])
+
+    def test_oferta_liberada_al_elegir_otro_horario(self):
+        """Tomar otro horario libera la oferta y el slot pasa al siguiente"""
+        primero = self._esperar(self.primero)
+        segundo = self._esperar(self.segundo)
+        self._cancelar()
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva, error = ReservaService.tomar_reserva(
+                self.primero, self.profesional.id, self.servicio, self.fecha, time(14, 0)
+            )
+        self.assertEqual(error, '')
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual(primero.estado, 'vencida')
+        self.assertEqual(segundo.estado, 'ofrecida')
+        self.assertEqual(ReservaSlot.objects.filter(cliente=self.primero).get(), reserva)
+
+    def test_retencion_vencida_tomada_por_otro_cliente(self):
+        """Si otro cliente toma el slot de una oferta vencida, la espera vence y no se reofrece"""
+        primero = self._esperar(self.primero)
+        segundo = self._esperar(self.segundo)
+        self._cancelar()
+        ReservaSlot.objects.update(vence=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva, _ = ReservaService.tomar_reserva(
+                self.titular, self.profesional.id, self.servicio, self.fecha, time(10, 0)
+            )
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual((primero.estado, segundo.estado), ('vencida', 'activa'))
+        self.assertEqual(ReservaSlot.objects.get(), reserva)
+
+    def test_cancelacion_en_lote_ofrece(self):
+        """Las cancelaciones en lote también ofrecen el slot"""
+        espera = self._esperar(self.primero)
+        with self.captureOnCommitCallbacks(execute=True):
+            TransicionService.aplicar_transiciones(self.profesional.usuario, [self.turno.id], 'cancelado')
+        espera.refresh_from_db()
+        self.assertEqual(espera.estado, 'ofrecida')
+
+    def test_no_se_ofrece_a_quien_cancela(self):
+        """El cliente que cancela y está en espera del servicio no recibe su propio slot"""
+        self._esperar(self.titular)
+        espera = self._esperar(self.primero)
+        self._cancelar()
+        self.assertEqual(ReservaSlot.objects.get().cliente, self.primero)
+        espera.refresh_from_db()
+        self.assertEqual(espera.estado, 'ofrecida')
+        self.assertEqual(EsperaSlot.objects.get(cliente=self.titular).estado, 'activa')
+
+    def test_cancelacion_en_lote_no_ofrece_a_quien_cancela(self):
+        """En lote tampoco se ofrece el slot al cliente del turno cancelado"""
+        self._esperar(self.titular)
+        with self.captureOnCommitCallbacks(execute=True):
+            TransicionService.aplicar_transiciones(self.profesional.usuario, [self.turno.id], 'cancelado')
+        self.assertFalse(ReservaSlot.objects.exists())
+
+    def test_busqueda_indexada(self):
+        """La búsqueda del primer compatible filtra servicio y rango de fechas con un índice parcial"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN es específico de SQLite')
+        for dias in range(30):
+            EsperaSlot.objects.create(
+                cliente=self.primero, servicio=self.servicio, estado='activa',
+                fecha_desde=self.fecha - timedelta(days=60 + dias), fecha_hasta=self.fecha - timedelta(days=30 + dias)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        consulta = EsperaSlot.objects.filter(
+            servicio_id=self.servicio.id, estado='activa', fecha_hasta__gte=self.fecha, fecha_desde__lte=self.fecha
+        ).order_by('fecha_creacion')[:1]
+        self.assertIn('espera_servicio_fechas_idx', consulta.explain())
+
+    def test_endpoints(self):
+        """El cliente se anota y ve la oferta con su retención"""
+        self.client.login(username='primero', password='Cliente123')
+        hoy = timezone.localdate()
+        response = self.client.post(reverse('turnos:unirse_lista_espera'), {
+            'servicio_id': self.servicio.id,
+            'fecha_desde': hoy.strftime('%Y-%m-%d'),
+            'fecha_hasta': (hoy + timedelta(days=7)).strftime('%Y-%m-%d'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self._cancelar()
+        esperas = self.client.get(reverse('turnos:mis_esperas')).json()['esperas']
+        self.assertEqual(esperas[0]['oferta']['hora'], '10:00')
@@ -0,0 +1,100 @@
+"""
+Tests para el vencimiento de turnos pendientes.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_expiracion
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.turnos.expiracion_services import ExpiracionService
+from apps.turnos.signals import turnos_expirados
+
+
+class ExpiracionServiceTestCase(TestCase):
+    """Tests para ExpiracionService"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='herrero', email='herrero@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Herrería')
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Herrería', descripcion='Herrería'),
+            profesional=self.profesional,
+            nombre='Reja',
+            descripcion='Reja',
+            precio_base=Decimal('9000.00'),
+            duracion_estimada=60
+        )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+        # Mediodía fijo para no depender de la hora en que corren los tests
+        self.ahora = timezone.make_aware(datetime.combine(timezone.localdate(), time(12, 0)))
+        hoy = self.ahora.date()
+
+        turnos = [
+            Turno(fecha=hoy - timedelta(days=dias), hora=time(9 + dias % 8, 0))
+            for dias in range(1, 8)
+        ]
+        turnos += [
+            Turno(fecha=hoy, hora=time(11, 0)),                              # vencido hoy
+            Turno(fecha=hoy, hora=time(13, 0)),                              # todavía no
+            Turno(fecha=hoy + timedelta(days=1), hora=time(9, 0)),           # futuro
+            Turno(fecha=hoy - timedelta(days=1), hora=time(8, 0), estado='confirmado'),
+        ]
+        for turno in turnos:
+            turno.cliente = self.cliente
+            turno.profesional = self.profesional
+            turno.servicio = self.servicio
+            turno.direccion_servicio = 'Calle 123'
+            turno.precio_final = self.servicio.precio_base
+        Turno.objects.bulk_create(turnos)
+
+    def test_cancela_solo_pendientes_vencidos_en_lotes(self):
+        """Cancela los ocho vencidos en lotes de tres y deja el resto"""
+        eventos = []
+
+        def receptor(sender, turnos, **kwargs):
+            eventos.append(len(turnos))
+
+        turnos_expirados.connect(receptor)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                cancelados = ExpiracionService.expirar_pendientes(self.ahora, tamanio_lote=3)
+        finally:
+            turnos_expirados.disconnect(receptor)
+
+        self.assertEqual(cancelados, 8)
+        self.assertEqual(eventos, [3, 3, 2])
+        self.assertEqual(Turno.objects.filter(estado='pendiente').count(), 2)
+        self.assertEqual(Turno.objects.filter(estado='confirmado').count(), 1)
+
+    def test_idempotente(self):
+        """Una segunda ejecución no cancela ni notifica nada"""
+        ExpiracionService.expirar_pendientes(self.ahora)
+        self.assertEqual(ExpiracionService.expirar_pendientes(self.ahora), 0)
+
+    def test_consulta_usa_indice_parcial(self):
+        """La búsqueda de vencidos usa el índice de pendientes"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN es específico de SQLite')
+        self.assertIn('turno_pendiente_fecha_idx', ExpiracionService.pendientes_vencidos(self.ahora).explain())
+
+    def test_comando(self):
+        """El comando informa la cantidad de turnos cancelados"""
+        salida = StringIO()
+        call_command('expirar_turnos_pendientes', stdout=salida)
+        self.assertIn('cancelados', salida.getvalue())
+        self.assertFalse(ExpiracionService.pendientes_vencidos().exists())
@@ -0,0 +1,131 @@
+"""
+Tests para el historial de turnos paginado por cursor.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_historial
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.turnos.historial_services import HistorialService
+
+
+class HistorialServiceTestCase(TestCase):
+    """Tests para HistorialService y las vistas de historial"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='electricista', email='electricista@test.com', password='Profesional123',
+            first_name='Elena', last_name='Voltio', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Electricidad')
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Electricidad', descripcion='Electricidad'),
+            profesional=self.profesional,
+            nombre='Cambio de tablero',
+            descripcion='Tablero',
+            precio_base=Decimal('15000.00'),
+            duracion_estimada=60
+        )
+        self.clientes = []
+        for nombre in ['cliente', 'otro']:
+            usuario_cliente = Usuario.objects.create_user(
+                username=nombre, email=f'{nombre}@test.com', password='Cliente123', rol='cliente'
+            )
+            self.clientes.append(Cliente.objects.create(usuario=usuario_cliente))
+
+        # 25 turnos del primer cliente, con varios en el mismo horario (cancelados)
+        hoy = timezone.localdate()
+        turnos = []
+        for i in range(25):
+            turnos.append(Turno(
+                cliente=self.clientes[0],
+                profesional=self.profesional,
+                servicio=self.servicio,
+                fecha=hoy - timedelta(days=i // 3),
+                hora=time(10, 0),
+                estado='cancelado',
+                direccion_servicio='Calle 123',
+                precio_final=self.servicio.precio_base
+            ))
+        turnos.append(Turno(
+            cliente=self.clientes[1],
+            profesional=self.profesional,
+            servicio=self.servicio,
+            fecha=hoy,
+            hora=time(11, 0),
+            direccion_servicio='Otra calle',
+            precio_final=self.servicio.precio_base
+        ))
+        Turno.objects.bulk_create(turnos)
+
+    def _ordenados(self, queryset):
+        return list(queryset.order_by('-fecha', '-hora', '-id').values_list('id', flat=True))
+
+    def test_paginar_recorre_todo_sin_repetir(self):
+        """Recorrer las páginas devuelve cada turno una vez y en orden"""
+        queryset = HistorialService.turnos_visibles(self.clientes[0].usuario)
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = HistorialService.paginar(queryset, cursor, limite=10)
+            vistos.extend(turno.id for turno in pagina)
+            if not cursor:
+                break
+        self.assertEqual(vistos, self._ordenados(queryset))
+
+    def test_cursor_invalido(self):
+        """Un cursor mal formado se rechaza"""
+        with self.assertRaises(ValueError):
+            HistorialService.paginar(Turno.objects.all(), 'no-es-un-cursor')
+
+    def test_pagina_con_consulta_constante(self):
+        """Una página del listado es una sola consulta"""
+        queryset = HistorialService.para_listado(HistorialService.turnos_visibles(self.clientes[0].usuario))
+        _, cursor = HistorialService.paginar(queryset, limite=5)
+        with self.assertNumQueries(1):
+            pagina, _ = HistorialService.paginar(queryset, cursor, limite=5)
+            [HistorialService.serializar(turno) for turno in pagina]
+
+    def test_vista_historial_paginada(self):
+        """El HTML muestra una página y el enlace a la siguiente"""
+        self.client.login(username='cliente', password='Cliente123')
+        response = self.client.get(reverse('turnos:historial_turnos'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['turnos']), HistorialService.PAGINA_DEFAULT)
+        self.assertIsNotNone(response.context['siguiente_cursor'])
+
+    def test_api_historial(self):
+        """La API devuelve solo los turnos del cliente, página por página"""
+        self.client.login(username='otro', password='Cliente123')
+        datos = self.client.get(reverse('turnos:historial_turnos_api')).json()
+        self.assertEqual(len(datos['turnos']), 1)
+        self.assertIsNone(datos['siguiente_cursor'])
+        self.assertEqual(datos['turnos'][0]['profesional'], 'Elena Voltio')
+
+        response = self.client.get(reverse('turnos:historial_turnos_api'), {'cursor': '%%%'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exportar_ndjson(self):
+        """La exportación transmite una línea JSON por turno"""
+        self.client.login(username='cliente', password='Cliente123')
+        response = self.client.get(reverse('turnos:exportar_historial'))
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        ids = [json.loads(linea)['id'] for linea in lineas]
+        self.assertEqual(ids, self._ordenados(Turno.objects.filter(cliente=self.clientes[0])))
+
+    def test_buscar_turno_pagina_con_filtros(self):
+        """La búsqueda pagina y conserva los filtros en el enlace siguiente"""
+        self.client.login(username='cliente', password='Cliente123')
+        response = self.client.get(reverse('turnos:buscar_turno'), {'estado': 'cancelado'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['turnos']), HistorialService.PAGINA_DEFAULT)
+        self.assertIn('estado=cancelado', response.context['siguiente_url'])
@@ -0,0 +1,150 @@
+"""
+Tests para el feed iCalendar de turnos del profesional.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_ical
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.turnos.ical_services import ICalService
+
+
+class ICalFormatoTestCase(SimpleTestCase):
+    """Tests del formato RFC 5545"""
+
+    def test_escapar(self):
+        """Comas, punto y coma y saltos de línea se escapan"""
+        self.assertEqual(ICalService._escapar('Av. 9 de Julio, 1; PB\nTimbre'), 'Av. 9 de Julio\\, 1\\; PB\\nTimbre')
+
+    def test_plegar_lineas_largas(self):
+        """Las líneas se parten en 75 octetos sin cortar caracteres multibyte"""
+        linea = 'DESCRIPTION:' + 'ñ' * 100
+        plegada = ICalService._plegar(linea)
+        segmentos = plegada.rstrip('\r\n').split('\r\n')
+        self.assertTrue(all(len(s.encode('utf-8')) <= 75 for s in segmentos))
+        self.assertEqual(segmentos[0] + ''.join(s[1:] for s in segmentos[1:]), linea)
+
+
+class CalendarioFeedTestCase(TestCase):
+    """Tests para el endpoint calendario_profesional"""
+
+    def setUp(self):
+        cache.clear()
+        usuario = Usuario.objects.create_user(
+            username='plomero', email='plomero@test.com', password='Profesional123', rol='profesional'
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Plomería')
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Plomería', descripcion='Plomería'),
+            profesional=self.profesional,
+            nombre='Destapación',
+            descripcion='Cañerías',
+            precio_base=Decimal('8000.00'),
+            duracion_estimada=90
+        )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente',
+            first_name='Ana', last_name='Gómez'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+        self.manana = timezone.localdate() + timedelta(days=1)
+        self.turnos = [
+            Turno.objects.create(
+                cliente=self.cliente,
+                profesional=self.profesional,
+                servicio=self.servicio,
+                fecha=self.manana,
+                hora=time(hora, 0),
+                direccion_servicio='Calle 123, Depto 4',
+                precio_final=self.servicio.precio_base
+            )
+            for hora in (9, 11, 14)
+        ]
+        self.url = reverse('turnos:calendario_profesional', args=[ICalService.token_para(self.profesional)])
+
+    def _leer(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_feed_completo(self):
+        """El feed incluye un VEVENT por turno con hora UTC y duración del servicio"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        contenido = self._leer(response)
+        self.assertTrue(contenido.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 3)
+        # 09:00 en Buenos Aires (UTC-3) son las 12:00 UTC
+        self.assertIn(f'DTSTART:{self.manana:%Y%m%d}T120000Z', contenido)
+        self.assertIn(f'DTEND:{self.manana:%Y%m%d}T133000Z', contenido)
+        self.assertIn('SUMMARY:Destapación - Ana Gómez', contenido)
+        self.assertIn('LOCATION:Calle 123\\, Depto 4', contenido)
+
+    def test_token_invalido(self):
+        """Un token alterado no expone ningún calendario"""
+        response = self.client.get(reverse('turnos:calendario_profesional', args=[f'{self.profesional.pk}:falso']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_modificado_sin_generar(self):
+        """Con el mismo ETag se responde 304 sin recorrer los turnos ni serializar"""
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch.object(ICalService, 'vevent') as vevent, self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        vevent.assert_not_called()
+
+    def test_last_modified(self):
+        """If-Modified-Since con la última modificación también responde 304"""
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_solo_regenera_los_modificados(self):
+        """Tras cancelar un turno cambia el ETag y solo ese VEVENT se vuelve a serializar"""
+        response = self.client.get(self.url)
+        self._leer(response)
+        etag = response['ETag']
+        turno = self.turnos[1]
+        turno.estado = 'cancelado'
+        turno.save()
+
+        with mock.patch.object(ICalService, 'vevent', wraps=ICalService.vevent) as vevent:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            contenido = self._leer(response)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([llamada.args[0].id for llamada in vevent.call_args_list], [turno.id])
+        self.assertEqual(contenido.count('STATUS:CANCELLED'), 1)
+
+    def test_borrado_cambia_version(self):
+        """Borrar un turno cambia el ETag aunque no cambie la última modificación"""
+        etag = self.client.get(self.url)['ETag']
+        self.turnos[0].delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renombrar_servicio_o_cliente_cambia_version(self):
+        """Renombrar el servicio o el cliente cambia el ETag y regenera el SUMMARY"""
+        etag = self.client.get(self.url)['ETag']
+        self.servicio.nombre = 'Destapación urgente'
+        self.servicio.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._leer(response).count('SUMMARY:Destapación urgente - Ana Gómez'), 3)
+
+        etag = response['ETag']
+        usuario = self.cliente.usuario
+        usuario.last_name = 'Gómez Paz'
+        usuario.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Destapación urgente - Ana Gómez Paz', self._leer(response))
@@ -0,0 +1,80 @@
+"""
+Tests de planes de consulta para los accesos frecuentes a Turno.
+Verifican con EXPLAIN QUERY PLAN que cada consulta usa un índice
+y no recorre la tabla completa.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_indices
+"""
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.turnos.models import Turno
+
+TABLA = Turno._meta.db_table
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN es específico de SQLite')
+class IndicesTurnoTestCase(TestCase):
+    """Cada consulta frecuente sobre Turno debe resolverse con su índice"""
+
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [fila[-1] for fila in cursor.fetchall()]
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = self._plan(queryset)
+        detalle = '\n'.join(plan)
+        self.assertNotIn(f'SCAN {TABLA}', detalle)
+        self.assertIn(f'SEARCH {TABLA} USING', detalle)
+        self.assertIn(indice, detalle)
+
+    def test_ocupacion_de_profesionales(self):
+        """Disponibilidad: profesionales, rango de fechas y estados activos"""
+        hoy = timezone.localdate()
+        self.assertUsaIndice(
+            Turno.objects.filter(
+                profesional_id__in=[1, 2, 3],
+                fecha__range=(hoy, hoy + timedelta(days=14)),
+                estado__in=Turno.ESTADOS_ACTIVOS
+            ).values_list('profesional_id', 'fecha', 'hora'),
+            'turno_prof_fecha_idx'
+        )
+
+    def test_dashboard_profesional(self):
+        """Turnos del profesional por estado ordenados por fecha y hora"""
+        self.assertUsaIndice(
+            Turno.objects.filter(profesional_id=1, estado='pendiente').order_by('fecha', 'hora')[:5],
+            'turno_prof_fecha_idx'
+        )
+
+    def test_dashboard_cliente(self):
+        """Turnos del cliente por estado ordenados por fecha y hora"""
+        self.assertUsaIndice(
+            Turno.objects.filter(cliente_id=1, estado='confirmado').order_by('fecha', 'hora')[:5],
+            'turno_cliente_estado_idx'
+        )
+
+    def test_reportes_por_fecha_de_solicitud(self):
+        """Reportes: rango de fecha de solicitud y estado"""
+        fin = timezone.now()
+        self.assertUsaIndice(
+            Turno.objects.filter(
+                fecha_solicitud__range=(fin - timedelta(days=30), fin),
+                estado='completado'
+            ),
+            'turno_solicitud_estado_idx'
+        )
+
+    def test_turnos_activos_de_promocion(self):
+        """PromocionService.puede_eliminar_promocion usa el índice parcial"""
+        self.assertUsaIndice(
+            Turno.objects.filter(promocion_id=1, estado__in=Turno.ESTADOS_ACTIVOS),
+            'turno_promocion_estado_idx'
+        )
@@ -0,0 +1,182 @@
+"""
+Tests para la reserva de horarios con retenciones temporales.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_reservas
+"""
+import threading
+import time as reloj
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, ReservaSlot
+from apps.turnos.reserva_services import ReservaService
+
+
+def crear_datos(cantidad_clientes=1):
+    categoria = Categoria.objects.create(nombre='Cerrajería', descripcion='Cerrajería')
+    usuario = Usuario.objects.create_user(
+        username='cerrajero', email='cerrajero@test.com', password='Profesional123', rol='profesional'
+    )
+    profesional = Profesional.objects.create(usuario=usuario, especialidades='Cerrajería')
+    servicio = Servicio.objects.create(
+        categoria=categoria,
+        profesional=profesional,
+        nombre='Apertura de puerta',
+        descripcion='Apertura',
+        precio_base=Decimal('2500.00'),
+        duracion_estimada=60
+    )
+    clientes = []
+    for i in range(cantidad_clientes):
+        usuario_cliente = Usuario.objects.create_user(
+            username=f'cliente{i}', email=f'cliente{i}@test.com', password='Cliente123', rol='cliente'
+        )
+        clientes.append(Cliente.objects.create(usuario=usuario_cliente))
+    return profesional, servicio, clientes
+
+
+def nuevo_turno(cliente, profesional, servicio, fecha, hora):
+    return Turno(
+        cliente=cliente,
+        profesional=profesional,
+        servicio=servicio,
+        fecha=fecha,
+        hora=hora,
+        direccion_servicio='Calle 123',
+        precio_final=servicio.precio_base
+    )
+
+
+class ReservaServiceTestCase(TestCase):
+    """Tests para ReservaService"""
+
+    def setUp(self):
+        self.profesional, self.servicio, self.clientes = crear_datos(2)
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        self.hora = time(10, 0)
+
+    def _tomar(self, cliente):
+        return ReservaService.tomar_reserva(cliente, self.profesional.id, self.servicio, self.fecha, self.hora)
+
+    def test_retencion_exclusiva(self):
+        """Un slot retenido no puede ser tomado por otro cliente"""
+        reserva, _ = self._tomar(self.clientes[0])
+        self.assertIsNotNone(reserva)
+        otra, mensaje = self._tomar(self.clientes[1])
+        self.assertIsNone(otra)
+        self.assertTrue(mensaje)
+
+    def test_retencion_vencida_se_libera(self):
+        """Una retención vencida se recupera al intentar tomar el slot"""
+        reserva, _ = self._tomar(self.clientes[0])
+        ReservaSlot.objects.filter(pk=reserva.pk).update(vence=timezone.now() - timedelta(seconds=1))
+        otra, _ = self._tomar(self.clientes[1])
+        self.assertIsNotNone(otra)
+        self.assertEqual(ReservaSlot.objects.count(), 1)
+
+    def test_confirmar_consume_retencion(self):
+        """Confirmar el turno consume la retención"""
+        reserva, _ = self._tomar(self.clientes[0])
+        turno = nuevo_turno(self.clientes[0], self.profesional, self.servicio, self.fecha, self.hora)
+        exitoso, _ = ReservaService.confirmar_turno(turno, reserva.id)
+        self.assertTrue(exitoso)
+        self.assertFalse(ReservaSlot.objects.exists())
+
+    def test_confirmar_con_retencion_vencida_falla(self):
+        """No se confirma un turno con una retención vencida"""
+        reserva, _ = self._tomar(self.clientes[0])
+        ReservaSlot.objects.filter(pk=reserva.pk).update(vence=timezone.now() - timedelta(seconds=1))
+        turno = nuevo_turno(self.clientes[0], self.profesional, self.servicio, self.fecha, self.hora)
+        exitoso, _ = ReservaService.confirmar_turno(turno, reserva.id)
+        self.assertFalse(exitoso)
+        self.assertFalse(Turno.objects.exists())
+
+    def test_restriccion_unica_turnos_activos(self):
+        """La base de datos impide dos turnos activos en el mismo slot"""
+        nuevo_turno(self.clientes[0], self.profesional, self.servicio, self.fecha, self.hora).save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            nuevo_turno(self.clientes[1], self.profesional, self.servicio, self.fecha, self.hora).save()
+
+    def test_turno_cancelado_libera_restriccion(self):
+        """Un turno cancelado no impide reservar el mismo slot"""
+        turno = nuevo_turno(self.clientes[0], self.profesional, self.servicio, self.fecha, self.hora)
+        turno.estado = 'cancelado'
+        turno.save()
+        exitoso, _ = ReservaService.confirmar_turno(
+            nuevo_turno(self.clientes[1], self.profesional, self.servicio, self.fecha, self.hora)
+        )
+        self.assertTrue(exitoso)
+
+    def test_endpoint_reservar_slot(self):
+        """El endpoint devuelve la retención o 409 si el slot está tomado"""
+        self._tomar(self.clientes[1])
+        self.client.login(username='cliente0', password='Cliente123')
+        response = self.client.post(reverse('turnos:reservar_slot'), {
+            'servicio_id': self.servicio.id,
+            'profesional_id': self.profesional.id,
+            'fecha': self.fecha.strftime('%Y-%m-%d'),
+            'hora': '10:00',
+        })
+        self.assertEqual(response.status_code, 409)
+
+
+class ReservaConcurrenteTestCase(TransactionTestCase):
+    """Muchos clientes compiten por el mismo slot al mismo tiempo"""
+
+    HILOS = 12
+
+    def setUp(self):
+        self.profesional, self.servicio, self.clientes = crear_datos(self.HILOS)
+        self.fecha = timezone.localdate() + timedelta(days=2)
+        self.hora = time(10, 0)
+
+    def _competir(self, trabajo):
+        """Ejecuta trabajo(cliente) en un hilo por cliente, arrancando todos juntos"""
+        barrera = threading.Barrier(self.HILOS)
+        resultados = []
+
+        def ejecutar(cliente):
+            barrera.wait()
+            try:
+                for _ in range(50):
+                    try:
+                        resultados.append(trabajo(cliente))
+                        return
+                    except OperationalError:
+                        # SQLite serializa escrituras; reintentar si la base está ocupada
+                        reloj.sleep(0.01)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=ejecutar, args=(cliente,)) for cliente in self.clientes]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def test_sin_doble_reserva_de_turnos(self):
+        """Solo un turno activo se crea aunque muchos hilos confirmen el mismo slot"""
+        resultados = self._competir(lambda cliente: ReservaService.confirmar_turno(
+            nuevo_turno(cliente, self.profesional, self.servicio, self.fecha, self.hora)
+        )[0])
+        self.assertEqual(len(resultados), self.HILOS)
+        self.assertEqual(resultados.count(True), 1)
+        self.assertEqual(Turno.objects.filter(estado__in=Turno.ESTADOS_ACTIVOS).count(), 1)
+
+    def test_sin_doble_retencion(self):
+        """Solo un cliente obtiene la retención del slot"""
+        resultados = self._competir(lambda cliente: ReservaService.tomar_reserva(
+            cliente, self.profesional.id, self.servicio, self.fecha, self.hora
+        )[0] is not None)
+        self.assertEqual(len(resultados), self.HILOS)
+        self.assertEqual(resultados.count(True), 1)
+        self.assertEqual(ReservaSlot.objects.count(), 1)
@@ -0,0 +1,128 @@
+"""
+Tests para la planificación de la ruta diaria del profesional.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_rutas
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+import time as reloj
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno
+from apps.turnos.ruta_services import RutaService
+
+
+class DistanciasTramosTestCase(SimpleTestCase):
+    """Tests de las distancias entre puntos consecutivos"""
+
+    def test_haversine(self):
+        """La distancia coincide con Obelisco - La Plata, ida y vuelta"""
+        distancias = RutaService.distancias_tramos([
+            (-34.6037, -58.3816), (-34.9214, -57.9544), (-34.6037, -58.3816)
+        ])
+        self.assertEqual(len(distancias), 2)
+        self.assertAlmostEqual(distancias[0], 53, delta=2)
+        self.assertAlmostEqual(distancias[0], distancias[1])
+
+    def test_muchas_paradas_en_milisegundos(self):
+        """Miles de tramos se calculan en pocos milisegundos"""
+        generador = np.random.default_rng(7)
+        puntos = np.column_stack([
+            generador.uniform(-34.75, -34.50, 5000), generador.uniform(-58.55, -58.35, 5000)
+        ])
+        inicio = reloj.perf_counter()
+        distancias = RutaService.distancias_tramos(puntos)
+        transcurrido = reloj.perf_counter() - inicio
+
+        self.assertEqual(len(distancias), 4999)
+        self.assertTrue((distancias < 40).all())
+        self.assertLess(transcurrido, 0.1)
+
+
+class PlanificarDiaTestCase(TestCase):
+    """Tests para RutaService.planificar_dia"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            username='jardinero', email='jardinero@test.com', password='Profesional123', rol='profesional',
+            latitud=Decimal('-34.6037'), longitud=Decimal('-58.3816')
+        )
+        self.profesional = Profesional.objects.create(usuario=usuario, especialidades='Jardinería')
+        self.servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Jardinería', descripcion='Jardinería'),
+            profesional=self.profesional,
+            nombre='Corte de césped',
+            descripcion='Césped',
+            precio_base=Decimal('5000.00'),
+            duracion_estimada=60
+        )
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+        self.hoy = timezone.localdate()
+
+    def _turno(self, hora, latitud=None, longitud=None, estado='confirmado'):
+        return Turno.objects.create(
+            cliente=self.cliente,
+            profesional=self.profesional,
+            servicio=self.servicio,
+            fecha=self.hoy,
+            hora=time(*hora),
+            estado=estado,
+            direccion_servicio='Calle 123',
+            latitud=latitud,
+            longitud=longitud,
+            precio_final=self.servicio.precio_base
+        )
+
+    def test_plan_y_conflictos(self):
+        """Sigue la agenda y marca el tramo imposible (La Plata con 30 min de margen)"""
+        cerca = self._turno((9, 0), Decimal('-34.6100'), Decimal('-58.3900'))
+        lejos = self._turno((10, 30), Decimal('-34.9214'), Decimal('-57.9544'))
+        self._turno((13, 0), Decimal('-34.9300'), Decimal('-57.9600'))
+        sin_ubicacion = self._turno((15, 0))
+        self._turno((16, 0), Decimal('-34.6000'), Decimal('-58.3800'), estado='pendiente')
+
+        plan = RutaService.planificar_dia(self.profesional, self.hoy)
+
+        self.assertEqual(plan['paradas'][0], cerca)
+        self.assertEqual(plan['sin_ubicacion'], [sin_ubicacion])
+        self.assertEqual(len(plan['tramos']), 2)
+        self.assertFalse(plan['tramos'][0]['factible'])
+        self.assertEqual(plan['tramos'][0]['hasta'], lejos)
+        self.assertTrue(plan['tramos'][1]['factible'])
+        self.assertEqual(plan['conflictos'], 1)
+
+    def test_distancia_desde_el_profesional(self):
+        """El recorrido suma el viaje desde la ubicación del profesional; los tramos, solo entre turnos"""
+        self._turno((9, 0), Decimal('-34.9214'), Decimal('-57.9544'))
+        self._turno((17, 0), Decimal('-34.6037'), Decimal('-58.3816'))
+
+        plan = RutaService.planificar_dia(self.profesional, self.hoy)
+
+        self.assertAlmostEqual(plan['distancia_km'], 2 * plan['tramos'][0]['distancia_km'], delta=0.02)
+        self.assertEqual(len(plan['tramos']), 1)
+        self.assertEqual(plan['tramos'][0]['margen_min'], 420)
+        self.assertEqual(plan['conflictos'], 0)
+
+    def test_sin_turnos(self):
+        """Un día sin turnos devuelve un plan vacío"""
+        plan = RutaService.planificar_dia(self.profesional, self.hoy + timedelta(days=3))
+        self.assertEqual(plan['paradas'], [])
+        self.assertEqual(plan['conflictos'], 0)
+
+    def test_dashboard_muestra_ruta(self):
+        """El dashboard del profesional incluye la ruta del día"""
+        self._turno((9, 0), Decimal('-34.6100'), Decimal('-58.3900'))
+        self.client.login(username='jardinero', password='Profesional123')
+        response = self.client.get(reverse('usuarios:dashboard_profesional'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['ruta_hoy']['paradas']), 1)
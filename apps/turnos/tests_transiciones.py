@@ -0,0 +1,131 @@
+"""
+Tests para los cambios de estado de turnos en lote.
+
+Para ejecutar:
+    python manage.py test apps.turnos.tests_transiciones
+"""
+from datetime import time, timedelta
+from decimal import Decimal
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.usuarios.models import Usuario, Cliente, Profesional, HorarioDisponibilidad
+from apps.servicios.models import Categoria, Servicio
+from apps.turnos.models import Turno, SlotDisponible
+from apps.turnos.disponibilidad_services import DisponibilidadService
+from apps.turnos.transicion_services import TransicionService
+
+
+class TransicionServiceTestCase(TestCase):
+    """Tests para TransicionService y el endpoint de transiciones"""
+
+    def setUp(self):
+        self.manana = timezone.localdate() + timedelta(days=1)
+        categoria = Categoria.objects.create(nombre='Plomería', descripcion='Plomería')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profesional, self.servicio = self._crear_profesional('plomero', categoria)
+            self.ajeno, self.servicio_ajeno = self._crear_profesional('gasista', categoria)
+        usuario_cliente = Usuario.objects.create_user(
+            username='cliente', email='cliente@test.com', password='Cliente123', rol='cliente'
+        )
+        self.cliente = Cliente.objects.create(usuario=usuario_cliente)
+        Usuario.objects.create_user(
+            username='admin', email='admin@test.com', password='Admin123', rol='administrador'
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pendientes = [self._turno(self.profesional, self.servicio, hora) for hora in (9, 10, 11)]
+            self.confirmado = self._turno(self.profesional, self.servicio, 12, 'confirmado')
+            self.turno_ajeno = self._turno(self.ajeno, self.servicio_ajeno, 9)
+
+    def _crear_profesional(self, username, categoria):
+        usuario = Usuario.objects.create_user(
+            username=username, email=f'{username}@test.com', password='Profesional123', rol='profesional'
+        )
+        profesional = Profesional.objects.create(usuario=usuario, especialidades=categoria.nombre)
+        HorarioDisponibilidad.objects.create(
+            profesional=profesional,
+            dia_semana=DisponibilidadService.DIAS_SEMANA[self.manana.weekday()],
+            hora_inicio=time(8, 0),
+            hora_fin=time(14, 0)
+        )
+        servicio = Servicio.objects.create(
+            categoria=categoria,
+            profesional=profesional,
+            nombre=f'Servicio de {username}',
+            descripcion='Servicio',
+            precio_base=Decimal('3000.00'),
+            duracion_estimada=60
+        )
+        return profesional, servicio
+
+    def _turno(self, profesional, servicio, hora, estado='pendiente'):
+        return Turno.objects.create(
+            cliente=self.cliente,
+            profesional=profesional,
+            servicio=servicio,
+            fecha=self.manana,
+            hora=time(hora, 0),
+            estado=estado,
+            direccion_servicio='Calle 123',
+            precio_final=servicio.precio_base
+        )
+
+    def test_confirmar_en_lote(self):
+        """Confirma todos los pendientes propios con un UPDATE"""
+        ids = [turno.id for turno in self.pendientes]
+        # SAVEPOINT + SELECT + UPDATE + RELEASE
+        with self.assertNumQueries(4):
+            resultados, errores = TransicionService.aplicar_transiciones(
+                self.profesional.usuario, ids, 'confirmado'
+            )
+        self.assertEqual(errores, [])
+        self.assertTrue(all(exitoso for exitoso, _ in resultados.values()))
+        self.assertEqual(Turno.objects.filter(id__in=ids, estado='confirmado').count(), 3)
+
+    def test_resultados_por_turno(self):
+        """Rechaza turnos ajenos, inexistentes o con transición inválida y aplica el resto"""
+        completado = self._turno(self.profesional, self.servicio, 13, 'completado')
+        ids = [self.pendientes[0].id, self.turno_ajeno.id, completado.id, 999999]
+        resultados, _ = TransicionService.aplicar_transiciones(self.profesional.usuario, ids, 'confirmado')
+        self.assertEqual([resultados[i][0] for i in ids], [True, False, False, False])
+        self.turno_ajeno.refresh_from_db()
+        self.assertEqual(self.turno_ajeno.estado, 'pendiente')
+
+    def test_cancelar_libera_slots(self):
+        """Cancelar en lote devuelve los horarios al calendario"""
+        ids = [self.pendientes[0].id, self.confirmado.id]
+        with self.captureOnCommitCallbacks(execute=True):
+            TransicionService.aplicar_transiciones(self.profesional.usuario, ids, 'cancelado')
+        horas = set(SlotDisponible.objects.filter(
+            profesional=self.profesional, fecha=self.manana
+        ).values_list('hora', flat=True))
+        self.assertIn(time(9, 0), horas)
+        self.assertIn(time(12, 0), horas)
+        self.assertNotIn(time(10, 0), horas)
+
+    def test_admin_gestiona_cualquier_turno(self):
+        """El administrador puede cancelar turnos de cualquier profesional"""
+        admin = Usuario.objects.get(username='admin')
+        resultados, _ = TransicionService.aplicar_transiciones(
+            admin, [self.turno_ajeno.id, self.pendientes[1].id], 'cancelado'
+        )
+        self.assertTrue(all(exitoso for exitoso, _ in resultados.values()))
+
+    def test_endpoint(self):
+        """El endpoint acepta JSON y rechaza a los clientes"""
+        self.client.login(username='plomero', password='Profesional123')
+        response = self.client.post(
+            reverse('turnos:transicionar_turnos'),
+            json.dumps({'ids': [t.id for t in self.pendientes], 'estado': 'confirmado'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['actualizados'], 3)
+
+        self.client.login(username='cliente', password='Cliente123')
+        response = self.client.post(reverse('turnos:transicionar_turnos'), {'ids': [1], 'estado': 'cancelado'})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,150 @@
+"""
+Cambios de estado de turnos en lote.
+Valida las transiciones y la pertenencia de todos los turnos con una sola
+lectura y aplica un UPDATE por cada grupo (estado origen -> estado destino).
+Al confirmarse la transacción envía turnos_transicionados con los turnos
+cambiados, para quienes mantienen datos derivados del estado (métricas).
+"""
+from collections import defaultdict
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.promociones.cupo_services import CupoService
+from .models import Turno
+from .calendario_services import CalendarioSlotsService
+from .espera_services import EsperaService
+from .signals import turnos_transicionados
+
+logger = logging.getLogger(__name__)
+
+
+class TransicionService:
+    """
+    Servicio de transiciones de estado de turnos.
+
+    Los UPDATE en lote no disparan señales, por eso los turnos que dejan
+    de ocupar su horario programan explícitamente el recálculo del
+    calendario de slots y la oferta a la lista de espera, los cancelados
+    devuelven el cupo de sus promociones, y el resto de los cambios se
+    anuncia con turnos_transicionados.
+    """
+
+    # Estado origen -> estados destino permitidos
+    TRANSICIONES = {
+        'pendiente': ('confirmado', 'cancelado'),
+        'confirmado': ('en_curso', 'completado', 'cancelado'),
+        'en_curso': ('completado', 'cancelado'),
+    }
+    MAX_TURNOS = 200
+    CAMPOS_EVENTO = ('cliente_id', 'promocion_id', 'precio_final', 'desglose_promociones')
+
+    @staticmethod
+    def transicion_permitida(origen, destino):
+        return destino in TransicionService.TRANSICIONES.get(origen, ())
+
+    @staticmethod
+    def _puede_gestionar(usuario, profesional_id):
+        """El administrador gestiona cualquier turno; el profesional solo los propios"""
+        if usuario.is_administrador():
+            return True
+        return usuario.is_profesional() and usuario.perfil_profesional.id == profesional_id
+
+    @staticmethod
+    def aplicar_transiciones(usuario, turno_ids, estado):
+        """
+        Lleva un conjunto de turnos al estado indicado.
+
+        Los turnos inexistentes, ajenos o cuya transición no está permitida
+        se informan como rechazados y el resto se actualiza igual.
+
+        Args:
+            usuario (Usuario): Profesional o administrador que realiza el cambio
+            turno_ids (list[int]): IDs de los turnos
+            estado (str): Estado destino
+
+        Returns:
+            tuple: (resultados: dict {id: (exitoso, mensaje)}, errores: list)
+        """
+        if estado not in dict(Turno.ESTADOS):
+            return {}, ['Estado inválido']
+        if not usuario.is_administrador() and not usuario.is_profesional():
+            return {}, ['No tienes permiso para modificar turnos']
+
+        turno_ids = list(dict.fromkeys(turno_ids))
+        if not turno_ids:
+            return {}, ['No se indicaron turnos']
+        if len(turno_ids) > TransicionService.MAX_TURNOS:
+            return {}, [f'Se pueden modificar hasta {TransicionService.MAX_TURNOS} turnos por vez']
+
+        resultados = {}
+        grupos = defaultdict(list)
+        liberados = set()
+        transicionados = []
+
+        with transaction.atomic():
+            turnos = Turno.objects.select_for_update().filter(id__in=turno_ids).values_list(
+                'id', 'estado', 'profesional_id', 'fecha', 'hora', 'servicio_id',
+                *TransicionService.CAMPOS_EVENTO
+            )
+            encontrados = {fila[0]: fila[1:] for fila in turnos}
+
+            for turno_id in turno_ids:
+                if turno_id not in encontrados:
+                    resultados[turno_id] = (False, 'Turno no encontrado')
+                    continue
+                origen, profesional_id = encontrados[turno_id][:2]
+                if not TransicionService._puede_gestionar(usuario, profesional_id):
+                    resultados[turno_id] = (False, 'No tienes permiso para modificar este turno')
+                elif origen == estado:
+                    resultados[turno_id] = (False, f'El turno ya está {estado}')
+                elif not TransicionService.transicion_permitida(origen, estado):
+                    resultados[turno_id] = (False, f'No se puede pasar de {origen} a {estado}')
+                else:
+                    grupos[origen].append(turno_id)
+
+            ahora = timezone.now()
+            for origen, ids in grupos.items():
+                # La condición sobre el estado origen evita pisar un cambio concurrente
+                actualizados = Turno.objects.filter(id__in=ids, estado=origen).update(
+                    estado=estado, fecha_actualizacion=ahora
+                )
+                aplicados = set(ids)
+                if actualizados != len(ids):
+                    # Otro proceso cambió algún turno entre la lectura y el UPDATE
+                    logger.warning(f"Transición {origen}->{estado}: {actualizados} de {len(ids)} turnos actualizados")
+                    aplicados = set(Turno.objects.filter(
+                        id__in=ids, estado=estado, fecha_actualizacion=ahora
+                    ).values_list('id', flat=True))
+                for turno_id in ids:
+                    if turno_id not in aplicados:
+                        resultados[turno_id] = (False, 'El turno cambió de estado mientras se procesaba')
+                        continue
+                    resultados[turno_id] = (True, '')
+                    transicionados.append({
+                        'id': turno_id,
+                        **dict(zip(TransicionService.CAMPOS_EVENTO, encontrados[turno_id][5:])),
+                        'origen': origen,
+                        'destino': estado,
+                    })
+                    if origen in Turno.ESTADOS_ACTIVOS and estado not in Turno.ESTADOS_ACTIVOS:
+                        liberados.add((*encontrados[turno_id][1:5], transicionados[-1]['cliente_id']))
+
+            if estado == 'cancelado':
+                # Devolver el cupo de las promociones en la misma transacción
+                CupoService.liberar([
+                    (turno['cliente_id'], turno['promocion_id'], turno['desglose_promociones'])
+                    for turno in transicionados
+                ])
+
+            if transicionados:
+                transaction.on_commit(
+                    lambda: turnos_transicionados.send(sender=Turno, turnos=transicionados)
+                )
+
+        for profesional_id, fecha, hora, servicio_id, cliente_id in liberados:
+            CalendarioSlotsService.programar_recalculo(profesional_id, fecha)
+            EsperaService.programar_oferta(profesional_id, servicio_id, fecha, hora, excluir_cliente_id=cliente_id)
+
+        return resultados, []
@@ -10,6 +10,10 @@ urlpatterns = [
     # APIs para solicitar turno
     path('api/servicios-por-categoria/', views.obtener_servicios_por_categoria, name='servicios_por_categoria'),
     path('api/profesionales-disponibles/', views.obtener_profesionales_disponibles, name='profesionales_disponibles'),
+    path('api/asignacion/candidatos/', views.obtener_candidatos_asignacion, name='candidatos_asignacion'),
+    path('api/reservar-slot/', views.reservar_slot, name='reservar_slot'),
+    path('api/lista-espera/', views.mis_esperas, name='mis_esperas'),
+    path('api/lista-espera/unirse/', views.unirse_lista_espera, name='unirse_lista_espera'),
     path('api/promociones-disponibles/', views.obtener_promociones_disponibles, name='promociones_disponibles'),
     path('api/validar-codigo-promocional/', views.validar_codigo_promocional, name='validar_codigo_promocional'),
     
@@ -24,6 +28,11 @@ urlpatterns = [
     
     # CU-31: Ver Historial de Turnos
     path('historial/', views.historial_turnos, name='historial_turnos'),
+    path('historial/exportar/', views.exportar_historial, name='exportar_historial'),
+    path('api/historial/', views.historial_turnos_api, name='historial_turnos_api'),
+    
+    # Feed iCalendar del profesional
+    path('calendario/<str:token>/turnos.ics', views.calendario_profesional, name='calendario_profesional'),
     
     # CU-32: Buscar Turno
     path('buscar/', views.buscar_turno, name='buscar_turno'),
@@ -31,4 +40,6 @@ urlpatterns = [
     # Vistas adicionales
     path('ver/<int:id>/', views.ver_turno, name='ver_turno'),
     path('confirmar/<int:id>/', views.confirmar_turno, name='confirmar_turno'),
+    path('api/transicion/', views.transicionar_turnos, name='transicionar_turnos'),
+    path('api/demanda/', views.mapa_demanda, name='mapa_demanda'),
 ]
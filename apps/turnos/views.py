@@ -1,13 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
-from .models import Turno, Pago, Calificacion
+from django.http import JsonResponse, StreamingHttpResponse, Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .models import Turno, Pago, EsperaSlot
 from .forms import SolicitarTurnoForm, ModificarTurnoForm, CalificarTurnoForm, BuscarTurnoForm, ConfirmarTurnoForm
-from apps.usuarios.models import Usuario, Profesional, HorarioDisponibilidad
+from .disponibilidad_services import DisponibilidadService
+from .calendario_services import CalendarioSlotsService
+from .asignacion_services import AsignacionService
+from .reserva_services import ReservaService
+from .historial_services import HistorialService
+from .transicion_services import TransicionService
+from .espera_services import EsperaService
+from .ical_services import ICalService
+from .demanda_services import DemandaService
+from apps.usuarios.models import Usuario, Profesional
+from apps.usuarios.geo_services import GeoService
 from apps.servicios.models import Servicio
-from datetime import datetime, timedelta, time
-from django.utils import timezone
+from datetime import datetime, time
+import json
 
 
 def es_cliente(user):
@@ -42,10 +54,42 @@ def solicitar_turno(request):
             latitud = request.POST.get('latitud')
             longitud = request.POST.get('longitud')
             
-            if not all([servicio_id, profesional_id, fecha, hora]):
-                messages.error(request, 'Debe seleccionar un servicio, profesional, fecha y hora')
+            if not all([servicio, fecha, hora]):
+                messages.error(request, 'Debe seleccionar un servicio, fecha y hora')
                 return render(request, 'turnos/solicitar_turno.html', {'form': form})
             
+            # Sin profesional elegido: asignar automáticamente el mejor candidato
+            if not profesional_id:
+                try:
+                    candidato = AsignacionService.mejor_candidato(
+                        servicio,
+                        datetime.strptime(fecha, '%Y-%m-%d').date(),
+                        datetime.strptime(hora, '%H:%M').time(),
+                        float(latitud) if latitud else None,
+                        float(longitud) if longitud else None
+                    )
+                except ValueError:
+                    candidato = None
+                
+                if not candidato:
+                    messages.error(request, 'No hay profesionales disponibles para la fecha y hora seleccionadas')
+                    return render(request, 'turnos/solicitar_turno.html', {'form': form})
+                
+                profesional_id = candidato['profesional_id']
+                if candidato['servicio_id'] != servicio.id:
+                    asignado = Servicio.objects.get(id=candidato['servicio_id'])
+                    # El cliente vio el precio del servicio elegido: no cobrar otro sin avisar
+                    if asignado.precio_base != servicio.precio_base:
+                        messages.error(
+                            request,
+                            f'El profesional disponible ({candidato["nombre"]}) cobra ${asignado.precio_base:.2f} '
+                            f'en lugar de ${servicio.precio_base:.2f}. Seleccione el horario nuevamente para '
+                            f'confirmar con el nuevo precio.'
+                        )
+                        return render(request, 'turnos/solicitar_turno.html', {'form': form})
+                    servicio = asignado
+                messages.info(request, f'Se asignó automáticamente a {candidato["nombre"]}')
+            
             try:
                 profesional = Profesional.objects.get(id=profesional_id)
                 
@@ -64,17 +108,24 @@ def solicitar_turno(request):
                 promocion_seleccionada = form.cleaned_data.get('promocion')
                 
                 if codigo_promocion:
-                    # Prioridad 1: Código promocional ingresado
+                    # Prioridad 1: Código promocional ingresado (combinado con las acumulables)
                     if codigo_promocion.aplica_a_servicio(servicio):
-                        turno.promocion = codigo_promocion
+                        turno.aplicar_promociones(obligatoria=codigo_promocion)
                         messages.info(request, f'Se aplicó el código promocional: {codigo_promocion.codigo}')
                     else:
                         messages.warning(request, f'El código {codigo_promocion.codigo} no aplica a este servicio')
                         turno.aplicar_promocion_automatica()
                 elif promocion_seleccionada:
-                    # Prioridad 2: Promoción seleccionada manualmente
-                    turno.promocion = promocion_seleccionada
-                    messages.info(request, f'Se aplicó la promoción: {promocion_seleccionada.titulo}')
+                    # Prioridad 2: Promoción seleccionada manualmente (la asignación automática
+                    # pudo cambiar el servicio por el del profesional asignado)
+                    if promocion_seleccionada.aplica_a_servicio(servicio):
+                        turno.aplicar_promociones(obligatoria=promocion_seleccionada)
+                        messages.info(request, f'Se aplicó la promoción: {promocion_seleccionada.titulo}')
+                    else:
+                        messages.warning(
+                            request, f'La promoción {promocion_seleccionada.titulo} no aplica a este servicio'
+                        )
+                        turno.aplicar_promocion_automatica()
                 else:
                     # Prioridad 3: Aplicar automáticamente la mejor promoción
                     mejor_promo = turno.aplicar_promocion_automatica()
@@ -83,7 +134,12 @@ def solicitar_turno(request):
                 
                 # Calcular precio final con descuento
                 turno.precio_final = turno.calcular_precio_final()
-                turno.save()
+                
+                # Guardar consumiendo la reserva del horario (protegido contra doble reserva)
+                exitoso, mensaje = ReservaService.confirmar_turno(turno, request.POST.get('reserva_id'))
+                if not exitoso:
+                    messages.error(request, mensaje)
+                    return render(request, 'turnos/solicitar_turno.html', {'form': form})
                 
                 # Mostrar resumen de precio
                 if turno.promocion:
@@ -141,73 +197,183 @@ def obtener_profesionales_disponibles(request):
     try:
         servicio = Servicio.objects.get(id=servicio_id)
         
-        # Obtener todos los profesionales que ofrecen este servicio
-        profesionales = Profesional.objects.filter(
-            servicios=servicio,
-            usuario__activo=True,
-            disponible=True
-        ).select_related('usuario')
-        
-        resultado = []
-        
-        # Generar disponibilidad para los próximos 14 días
-        hoy = timezone.now().date()
-        dias_a_mostrar = 14
+        # Si el cliente ya eligió la ubicación, solo considerar profesionales que llegan a ese punto
+        profesional_ids = None
+        latitud = request.GET.get('latitud')
+        longitud = request.GET.get('longitud')
+        if latitud and longitud:
+            try:
+                cercanos = GeoService.profesionales_cercanos(float(latitud), float(longitud), servicio)
+            except ValueError:
+                return JsonResponse({'error': 'Ubicación inválida'}, status=400)
+            profesional_ids = [profesional.id for profesional in cercanos]
         
-        for profesional in profesionales:
-            # Obtener horarios del profesional
-            horarios = HorarioDisponibilidad.objects.filter(profesional=profesional)
-            
-            disponibilidad = []
-            
-            for i in range(dias_a_mostrar):
-                fecha = hoy + timedelta(days=i)
-                dia_semana = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo'][fecha.weekday()]
-                
-                # Buscar horario para este día
-                horario_dia = horarios.filter(dia_semana=dia_semana).first()
-                
-                if horario_dia:
-                    # Generar slots de tiempo cada hora
-                    hora_actual = datetime.combine(fecha, horario_dia.hora_inicio)
-                    hora_fin = datetime.combine(fecha, horario_dia.hora_fin)
-                    
-                    while hora_actual < hora_fin:
-                        # Verificar que no haya turno en este horario
-                        turno_existe = Turno.objects.filter(
-                            profesional=profesional,
-                            fecha=fecha,
-                            hora=hora_actual.time(),
-                            estado__in=['pendiente', 'confirmado', 'en_curso']
-                        ).exists()
-                        
-                        if not turno_existe and hora_actual > timezone.now():
-                            disponibilidad.append({
-                                'fecha': fecha.strftime('%Y-%m-%d'),
-                                'fecha_formato': fecha.strftime('%d/%m/%Y'),
-                                'dia_semana': dia_semana.capitalize(),
-                                'hora': hora_actual.strftime('%H:%M'),
-                                'precio': float(servicio.precio_base)
-                            })
-                        
-                        # Incrementar por la duración del servicio o 1 hora mínimo
-                        incremento = max(servicio.duracion_estimada, 60)
-                        hora_actual += timedelta(minutes=incremento)
-            
-            if disponibilidad:  # Solo agregar si tiene disponibilidad
-                resultado.append({
+        # Leer los slots libres del calendario materializado (un único rango indexado)
+        por_profesional = {}
+        for slot in CalendarioSlotsService.buscar_slots(servicio, profesional_ids=profesional_ids):
+            if slot.profesional_id not in por_profesional:
+                profesional = slot.profesional
+                por_profesional[slot.profesional_id] = {
                     'id': profesional.id,
                     'nombre': profesional.usuario.get_full_name(),
                     'calificacion': float(profesional.calificacion_promedio),
                     'experiencia': profesional.anios_experiencia,
                     'foto': profesional.usuario.foto_perfil.url if profesional.usuario.foto_perfil else None,
-                    'disponibilidad': disponibilidad
-                })
+                    'disponibilidad': []
+                }
+            
+            por_profesional[slot.profesional_id]['disponibilidad'].append({
+                'fecha': slot.fecha.strftime('%Y-%m-%d'),
+                'fecha_formato': slot.fecha.strftime('%d/%m/%Y'),
+                'dia_semana': DisponibilidadService.DIAS_SEMANA[slot.fecha.weekday()].capitalize(),
+                'hora': slot.hora.strftime('%H:%M'),
+                'precio': float(servicio.precio_base)
+            })
+        
+        # Con ubicación, ordenar del profesional más cercano al más lejano
+        orden = profesional_ids if profesional_ids is not None else list(por_profesional)
+        resultado = [por_profesional[pid] for pid in orden if pid in por_profesional]
         
-        return JsonResponse({'profesionales': resultado})
+        # Sin horarios libres, el cliente puede anotarse en la lista de espera
+        return JsonResponse({'profesionales': resultado, 'lista_espera': not resultado})
+        
+    except Servicio.DoesNotExist:
+        return JsonResponse({'error': 'Servicio no encontrado'}, status=404)
+
+
+@user_passes_test(es_cliente)
+def unirse_lista_espera(request):
+    """API para anotarse en la lista de espera de un servicio sin horarios libres"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'mensaje': 'Método no permitido'}, status=405)
+    
+    try:
+        servicio = Servicio.objects.get(id=request.POST.get('servicio_id'), activo=True)
+        fecha_desde = datetime.strptime(request.POST.get('fecha_desde', ''), '%Y-%m-%d').date()
+        fecha_hasta = datetime.strptime(request.POST.get('fecha_hasta', ''), '%Y-%m-%d').date()
+        latitud = request.POST.get('latitud')
+        longitud = request.POST.get('longitud')
+        latitud = float(latitud) if latitud else None
+        longitud = float(longitud) if longitud else None
+    except (Servicio.DoesNotExist, ValueError):
+        return JsonResponse({'success': False, 'mensaje': 'Datos incompletos'}, status=400)
+    
+    espera, errores = EsperaService.unirse(
+        request.user.perfil_cliente, servicio, fecha_desde, fecha_hasta, latitud, longitud
+    )
+    if errores:
+        return JsonResponse({'success': False, 'mensaje': errores[0]}, status=400)
+    
+    return JsonResponse({'success': True, 'espera_id': espera.id})
+
+
+@user_passes_test(es_cliente)
+def mis_esperas(request):
+    """API con las esperas del cliente y los horarios que se le ofrecieron"""
+    esperas = EsperaSlot.objects.filter(
+        cliente=request.user.perfil_cliente,
+        estado__in=('activa', 'ofrecida')
+    ).select_related('servicio', 'reserva')
+    
+    resultado = []
+    for espera in esperas:
+        oferta = None
+        if espera.reserva and espera.reserva.esta_vigente():
+            oferta = {
+                'reserva_id': espera.reserva.id,
+                'profesional_id': espera.reserva.profesional_id,
+                'fecha': espera.reserva.fecha.strftime('%Y-%m-%d'),
+                'hora': espera.reserva.hora.strftime('%H:%M'),
+                'vence': espera.reserva.vence.isoformat(),
+            }
+        resultado.append({
+            'id': espera.id,
+            'servicio_id': espera.servicio_id,
+            'servicio': espera.servicio.nombre,
+            'fecha_desde': espera.fecha_desde.strftime('%Y-%m-%d'),
+            'fecha_hasta': espera.fecha_hasta.strftime('%Y-%m-%d'),
+            'estado': espera.estado,
+            'oferta': oferta,
+        })
+    
+    return JsonResponse({'esperas': resultado})
+
+
+@user_passes_test(es_cliente)
+def reservar_slot(request):
+    """API para retener un horario mientras el cliente completa la solicitud"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'mensaje': 'Método no permitido'}, status=405)
+    
+    try:
+        servicio = Servicio.objects.get(id=request.POST.get('servicio_id'))
+        profesional = Profesional.objects.get(id=request.POST.get('profesional_id'))
+        fecha = datetime.strptime(request.POST.get('fecha', ''), '%Y-%m-%d').date()
+        hora = datetime.strptime(request.POST.get('hora', ''), '%H:%M').time()
+    except (Servicio.DoesNotExist, Profesional.DoesNotExist, ValueError):
+        return JsonResponse({'success': False, 'mensaje': 'Datos incompletos'}, status=400)
+    
+    reserva, mensaje = ReservaService.tomar_reserva(
+        request.user.perfil_cliente, profesional.id, servicio, fecha, hora
+    )
+    if not reserva:
+        return JsonResponse({'success': False, 'mensaje': mensaje}, status=409)
+    
+    return JsonResponse({
+        'success': True,
+        'reserva_id': reserva.id,
+        'vence': reserva.vence.isoformat()
+    })
+
+
+@user_passes_test(es_cliente)
+def obtener_candidatos_asignacion(request):
+    """API para obtener los profesionales recomendados para un servicio, fecha y hora"""
+    servicio_id = request.GET.get('servicio_id')
+    fecha = request.GET.get('fecha')
+    
+    if not servicio_id or not fecha:
+        return JsonResponse({'candidatos': []})
+    
+    try:
+        servicio = Servicio.objects.get(id=servicio_id)
+        fecha = datetime.strptime(fecha, '%Y-%m-%d').date()
+        hora = request.GET.get('hora')
+        hora = datetime.strptime(hora, '%H:%M').time() if hora else None
+        latitud = request.GET.get('latitud')
+        longitud = request.GET.get('longitud')
+        k = int(request.GET.get('k', AsignacionService.K_DEFAULT))
         
+        candidatos = AsignacionService.rankear_profesionales(
+            servicio,
+            fecha,
+            hora,
+            float(latitud) if latitud else None,
+            float(longitud) if longitud else None,
+            k=max(1, min(k, 50))
+        )
     except Servicio.DoesNotExist:
         return JsonResponse({'error': 'Servicio no encontrado'}, status=404)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    return JsonResponse({
+        'candidatos': [
+            {
+                'profesional_id': c['profesional_id'],
+                'nombre': c['nombre'],
+                'servicio_id': c['servicio_id'],
+                'fecha': c['fecha'].strftime('%Y-%m-%d'),
+                'hora': c['hora'].strftime('%H:%M'),
+                'puntaje': c['puntaje'],
+                'calificacion': c['calificacion'],
+                'distancia_km': c['distancia_km'],
+                'carga': c['carga'],
+                'experiencia': c['experiencia'],
+            }
+            for c in candidatos
+        ]
+    })
 
 
 @user_passes_test(es_cliente)
@@ -219,35 +385,26 @@ def obtener_promociones_disponibles(request):
         return JsonResponse({'promociones': []})
     
     try:
-        from apps.promociones.models import Promocion
+        from apps.promociones.indice_services import PromocionIndiceService
         servicio = Servicio.objects.get(id=servicio_id)
-        now = timezone.now()
-        
-        # Buscar promociones vigentes
-        promociones_vigentes = Promocion.objects.filter(
-            activa=True,
-            fecha_inicio__lte=now,
-            fecha_fin__gte=now
-        )
         
-        # Filtrar las que aplican al servicio
+        # Promociones vigentes que aplican al servicio (índice en memoria, sin consultas)
         promociones_aplicables = []
-        for promo in promociones_vigentes:
-            if promo.aplica_a_servicio(servicio):
-                descuento = promo.calcular_descuento(servicio.precio_base)
-                precio_con_descuento = servicio.precio_base - descuento
-                
-                promociones_aplicables.append({
-                    'id': promo.id,
-                    'titulo': promo.titulo,
-                    'descripcion': promo.descripcion,
-                    'tipo_descuento': promo.get_tipo_descuento_display(),
-                    'valor_descuento': float(promo.valor_descuento),
-                    'descuento_calculado': float(descuento),
-                    'precio_final': float(precio_con_descuento),
-                    'codigo': promo.codigo if promo.codigo else None,
-                    'fecha_fin': promo.fecha_fin.strftime('%d/%m/%Y %H:%M')
-                })
+        for promo in PromocionIndiceService.aplicables(servicio):
+            descuento = promo.calcular_descuento(servicio.precio_base)
+            precio_con_descuento = servicio.precio_base - descuento
+            
+            promociones_aplicables.append({
+                'id': promo.id,
+                'titulo': promo.titulo,
+                'descripcion': promo.descripcion,
+                'tipo_descuento': promo.get_tipo_descuento_display(),
+                'valor_descuento': float(promo.valor_descuento),
+                'descuento_calculado': float(descuento),
+                'precio_final': float(precio_con_descuento),
+                'codigo': promo.codigo if promo.codigo else None,
+                'fecha_fin': promo.fecha_fin.strftime('%d/%m/%Y %H:%M')
+            })
         
         return JsonResponse({
             'promociones': promociones_aplicables,
@@ -261,7 +418,7 @@ def obtener_promociones_disponibles(request):
 @user_passes_test(es_cliente)
 def validar_codigo_promocional(request):
     """API para validar un código promocional"""
-    from apps.promociones.models import Promocion
+    from apps.promociones.indice_services import PromocionIndiceService
     
     codigo = request.GET.get('codigo', '').strip().upper()
     servicio_id = request.GET.get('servicio_id')
@@ -269,9 +426,21 @@ def validar_codigo_promocional(request):
     if not codigo or not servicio_id:
         return JsonResponse({'valido': False, 'mensaje': 'Datos incompletos'})
     
+    # Código inexistente: se rechaza sin consultar la tabla de promociones (frena los intentos de adivinar)
+    if not PromocionIndiceService.codigo_existe(codigo):
+        return JsonResponse({
+            'valido': False, 
+            'mensaje': 'Código promocional no válido'
+        })
+    
     try:
         servicio = Servicio.objects.get(id=servicio_id)
-        promocion = Promocion.objects.get(codigo__iexact=codigo)
+        promocion = PromocionIndiceService.buscar_por_codigo(codigo)
+        if promocion is None:
+            return JsonResponse({
+                'valido': False, 
+                'mensaje': 'Código promocional no válido'
+            })
         
         if not promocion.esta_vigente():
             return JsonResponse({
@@ -300,11 +469,6 @@ def validar_codigo_promocional(request):
             }
         })
         
-    except Promocion.DoesNotExist:
-        return JsonResponse({
-            'valido': False, 
-            'mensaje': 'Código promocional no válido'
-        })
     except Servicio.DoesNotExist:
         return JsonResponse({
             'valido': False, 
@@ -385,7 +549,7 @@ def calificar_turno(request, id):
         return redirect('turnos:ver_turno', id=turno.id)
     
     # Verificar que no esté ya calificado
-    if hasattr(turno, 'calificacion'):
+    if turno.calificaciones.exists():
         messages.warning(request, 'Este turno ya fue calificado')
         return redirect('turnos:ver_turno', id=turno.id)
     
@@ -394,16 +558,10 @@ def calificar_turno(request, id):
         if form.is_valid():
             calificacion = form.save(commit=False)
             calificacion.turno = turno
-            calificacion.cliente = turno.cliente
+            calificacion.cliente = turno.cliente.usuario
+            # Los agregados del profesional se actualizan en la señal post_save
             calificacion.save()
             
-            # Actualizar calificación promedio del profesional
-            profesional = turno.profesional
-            calificaciones = Calificacion.objects.filter(turno__profesional=profesional)
-            promedio = sum(c.puntuacion for c in calificaciones) / calificaciones.count()
-            profesional.calificacion_promedio = promedio
-            profesional.save()
-            
             messages.success(request, 'Calificación registrada exitosamente')
             return redirect('turnos:ver_turno', id=turno.id)
     else:
@@ -415,48 +573,59 @@ def calificar_turno(request, id):
 # CU-31: Ver Historial de Turnos
 @login_required
 def historial_turnos(request):
-    """Ver historial de turnos (cliente o profesional)"""
-    if request.user.is_cliente():
-        # Cliente ve todos sus turnos (historial completo)
-        turnos = Turno.objects.filter(
-            cliente=request.user.perfil_cliente
-        ).select_related('servicio', 'profesional__usuario').order_by('-fecha', '-hora')
-    elif request.user.is_profesional():
-        # Profesional ve todos sus turnos (historial completo)
-        turnos = Turno.objects.filter(
-            profesional=request.user.perfil_profesional
-        ).select_related('servicio', 'cliente__usuario').order_by('-fecha', '-hora')
-    else:
-        # Admin ve todos los turnos
-        turnos = Turno.objects.all().select_related(
-            'cliente__usuario', 'profesional__usuario', 'servicio'
-        ).order_by('-fecha', '-hora')
+    """Ver historial de turnos (cliente, profesional o admin), paginado por cursor"""
+    turnos = HistorialService.para_listado(HistorialService.turnos_visibles(request.user))
+    
+    try:
+        turnos, siguiente_cursor = HistorialService.paginar(turnos, request.GET.get('cursor'))
+    except ValueError:
+        return redirect('turnos:historial_turnos')
+    
+    return render(request, 'turnos/historial_turnos.html', {
+        'turnos': turnos,
+        'siguiente_cursor': siguiente_cursor,
+    })
+
+
+@login_required
+def historial_turnos_api(request):
+    """API del historial de turnos paginada por cursor"""
+    turnos = HistorialService.para_listado(HistorialService.turnos_visibles(request.user))
     
-    return render(request, 'turnos/historial_turnos.html', {'turnos': turnos})
+    try:
+        limite = int(request.GET.get('limite', HistorialService.PAGINA_DEFAULT))
+        turnos, siguiente_cursor = HistorialService.paginar(turnos, request.GET.get('cursor'), limite)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+    
+    return JsonResponse({
+        'turnos': [HistorialService.serializar(turno) for turno in turnos],
+        'siguiente_cursor': siguiente_cursor,
+    })
+
+
+@login_required
+def exportar_historial(request):
+    """Descarga el historial completo del usuario como NDJSON (una línea por turno)"""
+    response = StreamingHttpResponse(
+        HistorialService.exportar_ndjson(HistorialService.turnos_visibles(request.user)),
+        content_type='application/x-ndjson'
+    )
+    response['Content-Disposition'] = 'attachment; filename="historial_turnos.ndjson"'
+    return response
 
 
 # CU-32: Buscar Turno
 @login_required
 def buscar_turno(request):
-    """Buscar turnos con filtros"""
+    """Buscar turnos con filtros, paginado por cursor"""
     form = BuscarTurnoForm(request.GET or None)
     turnos = None
+    siguiente_url = None
     
     if form.is_valid():
         # Filtrar según el rol
-        if request.user.is_cliente():
-            turnos = Turno.objects.filter(
-                cliente=request.user.perfil_cliente
-            ).select_related('servicio', 'profesional__usuario')
-        elif request.user.is_profesional():
-            turnos = Turno.objects.filter(
-                profesional=request.user.perfil_profesional
-            ).select_related('servicio', 'cliente__usuario')
-        else:
-            # Admin ve todos
-            turnos = Turno.objects.all().select_related(
-                'cliente__usuario', 'profesional__usuario', 'servicio'
-            )
+        turnos = HistorialService.turnos_visibles(request.user)
         
         # Aplicar filtros de fecha
         if form.cleaned_data.get('fecha_desde'):
@@ -471,9 +640,23 @@ def buscar_turno(request):
         if form.cleaned_data.get('servicio'):
             turnos = turnos.filter(servicio=form.cleaned_data['servicio'])
         
-        turnos = turnos.order_by('-fecha_hora')
-    
-    return render(request, 'turnos/buscar_turno.html', {'form': form, 'turnos': turnos})
+        listado = HistorialService.para_listado(turnos)
+        try:
+            turnos, siguiente_cursor = HistorialService.paginar(listado, request.GET.get('cursor'))
+        except ValueError:
+            # Cursor inválido: volver a la primera página
+            turnos, siguiente_cursor = HistorialService.paginar(listado)
+        
+        if siguiente_cursor:
+            parametros = request.GET.copy()
+            parametros['cursor'] = siguiente_cursor
+            siguiente_url = f'?{parametros.urlencode()}'
+    
+    return render(request, 'turnos/buscar_turno.html', {
+        'form': form,
+        'turnos': turnos,
+        'siguiente_url': siguiente_url,
+    })
 
 
 @login_required
@@ -491,6 +674,90 @@ def ver_turno(request, id):
     return render(request, 'turnos/ver_turno.html', {'turno': turno})
 
 
+@login_required
+def transicionar_turnos(request):
+    """
+    API para cambiar el estado de varios turnos a la vez (profesional o admin).
+    Recibe JSON {"ids": [...], "estado": "confirmado"} o los mismos campos por POST.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'mensaje': 'Método no permitido'}, status=405)
+    if not (request.user.is_profesional() or request.user.is_administrador()):
+        return JsonResponse({'success': False, 'mensaje': 'No tienes permiso para modificar turnos'}, status=403)
+    
+    try:
+        if request.content_type == 'application/json':
+            datos = json.loads(request.body)
+            ids, estado = datos.get('ids', []), datos.get('estado')
+        else:
+            ids, estado = request.POST.getlist('ids'), request.POST.get('estado')
+        ids = [int(turno_id) for turno_id in ids]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'mensaje': 'Datos inválidos'}, status=400)
+    
+    resultados, errores = TransicionService.aplicar_transiciones(request.user, ids, estado)
+    if errores:
+        return JsonResponse({'success': False, 'mensaje': errores[0]}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'actualizados': sum(1 for exitoso, _ in resultados.values() if exitoso),
+        'resultados': [
+            {'id': turno_id, 'exitoso': exitoso, 'mensaje': mensaje}
+            for turno_id, (exitoso, mensaje) in resultados.items()
+        ]
+    })
+
+
+@login_required
+def mapa_demanda(request):
+    """
+    API con el mapa de calor de demanda (día × hora) por categoría.
+    Los profesionales ven por defecto las categorías de sus servicios.
+    Query params: categoria_id (opcional)
+    """
+    if not (request.user.is_profesional() or request.user.is_administrador()):
+        return JsonResponse({'success': False, 'mensaje': 'No tienes permiso para ver la demanda'}, status=403)
+    
+    categoria_ids = None
+    if request.GET.get('categoria_id'):
+        try:
+            categoria_ids = [int(request.GET['categoria_id'])]
+        except ValueError:
+            return JsonResponse({'success': False, 'mensaje': 'Categoría inválida'}, status=400)
+    elif request.user.is_profesional():
+        categoria_ids = request.user.perfil_profesional.servicios.values_list('categoria_id', flat=True)
+    
+    return JsonResponse({'success': True, **DemandaService.mapa(categoria_ids)})
+
+
+def calendario_profesional(request, token):
+    """
+    Feed iCalendar de los turnos de un profesional.
+    Sin sesión: el token firmado de la URL identifica al profesional.
+    Responde 304 si el calendario no cambió desde la última consulta.
+    """
+    profesional_id = ICalService.profesional_id_desde_token(token)
+    if profesional_id is None or not Profesional.objects.filter(pk=profesional_id).exists():
+        raise Http404('Calendario no encontrado')
+
+    etag, ultima_modificacion = ICalService.version(profesional_id)
+    last_modified = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if no_modificado is not None:
+        return no_modificado
+
+    response = StreamingHttpResponse(
+        ICalService.generar_feed(profesional_id),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Content-Disposition'] = 'inline; filename="turnos.ics"'
+    return response
+
+
 @user_passes_test(es_profesional)
 def confirmar_turno(request, id):
     """Profesional confirma o rechaza un turno"""
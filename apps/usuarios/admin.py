@@ -27,6 +27,10 @@ class ClienteAdmin(admin.ModelAdmin):
 class ProfesionalAdmin(admin.ModelAdmin):
     list_display = ['usuario', 'get_email', 'calificacion_promedio', 'disponible']
     list_filter = ['disponible']
+    readonly_fields = [
+        'calificacion_promedio', 'calificaciones_cantidad', 'calificaciones_suma',
+        'estrellas_1', 'estrellas_2', 'estrellas_3', 'estrellas_4', 'estrellas_5'
+    ]
     search_fields = ['usuario__username', 'usuario__email']
     
     def get_email(self, obj):
@@ -0,0 +1,191 @@
+"""
+Servicios geoespaciales para profesionales.
+Mantiene un índice de grilla sobre las áreas de cobertura y resuelve
+qué profesionales llegan a un punto elegido en el mapa.
+"""
+import math
+import logging
+
+from django.db import transaction
+
+from .models import Profesional, CeldaCobertura
+
+logger = logging.getLogger(__name__)
+
+
+class GeoService:
+    """
+    Servicio de búsqueda de profesionales por cercanía.
+
+    Cada profesional se indexa en las celdas de la grilla que toca el
+    rectángulo que contiene su círculo de cobertura. Buscar un punto es
+    una consulta por igualdad sobre su celda; la distancia exacta
+    (haversine) solo se calcula para esos candidatos.
+    """
+
+    TAMANIO_CELDA = 0.25  # Grados (~28 km de latitud)
+    RADIO_TIERRA_KM = 6371.0
+    KM_POR_GRADO = 111.32
+
+    @staticmethod
+    def _columnas_totales():
+        return int(round(360 / GeoService.TAMANIO_CELDA))
+
+    @staticmethod
+    def celda(latitud, longitud):
+        """
+        Calcula la celda de la grilla que contiene un punto.
+
+        Args:
+            latitud (float): Latitud en grados
+            longitud (float): Longitud en grados
+
+        Returns:
+            tuple: (fila, columna)
+        """
+        fila = math.floor(float(latitud) / GeoService.TAMANIO_CELDA)
+        columna = math.floor(float(longitud) / GeoService.TAMANIO_CELDA)
+        mitad = GeoService._columnas_totales() // 2
+        # Normalizar la columna para que -180 y 180 caigan en la misma celda
+        return fila, (columna + mitad) % GeoService._columnas_totales() - mitad
+
+    @staticmethod
+    def celdas_cobertura(latitud, longitud, radio_km):
+        """
+        Celdas que toca el rectángulo que contiene un círculo de cobertura.
+
+        Args:
+            latitud (float): Latitud del centro
+            longitud (float): Longitud del centro
+            radio_km (float): Radio del círculo en km
+
+        Returns:
+            set[tuple]: {(fila, columna), ...}
+        """
+        latitud = float(latitud)
+        longitud = float(longitud)
+        radio_km = float(radio_km)
+
+        delta_lat = radio_km / GeoService.KM_POR_GRADO
+        lat_min = max(latitud - delta_lat, -90.0)
+        lat_max = min(latitud + delta_lat, 90.0)
+
+        # En longitud el grado se achica con la latitud: usar el extremo más alejado del ecuador
+        coseno = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if coseno < 1e-6 or radio_km / (GeoService.KM_POR_GRADO * coseno) >= 180:
+            columnas = range(-(GeoService._columnas_totales() // 2), GeoService._columnas_totales() // 2)
+        else:
+            delta_lng = radio_km / (GeoService.KM_POR_GRADO * coseno)
+            columna_min = math.floor((longitud - delta_lng) / GeoService.TAMANIO_CELDA)
+            columna_max = math.floor((longitud + delta_lng) / GeoService.TAMANIO_CELDA)
+            columnas = range(columna_min, columna_max + 1)
+
+        fila_min = math.floor(lat_min / GeoService.TAMANIO_CELDA)
+        fila_max = math.floor(lat_max / GeoService.TAMANIO_CELDA)
+        mitad = GeoService._columnas_totales() // 2
+
+        return {
+            (fila, (columna + mitad) % GeoService._columnas_totales() - mitad)
+            for fila in range(fila_min, fila_max + 1)
+            for columna in columnas
+        }
+
+    @staticmethod
+    def distancia_km(lat1, lng1, lat2, lng2):
+        """
+        Distancia haversine entre dos puntos.
+
+        Returns:
+            float: Distancia en km
+        """
+        lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+        a = (math.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+        return 2 * GeoService.RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+    @staticmethod
+    @transaction.atomic
+    def actualizar_indice(profesional):
+        """
+        Regenera las celdas de cobertura de un profesional.
+        Si el usuario no tiene ubicación, el profesional queda fuera del índice.
+
+        Args:
+            profesional (Profesional): Profesional (con su usuario cargado)
+        """
+        CeldaCobertura.objects.filter(profesional=profesional).delete()
+
+        usuario = profesional.usuario
+        if usuario.latitud is None or usuario.longitud is None:
+            return
+
+        celdas = GeoService.celdas_cobertura(usuario.latitud, usuario.longitud, profesional.radio_cobertura_km)
+        CeldaCobertura.objects.bulk_create(
+            [CeldaCobertura(profesional=profesional, fila=fila, columna=columna) for fila, columna in celdas],
+            batch_size=1000
+        )
+
+    @staticmethod
+    def reconstruir_indice():
+        """
+        Regenera el índice de todos los profesionales.
+
+        Returns:
+            int: Cantidad de profesionales indexados
+        """
+        CeldaCobertura.objects.all().delete()
+        indexados = 0
+        profesionales = Profesional.objects.filter(
+            usuario__latitud__isnull=False,
+            usuario__longitud__isnull=False
+        ).select_related('usuario')
+
+        for profesional in profesionales.iterator(chunk_size=500):
+            GeoService.actualizar_indice(profesional)
+            indexados += 1
+
+        logger.info(f"Índice geográfico reconstruido: {indexados} profesionales")
+        return indexados
+
+    @staticmethod
+    def profesionales_cercanos(latitud, longitud, servicio=None):
+        """
+        Profesionales cuyo círculo de cobertura contiene el punto, del más cercano al más lejano.
+
+        Args:
+            latitud (float): Latitud del punto (ubicación del turno)
+            longitud (float): Longitud del punto
+            servicio (Servicio, optional): Solo profesionales que ofrecen este servicio
+
+        Returns:
+            list[Profesional]: Profesionales con el atributo distancia_km
+
+        Raises:
+            ValueError: Si el punto no es una coordenada válida (no finita o fuera de rango)
+        """
+        latitud, longitud = float(latitud), float(longitud)
+        if not (math.isfinite(latitud) and math.isfinite(longitud)) or abs(latitud) > 90 or abs(longitud) > 180:
+            raise ValueError(f'Coordenadas fuera de rango: ({latitud}, {longitud})')
+
+        fila, columna = GeoService.celda(latitud, longitud)
+        candidatos = Profesional.objects.filter(
+            celdas_cobertura__fila=fila,
+            celdas_cobertura__columna=columna,
+            usuario__activo=True,
+            disponible=True
+        ).select_related('usuario')
+
+        if servicio is not None:
+            candidatos = candidatos.filter(servicios=servicio)
+
+        cercanos = []
+        for profesional in candidatos:
+            distancia = GeoService.distancia_km(
+                latitud, longitud, profesional.usuario.latitud, profesional.usuario.longitud
+            )
+            if distancia <= float(profesional.radio_cobertura_km):
+                profesional.distancia_km = round(distancia, 2)
+                cercanos.append(profesional)
+
+        cercanos.sort(key=lambda p: p.distancia_km)
+        return cercanos
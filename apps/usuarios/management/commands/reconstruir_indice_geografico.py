@@ -0,0 +1,17 @@
+"""
+Comando para regenerar el índice geográfico de cobertura de profesionales.
+
+Uso:
+    python manage.py reconstruir_indice_geografico
+"""
+from django.core.management.base import BaseCommand
+
+from apps.usuarios.geo_services import GeoService
+
+
+class Command(BaseCommand):
+    help = 'Regenera las celdas de cobertura de todos los profesionales con ubicación'
+
+    def handle(self, *args, **options):
+        indexados = GeoService.reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f'Profesionales indexados: {indexados}'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_usuario_fecha_eliminacion_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CeldaCobertura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fila', models.IntegerField(help_text='Índice de la celda en latitud')),
+                ('columna', models.IntegerField(help_text='Índice de la celda en longitud')),
+                ('profesional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='celdas_cobertura', to='usuarios.profesional')),
+            ],
+            options={
+                'verbose_name': 'Celda de Cobertura',
+                'verbose_name_plural': 'Celdas de Cobertura',
+                'indexes': [models.Index(fields=['fila', 'columna'], name='celda_cobertura_idx')],
+                'unique_together': {('profesional', 'fila', 'columna')},
+            },
+        ),
+    ]
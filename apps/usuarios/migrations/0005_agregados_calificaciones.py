@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_celdacobertura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profesional',
+            name='calificaciones_cantidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='calificaciones_suma',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='estrellas_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='estrellas_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='estrellas_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='estrellas_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profesional',
+            name='estrellas_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0005_agregados_calificaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['fecha_modificacion'], name='usuario_modificacion_idx'),
+        ),
+    ]
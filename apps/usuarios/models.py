@@ -24,6 +24,10 @@ class Usuario(AbstractUser):
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            # Cambios desde la marca de agua de los agregados diarios
+            models.Index(fields=['fecha_modificacion'], name='usuario_modificacion_idx'),
+        ]
         
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_rol_display()})"
@@ -61,14 +65,27 @@ class Profesional(models.Model):
     calificacion_promedio = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     disponible = models.BooleanField(default=True)
     radio_cobertura_km = models.DecimalField(max_digits=5, decimal_places=2, default=10.0)
-    
+
+    # Agregados de calificaciones, mantenidos de forma incremental (ver CalificacionService)
+    calificaciones_cantidad = models.PositiveIntegerField(default=0)
+    calificaciones_suma = models.PositiveIntegerField(default=0)
+    estrellas_1 = models.PositiveIntegerField(default=0)
+    estrellas_2 = models.PositiveIntegerField(default=0)
+    estrellas_3 = models.PositiveIntegerField(default=0)
+    estrellas_4 = models.PositiveIntegerField(default=0)
+    estrellas_5 = models.PositiveIntegerField(default=0)
+
     class Meta:
         verbose_name = 'Profesional'
         verbose_name_plural = 'Profesionales'
-        
+
     def __str__(self):
         return f"Profesional: {self.usuario.get_full_name()}"
 
+    def histograma_calificaciones(self):
+        """Cantidad de calificaciones por puntuación: {1: n, ..., 5: n}"""
+        return {estrellas: getattr(self, f'estrellas_{estrellas}') for estrellas in range(1, 6)}
+
 
 class HorarioDisponibilidad(models.Model):
     """Horarios de disponibilidad del profesional"""
@@ -95,3 +112,26 @@ class HorarioDisponibilidad(models.Model):
     def __str__(self):
         return f"{self.profesional.usuario.get_full_name()} - {self.get_dia_semana_display()}: {self.hora_inicio} - {self.hora_fin}"
 
+
+
+class CeldaCobertura(models.Model):
+    """
+    Índice espacial de cobertura de profesionales.
+    Cada fila indica que el círculo de cobertura del profesional
+    (ubicación del usuario + radio_cobertura_km) toca una celda de la grilla.
+    Se mantiene al guardar el perfil (ver geo_services).
+    """
+    profesional = models.ForeignKey(Profesional, on_delete=models.CASCADE, related_name='celdas_cobertura')
+    fila = models.IntegerField(help_text="Índice de la celda en latitud")
+    columna = models.IntegerField(help_text="Índice de la celda en longitud")
+    
+    class Meta:
+        verbose_name = 'Celda de Cobertura'
+        verbose_name_plural = 'Celdas de Cobertura'
+        unique_together = ('profesional', 'fila', 'columna')
+        indexes = [
+            models.Index(fields=['fila', 'columna'], name='celda_cobertura_idx'),
+        ]
+        
+    def __str__(self):
+        return f"{self.profesional} - celda ({self.fila}, {self.columna})"
@@ -428,8 +428,11 @@ class UsuarioService:
                 # Actualizar servicios
                 if 'servicios' in datos_perfil:
                     from apps.servicios.models import Servicio
+                    from apps.turnos.calendario_services import CalendarioSlotsService
                     # Desasignar servicios actuales
                     Servicio.objects.filter(profesional=profesional).update(profesional=None)
+                    # update() no dispara señales: recalcular el calendario de slots explícitamente
+                    CalendarioSlotsService.programar_recalculo(profesional.id)
                     
                     # Asignar nuevos servicios
                     for servicio_id in datos_perfil['servicios']:
@@ -0,0 +1,51 @@
+"""
+Señales de la app Usuarios.
+Mantienen el índice geográfico de cobertura al guardar el perfil.
+"""
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import Usuario, Profesional
+from .geo_services import GeoService
+
+
+def _ubicacion(usuario):
+    """Lee __dict__ para no forzar la carga de campos diferidos"""
+    return (usuario.__dict__.get('latitud'), usuario.__dict__.get('longitud'))
+
+
+@receiver(post_init, sender=Usuario)
+def guardar_ubicacion_original(sender, instance, **kwargs):
+    instance._ubicacion_original = _ubicacion(instance)
+
+
+@receiver(post_init, sender=Profesional)
+def guardar_radio_original(sender, instance, **kwargs):
+    instance._radio_original = instance.__dict__.get('radio_cobertura_km')
+
+
+@receiver(post_save, sender=Usuario)
+def actualizar_indice_usuario(sender, instance, created, update_fields=None, **kwargs):
+    """Reindexa al profesional si cambió la ubicación del usuario"""
+    ubicacion = _ubicacion(instance)
+    cambio = ubicacion != getattr(instance, '_ubicacion_original', None)
+    instance._ubicacion_original = ubicacion
+
+    if created or not cambio or not instance.is_profesional():
+        return
+
+    profesional = Profesional.objects.filter(usuario=instance).first()
+    if profesional:
+        profesional.usuario = instance
+        GeoService.actualizar_indice(profesional)
+
+
+@receiver(post_save, sender=Profesional)
+def actualizar_indice_profesional(sender, instance, created, **kwargs):
+    """Indexa al profesional nuevo o al que cambió su radio de cobertura"""
+    radio = instance.__dict__.get('radio_cobertura_km')
+    cambio = radio != getattr(instance, '_radio_original', None)
+    instance._radio_original = radio
+
+    if created or cambio:
+        GeoService.actualizar_indice(instance)
@@ -0,0 +1,85 @@
+"""
+Tests para el índice geográfico de cobertura de profesionales.
+
+Para ejecutar:
+    python manage.py test apps.usuarios.tests_geo_services
+"""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.usuarios.models import Usuario, Profesional, CeldaCobertura
+from apps.usuarios.geo_services import GeoService
+from apps.servicios.models import Categoria, Servicio
+
+# Obelisco, Buenos Aires
+OBELISCO = (-34.6037, -58.3816)
+
+
+class GeoServiceTestCase(TestCase):
+    """Tests para GeoService"""
+
+    def _crear_profesional(self, username, latitud, longitud, radio_km):
+        usuario = Usuario.objects.create_user(
+            username=username,
+            email=f'{username}@test.com',
+            password='Profesional123',
+            rol='profesional',
+            latitud=Decimal(str(latitud)),
+            longitud=Decimal(str(longitud))
+        )
+        return Profesional.objects.create(
+            usuario=usuario, especialidades='Gas', radio_cobertura_km=Decimal(str(radio_km))
+        )
+
+    def test_distancia_haversine(self):
+        """La distancia Obelisco - La Plata es de unos 53 km"""
+        distancia = GeoService.distancia_km(*OBELISCO, -34.9214, -57.9544)
+        self.assertAlmostEqual(distancia, 53, delta=2)
+
+    def test_celdas_cubren_el_circulo(self):
+        """Todo punto dentro del círculo cae en alguna celda indexada"""
+        celdas = GeoService.celdas_cobertura(*OBELISCO, 40)
+        for punto in [(-34.95, -58.38), (-34.25, -58.38), (-34.60, -58.81), (-34.60, -57.95)]:
+            self.assertIn(GeoService.celda(*punto), celdas)
+
+    def test_indice_se_mantiene_al_guardar_perfil(self):
+        """Crear el perfil indexa y cambiar la ubicación reindexa"""
+        profesional = self._crear_profesional('gasista', *OBELISCO, 10)
+        self.assertTrue(CeldaCobertura.objects.filter(profesional=profesional).exists())
+
+        usuario = Usuario.objects.get(pk=profesional.usuario_id)
+        usuario.latitud = None
+        usuario.save()
+        self.assertFalse(CeldaCobertura.objects.filter(profesional=profesional).exists())
+
+    def test_profesionales_cercanos_filtra_por_radio_y_ordena(self):
+        """Solo devuelve profesionales cuyo radio alcanza el punto, del más cercano al más lejano"""
+        lejano = self._crear_profesional('lejano', -34.70, -58.38, 15)     # ~11 km
+        cercano = self._crear_profesional('cercano', -34.61, -58.38, 5)    # ~1 km
+        self._crear_profesional('fuera', -34.90, -58.38, 10)               # ~33 km
+
+        resultado = GeoService.profesionales_cercanos(*OBELISCO)
+        self.assertEqual([p.id for p in resultado], [cercano.id, lejano.id])
+        self.assertLess(resultado[0].distancia_km, 2)
+
+    def test_profesionales_cercanos_por_servicio(self):
+        """Con servicio, solo devuelve a los profesionales que lo ofrecen"""
+        profesional = self._crear_profesional('gasista', *OBELISCO, 10)
+        self._crear_profesional('otro', *OBELISCO, 10)
+        servicio = Servicio.objects.create(
+            categoria=Categoria.objects.create(nombre='Gas', descripcion='Gas'),
+            profesional=profesional,
+            nombre='Instalación de gas',
+            descripcion='Gas',
+            precio_base=Decimal('1000.00'),
+            duracion_estimada=60
+        )
+        resultado = GeoService.profesionales_cercanos(*OBELISCO, servicio)
+        self.assertEqual([p.id for p in resultado], [profesional.id])
+
+    def test_profesionales_cercanos_rechaza_coordenadas_invalidas(self):
+        """Coordenadas infinitas, NaN o fuera de rango levantan ValueError"""
+        for punto in [('inf', -58.38), (-34.6, '1e400'), ('nan', -58.38), (91, -58.38), (-34.6, 180.5)]:
+            with self.assertRaises(ValueError):
+                GeoService.profesionales_cercanos(*punto)
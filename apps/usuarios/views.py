@@ -618,26 +618,14 @@ def perfil_usuario(request, id):
     if usuario.is_cliente():
         context['perfil'] = usuario.perfil_cliente
     elif usuario.is_profesional():
-        from apps.turnos.models import Calificacion
         from apps.servicios.models import Servicio
-        from django.db.models import Avg
         
         perfil = usuario.perfil_profesional
         context['perfil'] = perfil
         
-        # Calcular calificación promedio desde turnos calificados
-        calificacion_promedio = Calificacion.objects.filter(
-            turno__profesional=perfil
-        ).aggregate(promedio=Avg('puntuacion'))['promedio']
-        
-        # Si tiene calificaciones, actualizar el promedio; si no, es 0
-        if calificacion_promedio is not None:
-            perfil.calificacion_promedio = round(calificacion_promedio, 2)
-        else:
-            perfil.calificacion_promedio = 0.0
-        perfil.save()
-        
+        # El promedio se mantiene de forma incremental al calificar
         context['calificacion_promedio'] = perfil.calificacion_promedio
+        context['histograma_calificaciones'] = perfil.histograma_calificaciones()
         
         # Obtener servicios que ofrece el profesional
         servicios_ofrecidos = Servicio.objects.filter(profesional=perfil, activo=True)
@@ -717,7 +705,11 @@ def dashboard_cliente(request):
 def dashboard_profesional(request):
     """Dashboard para profesionales"""
     from apps.turnos.models import Turno
+    from apps.turnos.ruta_services import RutaService
+    from apps.turnos.ical_services import ICalService
     from apps.servicios.models import Servicio
+    from django.urls import reverse
+    from django.utils import timezone
     
     profesional = request.user.perfil_profesional
     
@@ -768,6 +760,12 @@ def dashboard_profesional(request):
         'mis_servicios': mis_servicios,
         'total_turnos': total_turnos,
         'turnos_completados': turnos_completados,
+        # Ruta sugerida para los turnos confirmados de hoy
+        'ruta_hoy': RutaService.planificar_dia(profesional, timezone.localdate()),
+        # Suscripción al feed iCalendar de los turnos
+        'url_calendario': request.build_absolute_uri(
+            reverse('turnos:calendario_profesional', args=[ICalService.token_para(profesional)])
+        ),
     }
     return render(request, 'usuarios/dashboard_profesional.html', context)
 
@@ -778,7 +776,7 @@ def dashboard_admin(request):
     """Dashboard para administradores"""
     from apps.turnos.models import Turno
     from apps.servicios.models import Servicio, Categoria
-    from apps.promociones.models import Promocion
+    from apps.promociones.indice_services import PromocionIndiceService
     from apps.politicas.models import PoliticaCancelacion
     from django.db.models import Count
     from datetime import date
@@ -793,12 +791,8 @@ def dashboard_admin(request):
     turnos_pendientes = Turno.objects.filter(estado='pendiente').count()
     turnos_hoy = Turno.objects.filter(fecha=date.today()).count()
     
-    # Promociones activas
-    promociones_activas = Promocion.objects.filter(
-        activa=True,
-        fecha_inicio__lte=date.today(),
-        fecha_fin__gte=date.today()
-    ).count()
+    # Promociones activas (en memoria hasta el próximo cambio de vigencia)
+    promociones_activas = len(PromocionIndiceService.vigentes_ids())
     
     # Usuarios recientes
     usuarios_recientes = Usuario.objects.filter(activo=True).order_by('-fecha_registro')[:5]
@@ -886,16 +880,9 @@ def perfil_usuario_ajax(request, id):
     if usuario.is_profesional():
         try:
             perfil = usuario.perfil_profesional
-            from apps.turnos.models import Calificacion, Turno
+            from apps.turnos.models import Turno
             
-            # Calcular calificación promedio
-            calificaciones = Calificacion.objects.filter(turno__profesional=perfil)
-            if calificaciones.exists():
-                from django.db.models import Avg
-                calificacion_promedio = calificaciones.aggregate(Avg('puntuacion'))['puntuacion__avg']
-                context['calificacion_promedio'] = round(calificacion_promedio, 2) if calificacion_promedio else 0
-            else:
-                context['calificacion_promedio'] = 0
+            context['calificacion_promedio'] = perfil.calificacion_promedio
             
             # Obtener servicios que ofrece
             from apps.servicios.models import Servicio